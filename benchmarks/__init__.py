@@ -0,0 +1 @@
+"""Benchmarks de desempenho da aplicação (executar com `python -m benchmarks.<nome>`)."""
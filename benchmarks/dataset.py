@@ -0,0 +1,128 @@
+"""
+Gerador determinístico de usuários sintéticos e criação de bancos SQLite semeados.
+
+A mesma combinação (quantidade, seed) produz sempre os mesmos registros, de
+modo que resultados de benchmarks em máquinas e commits diferentes sejam
+comparáveis. Bancos semeados são guardados em cache no diretório de dados
+e copiados para um arquivo de trabalho a cada execução.
+
+Uso:
+    python -m benchmarks.dataset --users 1000000 [--seed 42]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Iterator
+
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, insert
+
+from src.infrastructure.database.database import Base
+from src.infrastructure.database.models import User as UserModelDB
+
+DEFAULT_SEED = 42
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "user-manager-benchmarks")
+SEED_BATCH_SIZE = 10000
+# Incrementado quando o esquema muda (v2: índice de busca FTS5 e contador de usuários;
+# v3: coluna users.version), para que bancos semeados em cache com o esquema antigo
+# não sejam reaproveitados
+SCHEMA_VERSION = 3
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+_FIRST_NAMES = (
+    "ana", "bruno", "carla", "diego", "elisa", "felipe", "gabriela", "heitor",
+    "isabela", "joao", "karen", "lucas", "marina", "nicolas", "olivia", "paulo",
+    "quezia", "rafael", "sofia", "tiago", "ursula", "vitor", "wanda", "yasmin",
+)
+_LAST_NAMES = (
+    "almeida", "barbosa", "cardoso", "dias", "esteves", "ferreira", "gomes",
+    "haddad", "lima", "moreira", "nunes", "oliveira", "pereira", "ribeiro",
+    "santos", "teixeira", "vieira",
+)
+_DOMAINS = ("example.com", "example.org", "example.net", "mail.example.com")
+
+
+def benchmark_password_hash() -> str:
+    """Hash bcrypt fixo (salt determinístico) compartilhado por todos os usuários gerados"""
+    handler = CryptContext(schemes=["bcrypt"]).handler("bcrypt")
+    return handler.using(salt="benchmarkseedsaltvalue", rounds=12).hash(BENCHMARK_PASSWORD)
+
+
+def generate_users(count: int, seed: int = DEFAULT_SEED, password_hash: str = "") -> Iterator[dict]:
+    """
+    Gera count usuários determinísticos; o índice no sufixo garante emails únicos.
+    O i-ésimo usuário gerado recebe id i + 1 ao ser inserido em uma tabela vazia.
+    """
+    rng = random.Random(seed)
+    for index in range(count):
+        first = rng.choice(_FIRST_NAMES)
+        last = rng.choice(_LAST_NAMES)
+        yield {
+            "username": f"{first}_{last}{index}",
+            "email": f"{first}.{last}.{index}@{rng.choice(_DOMAINS)}",
+            "hashed_password": password_hash,
+        }
+
+
+def seed_database(path: str, count: int, seed: int = DEFAULT_SEED) -> None:
+    """Cria o arquivo SQLite em path com count usuários gerados"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    password_hash = benchmark_password_hash()
+    batch = []
+    with engine.begin() as conn:
+        # Carga inicial: sem journal e sem fsync, o arquivo é descartável até o final
+        conn.exec_driver_sql("PRAGMA journal_mode=OFF")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        for user in generate_users(count, seed, password_hash):
+            batch.append(user)
+            if len(batch) >= SEED_BATCH_SIZE:
+                conn.execute(insert(UserModelDB), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(UserModelDB), batch)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+
+
+def seeded_database(count: int, seed: int = DEFAULT_SEED, data_dir: str = DEFAULT_DATA_DIR) -> str:
+    """Retorna o caminho do banco semeado em cache, criando-o se necessário"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"users-{count}-seed{seed}-v{SCHEMA_VERSION}.db")
+    if not os.path.exists(path):
+        partial = f"{path}.partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        seed_database(partial, count, seed)
+        os.replace(partial, path)
+    return path
+
+
+def working_copy(count: int, seed: int = DEFAULT_SEED, data_dir: str = DEFAULT_DATA_DIR) -> str:
+    """Copia o banco semeado para um arquivo temporário que pode ser alterado"""
+    source = seeded_database(count, seed, data_dir)
+    fd, path = tempfile.mkstemp(prefix=f"users-{count}-", suffix=".db", dir=data_dir)
+    os.close(fd)
+    shutil.copyfile(source, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    path = seeded_database(args.users, args.seed, args.data_dir)
+    print(f"{path} ({args.users} usuários, {time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
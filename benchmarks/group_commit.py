@@ -0,0 +1,155 @@
+"""
+Benchmark da fila de escrita com group commit (WRITE_QUEUE_ENABLED).
+
+Várias threads cadastram usuários ao mesmo tempo, como requisições
+concorrentes de POST /users/, com o perfil de PRAGMAs "durable" (WAL +
+synchronous=FULL) em um arquivo temporário:
+
+- direct: cada cadastro abre uma sessão e faz o seu próprio COMMIT
+  (SQLiteUserRepository), disputando o lock de escrita do SQLite
+- queue: cada cadastro é enviado ao GroupCommitWriter e aguarda o COMMIT do
+  lote que o contém
+
+--commit-latency-ms acrescenta uma espera a cada COMMIT, com o lock de
+escrita adquirido, para reproduzir um armazenamento cujo fsync custa esse
+tempo (discos de rede, sem cache de escrita).
+
+Uso:
+    python -m benchmarks.group_commit [--writers 32] [--users-per-writer 100] [--commit-latency-ms 0]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.core.exceptions import UserAlreadyExistsError
+from src.infrastructure.database.database import Base
+from src.infrastructure.database.group_commit import GroupCommitWriter, enable_savepoints
+from src.infrastructure.database.sqlite_pragmas import install_sqlite_pragmas, resolve_sqlite_pragmas
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+from src.infrastructure.database.user_count import create_user_counter
+from src.infrastructure.database.user_search import create_search_index
+
+
+def _engine(path: str, commit_latency: float, savepoints: bool = False):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, pool_size=64)
+    if savepoints:
+        enable_savepoints(engine)
+    install_sqlite_pragmas(engine, resolve_sqlite_pragmas("durable"))
+    if commit_latency > 0:
+        # O evento "commit" ocorre antes do COMMIT do driver, com o lock de escrita já adquirido
+        event.listen(engine, "commit", lambda connection: time.sleep(commit_latency))
+    return engine
+
+
+def _user(index: int) -> dict:
+    return {"username": f"user{index}", "email": f"user{index}@example.com", "hashed_password": "h"}
+
+
+def _run_writers(writers: int, users_per_writer: int, write) -> dict:
+    barrier = threading.Barrier(writers + 1)
+    latencies, locked, lock = [], [0], threading.Lock()
+
+    def writer(thread: int):
+        barrier.wait()
+        samples, failures = [], 0
+        for i in range(users_per_writer):
+            started = time.perf_counter()
+            try:
+                write(_user(thread * users_per_writer + i))
+            except OperationalError:
+                # "database is locked": o escritor esperou mais que o busy_timeout pelo lock
+                failures += 1
+            samples.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(samples)
+            locked[0] += failures
+
+    workers = [threading.Thread(target=writer, args=(thread,)) for thread in range(writers)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "seconds": elapsed,
+        "locked": locked[0],
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def run(mode: str, writers: int, users_per_writer: int, commit_latency: float, max_batch: int, max_delay: float):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "users.db")
+        setup = create_engine(f"sqlite:///{path}")
+        install_sqlite_pragmas(setup, resolve_sqlite_pragmas("durable"))
+        Base.metadata.create_all(setup)
+        with setup.begin() as connection:
+            create_search_index(connection)
+            create_user_counter(connection)
+
+        stats = None
+        if mode == "direct":
+            engine = _engine(path, commit_latency)
+            factory = sessionmaker(bind=engine, autoflush=False)
+
+            def write(user_data: dict):
+                with factory() as session:
+                    SQLiteUserRepository(session).add(user_data)
+
+            result = _run_writers(writers, users_per_writer, write)
+        else:
+            engine = _engine(path, commit_latency, savepoints=True)
+            writer = GroupCommitWriter(engine, max_batch=max_batch, max_delay=max_delay)
+            result = _run_writers(writers, users_per_writer, lambda user_data: writer.add(user_data).result())
+            writer.close()
+            stats = writer.stats()
+        engine.dispose()
+
+        with setup.connect() as connection:
+            users = connection.exec_driver_sql("SELECT count(*) FROM users").scalar()
+        setup.dispose()
+    result.update({"mode": mode, "users": users, "inserts_per_second": users / result["seconds"], "writer": stats})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--users-per-writer", type=int, default=100)
+    parser.add_argument("--commit-latency-ms", type=float, default=0.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(
+        f"{args.writers} escritores, {args.users_per_writer} cadastros cada, "
+        f"latência de COMMIT simulada {args.commit_latency_ms}ms, {os.cpu_count()} CPUs"
+    )
+    print(f"{'modo':<8} {'usuários':>9} {'locked':>7} {'inserts/s':>10} {'p50':>9} {'p99':>9} {'escritas/COMMIT':>16}")
+    baseline = None
+    for mode in ("direct", "queue"):
+        result = run(
+            mode, args.writers, args.users_per_writer, args.commit_latency_ms / 1000,
+            args.max_batch, args.max_delay_ms / 1000,
+        )
+        baseline = baseline or result["inserts_per_second"]
+        per_commit = f"{result['writer']['operations_per_batch_avg']:.1f}" if result["writer"] else "1.0"
+        print(
+            f"{mode:<8} {result['users']:>9} {result['locked']:>7} {result['inserts_per_second']:>10.0f} "
+            f"{result['p50_ms']:>7.2f}ms {result['p99_ms']:>7.2f}ms {per_commit:>16}"
+            f"  ({result['inserts_per_second'] / baseline:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Teste de carga HTTP ponta a ponta da aplicação (src.main:app).
+
+Semeia uma cópia de banco SQLite com o gerador determinístico, sobe a
+aplicação em processo (ASGI, sem sockets) ou sob uvicorn em localhost e
+dispara cargas mistas com clientes httpx assíncronos concorrentes.
+O relatório traz requisições por segundo, p50/p95/p99, histograma de
+latência e taxa de erros por rota, além de um JSON opcional.
+
+Cargas disponíveis: read-heavy, login-storm, login-spike, write-burst e mixed.
+login-spike mistura logins com leituras e /health para comparar a latência
+das rotas baratas durante um pico de bcrypt, com e sem os limites de
+concorrência (CONCURRENCY_LIMIT_ENABLED).
+
+Uso:
+    python -m benchmarks.loadtest --workload read-heavy --concurrency 32 --duration 20
+    python -m benchmarks.loadtest --server uvicorn --workers 2 --workload mixed --output report.json
+    python -m benchmarks.loadtest --workload login-storm --env PASSWORD_HASH_WORKERS=4
+    python -m benchmarks.loadtest --workload login-spike --concurrency 64 --env CONCURRENCY_LIMIT_ENABLED=false
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+# Pesos relativos de cada operação por carga
+WORKLOADS: Dict[str, Dict[str, int]] = {
+    "read-heavy": {"get_user": 45, "list_users": 20, "me": 30, "update_me": 5},
+    "login-storm": {"login": 100},
+    "login-spike": {"login": 50, "get_user": 30, "health": 20},
+    "write-burst": {"create_user": 70, "update_me": 30},
+    "mixed": {"login": 5, "get_user": 35, "list_users": 15, "me": 30, "create_user": 8, "update_me": 7},
+}
+
+# Limites superiores dos intervalos do histograma, em milissegundos
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+
+
+class Recorder:
+    """Acumula latências (ms), códigos de status e erros por rota"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    def record(self, label: str, latency_ms: float, status: Optional[int]) -> None:
+        self.latencies[label].append(latency_ms)
+        self.statuses[label][status if status is not None else "exception"] += 1
+        if status is None or status >= 400:
+            self.errors[label] += 1
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def histogram(latencies: List[float]) -> List[Tuple[str, int]]:
+    counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+    for latency in latencies:
+        for index, upper in enumerate(HISTOGRAM_BUCKETS_MS):
+            if latency <= upper:
+                counts[index] += 1
+                break
+    labels = [f"<= {upper:g} ms" if upper != float("inf") else f"> {HISTOGRAM_BUCKETS_MS[-2]:g} ms"
+              for upper in HISTOGRAM_BUCKETS_MS]
+    return list(zip(labels, counts))
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    routes = {}
+    all_latencies: List[float] = []
+    for label, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        all_latencies.extend(ordered)
+        routes[label] = _route_summary(ordered, recorder.errors[label], elapsed)
+        routes[label]["status_codes"] = {str(k): v for k, v in recorder.statuses[label].items()}
+    total = _route_summary(sorted(all_latencies), sum(recorder.errors.values()), elapsed)
+    return {"elapsed_seconds": elapsed, "total": total, "routes": routes}
+
+
+def _route_summary(ordered: List[float], errors: int, elapsed: float) -> dict:
+    count = len(ordered)
+    return {
+        "requests": count,
+        "requests_per_second": count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "histogram": histogram(ordered),
+    }
+
+
+class LoadContext:
+    """Estado compartilhado entre os clientes virtuais: contas logadas e contadores"""
+
+    def __init__(self, users: int, accounts: List[dict], password: str):
+        self.users = users
+        self.accounts = accounts
+        self.password = password
+        self.created = 0
+
+    def next_email(self, worker: int) -> str:
+        self.created += 1
+        return f"loadtest-{worker}-{self.created}@load.example.com"
+
+
+async def op_login(client, ctx, rng, worker) -> Tuple[str, httpx.Response]:
+    account = ctx.accounts[worker % len(ctx.accounts)]
+    response = await client.post("/token", data={"username": account["email"], "password": ctx.password})
+    return "POST /token", response
+
+
+async def op_get_user(client, ctx, rng, worker):
+    return "GET /users/{id}", await client.get(f"/users/{rng.randint(1, ctx.users)}")
+
+
+async def op_health(client, ctx, rng, worker):
+    return "GET /health", await client.get("/health")
+
+
+async def op_list_users(client, ctx, rng, worker):
+    return "GET /users/", await client.get("/users/", params={"limit": 10})
+
+
+async def op_me(client, ctx, rng, worker):
+    account = ctx.accounts[worker % len(ctx.accounts)]
+    return "GET /users/me", await client.get("/users/me", headers=account["headers"])
+
+
+async def op_create_user(client, ctx, rng, worker):
+    email = ctx.next_email(worker)
+    payload = {"username": email.split("@")[0], "email": email, "password": ctx.password}
+    return "POST /users/", await client.post("/users/", json=payload)
+
+
+async def refresh_account(client, account: dict, stale_headers: dict) -> None:
+    """Renova o token da conta uma única vez, mesmo com vários clientes virtuais a usando"""
+    async with account["lock"]:
+        if account["headers"] is stale_headers:
+            response = await client.post("/token/refresh", data={"refresh_token": account["refresh_token"]})
+            response.raise_for_status()
+            _store_tokens(account, response.json())
+
+
+async def op_update_me(client, ctx, rng, worker):
+    account = ctx.accounts[worker % len(ctx.accounts)]
+    payload = {"username": f"loadtest{worker}-{rng.randint(0, 10**6)}"}
+    headers = account["headers"]
+    response = await client.put(f"/users/{account['id']}", json=payload, headers=headers)
+    if response.status_code == 401 and account.get("refresh_token"):
+        # Token desatualizado por um PUT concorrente de outro cliente da conta: renova e repete
+        await refresh_account(client, account, headers)
+        response = await client.put(f"/users/{account['id']}", json=payload, headers=account["headers"])
+    if "X-Access-Token" in response.headers:
+        # Com ACCESS_TOKEN_SELF_CONTAINED, o PUT devolve o token com a nova versão do usuário
+        account["headers"] = {"Authorization": f"Bearer {response.headers['X-Access-Token']}"}
+    return "PUT /users/{id}", response
+
+
+OPERATIONS = {
+    "login": op_login,
+    "get_user": op_get_user,
+    "health": op_health,
+    "list_users": op_list_users,
+    "me": op_me,
+    "create_user": op_create_user,
+    "update_me": op_update_me,
+}
+
+
+async def virtual_user(worker, client, ctx, workload, recorder, measure_from, deadline, seed):
+    rng = random.Random(seed * 1000 + worker)
+    names = list(workload)
+    weights = [workload[name] for name in names]
+    while True:
+        started = time.perf_counter()
+        if started >= deadline:
+            return
+        operation = OPERATIONS[rng.choices(names, weights)[0]]
+        try:
+            label, response = await operation(client, ctx, rng, worker)
+            status = response.status_code
+        except httpx.HTTPError:
+            label, status = operation.__name__, None
+        finished = time.perf_counter()
+        if started >= measure_from:
+            recorder.record(label, (finished - started) * 1000, status)
+        if status == 503 and "Retry-After" in response.headers:
+            # Como um cliente real, espera o Retry-After antes da próxima requisição
+            await asyncio.sleep(float(response.headers["Retry-After"]))
+
+
+def _store_tokens(account: dict, tokens: dict) -> None:
+    account["headers"] = {"Authorization": f"Bearer {tokens['access_token']}"}
+    account["refresh_token"] = tokens.get("refresh_token")
+
+
+async def login_accounts(client, accounts: List[dict], password: str) -> None:
+    async def login(account):
+        response = await client.post("/token", data={"username": account["email"], "password": password})
+        # 503 com Retry-After: limite de concorrência de /token atingido
+        while response.status_code == 503 and "Retry-After" in response.headers:
+            await asyncio.sleep(float(response.headers["Retry-After"]))
+            response = await client.post("/token", data={"username": account["email"], "password": password})
+        response.raise_for_status()
+        _store_tokens(account, response.json())
+        account["lock"] = asyncio.Lock()
+    await asyncio.gather(*(login(account) for account in accounts))
+
+
+async def run_load(client, args, accounts, password) -> dict:
+    await login_accounts(client, accounts, password)
+    ctx = LoadContext(args.users, accounts, password)
+    recorder = Recorder()
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    deadline = measure_from + args.duration
+    await asyncio.gather(*(
+        virtual_user(worker, client, ctx, WORKLOADS[args.workload], recorder, measure_from, deadline, args.seed)
+        for worker in range(args.concurrency)
+    ))
+    # Requisições iniciadas dentro da janela contam; req/s usa a duração da janela
+    return summarize(recorder, args.duration)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn encerrou com código {process.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn não respondeu a /health a tempo")
+
+
+async def run_with_uvicorn(args, accounts, password, env) -> dict:
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await _wait_until_ready(base_url, process)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            return await run_load(client, args, accounts, password)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def run_in_process(args, accounts, password) -> dict:
+    # Importado somente aqui: a aplicação lê DATABASE_URL ao ser criada
+    from src.main import app
+    from src.infrastructure.security.password_hasher import get_password_hasher
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            return await run_load(client, args, accounts, password)
+    finally:
+        get_password_hasher().shutdown()
+
+
+def print_report(report: dict) -> None:
+    meta = report["meta"]
+    print(f"Carga: {meta['workload']} | servidor: {meta['server']} | concorrência: {meta['concurrency']} "
+          f"| duração: {report['elapsed_seconds']:.1f}s | usuários: {meta['users']}")
+    print(f"\n{'rota':<18}{'req':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'erros':>8}")
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for label, stats in rows:
+        print(f"{label:<18}{stats['requests']:>8}{stats['requests_per_second']:>9.1f}{stats['p50_ms']:>9.1f}"
+              f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}{stats['error_rate']:>8.1%}")
+    for label, stats in report["routes"].items():
+        print(f"\n{label}  status: {stats['status_codes']}")
+        peak = max((count for _, count in stats["histogram"]), default=0) or 1
+        for bucket, count in stats["histogram"]:
+            if count:
+                print(f"  {bucket:>12} {'#' * max(1, round(40 * count / peak)):<40} {count}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="mixed")
+    parser.add_argument("--server", choices=("asgi", "uvicorn"), default="asgi",
+                        help="asgi: aplicação no próprio processo; uvicorn: subprocesso em localhost")
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn")
+    parser.add_argument("--concurrency", type=int, default=32, help="clientes virtuais simultâneos")
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos descartados no início")
+    parser.add_argument("--users", type=int, default=10000, help="tamanho do banco semeado")
+    parser.add_argument("--accounts", type=int, default=16, help="contas logadas usadas pelos clientes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout por requisição (s)")
+    parser.add_argument("--env", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="variável de ambiente para a aplicação (pode repetir)")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--output", help="grava o relatório em JSON")
+    args = parser.parse_args(argv)
+
+    # O ambiente precisa estar pronto antes de qualquer importação de src
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), "user-manager-benchmarks")
+    os.makedirs(data_dir, exist_ok=True)
+    database_path = os.path.join(data_dir, f"loadtest-{os.getpid()}.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    for item in args.env:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+
+    from benchmarks.dataset import BENCHMARK_PASSWORD, generate_users, seeded_database
+
+    shutil.copyfile(seeded_database(args.users, args.seed, data_dir), database_path)
+    accounts = [
+        {"id": index + 1, "email": user["email"]}
+        for index, user in enumerate(generate_users(min(args.accounts, args.users), args.seed))
+    ]
+    try:
+        if args.server == "uvicorn":
+            report = asyncio.run(run_with_uvicorn(args, accounts, BENCHMARK_PASSWORD, dict(os.environ)))
+        else:
+            report = asyncio.run(run_in_process(args, accounts, BENCHMARK_PASSWORD))
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database_path + suffix):
+                os.remove(database_path + suffix)
+
+    report["meta"] = {
+        "workload": args.workload,
+        "weights": WORKLOADS[args.workload],
+        "server": args.server if args.server == "asgi" else f"uvicorn x{args.workers}",
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "seed": args.seed,
+        "env": args.env,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRelatório gravado em {args.output}")
+    return 1 if report["total"]["requests"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Calibração do custo do hashing de senhas (PASSWORD_HASH_*).
+
+Mede, neste hardware, o tempo de um hash para custos crescentes do esquema
+e recomenda o maior custo cuja mediana fica dentro da latência alvo de um
+login. O bcrypt dobra o tempo a cada round; no argon2 a memória
+(--argon2-memory-kib) e o paralelismo ficam fixos e o time_cost cresce. As
+medições usam o mesmo CryptContext da aplicação (get_pwd_context), em um
+único processo: cada processo do pool de hashing (PASSWORD_HASH_WORKERS)
+atende cerca de 1000 / tempo_ms logins por segundo.
+
+O argon2 requer o pacote argon2-cffi (pip install argon2-cffi).
+
+Uso:
+    python -m benchmarks.password_hash [--target-ms 250] [--scheme bcrypt|argon2|all] [--samples 3]
+"""
+import argparse
+import statistics
+import time
+from dataclasses import replace
+from typing import List, Optional, Tuple
+
+from src.infrastructure.security.password_hasher import PasswordHashPolicy, get_pwd_context
+
+PASSWORD = "calibration-password"
+BCRYPT_ROUNDS = range(8, 17)
+ARGON2_TIME_COSTS = range(1, 11)
+
+
+def measure(policy: PasswordHashPolicy, samples: int) -> float:
+    """Mediana, em ms, do tempo de um hash com a política"""
+    context = get_pwd_context(policy)
+    context.hash(PASSWORD)  # aquece o backend
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(candidates: List[Tuple[int, PasswordHashPolicy]], target_ms: float,
+              samples: int) -> Tuple[List[Tuple[int, float]], Optional[int]]:
+    """Mede os custos em ordem crescente até passar de 2x o alvo; retorna as medições e o recomendado"""
+    results, recommended = [], None
+    for cost, policy in candidates:
+        elapsed = measure(policy, samples)
+        results.append((cost, elapsed))
+        if elapsed <= target_ms:
+            recommended = cost
+        if elapsed > target_ms * 2:
+            break
+    return results, recommended
+
+
+def _report(scheme: str, label: str, results, recommended, target_ms: float, settings: List[str]) -> None:
+    print(f"\n{scheme} ({label})")
+    for cost, elapsed in results:
+        marker = "  <- recomendado" if cost == recommended else ""
+        print(f"  {cost:>4}  {elapsed:>9.1f} ms  ~{1000 / elapsed:>7.1f} hashes/s por processo{marker}")
+    if recommended is None:
+        print(f"  ⚠️  Nenhum custo ficou abaixo de {target_ms:.0f} ms; use o menor medido ou aumente o alvo")
+        return
+    print("\n  .env:")
+    for line in settings:
+        print(f"  {line}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250.0, help="latência alvo de um hash (ms)")
+    parser.add_argument("--scheme", choices=("bcrypt", "argon2", "all"), default="all")
+    parser.add_argument("--samples", type=int, default=3, help="hashes medidos por custo")
+    parser.add_argument("--argon2-memory-kib", type=int, default=PasswordHashPolicy.argon2_memory_kib)
+    parser.add_argument("--argon2-parallelism", type=int, default=PasswordHashPolicy.argon2_parallelism)
+    args = parser.parse_args(argv)
+
+    print(f"Alvo: {args.target_ms:.0f} ms por hash | amostras por custo: {args.samples}")
+    if args.scheme in ("bcrypt", "all"):
+        results, recommended = calibrate(
+            [(rounds, PasswordHashPolicy(bcrypt_rounds=rounds)) for rounds in BCRYPT_ROUNDS],
+            args.target_ms, args.samples,
+        )
+        _report("bcrypt", "rounds", results, recommended, args.target_ms, [
+            "PASSWORD_HASH_SCHEME=bcrypt",
+            f"PASSWORD_HASH_BCRYPT_ROUNDS={recommended}",
+        ])
+    if args.scheme in ("argon2", "all"):
+        base = PasswordHashPolicy(
+            scheme="argon2", argon2_memory_kib=args.argon2_memory_kib, argon2_parallelism=args.argon2_parallelism
+        )
+        try:
+            base.check_backend()
+        except RuntimeError as e:
+            print(f"\nargon2: {e}")
+            return 0 if args.scheme == "all" else 1
+        results, recommended = calibrate(
+            [(cost, replace(base, argon2_time_cost=cost)) for cost in ARGON2_TIME_COSTS],
+            args.target_ms, args.samples,
+        )
+        _report("argon2", f"time_cost, {args.argon2_memory_kib} KiB, parallelism {args.argon2_parallelism}",
+                results, recommended, args.target_ms, [
+                    "PASSWORD_HASH_SCHEME=argon2",
+                    f"PASSWORD_HASH_ARGON2_TIME_COST={recommended}",
+                    f"PASSWORD_HASH_ARGON2_MEMORY_KIB={args.argon2_memory_kib}",
+                    f"PASSWORD_HASH_ARGON2_PARALLELISM={args.argon2_parallelism}",
+                ])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
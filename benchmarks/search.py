@@ -0,0 +1,94 @@
+"""
+Benchmark da busca de usuários (GET /users/search) sobre um banco semeado.
+
+Cria o índice FTS5 em uma cópia do banco semeado (medindo o tempo de
+construção) e mede a latência de SQLiteUserRepository.search para consultas
+de seletividades diferentes: termos raros, nomes, nome + sobrenome, prefixos
+curtos e termos presentes em todos os usuários.
+
+Uso:
+    python -m benchmarks.search [--users 1000000] [--iterations 50]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.dataset import DEFAULT_SEED, working_copy
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+from src.infrastructure.database.user_search import create_search_index
+
+QUERIES = (
+    "12345",
+    "marina",
+    "marina lima",
+    "marina.lima.20",
+    "carla_dias77",
+    "ma",
+    "lim",
+    "example",
+    "gabriela.ferreira.999@example.org",
+)
+
+
+def run(users: int, iterations: int, limit: int, seed: int = DEFAULT_SEED) -> dict:
+    path = working_copy(users, seed)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            create_search_index(connection)
+        index_seconds = time.perf_counter() - started
+
+        session = sessionmaker(bind=engine)()
+        repository = SQLiteUserRepository(session)
+        results = {}
+        for query in QUERIES:
+            first_page = repository.search(query, limit=limit)
+            samples = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                repository.search(query, limit=limit)
+                samples.append(time.perf_counter() - started)
+            # Segunda página a partir do cursor (rank, id) do último resultado
+            after = (first_page[-1][0], first_page[-1][1].id) if len(first_page) == limit else None
+            next_samples = []
+            if after is not None:
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    repository.search(query, limit=limit, after=after)
+                    next_samples.append(time.perf_counter() - started)
+            results[query] = {
+                "results": len(first_page),
+                "median_ms": statistics.median(samples) * 1000,
+                "max_ms": max(samples) * 1000,
+                "next_page_median_ms": statistics.median(next_samples) * 1000 if next_samples else None,
+            }
+        session.close()
+        return {"users": users, "index_build_seconds": index_seconds, "queries": results}
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    result = run(args.users, args.iterations, args.limit, args.seed)
+    print(f"{result['users']} usuários, índice criado em {result['index_build_seconds']:.1f}s")
+    print(f"{'consulta':<36} {'resultados':>10} {'mediana':>10} {'máx':>10} {'página 2':>10}")
+    for query, row in result["queries"].items():
+        next_page = f"{row['next_page_median_ms']:8.2f}ms" if row["next_page_median_ms"] is not None else "-"
+        print(f"{query:<36} {row['results']:>10} {row['median_ms']:8.2f}ms {row['max_ms']:8.2f}ms {next_page:>10}")
+
+
+if __name__ == "__main__":
+    main()
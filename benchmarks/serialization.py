@@ -0,0 +1,113 @@
+"""
+Benchmark da serialização de usuários do banco para JSON.
+
+Compara, por resposta de GET /users/{id} e de GET /users/ (uma página), o
+caminho padrão (model_validate do domínio + response_model do FastAPI +
+JSONResponse) com o caminho direto (model_construct + TypeAdapter.dump_json).
+Antes de medir, verifica que os dois produzem exatamente os mesmos bytes.
+
+Uso:
+    python -m benchmarks.serialization [--iterations 20000] [--page-size 100]
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.core.models import User as UserDomain
+from src.infrastructure.database.models import User as UserModelDB, to_domain
+from src.infrastructure.web import schemas
+from src.infrastructure.web.serialization import encode_user, encode_users
+
+_USER_FIELD = create_model_field(name="Response_read_user", type_=schemas.UserResponse, mode="serialization")
+_USER_LIST_FIELD = create_model_field(
+    name="Response_read_users", type_=List[schemas.UserResponse], mode="serialization"
+)
+
+
+def make_rows(count: int) -> List[UserModelDB]:
+    """Objetos ORM como os devolvidos pela sessão (inclui nomes não ASCII)"""
+    return [
+        UserModelDB(
+            id=index + 1,
+            username=f"usuário_{index} \"São Paulo\"",
+            email=f"user{index}@example.com",
+            hashed_password="$2b$12$" + "x" * 53,
+            version=1,
+        )
+        for index in range(count)
+    ]
+
+
+async def standard_path(rows: List[UserModelDB], single: bool) -> bytes:
+    """Caminho anterior: validação no repositório e no response_model"""
+    users = [UserDomain.model_validate(row) for row in rows]
+    content = await serialize_response(
+        field=_USER_FIELD if single else _USER_LIST_FIELD,
+        response_content=users[0] if single else users,
+        is_coroutine=True,
+    )
+    return JSONResponse(content).body
+
+
+def fast_path(rows: List[UserModelDB], single: bool) -> bytes:
+    users = [to_domain(row) for row in rows]
+    return encode_user(users[0]) if single else encode_users(users)
+
+
+async def _time_standard(rows, single: bool, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await standard_path(rows, single)
+    return time.perf_counter() - started
+
+
+def _time_fast(rows, single: bool, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fast_path(rows, single)
+    return time.perf_counter() - started
+
+
+def run(iterations: int, page_size: int) -> dict:
+    cases = {
+        "GET /users/{id}": (make_rows(1), True, iterations),
+        f"GET /users/ ({page_size} por página)": (make_rows(page_size), False, max(1, iterations // page_size)),
+    }
+    results = {}
+    for name, (rows, single, count) in cases.items():
+        standard = asyncio.run(standard_path(rows, single))
+        fast = fast_path(rows, single)
+        if standard != fast:
+            raise AssertionError(f"{name}: saídas diferentes\n{standard!r}\n{fast!r}")
+        standard_seconds = asyncio.run(_time_standard(rows, single, count))
+        fast_seconds = _time_fast(rows, single, count)
+        results[name] = {
+            "iterations": count,
+            "bytes": len(fast),
+            "standard_us_per_response": standard_seconds / count * 1e6,
+            "fast_us_per_response": fast_seconds / count * 1e6,
+            "speedup": standard_seconds / fast_seconds if fast_seconds else float("inf"),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    for name, result in run(args.iterations, args.page_size).items():
+        print(f"{name}  ({result['bytes']} bytes, saída idêntica)")
+        print(f"  response_model:  {result['standard_us_per_response']:9.2f} µs/resposta")
+        print(f"  caminho direto:  {result['fast_us_per_response']:9.2f} µs/resposta")
+        print(f"  Ganho:           {result['speedup']:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
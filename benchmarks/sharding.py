@@ -0,0 +1,218 @@
+"""
+Benchmark de vazão de escrita com o repositório particionado em shards SQLite.
+
+Vários escritores cadastram usuários ao mesmo tempo, um INSERT + COMMIT por
+usuário (como POST /users/), com ShardedUserRepository sobre 1, 2, 4, ...
+arquivos. Com um único arquivo as escritas disputam o lock de escrita do
+SQLite; com N arquivos, escritas em shards diferentes prosseguem em paralelo.
+
+Os escritores são processos (--mode processes, como vários workers do
+uvicorn) ou threads de um mesmo processo (--mode threads; o sqlite3 libera o
+GIL durante o COMMIT e o fsync, mas o restante do INSERT disputa o GIL).
+O ganho depende de quanto do tempo de cada escrita é espera pelo lock e pelo
+fsync: com poucos núcleos ou fsync barato (tmpfs, cache de escrita do disco),
+a CPU limita a vazão antes do lock. Os arquivos são criados em --directory
+(padrão: diretório temporário do sistema).
+
+--commit-latency-ms acrescenta uma espera antes de cada COMMIT, com o lock de
+escrita já adquirido, para reproduzir um armazenamento cujo fsync custa esse
+tempo (discos de rede, sem cache de escrita) em máquinas onde ele é barato.
+
+Uso:
+    python -m benchmarks.sharding [--shards 1 2 4 8] [--writers 16] [--users-per-writer 200]
+    python -m benchmarks.sharding --mode threads --profile default --directory /var/tmp
+    python -m benchmarks.sharding --commit-latency-ms 2
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from typing import List, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.infrastructure.database.database import Base
+from src.infrastructure.database.email_routes import create_shard_schema
+from src.infrastructure.database.sharded_user_repository import ShardedUserRepository
+from src.infrastructure.database.sqlite_pragmas import install_sqlite_pragmas, resolve_sqlite_pragmas
+from src.infrastructure.database.user_count import create_user_counter
+from src.infrastructure.database.user_search import create_search_index
+
+
+def _engines_for(paths: List[str], profile: str, commit_latency: float = 0.0) -> list:
+    pragmas = resolve_sqlite_pragmas(profile)
+    engines = []
+    for path in paths:
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, pool_size=64)
+        install_sqlite_pragmas(engine, pragmas)
+        if commit_latency > 0:
+            # O evento "commit" ocorre antes do COMMIT do driver, com o lock de escrita já adquirido
+            event.listen(engine, "commit", lambda connection: time.sleep(commit_latency))
+        engines.append(engine)
+    return engines
+
+
+def _write_users(factories: list, writer: int, users_per_writer: int) -> int:
+    """Cadastra os usuários do escritor e retorna quantos falharam por lock (busy_timeout esgotado)"""
+    sessions = [factory() for factory in factories]
+    repository = ShardedUserRepository(sessions)
+    failures = 0
+    try:
+        for i in range(users_per_writer):
+            index = writer * users_per_writer + i
+            try:
+                repository.add(
+                    {"username": f"user{index}", "email": f"user{index}@example.com", "hashed_password": "h"}
+                )
+            except OperationalError:
+                # "database is locked": o escritor esperou mais que o busy_timeout pelo lock
+                failures += 1
+                for session in sessions:
+                    session.rollback()
+    finally:
+        for session in sessions:
+            session.close()
+    return failures
+
+
+def _process_writer(
+    paths: List[str], profile: str, commit_latency: float, writer: int, users_per_writer: int, barrier, failures
+) -> None:
+    engines = _engines_for(paths, profile, commit_latency)
+    factories = [sessionmaker(bind=engine, autoflush=False) for engine in engines]
+    barrier.wait()
+    failed = _write_users(factories, writer, users_per_writer)
+    with failures.get_lock():
+        failures.value += failed
+    for engine in engines:
+        engine.dispose()
+
+
+def _run_threads(engines: list, writers: int, users_per_writer: int) -> Tuple[float, int]:
+    factories = [sessionmaker(bind=engine, autoflush=False) for engine in engines]
+    barrier = threading.Barrier(writers + 1)
+    errors, failures = [], []
+
+    def writer(index: int):
+        barrier.wait()
+        try:
+            failures.append(_write_users(factories, index, users_per_writer))
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return elapsed, sum(failures)
+
+
+def _run_processes(
+    paths: List[str], profile: str, commit_latency: float, writers: int, users_per_writer: int
+) -> Tuple[float, int]:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(writers + 1)
+    failures = context.Value("i", 0)
+    workers = [
+        context.Process(
+            target=_process_writer,
+            args=(paths, profile, commit_latency, index, users_per_writer, barrier, failures),
+        )
+        for index in range(writers)
+    ]
+    for worker in workers:
+        worker.start()
+    # O tempo começa quando todos os processos já importaram os módulos e abriram os engines
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if any(worker.exitcode != 0 for worker in workers):
+        raise RuntimeError("Um ou mais processos escritores falharam")
+    return elapsed, failures.value
+
+
+def run(
+    shards: int,
+    writers: int,
+    users_per_writer: int,
+    directory: str,
+    profile: str,
+    mode: str,
+    commit_latency: float = 0.0,
+) -> dict:
+    with tempfile.TemporaryDirectory(dir=directory) as tmpdir:
+        paths = [os.path.join(tmpdir, f"shard{index}.db") for index in range(shards)]
+        engines = _engines_for(paths, profile)
+        for engine in engines:
+            Base.metadata.create_all(engine)
+            with engine.begin() as connection:
+                create_search_index(connection)
+                create_user_counter(connection)
+                create_shard_schema(connection)
+
+        if mode == "threads":
+            writer_engines = _engines_for(paths, profile, commit_latency)
+            elapsed, failures = _run_threads(writer_engines, writers, users_per_writer)
+            for engine in writer_engines:
+                engine.dispose()
+        else:
+            elapsed, failures = _run_processes(paths, profile, commit_latency, writers, users_per_writer)
+
+        sessions = [sessionmaker(bind=engine)() for engine in engines]
+        total = ShardedUserRepository(sessions).count()
+        for session in sessions:
+            session.close()
+        for engine in engines:
+            engine.dispose()
+    return {
+        "shards": shards,
+        "users": total,
+        "locked": failures,
+        "seconds": elapsed,
+        "inserts_per_second": total / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--users-per-writer", type=int, default=200)
+    parser.add_argument("--mode", choices=("processes", "threads"), default="processes")
+    parser.add_argument("--commit-latency-ms", type=float, default=0.0, help="espera simulada de fsync por COMMIT")
+    parser.add_argument("--directory", default=None, help="diretório dos arquivos SQLite")
+    parser.add_argument("--profile", default="durable", help="perfil de PRAGMAs (durable, throughput, default)")
+    args = parser.parse_args()
+
+    print(
+        f"{args.writers} escritores ({args.mode}), {args.users_per_writer} cadastros cada, "
+        f"perfil {args.profile}, {os.cpu_count()} CPUs, latência de COMMIT simulada {args.commit_latency_ms}ms"
+    )
+    print(f"{'shards':>6} {'usuários':>9} {'locked':>7} {'tempo':>8} {'inserts/s':>10} {'ganho':>7}")
+    baseline = None
+    for shards in args.shards:
+        result = run(
+            shards, args.writers, args.users_per_writer, args.directory, args.profile, args.mode,
+            args.commit_latency_ms / 1000,
+        )
+        baseline = baseline or result["inserts_per_second"]
+        print(
+            f"{shards:>6} {result['users']:>9} {result['locked']:>7} {result['seconds']:>7.2f}s "
+            f"{result['inserts_per_second']:>10.0f} {result['inserts_per_second'] / baseline:>6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Tempo de importação e de partida a frio da aplicação.
+
+Cada medição roda em um processo novo (como um worker recém-criado), com um
+banco SQLite vazio em um diretório temporário:
+
+- import: tempo de "import src.main" (sem montar a aplicação)
+- create_app: "import src.main" seguido do acesso a src.main.app (aplicação montada)
+- first_response: do início do processo uvicorn até a primeira resposta 200 de /health
+- modules: maiores tempos cumulativos de importação (python -X importtime)
+
+Uso:
+    python -m benchmarks.startup [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import src.main; {extra}"
+    "print(time.perf_counter() - started)"
+)
+
+
+def _environment(tmpdir: str) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'startup.db')}"
+    env["PYTHONPATH"] = ROOT
+    return env
+
+
+def measure_import(runs: int, build_app: bool = False) -> list:
+    snippet = _IMPORT_SNIPPET.format(extra="src.main.app; " if build_app else "")
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = subprocess.run(
+                [sys.executable, "-c", snippet], cwd=tmpdir, env=_environment(tmpdir),
+                capture_output=True, text=True, check=True,
+            ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return samples
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(runs: int, timeout: float = 60.0) -> list:
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            port = _free_port()
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+                cwd=tmpdir, env=_environment(tmpdir),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                while True:
+                    if time.perf_counter() - started > timeout or process.poll() is not None:
+                        raise RuntimeError("a aplicação não respondeu a /health")
+                    try:
+                        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                            if response.status == 200:
+                                break
+                    except (urllib.error.URLError, ConnectionError):
+                        time.sleep(0.005)
+                samples.append(time.perf_counter() - started)
+            finally:
+                process.terminate()
+                process.wait()
+    return samples
+
+
+def import_profile(top: int) -> list:
+    """Módulos com maior tempo cumulativo de importação (µs)"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stderr = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import src.main; src.main.app"], cwd=tmpdir,
+            env=_environment(tmpdir), capture_output=True, text=True, check=True,
+        ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    # Apenas módulos de primeiro nível (sem indentação) e os do próprio projeto
+    interesting = [(us, name) for us, name in rows if "." not in name or name.startswith("src.")]
+    return sorted(interesting, reverse=True)[:top]
+
+
+def _describe(samples: list) -> str:
+    return (f"mediana {statistics.median(samples) * 1000:8.1f} ms  "
+            f"mín {min(samples) * 1000:8.1f} ms  máx {max(samples) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # Uma execução descartada para aquecer o cache de bytecode e do sistema de arquivos
+    measure_import(1)
+    print(f"import src.main   {_describe(measure_import(args.runs))}")
+    print(f"create_app        {_describe(measure_import(args.runs, build_app=True))}")
+    print(f"first response    {_describe(measure_first_response(args.runs))}")
+    print("\nimportação cumulativa (ms):")
+    for microseconds, name in import_profile(args.top):
+        print(f"  {microseconds / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
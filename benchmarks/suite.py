@@ -0,0 +1,343 @@
+"""
+Micro-benchmarks dos métodos do repositório, do serviço, do hashing de senhas e do JWT.
+
+Cada caso executa N operações sobre uma cópia de um banco semeado pelo gerador
+determinístico (benchmarks.dataset) e registra mediana, p95, média e mínimo por
+operação em um arquivo JSON. O modo compare aponta regressões em relação a um
+arquivo de baseline quando a mediana piora além do limiar configurado.
+
+Uso:
+    python -m benchmarks.suite run --users 10000 --output results.json
+    python -m benchmarks.suite run --users 1000000 --iterations 200 --baseline baseline.json
+    python -m benchmarks.suite compare baseline.json results.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, Sequence
+
+import sqlalchemy
+from jose import jwt
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.dataset import (
+    BENCHMARK_PASSWORD,
+    DEFAULT_DATA_DIR,
+    DEFAULT_SEED,
+    benchmark_password_hash,
+    working_copy,
+)
+from src.config import get_settings
+from src.core.services.async_user_service import AsyncUserService
+from src.infrastructure.database.models import User as UserModelDB
+from src.infrastructure.database.sqlite_pragmas import install_sqlite_pragmas, resolve_sqlite_pragmas
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+from src.infrastructure.database.threadpool_user_repository import ThreadPoolUserRepository
+from src.infrastructure.security.password_hasher import get_pwd_context
+from src.infrastructure.web.auth import create_access_token, decode_access_token, get_token_claims_cache
+
+DEFAULT_THRESHOLD = 0.10
+COMPARED_METRIC = "median_us"
+
+
+def summarize(samples_ns: Sequence[int]) -> dict:
+    """Estatísticas por operação, em microssegundos"""
+    ordered = sorted(samples_ns)
+    mean = statistics.fmean(ordered)
+    return {
+        "iterations": len(ordered),
+        "median_us": statistics.median(ordered) / 1000,
+        "p95_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] / 1000,
+        "mean_us": mean / 1000,
+        "min_us": ordered[0] / 1000,
+        "ops_per_second": 1e9 / mean if mean else 0.0,
+    }
+
+
+def time_calls(func: Callable, arguments: Iterable[tuple], warmup: int = 0) -> List[int]:
+    """Executa func para cada tupla de argumentos e retorna a duração de cada chamada (ns)"""
+    arguments = list(arguments)
+    for args in arguments[:warmup]:
+        func(*args)
+    samples = []
+    for args in arguments:
+        started = time.perf_counter_ns()
+        func(*args)
+        samples.append(time.perf_counter_ns() - started)
+    return samples
+
+
+class RepositoryBench:
+    """Executa cada chamada com uma sessão nova, como uma requisição HTTP"""
+
+    def __init__(self, path: str):
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        settings = get_settings()
+        install_sqlite_pragmas(
+            self.engine, resolve_sqlite_pragmas(settings.sqlite_profile, settings.sqlite_pragma_overrides)
+        )
+        self.session_factory = sessionmaker(bind=self.engine, autoflush=False)
+        # Um event loop para todas as chamadas do serviço, que é assíncrono
+        self.loop = asyncio.new_event_loop()
+
+    def repository_call(self, method: str) -> Callable:
+        def call(*args, **kwargs):
+            with self.session_factory() as db:
+                return getattr(SQLiteUserRepository(db), method)(*args, **kwargs)
+        return call
+
+    def service_call(self, method: str) -> Callable:
+        # Como REPOSITORY_BACKEND=sync: o repositório síncrono roda no threadpool
+        def call(*args, **kwargs):
+            with self.session_factory() as db:
+                service = AsyncUserService(ThreadPoolUserRepository(SQLiteUserRepository(db)))
+                return self.loop.run_until_complete(getattr(service, method)(*args, **kwargs))
+        return call
+
+    def emails_for(self, ids: Sequence[int]) -> List[str]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(UserModelDB.id, UserModelDB.email).where(UserModelDB.id.in_(set(ids))))
+            email_by_id = dict(rows.all())
+        return [email_by_id[user_id] for user_id in ids]
+
+    def dispose(self) -> None:
+        self.loop.close()
+        self.engine.dispose()
+
+
+def _new_users(prefix: str, count: int, password_hash: str) -> List[tuple]:
+    return [
+        ({"username": f"{prefix}{i}", "email": f"{prefix}{i}@bench.example.com", "hashed_password": password_hash},)
+        for i in range(count)
+    ]
+
+
+def run_database_cases(path: str, users: int, iterations: int, page_size: int, seed: int, warmup: int) -> dict:
+    rng = random.Random(seed)
+    bench = RepositoryBench(path)
+    password_hash = benchmark_password_hash()
+    results = {}
+    try:
+        ids = [rng.randint(1, users) for _ in range(iterations)]
+        emails = bench.emails_for(ids)
+
+        created = []
+        add = bench.repository_call("add")
+        results["repository.add"] = summarize(time_calls(
+            lambda data: created.append(add(data)), _new_users("repo", iterations, password_hash)
+        ))
+        results["repository.get_by_id"] = summarize(
+            time_calls(bench.repository_call("get_by_id"), [(i,) for i in ids], warmup)
+        )
+        results["repository.get_version"] = summarize(
+            time_calls(bench.repository_call("get_version"), [(i,) for i in ids], warmup)
+        )
+        results["repository.get_by_email"] = summarize(
+            time_calls(bench.repository_call("get_by_email"), [(e,) for e in emails], warmup)
+        )
+        offsets = {"start": 0, "middle": users // 2, "end": max(0, users - page_size)}
+        get_all = bench.repository_call("get_all")
+        get_all_after = bench.repository_call("get_all_after")
+        get_versions = bench.repository_call("get_versions")
+        for label, offset in offsets.items():
+            results[f"repository.get_all[offset={label}]"] = summarize(
+                time_calls(lambda o=offset: get_all(skip=o, limit=page_size), [()] * iterations, warmup)
+            )
+            after_id = offset or None
+            results[f"repository.get_all_after[{label}]"] = summarize(
+                time_calls(lambda a=after_id: get_all_after(after_id=a, limit=page_size), [()] * iterations, warmup)
+            )
+            results[f"repository.get_versions[after={label}]"] = summarize(
+                time_calls(lambda a=after_id: get_versions(after_id=a, limit=page_size), [()] * iterations, warmup)
+            )
+        results["repository.count"] = summarize(
+            time_calls(bench.repository_call("count"), [()] * iterations, warmup)
+        )
+        results["repository.update"] = summarize(time_calls(
+            bench.repository_call("update"), [(i, {"username": f"renamed{n}"}) for n, i in enumerate(ids)]
+        ))
+        results["repository.delete"] = summarize(
+            time_calls(bench.repository_call("delete"), [(user.id,) for user in created])
+        )
+
+        created = []
+        create_user = bench.service_call("create_user")
+        results["service.create_user"] = summarize(time_calls(
+            lambda data: created.append(create_user(data)), _new_users("service", iterations, password_hash)
+        ))
+        results["service.get_user_by_id"] = summarize(
+            time_calls(bench.service_call("get_user_by_id"), [(i,) for i in ids], warmup)
+        )
+        results["service.update_user"] = summarize(time_calls(
+            bench.service_call("update_user"), [(user.id, {"username": "renamed"}) for user in created]
+        ))
+        results["service.delete_user"] = summarize(
+            time_calls(bench.service_call("delete_user"), [(user.id,) for user in created])
+        )
+    finally:
+        bench.dispose()
+    return results
+
+
+def run_security_cases(iterations: int, hash_iterations: int) -> dict:
+    settings = get_settings()
+    stored_hash = benchmark_password_hash()
+    token = create_access_token({"sub": "benchmark@example.com"})
+    get_token_claims_cache().clear()
+    decode_access_token(token)
+    return {
+        "password.hash": summarize(time_calls(get_pwd_context().hash, [(BENCHMARK_PASSWORD,)] * hash_iterations)),
+        "password.verify": summarize(
+            time_calls(get_pwd_context().verify, [(BENCHMARK_PASSWORD, stored_hash)] * hash_iterations)
+        ),
+        "jwt.encode": summarize(
+            time_calls(create_access_token, [({"sub": f"user{i}@example.com"},) for i in range(iterations)])
+        ),
+        "jwt.decode": summarize(
+            time_calls(
+                lambda: jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]), [()] * iterations
+            )
+        ),
+        "jwt.decode_cached": summarize(time_calls(decode_access_token, [(token,)] * iterations)),
+    }
+
+
+def _metadata(args) -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "users": args.users,
+        "seed": args.seed,
+        "iterations": args.iterations,
+        "page_size": args.page_size,
+        "sqlite_profile": get_settings().sqlite_profile,
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """
+    Compara a mediana de cada caso com a baseline.
+    status: "regression" (piora > threshold), "improvement" (melhora > threshold),
+    "ok", "new" (ausente na baseline) ou "missing" (ausente no resultado atual).
+    """
+    rows = []
+    base_results = baseline.get("results", {})
+    current_results = current.get("results", {})
+    for name in sorted(set(base_results) | set(current_results)):
+        before = base_results.get(name, {}).get(COMPARED_METRIC)
+        after = current_results.get(name, {}).get(COMPARED_METRIC)
+        if before is None or after is None:
+            rows.append({"case": name, "baseline": before, "current": after, "change": None,
+                         "status": "new" if before is None else "missing"})
+            continue
+        change = (after - before) / before if before else 0.0
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"case": name, "baseline": before, "current": after, "change": change, "status": status})
+    return rows
+
+
+def print_results(results: dict) -> None:
+    print(f"{'caso':<42}{'mediana µs':>12}{'p95 µs':>12}{'ops/s':>12}")
+    for name, stats in results.items():
+        print(f"{name:<42}{stats['median_us']:>12.1f}{stats['p95_us']:>12.1f}{stats['ops_per_second']:>12.0f}")
+
+
+def print_comparison(rows: List[dict], threshold: float) -> int:
+    """Imprime a comparação e retorna a quantidade de regressões"""
+    print(f"Limiar: {threshold:.0%} sobre a {COMPARED_METRIC}")
+    print(f"{'caso':<42}{'baseline':>12}{'atual':>12}{'variação':>10}  status")
+    for row in rows:
+        fmt = lambda value: f"{value:.1f}" if value is not None else "-"
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        print(f"{row['case']:<42}{fmt(row['baseline']):>12}{fmt(row['current']):>12}{change:>10}  {row['status']}")
+    return sum(1 for row in rows if row["status"] == "regression")
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _check_comparable(baseline: dict, current: dict) -> None:
+    for key in ("users", "seed", "page_size"):
+        before, after = baseline.get("meta", {}).get(key), current.get("meta", {}).get(key)
+        if before != after:
+            print(f"⚠️  Parâmetro '{key}' difere da baseline ({before} != {after}); a comparação pode não ser válida")
+
+
+def command_run(args) -> int:
+    path = working_copy(args.users, args.seed, args.data_dir)
+    try:
+        results = run_database_cases(path, args.users, args.iterations, args.page_size, args.seed, args.warmup)
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    results.update(run_security_cases(args.iterations, args.hash_iterations))
+
+    report = {"meta": _metadata(args), "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_results(results)
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.baseline:
+        baseline = _load(args.baseline)
+        _check_comparable(baseline, report)
+        print()
+        return 1 if print_comparison(compare(baseline, report, args.threshold), args.threshold) else 0
+    return 0
+
+
+def command_compare(args) -> int:
+    baseline, current = _load(args.baseline), _load(args.current)
+    _check_comparable(baseline, current)
+    return 1 if print_comparison(compare(baseline, current, args.threshold), args.threshold) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="executa os benchmarks e grava o JSON de resultados")
+    run.add_argument("--users", type=int, default=10000, help="tamanho do banco semeado")
+    run.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run.add_argument("--iterations", type=int, default=500, help="operações por caso")
+    run.add_argument("--hash-iterations", type=int, default=5, help="operações de bcrypt por caso")
+    run.add_argument("--page-size", type=int, default=10)
+    run.add_argument("--warmup", type=int, default=20, help="chamadas de aquecimento nos casos de leitura")
+    run.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    run.add_argument("--output", default="benchmark-results.json")
+    run.add_argument("--baseline", help="arquivo de baseline para comparar ao final")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    run.set_defaults(handler=command_run)
+
+    cmp = commands.add_parser("compare", help="compara dois arquivos de resultados")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    cmp.set_defaults(handler=command_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Benchmark do cache de claims de tokens JWT.
+
+Compara o custo por requisição de validar o mesmo bearer token com
+verificação completa (HMAC + base64/JSON) e com o cache de claims.
+
+Uso:
+    python -m benchmarks.token_cache [--iterations 20000]
+"""
+import argparse
+import timeit
+
+from jose import jwt
+
+from src.config import get_settings
+from src.infrastructure.web.auth import (
+    create_access_token,
+    decode_access_token,
+    get_token_claims_cache,
+)
+
+
+def run(iterations: int) -> dict:
+    settings = get_settings()
+    token = create_access_token({"sub": "benchmark@example.com"})
+
+    uncached = timeit.timeit(
+        lambda: jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]), number=iterations
+    )
+    get_token_claims_cache().clear()
+    decode_access_token(token)  # aquece o cache
+    cached = timeit.timeit(lambda: decode_access_token(token), number=iterations)
+
+    return {
+        "iterations": iterations,
+        "uncached_us_per_request": uncached / iterations * 1e6,
+        "cached_us_per_request": cached / iterations * 1e6,
+        "speedup": uncached / cached if cached else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    result = run(args.iterations)
+    print(f"Iterações:           {result['iterations']}")
+    print(f"jwt.decode completo: {result['uncached_us_per_request']:.2f} µs/requisição")
+    print(f"Cache de claims:     {result['cached_us_per_request']:.2f} µs/requisição")
+    print(f"Ganho:               {result['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
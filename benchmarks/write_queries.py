@@ -0,0 +1,138 @@
+"""
+Benchmark de round-trips SQL por operação de escrita do serviço.
+
+Conta as instruções SQL enviadas ao SQLite (evento before_cursor_execute)
+e os COMMITs em create/update/delete do AsyncUserService sobre os dois
+backends de REPOSITORY_BACKEND (sync: SQLiteUserRepository no threadpool;
+async: aiosqlite), usando um banco temporário. Cada operação usa uma
+sessão própria, como uma requisição HTTP.
+
+Uso:
+    python -m benchmarks.write_queries [--iterations 200]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.exceptions import UserAlreadyExistsError, UserNotFoundError
+from src.core.services.async_user_service import AsyncUserService
+from src.infrastructure.database.async_sqlite_user_repository import AsyncSQLiteUserRepository
+from src.infrastructure.database.database import Base
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+from src.infrastructure.database.threadpool_user_repository import ThreadPoolUserRepository
+
+OPERATIONS = ("create", "create_duplicate", "update", "update_missing", "delete", "delete_missing")
+
+
+class StatementCounter:
+    """Conta instruções SQL e COMMITs de um engine síncrono"""
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_statement)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_statement(self, *args, **kwargs):
+        self.statements += 1
+
+    def _on_commit(self, *args, **kwargs):
+        self.commits += 1
+
+    @contextmanager
+    def measure(self, results: dict, name: str):
+        statements, commits, started = self.statements, self.commits, time.perf_counter()
+        try:
+            yield
+        except (UserAlreadyExistsError, UserNotFoundError):
+            pass
+        stats = results.setdefault(name, {"statements": 0, "commits": 0, "seconds": 0.0, "calls": 0})
+        stats["statements"] += self.statements - statements
+        stats["commits"] += self.commits - commits
+        stats["seconds"] += time.perf_counter() - started
+        stats["calls"] += 1
+
+
+def _user(index: int) -> dict:
+    return {"username": f"user{index}", "email": f"user{index}@example.com", "hashed_password": "h"}
+
+
+async def run_sync(path: str, iterations: int) -> dict:
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    counter = StatementCounter(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    results: dict = {}
+
+    async def call(name, method, *args):
+        # Uma sessão por operação, como uma requisição HTTP
+        with session_factory() as db, counter.measure(results, name):
+            service = AsyncUserService(ThreadPoolUserRepository(SQLiteUserRepository(db)))
+            return await getattr(service, method)(*args)
+
+    for i in range(iterations):
+        user = await call("create", "create_user", _user(i))
+        await call("create_duplicate", "create_user", _user(i))
+        await call("update", "update_user", user.id, {"username": f"renamed{i}"})
+        await call("update_missing", "update_user", 10**9, {"username": "x"})
+        await call("delete", "delete_user", user.id)
+        await call("delete_missing", "delete_user", user.id)
+    engine.dispose()
+    return results
+
+
+async def run_async(path: str, iterations: int) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    counter = StatementCounter(engine.sync_engine)
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    results: dict = {}
+
+    async def call(name, method, *args):
+        async with session_factory() as db:
+            with counter.measure(results, name):
+                return await getattr(AsyncUserService(AsyncSQLiteUserRepository(db)), method)(*args)
+
+    for i in range(iterations):
+        user = await call("create", "create_user", _user(i))
+        await call("create_duplicate", "create_user", _user(i))
+        await call("update", "update_user", user.id, {"username": f"renamed{i}"})
+        await call("update_missing", "update_user", 10**9, {"username": "x"})
+        await call("delete", "delete_user", user.id)
+        await call("delete_missing", "delete_user", user.id)
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        suites = {
+            "sync": asyncio.run(run_sync(os.path.join(tmpdir, "sync.db"), args.iterations)),
+            "async": asyncio.run(run_async(os.path.join(tmpdir, "async.db"), args.iterations)),
+        }
+
+    print(f"{'operação':<18}{'backend':<8}{'SQL/op':>8}{'COMMIT/op':>11}{'µs/op':>10}")
+    for name in OPERATIONS:
+        for backend, results in suites.items():
+            stats = results[name]
+            calls = stats["calls"]
+            print(
+                f"{name:<18}{backend:<8}{stats['statements'] / calls:>8.1f}"
+                f"{stats['commits'] / calls:>11.1f}{stats['seconds'] / calls * 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,347 @@
+"""
+Configurações da aplicação.
+
+Settings reúne todos os parâmetros e é lido do ambiente (e do arquivo .env)
+apenas quando solicitado: importar este módulo não carrega o .env, não
+configura o logging e não lê variáveis. create_app(settings) injeta as
+configurações ativas; sem isso, get_settings() as carrega do ambiente no
+primeiro uso.
+
+Os nomes em maiúsculas (SECRET_KEY, DATABASE_URL, ...) estão obsoletos: ainda
+respondem, com DeprecationWarning, pelas configurações ativas.
+"""
 import os
 import logging
-from dotenv import load_dotenv
-
-# Carrega as variáveis de ambiente do arquivo .env
-load_dotenv()
+import warnings
+from dataclasses import dataclass, field, replace
+from typing import Dict, Mapping, Optional, Tuple
 
-# Configurar logging estruturado
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Configurações de segurança
-SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key")
-if SECRET_KEY == "your-super-secret-key":
-    logger.warning("⚠️  SECRET_KEY usando valor padrão! Configure SECRET_KEY em produção!")
+DEFAULT_SECRET_KEY = "your-super-secret-key"
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class ConcurrencyLimit:
+    """
+    Orçamento de concorrência de uma classe de rotas (CONCURRENCY_LIMIT_<CLASSE>).
+
+    O limite começa em initial e é ajustado entre min e max pela latência
+    observada (AIMD): cresce enquanto as respostas ficam abaixo de target_ms e
+    é reduzido quando passam dele. Acima do limite, até queue requisições
+    aguardam no máximo queue_timeout_ms; as demais recebem 503.
+    """
+
+    initial: int
+    min: int
+    max: int
+    queue: int
+    queue_timeout_ms: float
+    target_ms: float
+
+    def __post_init__(self):
+        if not 1 <= self.min <= self.initial <= self.max:
+            raise ValueError("CONCURRENCY_LIMIT_*: é preciso 1 <= min <= initial <= max")
+        if self.queue < 0 or self.queue_timeout_ms < 0:
+            raise ValueError("CONCURRENCY_LIMIT_*: queue e queue_timeout_ms não podem ser negativos")
+        if self.target_ms <= 0:
+            raise ValueError("CONCURRENCY_LIMIT_*: target_ms deve ser positivo")
+
+    def with_overrides(self, spec: str) -> "ConcurrencyLimit":
+        """Aplica sobrescritas no formato "max=16,queue=32,target_ms=500" """
+        values = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in ("initial", "min", "max", "queue", "queue_timeout_ms", "target_ms"):
+                raise ValueError(f"CONCURRENCY_LIMIT_*: parâmetro desconhecido {key!r}")
+            values[key] = float(value) if key.endswith("_ms") else int(value)
+        return replace(self, **values)
+
+
+# Orçamentos padrão por classe de rotas, pensados para um worker com o bcrypt no pool de processos
+DEFAULT_CONCURRENCY_LIMITS = {
+    # POST /token, POST /users/ e /users/bulk: dominadas pelo bcrypt (~250 ms de CPU cada)
+    "auth": ConcurrencyLimit(initial=4, min=1, max=32, queue=16, queue_timeout_ms=2000, target_ms=1000),
+    "write": ConcurrencyLimit(initial=16, min=2, max=128, queue=64, queue_timeout_ms=1000, target_ms=250),
+    "read": ConcurrencyLimit(initial=32, min=4, max=256, queue=128, queue_timeout_ms=500, target_ms=100),
+    # /health, /metrics e /: limite fixo, independente da carga das outras classes
+    "health": ConcurrencyLimit(initial=8, min=8, max=8, queue=8, queue_timeout_ms=100, target_ms=1000),
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Parâmetros da aplicação; os padrões correspondem aos documentados no .env.example"""
+
+    # Configurações de segurança
+    secret_key: str = DEFAULT_SECRET_KEY
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    # Tokens de acesso com id, username e versão do usuário: as rotas protegidas
+    # dispensam a consulta ao banco. Até expirar, o token pode trazer username/email
+    # antigos ou continuar aceito após a remoção do usuário; por isso esses tokens
+    # usam uma validade própria, mais curta (limitada por access_token_expire_minutes)
+    access_token_self_contained: bool = False
+    self_contained_token_expire_minutes: int = 5
+    # Validade dos refresh tokens (POST /token/refresh, com rotação); 0 desabilita
+    refresh_token_expire_days: float = 14.0
+
+    # Executor de hashing de senhas (bcrypt em pool de processos)
+    # password_hash_workers=0 executa o hashing na própria thread (sem pool)
+    password_hash_workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    password_hash_max_pending: int = 64
+    # Esquema e custo dos novos hashes ("bcrypt" ou "argon2"); hashes com outro
+    # esquema ou custo são refeitos no próximo login
+    password_hash_scheme: str = "bcrypt"
+    password_hash_bcrypt_rounds: int = 12
+    password_hash_argon2_time_cost: int = 2
+    password_hash_argon2_memory_kib: int = 19456
+    password_hash_argon2_parallelism: int = 1
+
+    # Cache dos usuários autenticados (TTL em segundos; 0 desabilita)
+    auth_user_cache_ttl_seconds: float = 30.0
+    auth_user_cache_max_size: int = 10000
+
+    # Cache de claims de tokens JWT já verificados (0 desabilita)
+    token_claims_cache_max_size: int = 10000
+
+    # Cache read-through do repositório (get_by_id/get_by_email): "none", "memory" ou "redis"
+    user_repository_cache: str = "none"
+    user_repository_cache_ttl_seconds: float = 60.0
+    # Consultas sem resultado ficam menos tempo em cache (0 desabilita o cache negativo)
+    user_repository_cache_negative_ttl_seconds: float = 5.0
+    user_repository_cache_max_size: int = 10000
+    user_repository_cache_redis_url: str = "redis://localhost:6379/0"
+
+    # Importação em massa: registros por lote (uma transação por lote)
+    bulk_import_batch_size: int = 500
+    # Exportação (GET /users/export): linhas lidas e enviadas por lote
+    export_batch_size: int = 1000
+    # Intervalo da conferência do contador de usuários com COUNT(*) (0 = apenas no startup)
+    user_count_reconcile_interval_seconds: float = 300.0
+
+    # Busca (GET /users/search): ocorrências do índice consideradas por consulta
+    search_max_candidates: int = 1000
+
+    # Cabeçalho Server-Timing e log por requisição com o tempo de SQL, bcrypt, JWT e pydantic
+    server_timing_enabled: bool = True
+
+    # Métricas no formato do Prometheus em GET /metrics
+    metrics_enabled: bool = True
+    # Diretório compartilhado pelos workers para agregar as métricas (vazio = cada processo expõe as suas)
+    metrics_multiproc_dir: str = ""
+    metrics_flush_interval_seconds: float = 5.0
+
+    # Configurações do banco de dados
+    database_url: str = "sqlite:///./user_manager.db"
+    # URL opcional para o engine assíncrono; se ausente, é derivada de database_url
+    async_database_url: Optional[str] = None
+    # Réplicas de leitura (vazia = leituras no engine de escrita)
+    # URLs SQLite de arquivo são abertas em modo somente leitura (mode=ro)
+    database_read_urls: Tuple[str, ...] = ()
+    # Shards SQLite (vazia = banco único em database_url); usuários distribuídos pelo hash do email
+    # A quantidade e a ordem das URLs fazem parte dos ids: não podem mudar depois de haver dados
+    database_shard_urls: Tuple[str, ...] = ()
+
+    # Perfil de PRAGMAs do SQLite: "durable" (WAL + synchronous=FULL), "throughput" ou "default"
+    sqlite_profile: str = "durable"
+    # Sobrescritas opcionais de PRAGMAs individuais do perfil
+    sqlite_pragma_overrides: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    # Fila de escrita com group commit: uma thread escritora confirma várias escritas por COMMIT
+    write_queue_enabled: bool = False
+    write_queue_max_batch: int = 64
+    # Espera máxima por mais escritas antes de confirmar um lote (0 = apenas as já enfileiradas)
+    write_queue_max_delay_ms: float = 0.0
+
+    # Backend do repositório usado pelas rotas: "async" (aiosqlite) ou "sync" (threadpool)
+    repository_backend: str = "async"
+
+    # Limites adaptativos de concorrência por classe de rotas (auth, write, read, health);
+    # requisições acima do orçamento recebem 503 com Retry-After em vez de se acumularem
+    concurrency_limit_enabled: bool = True
+    concurrency_limits: Dict[str, ConcurrencyLimit] = field(
+        default_factory=lambda: dict(DEFAULT_CONCURRENCY_LIMITS)
+    )
+
+    def __post_init__(self):
+        # Validações de configuração
+        if self.access_token_expire_minutes <= 0:
+            raise ValueError("ACCESS_TOKEN_EXPIRE_MINUTES deve ser positivo")
+        if self.self_contained_token_expire_minutes <= 0:
+            raise ValueError("SELF_CONTAINED_TOKEN_EXPIRE_MINUTES deve ser positivo")
+        if self.refresh_token_expire_days < 0:
+            raise ValueError("REFRESH_TOKEN_EXPIRE_DAYS não pode ser negativo")
+        if self.password_hash_workers < 0:
+            raise ValueError("PASSWORD_HASH_WORKERS não pode ser negativo")
+        if self.password_hash_max_pending <= 0:
+            raise ValueError("PASSWORD_HASH_MAX_PENDING deve ser positivo")
+        if self.password_hash_scheme not in ("bcrypt", "argon2"):
+            raise ValueError("PASSWORD_HASH_SCHEME deve ser 'bcrypt' ou 'argon2'")
+        if not 4 <= self.password_hash_bcrypt_rounds <= 31:
+            raise ValueError("PASSWORD_HASH_BCRYPT_ROUNDS deve estar entre 4 e 31")
+        if self.password_hash_argon2_time_cost < 1 or self.password_hash_argon2_parallelism < 1:
+            raise ValueError("PASSWORD_HASH_ARGON2_TIME_COST e PASSWORD_HASH_ARGON2_PARALLELISM devem ser positivos")
+        if self.password_hash_argon2_memory_kib < 8 * self.password_hash_argon2_parallelism:
+            raise ValueError("PASSWORD_HASH_ARGON2_MEMORY_KIB deve ser de pelo menos 8 KiB por PARALLELISM")
+        if self.user_repository_cache not in ("none", "memory", "redis"):
+            raise ValueError("USER_REPOSITORY_CACHE deve ser 'none', 'memory' ou 'redis'")
+        if self.user_repository_cache_negative_ttl_seconds < 0:
+            raise ValueError("USER_REPOSITORY_CACHE_NEGATIVE_TTL_SECONDS não pode ser negativo")
+        if self.bulk_import_batch_size <= 0:
+            raise ValueError("BULK_IMPORT_BATCH_SIZE deve ser positivo")
+        if self.export_batch_size <= 0:
+            raise ValueError("EXPORT_BATCH_SIZE deve ser positivo")
+        if self.user_count_reconcile_interval_seconds < 0:
+            raise ValueError("USER_COUNT_RECONCILE_INTERVAL_SECONDS não pode ser negativo")
+        if self.search_max_candidates <= 0:
+            raise ValueError("SEARCH_MAX_CANDIDATES deve ser positivo")
+        if self.metrics_flush_interval_seconds <= 0:
+            raise ValueError("METRICS_FLUSH_INTERVAL_SECONDS deve ser positivo")
+        if self.repository_backend not in ("async", "sync"):
+            raise ValueError("REPOSITORY_BACKEND deve ser 'async' ou 'sync'")
+        if self.database_shard_urls and self.database_read_urls:
+            raise ValueError("DATABASE_SHARD_URLS não pode ser combinado com DATABASE_READ_URLS")
+        if len(set(self.database_shard_urls)) != len(self.database_shard_urls):
+            raise ValueError("DATABASE_SHARD_URLS não pode repetir URLs")
+        if self.write_queue_max_batch <= 0:
+            raise ValueError("WRITE_QUEUE_MAX_BATCH deve ser positivo")
+        if self.write_queue_max_delay_ms < 0:
+            raise ValueError("WRITE_QUEUE_MAX_DELAY_MS não pode ser negativo")
+        if self.write_queue_enabled and self.database_shard_urls:
+            raise ValueError("WRITE_QUEUE_ENABLED não pode ser combinado com DATABASE_SHARD_URLS")
+        if set(self.concurrency_limits) != set(DEFAULT_CONCURRENCY_LIMITS):
+            raise ValueError("CONCURRENCY_LIMIT_*: as classes são " + ", ".join(DEFAULT_CONCURRENCY_LIMITS))
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        """Lê as configurações de um mapeamento de variáveis (padrão: os.environ)"""
+        env = os.environ if environ is None else environ
+        defaults = cls()
+        return cls(
+            secret_key=env.get("SECRET_KEY", defaults.secret_key),
+            algorithm=env.get("ALGORITHM", defaults.algorithm),
+            access_token_expire_minutes=int(env.get("ACCESS_TOKEN_EXPIRE_MINUTES", "30")),
+            access_token_self_contained=_parse_bool(env.get("ACCESS_TOKEN_SELF_CONTAINED", "false")),
+            self_contained_token_expire_minutes=int(env.get("SELF_CONTAINED_TOKEN_EXPIRE_MINUTES", "5")),
+            refresh_token_expire_days=float(env.get("REFRESH_TOKEN_EXPIRE_DAYS", "14")),
+            password_hash_workers=int(env.get("PASSWORD_HASH_WORKERS", str(defaults.password_hash_workers))),
+            password_hash_max_pending=int(env.get("PASSWORD_HASH_MAX_PENDING", "64")),
+            password_hash_scheme=env.get("PASSWORD_HASH_SCHEME", "bcrypt").lower(),
+            password_hash_bcrypt_rounds=int(env.get("PASSWORD_HASH_BCRYPT_ROUNDS", "12")),
+            password_hash_argon2_time_cost=int(env.get("PASSWORD_HASH_ARGON2_TIME_COST", "2")),
+            password_hash_argon2_memory_kib=int(env.get("PASSWORD_HASH_ARGON2_MEMORY_KIB", "19456")),
+            password_hash_argon2_parallelism=int(env.get("PASSWORD_HASH_ARGON2_PARALLELISM", "1")),
+            auth_user_cache_ttl_seconds=float(env.get("AUTH_USER_CACHE_TTL_SECONDS", "30")),
+            auth_user_cache_max_size=int(env.get("AUTH_USER_CACHE_MAX_SIZE", "10000")),
+            token_claims_cache_max_size=int(env.get("TOKEN_CLAIMS_CACHE_MAX_SIZE", "10000")),
+            user_repository_cache=env.get("USER_REPOSITORY_CACHE", "none").lower(),
+            user_repository_cache_ttl_seconds=float(env.get("USER_REPOSITORY_CACHE_TTL_SECONDS", "60")),
+            user_repository_cache_negative_ttl_seconds=float(
+                env.get("USER_REPOSITORY_CACHE_NEGATIVE_TTL_SECONDS", "5")
+            ),
+            user_repository_cache_max_size=int(env.get("USER_REPOSITORY_CACHE_MAX_SIZE", "10000")),
+            user_repository_cache_redis_url=env.get(
+                "USER_REPOSITORY_CACHE_REDIS_URL", defaults.user_repository_cache_redis_url
+            ),
+            bulk_import_batch_size=int(env.get("BULK_IMPORT_BATCH_SIZE", "500")),
+            export_batch_size=int(env.get("EXPORT_BATCH_SIZE", "1000")),
+            user_count_reconcile_interval_seconds=float(env.get("USER_COUNT_RECONCILE_INTERVAL_SECONDS", "300")),
+            search_max_candidates=int(env.get("SEARCH_MAX_CANDIDATES", "1000")),
+            server_timing_enabled=_parse_bool(env.get("SERVER_TIMING_ENABLED", "true")),
+            metrics_enabled=_parse_bool(env.get("METRICS_ENABLED", "true")),
+            metrics_multiproc_dir=env.get("METRICS_MULTIPROC_DIR", ""),
+            metrics_flush_interval_seconds=float(env.get("METRICS_FLUSH_INTERVAL_SECONDS", "5")),
+            database_url=env.get("DATABASE_URL", defaults.database_url),
+            async_database_url=env.get("ASYNC_DATABASE_URL"),
+            database_read_urls=tuple(
+                url.strip() for url in env.get("DATABASE_READ_URLS", "").split(",") if url.strip()
+            ),
+            database_shard_urls=tuple(
+                url.strip() for url in env.get("DATABASE_SHARD_URLS", "").split(",") if url.strip()
+            ),
+            sqlite_profile=env.get("SQLITE_PROFILE", "durable").lower(),
+            sqlite_pragma_overrides={
+                "journal_mode": env.get("SQLITE_JOURNAL_MODE"),
+                "synchronous": env.get("SQLITE_SYNCHRONOUS"),
+                "cache_size": env.get("SQLITE_CACHE_SIZE"),
+                "mmap_size": env.get("SQLITE_MMAP_SIZE"),
+                "temp_store": env.get("SQLITE_TEMP_STORE"),
+                "busy_timeout": env.get("SQLITE_BUSY_TIMEOUT_MS"),
+            },
+            write_queue_enabled=_parse_bool(env.get("WRITE_QUEUE_ENABLED", "false")),
+            write_queue_max_batch=int(env.get("WRITE_QUEUE_MAX_BATCH", "64")),
+            write_queue_max_delay_ms=float(env.get("WRITE_QUEUE_MAX_DELAY_MS", "0")),
+            repository_backend=env.get("REPOSITORY_BACKEND", "async").lower(),
+            concurrency_limit_enabled=_parse_bool(env.get("CONCURRENCY_LIMIT_ENABLED", "true")),
+            concurrency_limits={
+                route_class: limit.with_overrides(env.get(f"CONCURRENCY_LIMIT_{route_class.upper()}", ""))
+                for route_class, limit in DEFAULT_CONCURRENCY_LIMITS.items()
+            },
+        )
+
+
+def load_settings() -> Settings:
+    """Carrega o arquivo .env (sem sobrescrever o ambiente) e lê as configurações"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    settings = Settings.from_env()
+    if settings.secret_key == DEFAULT_SECRET_KEY:
+        logger.warning("⚠️  SECRET_KEY usando valor padrão! Configure SECRET_KEY em produção!")
+    logger.info(
+        f"🔧 Configuração carregada: ALGORITHM={settings.algorithm}, "
+        f"TOKEN_EXPIRE={settings.access_token_expire_minutes}min, "
+        f"REPOSITORY_BACKEND={settings.repository_backend}"
+    )
+    return settings
+
+
+# Configurações ativas do processo (definidas por create_app ou carregadas no primeiro uso)
+_active_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """Retorna as configurações ativas, carregando-as do ambiente na primeira chamada"""
+    global _active_settings
+    if _active_settings is None:
+        _active_settings = load_settings()
+    return _active_settings
+
+
+def configure_settings(settings: Settings) -> None:
+    """Define as configurações ativas do processo"""
+    global _active_settings
+    _active_settings = settings
+
+
+def configure_logging() -> None:
+    """Configura o logging estruturado (sem efeito se o logging já estiver configurado)"""
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Validações de configuração
-if ACCESS_TOKEN_EXPIRE_MINUTES <= 0:
-    raise ValueError("ACCESS_TOKEN_EXPIRE_MINUTES deve ser positivo")
+# Constantes que o módulo exportava antes de Settings
+_DEPRECATED_NAMES = {
+    "SECRET_KEY": "secret_key",
+    "ALGORITHM": "algorithm",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "access_token_expire_minutes",
+    "DATABASE_URL": "database_url",
+}
 
-# Configurações do banco de dados
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./user_manager.db")
 
-logger.info(f"🔧 Configuração carregada: ALGORITHM={ALGORITHM}, TOKEN_EXPIRE={ACCESS_TOKEN_EXPIRE_MINUTES}min")
\ No newline at end of file
+def __getattr__(name: str):
+    # Obsoleto: use get_settings().secret_key etc.; mantido para quem ainda importa as constantes
+    if name in _DEPRECATED_NAMES:
+        warnings.warn(
+            f"src.config.{name} está obsoleto; use get_settings().{_DEPRECATED_NAMES[name]}",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return getattr(get_settings(), _DEPRECATED_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -14,11 +14,21 @@ class UserNotFoundError(Exception):
     pass
 
 
+class UserVersionConflictError(Exception):
+    """Exceção lançada quando a versão do usuário difere da esperada (If-Match)."""
+    pass
+
+
 class InvalidCredentialsError(Exception):
     """Exceção lançada quando as credenciais são inválidas."""
     pass
 
 
+class InvalidRefreshTokenError(Exception):
+    """Exceção lançada quando o refresh token é desconhecido, expirado ou já foi usado."""
+    pass
+
+
 class UnauthorizedOperationError(Exception):
     """Exceção lançada quando uma operação não é autorizada."""
     pass
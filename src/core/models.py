@@ -11,6 +11,8 @@ class User(BaseModel):
     username: str
     email: EmailStr
     hashed_password: str
+    # Incrementada a cada atualização (ETag e controle de concorrência otimista)
+    version: int = 1
 
     # ✅ SOLUÇÃO: ConfigDict moderno para Pydantic V2
     model_config = ConfigDict(from_attributes=True)
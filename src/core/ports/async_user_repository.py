@@ -0,0 +1,99 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+
+from src.core.models import User
+
+
+class AsyncUserRepository(ABC):
+    """
+    Interface (Porta) assíncrona equivalente ao UserRepository.
+    Permite que adapters não bloqueantes (ex.: aiosqlite) sejam usados
+    diretamente no event loop, sem depender do threadpool.
+    """
+
+    @abstractmethod
+    async def add(self, user_data: dict) -> User:
+        """Insere o usuário; lança UserAlreadyExistsError se o email já existir"""
+        pass
+
+    @abstractmethod
+    async def add_many(self, users_data: List[dict]) -> List[User]:
+        """Insere vários usuários em uma única transação, preservando a ordem"""
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        pass
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[User]:
+        pass
+
+    @abstractmethod
+    async def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        """Retorna, em uma única consulta, quais dos emails informados já existem"""
+        pass
+
+    @abstractmethod
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[User]:
+        pass
+
+    @abstractmethod
+    async def get_all_after(self, after_id: Optional[int] = None, limit: int = 100) -> List[User]:
+        """Paginação por keyset: usuários com id > after_id, ordenados por id"""
+        pass
+
+    @abstractmethod
+    async def get_version(self, user_id: int) -> Optional[int]:
+        """Versão atual do usuário sem carregar a linha, ou None se não existir"""
+        pass
+
+    @abstractmethod
+    async def get_versions(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Pares (id, versão) da página que get_all (ou get_all_after, quando
+        after_id é informado) retornaria, sem carregar as linhas
+        """
+        pass
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Total de usuários, sem percorrer a tabela (contador mantido a cada escrita)"""
+        pass
+
+    @abstractmethod
+    def stream_all(self, batch_size: int = 1000) -> AsyncIterator[Tuple[int, str, str]]:
+        """Percorre todos os usuários como tuplas (id, username, email) ordenadas por id"""
+        pass
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, User]]:
+        """Busca por termos e prefixos em username e email (ver UserRepository.search)"""
+        pass
+
+    @abstractmethod
+    async def update(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[User]:
+        """
+        Retorna o usuário atualizado ou None se não existir; email duplicado lança
+        UserAlreadyExistsError. Com expected_version, a atualização só ocorre se a
+        versão atual for essa; caso contrário lança UserVersionConflictError
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[User]:
+        """
+        Remove o usuário e retorna os dados removidos, ou None se não existir;
+        expected_version como em update
+        """
+        pass
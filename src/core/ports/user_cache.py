@@ -0,0 +1,15 @@
+from abc import ABC, abstractmethod
+
+from src.core.models import User
+
+
+class UserCache(ABC):
+    """
+    Interface (Porta) para caches de usuários mantidos fora do repositório.
+    O serviço invalida as entradas explicitamente quando um usuário muda,
+    evitando que dados removidos ou renomeados sejam servidos do cache.
+    """
+
+    @abstractmethod
+    def invalidate_user(self, user: User) -> None:
+        pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
 
 from src.core.models import User
 
@@ -12,6 +12,12 @@ class UserRepository(ABC):
 
     @abstractmethod
     def add(self, user_data: dict) -> User:
+        """Insere o usuário; lança UserAlreadyExistsError se o email já existir"""
+        pass
+
+    @abstractmethod
+    def add_many(self, users_data: List[dict]) -> List[User]:
+        """Insere vários usuários em uma única transação, preservando a ordem"""
         pass
 
     @abstractmethod
@@ -22,14 +28,75 @@ class UserRepository(ABC):
     def get_by_email(self, email: str) -> Optional[User]:
         pass
 
+    @abstractmethod
+    def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        """Retorna, em uma única consulta, quais dos emails informados já existem"""
+        pass
+
     @abstractmethod
     def get_all(self, skip: int = 0, limit: int = 100) -> List[User]:
         pass
 
     @abstractmethod
-    def update(self, user_id: int, user_data: dict) -> Optional[User]:
+    def get_all_after(self, after_id: Optional[int] = None, limit: int = 100) -> List[User]:
+        """Paginação por keyset: usuários com id > after_id, ordenados por id"""
+        pass
+
+    @abstractmethod
+    def get_version(self, user_id: int) -> Optional[int]:
+        """Versão atual do usuário sem carregar a linha, ou None se não existir"""
+        pass
+
+    @abstractmethod
+    def get_versions(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Pares (id, versão) da página que get_all (ou get_all_after, quando
+        after_id é informado) retornaria, sem carregar as linhas
+        """
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        """Total de usuários, sem percorrer a tabela (contador mantido a cada escrita)"""
+        pass
+
+    @abstractmethod
+    def stream_all(self, batch_size: int = 1000) -> Iterator[Tuple[int, str, str]]:
+        """Percorre todos os usuários como tuplas (id, username, email) ordenadas por id"""
+        pass
+
+    @abstractmethod
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, User]]:
+        """
+        Busca por termos e prefixos em username e email. Retorna pares (rank, usuário)
+        ordenados por (rank, id), com rank menor para correspondências melhores;
+        after=(rank, id) do último resultado visto continua a busca (keyset).
+        """
+        pass
+
+    @abstractmethod
+    def update(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[User]:
+        """
+        Retorna o usuário atualizado ou None se não existir; email duplicado lança
+        UserAlreadyExistsError. Com expected_version, a atualização só ocorre se a
+        versão atual for essa; caso contrário lança UserVersionConflictError
+        """
         pass
 
     @abstractmethod
-    def delete(self, user_id: int) -> bool:
+    def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[User]:
+        """
+        Remove o usuário e retorna os dados removidos, ou None se não existir;
+        expected_version como em update
+        """
         pass
@@ -0,0 +1,183 @@
+from typing import Iterable, List, Optional, Set, Tuple, Union
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.core.ports.user_cache import UserCache
+from src.core.models import User
+from src.core.exceptions import UserAlreadyExistsError, UserNotFoundError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncUserService:
+    """
+    Serviço que contém a lógica de negócio para gerenciamento de usuários,
+    utilizando a porta AsyncUserRepository. Um UserRepository síncrono é
+    usado através do ThreadPoolUserRepository.
+    """
+
+    def __init__(self, user_repository: AsyncUserRepository, user_cache: Optional[UserCache] = None):
+        self.user_repository = user_repository
+        self.user_cache = user_cache
+
+    def _invalidate_cached_user(self, *users: Optional[User]) -> None:
+        """Remove do cache as entradas dos usuários alterados"""
+        if self.user_cache is None:
+            return
+        for user in users:
+            if user is not None:
+                self.user_cache.invalidate_user(user)
+
+    async def create_user(self, user_data: dict) -> User:
+        """
+        Cria um novo usuário com validações de negócio.
+        A duplicidade de email é detectada pela constraint única no próprio INSERT.
+        """
+        try:
+            user = await self.user_repository.add(user_data)
+        except UserAlreadyExistsError:
+            logger.warning(f"Tentativa de criar usuário com email existente: {user_data.get('email')}")
+            raise UserAlreadyExistsError(f"Usuário com email {user_data.get('email')} já existe")
+
+        logger.info(f"Novo usuário criado: {user_data.get('email')}")
+        return user
+
+    async def create_users(
+        self, users_data: List[dict], known_existing: Optional[Set[str]] = None
+    ) -> List[Union[User, UserAlreadyExistsError]]:
+        """
+        Cria usuários em lote com uma consulta de duplicidade e um INSERT em lote.
+        Retorna, na ordem de entrada, o usuário criado ou o erro de cada item;
+        emails repetidos dentro do lote mantêm apenas a primeira ocorrência.
+        Com known_existing (resultado de get_existing_emails já obtido pelo
+        chamador para estes emails), a consulta de duplicidade não é repetida.
+        Se outro processo inserir um dos emails entre a consulta e o INSERT, o
+        lote é refeito item a item e apenas os itens em conflito falham.
+        """
+        if known_existing is None:
+            existing_emails = await self.get_existing_emails(user_data.get("email") for user_data in users_data)
+        else:
+            existing_emails = known_existing
+        results: List[Union[User, UserAlreadyExistsError, None]] = [None] * len(users_data)
+        seen_emails = set(existing_emails)
+        to_create = []
+        for index, user_data in enumerate(users_data):
+            email = user_data.get("email")
+            if email in seen_emails:
+                results[index] = UserAlreadyExistsError(f"Usuário com email {email} já existe")
+            else:
+                seen_emails.add(email)
+                to_create.append(index)
+
+        try:
+            created_users = await self.user_repository.add_many([users_data[i] for i in to_create])
+            for index, user in zip(to_create, created_users):
+                results[index] = user
+        except UserAlreadyExistsError:
+            logger.warning("Conflito de email durante criação em lote, inserindo os itens um a um")
+            for index in to_create:
+                try:
+                    results[index] = await self.user_repository.add(users_data[index])
+                except UserAlreadyExistsError:
+                    email = users_data[index].get("email")
+                    results[index] = UserAlreadyExistsError(f"Usuário com email {email} já existe")
+
+        created = sum(1 for result in results if not isinstance(result, Exception))
+        logger.info(f"Lote processado: {created} criados, {len(users_data) - created} rejeitados")
+        return results
+
+    async def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        """Quais dos emails informados já pertencem a algum usuário (uma consulta)"""
+        return await self.user_repository.get_existing_emails(set(emails))
+
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        """Busca usuário por ID"""
+        user = await self.user_repository.get_by_id(user_id)
+        if not user:
+            logger.debug(f"Usuário não encontrado com ID: {user_id}")
+        return user
+
+    async def get_user_by_email(self, email: str) -> Optional[User]:
+        """Busca usuário por email"""
+        user = await self.user_repository.get_by_email(email)
+        if not user:
+            logger.debug(f"Usuário não encontrado com email: {email}")
+        return user
+
+    async def get_all_users(self, skip: int = 0, limit: int = 10) -> List[User]:
+        """Lista usuários com paginação"""
+        if skip < 0:
+            skip = 0
+        if limit <= 0 or limit > 100:
+            limit = 10
+
+        logger.debug(f"Listando usuários: skip={skip}, limit={limit}")
+        return await self.user_repository.get_all(skip=skip, limit=limit)
+
+    async def get_users_after(self, after_id: Optional[int] = None, limit: int = 10) -> List[User]:
+        """Lista usuários com paginação por cursor (keyset)"""
+        if limit <= 0 or limit > 100:
+            limit = 10
+
+        logger.debug(f"Listando usuários por cursor: after_id={after_id}, limit={limit}")
+        return await self.user_repository.get_all_after(after_id=after_id, limit=limit)
+
+    async def get_user_version(self, user_id: int) -> Optional[int]:
+        """Versão atual do usuário (sem carregar a linha), ou None se não existir"""
+        return await self.user_repository.get_version(user_id)
+
+    async def get_user_versions(
+        self, skip: int = 0, limit: int = 10, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """Pares (id, versão) da mesma página de get_all_users/get_users_after"""
+        if skip < 0:
+            skip = 0
+        if limit <= 0 or limit > 100:
+            limit = 10
+
+        return await self.user_repository.get_versions(skip=skip, limit=limit, after_id=after_id)
+
+    async def count_users(self) -> int:
+        """Total de usuários (O(1), mantido pelo repositório)"""
+        return await self.user_repository.count()
+
+    async def search_users(
+        self,
+        query: str,
+        limit: int = 10,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, User]]:
+        """Busca usuários por username/email; retorna pares (rank, usuário)"""
+        if limit <= 0 or limit > 100:
+            limit = 10
+
+        logger.debug(f"Buscando usuários: query={query!r}, after={after}, limit={limit}")
+        return await self.user_repository.search(query, limit=limit, after=after, max_candidates=max_candidates)
+
+    async def update_user(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[User]:
+        """
+        Atualiza usuário existente (UPDATE ... RETURNING, sem SELECT prévio).
+        Com expected_version, lança UserVersionConflictError se a versão atual for outra.
+        """
+        updated_user = await self.user_repository.update(user_id, user_data, expected_version=expected_version)
+        if not updated_user:
+            logger.warning(f"Tentativa de atualizar usuário inexistente: {user_id}")
+            raise UserNotFoundError(f"Usuário com ID {user_id} não encontrado")
+
+        logger.info(f"Usuário atualizado: {user_id}")
+        # O cache localiza o email anterior pelo id, caso o email tenha mudado
+        self._invalidate_cached_user(updated_user)
+        return updated_user
+
+    async def delete_user(self, user_id: int, expected_version: Optional[int] = None) -> bool:
+        """Remove usuário (DELETE ... RETURNING, sem SELECT prévio); expected_version como em update_user"""
+        deleted_user = await self.user_repository.delete(user_id, expected_version=expected_version)
+        if not deleted_user:
+            logger.warning(f"Tentativa de deletar usuário inexistente: {user_id}")
+            raise UserNotFoundError(f"Usuário com ID {user_id} não encontrado")
+
+        logger.info(f"Usuário deletado: {user_id}")
+        self._invalidate_cached_user(deleted_user)
+        return True
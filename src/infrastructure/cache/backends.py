@@ -0,0 +1,148 @@
+"""
+Backends de cache usados pelo CachingUserRepository.
+
+Os valores são sempre strings (JSON serializado pelo repositório), de modo
+que o mesmo repositório funcione com o cache em processo e com um cache
+compartilhado entre workers (Redis ou compatível).
+"""
+from abc import ABC, abstractmethod
+import threading
+from typing import Optional
+
+from src.infrastructure.cache.ttl_cache import TTLCache
+
+
+class CacheBackend(ABC):
+    """Interface mínima de armazenamento chave/valor com TTL."""
+
+    # True quando as operações fazem I/O (ex.: rede) e não devem rodar no event loop
+    blocking: bool = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        pass
+
+    @abstractmethod
+    def stats(self) -> dict:
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Cache LRU + TTL local ao processo (TTLCache)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SharedCacheBackend(CacheBackend):
+    """
+    Cache compartilhado sobre um cliente no estilo redis-py
+    (get, set(ex=...), delete e, opcionalmente, info).
+
+    Acertos e falhas são contados por processo; descartes (LRU/TTL) são
+    decididos pelo servidor e lidos de INFO quando o cliente oferece.
+    """
+
+    blocking = True
+
+    def __init__(self, client, ttl: float, prefix: str = "users:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        # O Redis expira em segundos inteiros; TTL < 1s seria arredondado para "sem expiração"
+        seconds = int(ttl)
+        if seconds <= 0:
+            return
+        self.client.set(self.prefix + key, value, ex=seconds)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def _server_stats(self) -> dict:
+        info = getattr(self.client, "info", None)
+        if info is None:
+            return {}
+        try:
+            server = info("stats")
+        except Exception:
+            return {}
+        return {
+            "evictions": server.get("evicted_keys"),
+            "expirations": server.get("expired_keys"),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "backend": "shared",
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "evictions": None,
+            "expirations": None,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            **self._server_stats(),
+        }
+
+
+def create_cache_backend(
+    kind: str, maxsize: int, ttl: float, redis_url: Optional[str] = None
+) -> Optional[CacheBackend]:
+    """Cria o backend configurado: "none", "memory" ou "redis" (requer o pacote redis)"""
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return InMemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "USER_REPOSITORY_CACHE=redis requer o pacote 'redis' (pip install redis)"
+            ) from e
+        return SharedCacheBackend(redis.Redis.from_url(redis_url), ttl=ttl)
+    raise ValueError(f"Backend de cache desconhecido: '{kind}'")
@@ -0,0 +1,285 @@
+"""
+Decorators de cache read-through para as portas UserRepository e AsyncUserRepository.
+
+get_by_id e get_by_email consultam o backend antes do repositório envolvido;
+resultados ausentes também são guardados (cache negativo, com TTL próprio).
+add, add_many, update e delete invalidam as chaves afetadas após a escrita.
+get_version e get_versions sempre consultam o repositório: a versão decide
+conflitos de escrita e a validade de tokens, e uma entrada de outro worker
+pode estar desatualizada até expirar. Demais métodos (listagens, exportação,
+verificação em lote) também não passam pelo cache. Com read_through=False,
+get_by_id e get_by_email também vão direto ao repositório e as escritas
+continuam invalidando as chaves (ex.: login, que precisa do hash atual).
+"""
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Set, Tuple
+
+from anyio import to_thread
+
+from src.core.models import User
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.core.ports.user_repository import UserRepository
+from src.infrastructure.cache.backends import CacheBackend
+
+# Marcador de consulta sem resultado (JSON null)
+NEGATIVE_ENTRY = "null"
+
+
+def _id_key(user_id: int) -> str:
+    return f"id:{user_id}"
+
+
+def _email_key(email: str) -> str:
+    return f"email:{email}"
+
+
+def _encode(user: Optional[User]) -> str:
+    return NEGATIVE_ENTRY if user is None else user.model_dump_json()
+
+
+def _decode(value: str) -> Optional[User]:
+    return None if value == NEGATIVE_ENTRY else User.model_validate_json(value)
+
+
+def _user_keys(*users: Optional[User]) -> List[str]:
+    keys = []
+    for user in users:
+        if user is not None:
+            keys.extend((_id_key(user.id), _email_key(user.email)))
+    return keys
+
+
+class CachingUserRepository(UserRepository):
+    """
+    Envolve qualquer UserRepository com cache read-through.
+    negative_ttl limita por quanto tempo um "não encontrado" é servido do cache
+    (None usa o TTL do backend; 0 desabilita o cache negativo).
+    """
+
+    def __init__(
+        self,
+        repository: UserRepository,
+        backend: CacheBackend,
+        negative_ttl: Optional[float] = None,
+        read_through: bool = True,
+    ):
+        self.repository = repository
+        self.backend = backend
+        self.negative_ttl = negative_ttl
+        self.read_through = read_through
+
+    def _lookup(self, key: str) -> Tuple[bool, Optional[User]]:
+        value = self.backend.get(key)
+        if value is None:
+            return False, None
+        return True, _decode(value)
+
+    def _store(self, key: str, user: Optional[User]) -> None:
+        if user is None:
+            self.backend.set(key, NEGATIVE_ENTRY, ttl=self.negative_ttl)
+            return
+        # Um acerto por id também serve a busca por email e vice-versa
+        value = _encode(user)
+        self.backend.set(_id_key(user.id), value)
+        self.backend.set(_email_key(user.email), value)
+
+    def _known_user(self, user_id: int) -> Optional[User]:
+        """Estado atual do usuário (cache ou banco), necessário para invalidar o email"""
+        found, user = self._lookup(_id_key(user_id))
+        return user if found else self.repository.get_by_id(user_id)
+
+    def add(self, user_data: dict) -> User:
+        user = self.repository.add(user_data)
+        self.backend.delete(*_user_keys(user))
+        return user
+
+    def add_many(self, users_data: List[dict]) -> List[User]:
+        users = self.repository.add_many(users_data)
+        self.backend.delete(*_user_keys(*users))
+        return users
+
+    def get_by_id(self, user_id: int) -> Optional[User]:
+        if not self.read_through:
+            return self.repository.get_by_id(user_id)
+        found, user = self._lookup(_id_key(user_id))
+        if found:
+            return user
+        user = self.repository.get_by_id(user_id)
+        self._store(_id_key(user_id), user)
+        return user
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        if not self.read_through:
+            return self.repository.get_by_email(email)
+        found, user = self._lookup(_email_key(email))
+        if found:
+            return user
+        user = self.repository.get_by_email(email)
+        self._store(_email_key(email), user)
+        return user
+
+    def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        return self.repository.get_existing_emails(emails)
+
+    def get_all(self, skip: int = 0, limit: int = 100) -> List[User]:
+        return self.repository.get_all(skip=skip, limit=limit)
+
+    def get_all_after(self, after_id: Optional[int] = None, limit: int = 100) -> List[User]:
+        return self.repository.get_all_after(after_id=after_id, limit=limit)
+
+    def get_version(self, user_id: int) -> Optional[int]:
+        return self.repository.get_version(user_id)
+
+    def get_versions(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        return self.repository.get_versions(skip=skip, limit=limit, after_id=after_id)
+
+    def count(self) -> int:
+        return self.repository.count()
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[Tuple[int, str, str]]:
+        return self.repository.stream_all(batch_size=batch_size)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, User]]:
+        return self.repository.search(query, limit=limit, after=after, max_candidates=max_candidates)
+
+    def update(self, user_id: int, user_data: dict, expected_version: Optional[int] = None) -> Optional[User]:
+        previous = self._known_user(user_id) if "email" in user_data else None
+        user = self.repository.update(user_id, user_data, expected_version)
+        self.backend.delete(_id_key(user_id), *_user_keys(previous, user))
+        return user
+
+    def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[User]:
+        deleted = self.repository.delete(user_id, expected_version)
+        self.backend.delete(_id_key(user_id), *_user_keys(deleted))
+        return deleted
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+class AsyncCachingUserRepository(AsyncUserRepository):
+    """
+    Versão assíncrona do CachingUserRepository.
+    Backends bloqueantes (ex.: cache compartilhado via rede) rodam no threadpool;
+    o cache em processo é consultado direto no event loop.
+    """
+
+    def __init__(
+        self,
+        repository: AsyncUserRepository,
+        backend: CacheBackend,
+        negative_ttl: Optional[float] = None,
+        read_through: bool = True,
+    ):
+        self.repository = repository
+        self.backend = backend
+        self.negative_ttl = negative_ttl
+        self.read_through = read_through
+
+    async def _call(self, func, *args, **kwargs):
+        if self.backend.blocking:
+            return await to_thread.run_sync(lambda: func(*args, **kwargs))
+        return func(*args, **kwargs)
+
+    async def _lookup(self, key: str) -> Tuple[bool, Optional[User]]:
+        value = await self._call(self.backend.get, key)
+        if value is None:
+            return False, None
+        return True, _decode(value)
+
+    async def _store(self, key: str, user: Optional[User]) -> None:
+        if user is None:
+            await self._call(self.backend.set, key, NEGATIVE_ENTRY, ttl=self.negative_ttl)
+            return
+        value = _encode(user)
+        await self._call(self.backend.set, _id_key(user.id), value)
+        await self._call(self.backend.set, _email_key(user.email), value)
+
+    async def _known_user(self, user_id: int) -> Optional[User]:
+        found, user = await self._lookup(_id_key(user_id))
+        return user if found else await self.repository.get_by_id(user_id)
+
+    async def add(self, user_data: dict) -> User:
+        user = await self.repository.add(user_data)
+        await self._call(self.backend.delete, *_user_keys(user))
+        return user
+
+    async def add_many(self, users_data: List[dict]) -> List[User]:
+        users = await self.repository.add_many(users_data)
+        await self._call(self.backend.delete, *_user_keys(*users))
+        return users
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        if not self.read_through:
+            return await self.repository.get_by_id(user_id)
+        found, user = await self._lookup(_id_key(user_id))
+        if found:
+            return user
+        user = await self.repository.get_by_id(user_id)
+        await self._store(_id_key(user_id), user)
+        return user
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        if not self.read_through:
+            return await self.repository.get_by_email(email)
+        found, user = await self._lookup(_email_key(email))
+        if found:
+            return user
+        user = await self.repository.get_by_email(email)
+        await self._store(_email_key(email), user)
+        return user
+
+    async def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        return await self.repository.get_existing_emails(emails)
+
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[User]:
+        return await self.repository.get_all(skip=skip, limit=limit)
+
+    async def get_all_after(self, after_id: Optional[int] = None, limit: int = 100) -> List[User]:
+        return await self.repository.get_all_after(after_id=after_id, limit=limit)
+
+    async def get_version(self, user_id: int) -> Optional[int]:
+        return await self.repository.get_version(user_id)
+
+    async def get_versions(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        return await self.repository.get_versions(skip=skip, limit=limit, after_id=after_id)
+
+    async def count(self) -> int:
+        return await self.repository.count()
+
+    def stream_all(self, batch_size: int = 1000) -> AsyncIterator[Tuple[int, str, str]]:
+        return self.repository.stream_all(batch_size=batch_size)
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, User]]:
+        return await self.repository.search(query, limit=limit, after=after, max_candidates=max_candidates)
+
+    async def update(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[User]:
+        previous = await self._known_user(user_id) if "email" in user_data else None
+        user = await self.repository.update(user_id, user_data, expected_version)
+        await self._call(self.backend.delete, _id_key(user_id), *_user_keys(previous, user))
+        return user
+
+    async def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[User]:
+        deleted = await self.repository.delete(user_id, expected_version)
+        await self._call(self.backend.delete, _id_key(user_id), *_user_keys(deleted))
+        return deleted
+
+    def stats(self) -> dict:
+        return self.backend.stats()
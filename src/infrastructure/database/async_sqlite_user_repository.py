@@ -0,0 +1,192 @@
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.core.models import User as UserDomain
+from src.core.exceptions import UserAlreadyExistsError, UserVersionConflictError
+from src.infrastructure.database.models import User as UserModelDB, to_domain
+from src.infrastructure.database.user_count import COUNT_STATEMENT
+from src.infrastructure.database.user_search import SEARCH_STATEMENT, search_parameters
+from src.infrastructure.database.user_versions import VERSION_STATEMENT, page_versions_query, version_conflict
+
+# Colunas devolvidas por UPDATE/DELETE ... RETURNING
+_USER_COLUMNS = (
+    UserModelDB.id, UserModelDB.username, UserModelDB.email, UserModelDB.hashed_password, UserModelDB.version
+)
+
+
+class AsyncSQLiteUserRepository(AsyncUserRepository):
+    """
+    Implementação concreta (Adapter) do AsyncUserRepository para SQLite
+    usando AsyncSession do SQLAlchemy com o driver aiosqlite.
+
+    Assim como no adapter síncrono, leituras usam read_session até a primeira
+    escrita da requisição (read-your-writes).
+    """
+
+    def __init__(self, db_session: AsyncSession, read_session: Optional[AsyncSession] = None):
+        self.db = db_session
+        self.read_db = read_session
+        self._has_written = False
+
+    @property
+    def _reader(self) -> AsyncSession:
+        if self.read_db is None or self._has_written:
+            return self.db
+        return self.read_db
+
+    def _mark_written(self) -> None:
+        self._has_written = True
+
+    async def _check_version(self, user_id: int, expected_version: int) -> None:
+        """Ver SQLiteUserRepository._check_version"""
+        current_version = (await self.db.execute(VERSION_STATEMENT, {"id": user_id})).scalar()
+        if current_version is not None:
+            raise version_conflict(expected_version, current_version)
+
+    async def _get_model(self, session: AsyncSession, user_id: int) -> Optional[UserModelDB]:
+        result = await session.execute(select(UserModelDB).where(UserModelDB.id == user_id))
+        return result.scalars().first()
+
+    async def add(self, user_data: dict) -> UserDomain:
+        self._mark_written()
+        statement = insert(UserModelDB).returning(UserModelDB)
+        try:
+            result = await self.db.scalars(statement, [user_data])
+            user = to_domain(result.one())
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise UserAlreadyExistsError(f"Usuário com email {user_data.get('email')} já existe") from e
+        return user
+
+    async def add_many(self, users_data: List[dict]) -> List[UserDomain]:
+        if not users_data:
+            return []
+        self._mark_written()
+        statement = insert(UserModelDB).returning(UserModelDB, sort_by_parameter_order=True)
+        try:
+            result = await self.db.scalars(statement, users_data)
+            users = [to_domain(user) for user in result.all()]
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise UserAlreadyExistsError("Um ou mais emails do lote já existem") from e
+        return users
+
+    async def get_by_id(self, user_id: int) -> Optional[UserDomain]:
+        db_user = await self._get_model(self._reader, user_id)
+        if db_user:
+            return to_domain(db_user)
+        return None
+
+    async def get_by_email(self, email: str) -> Optional[UserDomain]:
+        result = await self._reader.execute(select(UserModelDB).where(UserModelDB.email == email))
+        db_user = result.scalars().first()
+        if db_user:
+            return to_domain(db_user)
+        return None
+
+    async def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        emails = list(emails)
+        if not emails:
+            return set()
+        result = await self._reader.scalars(
+            select(UserModelDB.email).where(UserModelDB.email.in_(emails))
+        )
+        return set(result.all())
+
+    async def get_all(self, skip: int = 0, limit: int = 10) -> List[UserDomain]:
+        result = await self._reader.execute(
+            select(UserModelDB).order_by(UserModelDB.id).offset(skip).limit(limit)
+        )
+        return [to_domain(user) for user in result.scalars().all()]
+
+    async def get_all_after(self, after_id: Optional[int] = None, limit: int = 10) -> List[UserDomain]:
+        statement = select(UserModelDB)
+        if after_id is not None:
+            statement = statement.where(UserModelDB.id > after_id)
+        result = await self._reader.execute(statement.order_by(UserModelDB.id).limit(limit))
+        return [to_domain(user) for user in result.scalars().all()]
+
+    async def get_version(self, user_id: int) -> Optional[int]:
+        return (await self._reader.execute(VERSION_STATEMENT, {"id": user_id})).scalar()
+
+    async def get_versions(
+        self, skip: int = 0, limit: int = 10, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        statement, parameters = page_versions_query(skip, limit, after_id)
+        return [tuple(row) for row in (await self._reader.execute(statement, parameters)).all()]
+
+    async def count(self) -> int:
+        return (await self._reader.execute(COUNT_STATEMENT)).scalar_one()
+
+    async def stream_all(self, batch_size: int = 1000) -> AsyncIterator[Tuple[int, str, str]]:
+        statement = (
+            select(UserModelDB.id, UserModelDB.username, UserModelDB.email)
+            .order_by(UserModelDB.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self._reader.stream(statement)
+        async for row in result:
+            yield tuple(row)
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, UserDomain]]:
+        parameters = search_parameters(query, limit, after, max_candidates)
+        if parameters is None:
+            return []
+        rows = (await self._reader.execute(SEARCH_STATEMENT, parameters)).all()
+        return [(row.rank, to_domain(row)) for row in rows]
+
+    async def update(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[UserDomain]:
+        self._mark_written()
+        if not user_data:
+            db_user = await self._get_model(self.db, user_id)
+            if db_user is not None and expected_version is not None and db_user.version != expected_version:
+                raise version_conflict(expected_version, db_user.version)
+            return to_domain(db_user) if db_user else None
+        statement = (
+            update(UserModelDB)
+            .where(UserModelDB.id == user_id)
+            .values(**user_data, version=UserModelDB.version + 1)
+            .returning(*_USER_COLUMNS)
+        )
+        if expected_version is not None:
+            statement = statement.where(UserModelDB.version == expected_version)
+        try:
+            row = (await self.db.execute(statement)).first()
+            if row is None and expected_version is not None:
+                await self._check_version(user_id, expected_version)
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise UserAlreadyExistsError(f"Usuário com email {user_data.get('email')} já existe") from e
+        except UserVersionConflictError:
+            await self.db.rollback()
+            raise
+        return to_domain(row) if row else None
+
+    async def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[UserDomain]:
+        self._mark_written()
+        statement = delete(UserModelDB).where(UserModelDB.id == user_id).returning(*_USER_COLUMNS)
+        if expected_version is not None:
+            statement = statement.where(UserModelDB.version == expected_version)
+        try:
+            row = (await self.db.execute(statement)).first()
+            if row is None and expected_version is not None:
+                await self._check_version(user_id, expected_version)
+        except UserVersionConflictError:
+            await self.db.rollback()
+            raise
+        await self.db.commit()
+        return to_domain(row) if row else None
@@ -1,27 +1,407 @@
+"""
+Engines e sessões do banco de dados.
+
+Importar este módulo não abre conexões nem cria engines. Database reúne os
+engines (escrita, assíncrono, réplicas de leitura e shards) e a fila de
+escrita de um Settings e os cria no primeiro uso. create_app instala a instância da aplicação com
+configure_database, e o esquema é criado no startup (lifespan) ou na primeira
+sessão aberta.
+"""
+import threading
+import warnings
+from itertools import cycle
+from typing import TYPE_CHECKING, List, Optional
+
+from anyio import to_thread
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-from src.config import DATABASE_URL
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from src.config import Settings, get_settings
+from src.infrastructure.observability.metrics import install_engine_metrics
+from src.infrastructure.observability.server_timing import install_sql_timing
+from src.infrastructure.database.email_routes import create_shard_schema
+from src.infrastructure.database.refresh_tokens import create_refresh_token_table
+from src.infrastructure.database.user_count import COUNT_STATEMENT, create_user_counter, reconcile_user_count
+from src.infrastructure.database.user_search import create_search_index
+from src.infrastructure.database.user_versions import add_version_column
+from src.infrastructure.database.sqlite_pragmas import (
+    install_sqlite_pragmas,
+    read_sqlite_pragmas,
+    resolve_sqlite_pragmas,
+)
 import logging
 
+if TYPE_CHECKING:
+    from src.infrastructure.database.group_commit import GroupCommitWriter
+
 logger = logging.getLogger(__name__)
 
 # ✅ SOLUÇÃO: Import moderno para SQLAlchemy 2.0
 Base = declarative_base()
 
-# Configuração do engine com logging
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    echo=False  # Set to True para debug SQL
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_async_database_url(database_url: str) -> str:
+    """Converte a URL síncrona do SQLite para o driver assíncrono aiosqlite"""
+    url = make_url(database_url)
+    if url.drivername in ("sqlite", "sqlite+pysqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def get_read_only_sqlite_url(database_url: str) -> str:
+    """
+    Converte a URL de um arquivo SQLite para abertura somente leitura (mode=ro).
+    URLs de outros bancos e bancos em memória são retornadas sem alteração.
+    """
+    url = make_url(database_url)
+    if not url.drivername.startswith("sqlite") or url.database in (None, "", ":memory:"):
+        return database_url
+    if url.database.startswith("file:"):
+        return database_url
+    query = dict(url.query)
+    query.update({"mode": "ro", "uri": "true"})
+    url = url.set(database=f"file:{url.database}", query=query)
+    return url.render_as_string(hide_password=False)
+
+
+class Database:
+    """
+    Engines e fábricas de sessão criados sob demanda a partir das configurações.
+
+    Cada grupo de engines (síncrono, assíncrono, réplicas) é criado no primeiro
+    acesso, com os PRAGMAs do SQLite e a instrumentação (Server-Timing e
+    métricas) conforme as configurações.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        # Perfis inválidos falham aqui, na criação da aplicação, e não na primeira consulta
+        self.sqlite_pragmas = resolve_sqlite_pragmas(settings.sqlite_profile, settings.sqlite_pragma_overrides)
+        # journal_mode não pode ser alterado em conexões somente leitura; o modo WAL
+        # é definido pelo engine de escrita e persistido no próprio arquivo
+        self.read_sqlite_pragmas = {
+            name: value for name, value in self.sqlite_pragmas.items() if name != "journal_mode"
+        }
+        self._lock = threading.RLock()
+        self._engine: Optional[Engine] = None
+        self._async_engine: Optional[AsyncEngine] = None
+        self._read_engines: Optional[List[Engine]] = None
+        self._async_read_engines: Optional[List[AsyncEngine]] = None
+        self._shard_engines: Optional[List[Engine]] = None
+        self._write_queue: Optional["GroupCommitWriter"] = None
+        self._schema_ready = False
+        self._effective_sqlite_pragmas: Optional[dict] = None
+
+    def _instrument(self, engine: Engine, name: str, pragmas: dict) -> None:
+        install_sqlite_pragmas(engine, pragmas)
+        # Tempo das instruções SQL no cabeçalho Server-Timing (fase "db")
+        if self.settings.server_timing_enabled:
+            install_sql_timing(engine)
+        # Contagem/duração de SQL por tipo de instrução e espera no pool em /metrics
+        if self.settings.metrics_enabled:
+            install_engine_metrics(engine, name)
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = create_engine(
+                        self.settings.database_url,
+                        connect_args={"check_same_thread": False},
+                        echo=False,  # Set to True para debug SQL
+                    )
+                    self._instrument(engine, "primary", self.sqlite_pragmas)
+                    self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                    self._engine = engine
+        return self._engine
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        """Engine assíncrono usado pelo AsyncSQLiteUserRepository"""
+        if self._async_engine is None:
+            with self._lock:
+                if self._async_engine is None:
+                    engine = create_async_engine(
+                        self.settings.async_database_url or get_async_database_url(self.settings.database_url),
+                        echo=False,
+                    )
+                    self._instrument(engine.sync_engine, "primary_async", self.sqlite_pragmas)
+                    # expire_on_commit=False evita lazy loads implícitos após o commit em contexto assíncrono
+                    self._async_session_factory = async_sessionmaker(
+                        bind=engine, autoflush=False, expire_on_commit=False
+                    )
+                    self._async_engine = engine
+        return self._async_engine
+
+    @property
+    def session_factory(self) -> sessionmaker:
+        self.engine
+        return self._session_factory
+
+    @property
+    def async_session_factory(self) -> async_sessionmaker:
+        self.async_engine
+        return self._async_session_factory
+
+    # --- Réplicas de leitura ---
+    @property
+    def read_engines(self) -> List[Engine]:
+        if self._read_engines is None:
+            with self._lock:
+                if self._read_engines is None:
+                    engines = []
+                    for index, url in enumerate(self.settings.database_read_urls):
+                        engine = create_engine(
+                            get_read_only_sqlite_url(url),
+                            connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+                            echo=False,
+                        )
+                        self._instrument(engine, f"replica{index}", self.read_sqlite_pragmas)
+                        engines.append(engine)
+                    self._read_session_factories = cycle(
+                        [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in engines]
+                    )
+                    self._read_engines = engines
+        return self._read_engines
+
+    @property
+    def async_read_engines(self) -> List[AsyncEngine]:
+        if self._async_read_engines is None:
+            with self._lock:
+                if self._async_read_engines is None:
+                    engines = []
+                    for index, url in enumerate(self.settings.database_read_urls):
+                        engine = create_async_engine(
+                            get_read_only_sqlite_url(get_async_database_url(url)), echo=False
+                        )
+                        self._instrument(engine.sync_engine, f"replica{index}_async", self.read_sqlite_pragmas)
+                        engines.append(engine)
+                    self._async_read_session_factories = cycle(
+                        [async_sessionmaker(bind=e, autoflush=False, expire_on_commit=False) for e in engines]
+                    )
+                    self._async_read_engines = engines
+        return self._async_read_engines
+
+    # --- Shards ---
+    @property
+    def shard_engines(self) -> List[Engine]:
+        """Um engine por URL de DATABASE_SHARD_URLS, na ordem configurada"""
+        if self._shard_engines is None:
+            with self._lock:
+                if self._shard_engines is None:
+                    engines = []
+                    for index, url in enumerate(self.settings.database_shard_urls):
+                        engine = create_engine(url, connect_args={"check_same_thread": False}, echo=False)
+                        self._instrument(engine, f"shard{index}", self.sqlite_pragmas)
+                        engines.append(engine)
+                    self._shard_session_factories = [
+                        sessionmaker(autocommit=False, autoflush=False, bind=e) for e in engines
+                    ]
+                    self._shard_engines = engines
+        return self._shard_engines
+
+    @property
+    def sharded(self) -> bool:
+        return bool(self.settings.database_shard_urls)
+
+    def _user_engines(self) -> List[Engine]:
+        """Engines que guardam a tabela users: os shards, se configurados, ou o de escrita"""
+        return self.shard_engines if self.sharded else [self.engine]
+
+    # --- Fila de escrita ---
+    @property
+    def write_queue(self) -> Optional["GroupCommitWriter"]:
+        """GroupCommitWriter com engine próprio, ou None se WRITE_QUEUE_ENABLED estiver desligado"""
+        if not self.settings.write_queue_enabled:
+            return None
+        if self._write_queue is None:
+            with self._lock:
+                if self._write_queue is None:
+                    # group_commit depende dos modelos, que dependem de Base (definido aqui)
+                    from src.infrastructure.database.group_commit import GroupCommitWriter, enable_savepoints
+
+                    engine = create_engine(
+                        self.settings.database_url, connect_args={"check_same_thread": False}, echo=False
+                    )
+                    enable_savepoints(engine)
+                    self._instrument(engine, "writer", self.sqlite_pragmas)
+                    self._write_queue = GroupCommitWriter(
+                        engine,
+                        max_batch=self.settings.write_queue_max_batch,
+                        max_delay=self.settings.write_queue_max_delay_ms / 1000,
+                    )
+        return self._write_queue
+
+    # --- Sessões ---
+    def session(self) -> Session:
+        """Abre uma sessão no engine de escrita"""
+        self.ensure_schema()
+        return self.session_factory()
+
+    def async_session(self) -> AsyncSession:
+        """Abre uma sessão assíncrona no engine de escrita"""
+        self.ensure_schema()
+        return self.async_session_factory()
+
+    def read_session(self) -> Optional[Session]:
+        """Abre uma sessão na próxima réplica de leitura (round-robin) ou None se não houver"""
+        if not self.read_engines:
+            return None
+        return next(self._read_session_factories)()
+
+    def async_read_session(self) -> Optional[AsyncSession]:
+        """Versão assíncrona de read_session"""
+        if not self.async_read_engines:
+            return None
+        return next(self._async_read_session_factories)()
+
+    def shard_sessions(self) -> List[Session]:
+        """Abre uma sessão em cada shard, na ordem de DATABASE_SHARD_URLS"""
+        self.ensure_schema()
+        self.shard_engines
+        return [factory() for factory in self._shard_session_factories]
+
+    # --- Esquema ---
+    @staticmethod
+    def _create_schema(engine: Engine, shard: bool = False) -> None:
+        Base.metadata.create_all(bind=engine)
+        # Bancos criados antes da coluna de versão, do índice de busca ou do contador
+        with engine.begin() as connection:
+            add_version_column(connection)
+            create_search_index(connection)
+            create_user_counter(connection)
+            reconcile_user_count(connection)
+            if shard:
+                create_shard_schema(connection)
+            else:
+                create_refresh_token_table(connection)
+
+    def create_tables(self) -> None:
+        """Cria as tabelas no banco de dados (e em cada shard, se configurados)"""
+        with self._lock:
+            try:
+                self._create_schema(self.engine)
+                for engine in self.shard_engines:
+                    self._create_schema(engine, shard=True)
+                logger.info("✅ Tabelas do banco de dados criadas com sucesso")
+            except Exception as e:
+                logger.error(f"❌ Erro ao criar tabelas: {e}")
+                raise
+            self._schema_ready = True
+        if self.engine.dialect.name == "sqlite":
+            logger.info(f"🗄️  SQLite (perfil {self.settings.sqlite_profile}): {self.effective_sqlite_pragmas()}")
+        if self.sharded:
+            logger.info(f"🧩 Usuários distribuídos em {len(self.shard_engines)} shards")
+
+    def ensure_schema(self) -> None:
+        """Cria as tabelas na primeira sessão se o startup da aplicação não o fez"""
+        if not self._schema_ready:
+            with self._lock:
+                if not self._schema_ready:
+                    self.create_tables()
+
+    def reconcile_user_count(self) -> Optional[int]:
+        """
+        Corrige o contador de usuários (de cada shard) se divergir de COUNT(*)
+        (ver user_count). Retorna o novo total, ou None se nenhum contador divergia.
+        """
+        engines = self._user_engines()
+        if engines[0].dialect.name != "sqlite":
+            return None
+        corrected, total = False, 0
+        for engine in engines:
+            with engine.begin() as connection:
+                count = reconcile_user_count(connection)
+                corrected = corrected or count is not None
+                total += count if count is not None else connection.execute(COUNT_STATEMENT).scalar()
+        return total if corrected else None
+
+    def effective_sqlite_pragmas(self) -> dict:
+        """
+        Retorna os PRAGMAs efetivos do SQLite, lidos em uma conexão do pool na
+        primeira chamada: todas as conexões recebem os mesmos PRAGMAs
+        """
+        if self._effective_sqlite_pragmas is None:
+            self._effective_sqlite_pragmas = read_sqlite_pragmas(self.engine)
+        return self._effective_sqlite_pragmas
+
+    def ping(self) -> None:
+        """Verifica a conexão com o banco (SELECT 1); lança a exceção do driver se falhar"""
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+
+    async def dispose(self) -> None:
+        """Fecha as conexões dos engines já criados (eles continuam utilizáveis)"""
+        if self._write_queue is not None:
+            # Confirma as escritas ainda na fila antes de fechar o engine da thread escritora
+            await to_thread.run_sync(self._write_queue.close)
+            self._write_queue.engine.dispose()
+        for engine in [self._engine, *(self._read_engines or []), *(self._shard_engines or [])]:
+            if engine is not None:
+                engine.dispose()
+        for async_engine in [self._async_engine, *(self._async_read_engines or [])]:
+            if async_engine is not None:
+                await async_engine.dispose()
+
+
+_database: Optional[Database] = None
+_database_lock = threading.Lock()
+
+
+def configure_database(settings: Settings) -> Database:
+    """Instala o Database do processo com as configurações informadas"""
+    global _database
+    with _database_lock:
+        _database = Database(settings)
+    return _database
+
+
+def get_database() -> Database:
+    """Retorna o Database do processo, criando-o com get_settings() se necessário"""
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = Database(get_settings())
+    return _database
+
+
+def get_read_session() -> Optional[Session]:
+    """Abre uma sessão na próxima réplica de leitura (round-robin) ou None se não houver"""
+    return get_database().read_session()
+
+
+def get_async_read_session() -> Optional[AsyncSession]:
+    """Versão assíncrona de get_read_session"""
+    return get_database().async_read_session()
+
+
+def get_sqlite_pragmas() -> dict:
+    """Retorna os PRAGMAs efetivos do SQLite em uma conexão do pool"""
+    return get_database().effective_sqlite_pragmas()
+
 
 def create_db_and_tables():
     """Cria as tabelas no banco de dados"""
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("✅ Tabelas do banco de dados criadas com sucesso")
-    except Exception as e:
-        logger.error(f"❌ Erro ao criar tabelas: {e}")
-        raise
+    get_database().create_tables()
+
+
+# Atributos que o módulo exportava antes de Database
+_DEPRECATED_ATTRIBUTES = {
+    "engine": "engine",
+    "SessionLocal": "session_factory",
+}
+
+
+def __getattr__(name: str):
+    # Obsoleto: use get_database().engine / get_database().session(); resolvidos no Database do processo
+    if name in _DEPRECATED_ATTRIBUTES:
+        warnings.warn(
+            f"{__name__}.{name} está obsoleto; use get_database().{_DEPRECATED_ATTRIBUTES[name]}",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return getattr(get_database(), _DEPRECATED_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,47 @@
+"""
+Rotas de email entre shards (ver sharded_user_repository).
+
+Cada usuário permanece no shard em que foi criado. Se o email mudar para um
+endereço cujo hash aponta para outro shard, o shard "de origem" do novo email
+registra email -> shard em email_routes. Os triggers abaixo impedem que um
+email roteado seja inserido ou atribuído novamente naquele shard, de modo que
+a unicidade global do email é verificada consultando um único shard.
+"""
+from sqlalchemy import bindparam, text
+
+_SHARD_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS email_routes (
+        email VARCHAR PRIMARY KEY,
+        shard INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_email_route_insert BEFORE INSERT ON users
+    WHEN EXISTS (SELECT 1 FROM email_routes WHERE email = new.email) BEGIN
+        SELECT RAISE(ABORT, 'UNIQUE constraint failed: users.email (email_routes)');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_email_route_update BEFORE UPDATE OF email ON users
+    WHEN EXISTS (SELECT 1 FROM email_routes WHERE email = new.email) BEGIN
+        SELECT RAISE(ABORT, 'UNIQUE constraint failed: users.email (email_routes)');
+    END
+    """,
+)
+
+CLAIM_ROUTE = text(
+    "INSERT INTO email_routes (email, shard) SELECT :email, :shard "
+    "WHERE NOT EXISTS (SELECT 1 FROM users WHERE email = :email)"
+)
+RELEASE_ROUTE = text("DELETE FROM email_routes WHERE email = :email")
+ROUTED_SHARD = text("SELECT shard FROM email_routes WHERE email = :email")
+ROUTED_EMAILS = text("SELECT email FROM email_routes WHERE email IN :emails").bindparams(
+    bindparam("emails", expanding=True)
+)
+
+
+def create_shard_schema(connection) -> None:
+    """Cria a tabela de rotas de email e os triggers de unicidade de um shard"""
+    for statement in _SHARD_DDL:
+        connection.exec_driver_sql(statement)
@@ -0,0 +1,350 @@
+"""
+Fila de escrita com group commit (um único escritor por processo).
+
+Cada add/update/delete do SQLiteUserRepository faz o seu próprio COMMIT, e
+cada COMMIT paga um fsync (synchronous=FULL) segurando o lock de escrita do
+SQLite; escritores concorrentes esperam o lock em sequência e, sob carga,
+esgotam o busy_timeout ("database is locked").
+
+Com WRITE_QUEUE_ENABLED, as escritas das requisições são enviadas para uma
+fila consumida por uma thread dedicada. A thread junta as operações já
+enfileiradas (até max_batch, aguardando no máximo max_delay por mais) e as
+executa em uma única transação, cada uma dentro do seu SAVEPOINT: o erro de
+uma operação (ex.: email duplicado) desfaz apenas ela. Um COMMIT confirma o
+lote inteiro, e só depois dele cada chamador recebe o seu resultado ou a sua
+exceção: a resposta de uma escrita continua significando que ela está no
+disco, como antes. Uma operação cujo chamador desistiu (requisição
+cancelada) antes de o lote começar é descartada; depois disso, ela é
+confirmada normalmente, mesmo sem ninguém para receber o resultado.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from src.core.exceptions import UserAlreadyExistsError
+from src.core.models import User
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.infrastructure.database.models import User as UserModelDB, to_domain
+from src.infrastructure.database.user_versions import VERSION_STATEMENT, version_conflict
+from src.infrastructure.observability.metrics import db_write_batch_size, db_write_queue_wait
+import logging
+
+logger = logging.getLogger(__name__)
+
+_USERS = UserModelDB.__table__
+_USER_COLUMNS = (_USERS.c.id, _USERS.c.username, _USERS.c.email, _USERS.c.hashed_password, _USERS.c.version)
+
+
+def enable_savepoints(engine: Engine) -> None:
+    """
+    Faz o SQLAlchemy controlar as transações do pysqlite.
+
+    O driver abre transações implicitamente e não as reconhece quando a
+    primeira instrução é um SAVEPOINT: o RELEASE do primeiro SAVEPOINT do
+    lote faria COMMIT. Com isolation_level=None o driver não abre transações
+    e o BEGIN é emitido pelo SQLAlchemy. BEGIN IMMEDIATE adquire o lock de
+    escrita no início do lote, em vez de no primeiro INSERT.
+    """
+
+    @event.listens_for(engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+# --- Operações executadas pela thread escritora (dentro de um SAVEPOINT) ---
+def _add(connection: Connection, user_data: dict) -> User:
+    row = connection.execute(insert(_USERS).returning(*_USER_COLUMNS), [user_data]).one()
+    return to_domain(row)
+
+
+def _add_many(connection: Connection, users_data: List[dict]) -> List[User]:
+    statement = insert(_USERS).returning(*_USER_COLUMNS, sort_by_parameter_order=True)
+    return [to_domain(row) for row in connection.execute(statement, users_data)]
+
+
+def _check_version(connection: Connection, user_id: int, expected_version: int) -> None:
+    # UPDATE/DELETE condicional sem linhas afetadas: usuário inexistente ou em outra versão
+    current_version = connection.execute(VERSION_STATEMENT, {"id": user_id}).scalar()
+    if current_version is not None:
+        raise version_conflict(expected_version, current_version)
+
+
+def _update(
+    connection: Connection, user_id: int, user_data: dict, expected_version: Optional[int] = None
+) -> Optional[User]:
+    if user_data:
+        statement = (
+            update(_USERS)
+            .where(_USERS.c.id == user_id)
+            .values(**user_data, version=_USERS.c.version + 1)
+            .returning(*_USER_COLUMNS)
+        )
+    else:
+        statement = select(*_USER_COLUMNS).where(_USERS.c.id == user_id)
+    if expected_version is not None:
+        statement = statement.where(_USERS.c.version == expected_version)
+    row = connection.execute(statement).first()
+    if row is None and expected_version is not None:
+        _check_version(connection, user_id, expected_version)
+    return to_domain(row) if row else None
+
+
+def _delete(connection: Connection, user_id: int, expected_version: Optional[int] = None) -> Optional[User]:
+    statement = delete(_USERS).where(_USERS.c.id == user_id).returning(*_USER_COLUMNS)
+    if expected_version is not None:
+        statement = statement.where(_USERS.c.version == expected_version)
+    row = connection.execute(statement).first()
+    if row is None and expected_version is not None:
+        _check_version(connection, user_id, expected_version)
+    return to_domain(row) if row else None
+
+
+def _integrity_message(operation: Callable, args: tuple) -> str:
+    if operation is _add_many:
+        return "Um ou mais emails do lote já existem"
+    user_data = args[0] if operation is _add else args[1]
+    return f"Usuário com email {user_data.get('email')} já existe"
+
+
+class _WriteRequest:
+    __slots__ = ("operation", "args", "future", "enqueued_at")
+
+    def __init__(self, operation: Callable, args: tuple):
+        self.operation = operation
+        self.args = args
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Thread escritora que confirma várias operações por transação.
+
+    submit() enfileira uma operação e devolve um Future resolvido após o
+    COMMIT do lote que a contém. A thread é iniciada na primeira operação e
+    encerrada por close() depois de processar o que já estava na fila; uma
+    nova operação após close() inicia outra thread.
+    """
+
+    def __init__(self, engine: Engine, max_batch: int = 64, max_delay: float = 0.0):
+        if max_batch <= 0:
+            raise ValueError("max_batch deve ser positivo")
+        if max_delay < 0:
+            raise ValueError("max_delay não pode ser negativo")
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._operations = 0
+
+    # --- Operações ---
+    def submit(self, operation: Callable, *args) -> Future:
+        request = _WriteRequest(operation, args)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+            self._queue.put(request)
+        return request.future
+
+    def add(self, user_data: dict) -> Future:
+        return self.submit(_add, user_data)
+
+    def add_many(self, users_data: List[dict]) -> Future:
+        return self.submit(_add_many, users_data)
+
+    def update(self, user_id: int, user_data: dict, expected_version: Optional[int] = None) -> Future:
+        return self.submit(_update, user_id, user_data, expected_version)
+
+    def delete(self, user_id: int, expected_version: Optional[int] = None) -> Future:
+        return self.submit(_delete, user_id, expected_version)
+
+    def close(self) -> None:
+        """Processa as operações pendentes e encerra a thread escritora"""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+        thread.join()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "operations": self._operations,
+                "operations_per_batch_avg": self._operations / self._batches if self._batches else 0.0,
+            }
+
+    # --- Thread escritora ---
+    def _next_batch(self) -> Tuple[List[_WriteRequest], bool]:
+        """Bloqueia até a primeira operação e junta as seguintes; indica se close() foi chamado"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                # Primeiro o que já está na fila; depois, espera até o prazo do lote
+                remaining = deadline - time.perf_counter()
+                request = self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._execute(batch)
+            except Exception as e:
+                # Nenhum chamador pode ficar esperando um Future que a thread não vai resolver
+                logger.exception(f"❌ Erro inesperado na fila de escrita: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _execute(self, batch: List[_WriteRequest]) -> None:
+        # Operações canceladas enquanto estavam na fila não são executadas; as
+        # demais não podem mais ser canceladas
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        queue_wait = db_write_queue_wait.labels()
+        for request in batch:
+            queue_wait.observe(started - request.enqueued_at)
+        outcomes: List[Tuple[bool, object]] = []
+        try:
+            with self.engine.connect() as connection:
+                with connection.begin():
+                    for request in batch:
+                        savepoint = connection.begin_nested()
+                        try:
+                            result = request.operation(connection, *request.args)
+                            savepoint.commit()
+                            outcomes.append((True, result))
+                        except IntegrityError as e:
+                            savepoint.rollback()
+                            error = UserAlreadyExistsError(_integrity_message(request.operation, request.args))
+                            error.__cause__ = e
+                            outcomes.append((False, error))
+                        except Exception as e:
+                            savepoint.rollback()
+                            outcomes.append((False, e))
+        except Exception as e:
+            # BEGIN ou COMMIT falharam: nenhuma operação do lote foi confirmada
+            logger.error(f"❌ Erro ao confirmar lote de {len(batch)} escritas: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        db_write_batch_size.labels().observe(len(batch))
+        with self._stats_lock:
+            self._batches += 1
+            self._operations += len(batch)
+        for request, (succeeded, value) in zip(batch, outcomes):
+            if succeeded:
+                request.future.set_result(value)
+            else:
+                request.future.set_exception(value)
+
+
+class GroupCommitUserRepository(AsyncUserRepository):
+    """
+    Decorator da porta assíncrona que envia add/add_many/update/delete para o
+    GroupCommitWriter e delega as leituras ao repositório envolvido. Cada
+    escrita marca o repositório envolvido como escrito, para que as leituras
+    seguintes da requisição deixem as réplicas (read-your-writes).
+    """
+
+    def __init__(self, repository: AsyncUserRepository, writer: GroupCommitWriter):
+        self.repository = repository
+        self.writer = writer
+
+    def _mark_written(self) -> None:
+        mark_written = getattr(self.repository, "_mark_written", None)
+        if mark_written is not None:
+            mark_written()
+
+    async def add(self, user_data: dict) -> User:
+        self._mark_written()
+        return await asyncio.wrap_future(self.writer.add(user_data))
+
+    async def add_many(self, users_data: List[dict]) -> List[User]:
+        if not users_data:
+            return []
+        self._mark_written()
+        return await asyncio.wrap_future(self.writer.add_many(users_data))
+
+    async def update(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[User]:
+        self._mark_written()
+        return await asyncio.wrap_future(self.writer.update(user_id, user_data, expected_version))
+
+    async def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[User]:
+        self._mark_written()
+        return await asyncio.wrap_future(self.writer.delete(user_id, expected_version))
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        return await self.repository.get_by_id(user_id)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self.repository.get_by_email(email)
+
+    async def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        return await self.repository.get_existing_emails(emails)
+
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[User]:
+        return await self.repository.get_all(skip=skip, limit=limit)
+
+    async def get_all_after(self, after_id: Optional[int] = None, limit: int = 100) -> List[User]:
+        return await self.repository.get_all_after(after_id=after_id, limit=limit)
+
+    async def get_version(self, user_id: int) -> Optional[int]:
+        return await self.repository.get_version(user_id)
+
+    async def get_versions(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        return await self.repository.get_versions(skip=skip, limit=limit, after_id=after_id)
+
+    async def count(self) -> int:
+        return await self.repository.count()
+
+    def stream_all(self, batch_size: int = 1000) -> AsyncIterator[Tuple[int, str, str]]:
+        return self.repository.stream_all(batch_size=batch_size)
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, User]]:
+        return await self.repository.search(query, limit=limit, after=after, max_candidates=max_candidates)
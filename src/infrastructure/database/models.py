@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, event
+from src.core.models import User as UserDomain
 from .database import Base
+from .user_count import create_user_counter
+from .user_search import create_search_index
 
 
 class User(Base):
@@ -13,3 +16,24 @@ class User(Base):
     username = Column(String, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    # Incrementada por cada UPDATE (ver user_versions)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+
+# Índice de busca (FTS5), contador de linhas e seus triggers criados junto com a tabela users
+event.listen(User.__table__, "after_create", lambda target, connection, **kw: create_search_index(connection))
+event.listen(User.__table__, "after_create", lambda target, connection, **kw: create_user_counter(connection))
+
+
+def to_domain(row) -> UserDomain:
+    """
+    Converte uma linha da tabela users (objeto ORM ou Row de RETURNING) no
+    modelo de domínio sem revalidação: os dados já foram validados na escrita.
+    """
+    return UserDomain.model_construct(
+        id=row.id,
+        username=row.username,
+        email=row.email,
+        hashed_password=row.hashed_password,
+        version=row.version,
+    )
@@ -0,0 +1,117 @@
+"""
+Refresh tokens com rotação (POST /token/refresh).
+
+O refresh token é um valor aleatório opaco entregue no login. O banco guarda
+apenas o SHA-256 dele, com o usuário, a família (a cadeia de tokens iniciada
+em um login) e a validade. Cada uso marca o token como usado e emite o
+próximo da mesma família, na mesma transação. Apresentar outra vez um token
+já usado indica que ele vazou: a família inteira é revogada e o cliente
+precisa fazer login de novo.
+
+A tabela fica no banco principal (DATABASE_URL), inclusive com shards, e é
+acessada pelo engine assíncrono.
+"""
+import hashlib
+import secrets
+import time
+from typing import Tuple
+
+from sqlalchemy import text
+
+from src.core.exceptions import InvalidRefreshTokenError
+import logging
+
+logger = logging.getLogger(__name__)
+
+_REFRESH_TOKENS_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS refresh_tokens (
+        token_hash VARCHAR PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        family VARCHAR NOT NULL,
+        expires_at REAL NOT NULL,
+        used_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_family ON refresh_tokens (family)",
+    "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id ON refresh_tokens (user_id)",
+)
+
+INSERT_STATEMENT = text(
+    "INSERT INTO refresh_tokens (token_hash, user_id, family, expires_at) "
+    "VALUES (:token_hash, :user_id, :family, :expires_at)"
+)
+# Marca o token como usado apenas se ainda não foi usado e não expirou
+USE_STATEMENT = text(
+    "UPDATE refresh_tokens SET used_at = :now "
+    "WHERE token_hash = :token_hash AND used_at IS NULL AND expires_at > :now "
+    "RETURNING user_id, family"
+)
+LOOKUP_STATEMENT = text("SELECT family, used_at FROM refresh_tokens WHERE token_hash = :token_hash")
+REVOKE_FAMILY_STATEMENT = text("DELETE FROM refresh_tokens WHERE family = :family")
+REVOKE_USER_STATEMENT = text("DELETE FROM refresh_tokens WHERE user_id = :user_id")
+# Tokens expirados do usuário, removidos a cada login (os usados ficam até expirar,
+# para que o reuso continue sendo detectado)
+PRUNE_USER_STATEMENT = text("DELETE FROM refresh_tokens WHERE user_id = :user_id AND expires_at <= :now")
+
+
+def create_refresh_token_table(connection) -> None:
+    """Cria a tabela de refresh tokens e os índices se ainda não existirem"""
+    for statement in _REFRESH_TOKENS_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class RefreshTokenStore:
+    """Emissão, rotação e revogação de refresh tokens no banco principal"""
+
+    def __init__(self, database, ttl_seconds: float):
+        self.database = database
+        self.ttl_seconds = ttl_seconds
+
+    async def _insert(self, connection, user_id: int, family: str, now: float) -> str:
+        token = secrets.token_urlsafe(32)
+        await connection.execute(INSERT_STATEMENT, {
+            "token_hash": _token_hash(token),
+            "user_id": user_id,
+            "family": family,
+            "expires_at": now + self.ttl_seconds,
+        })
+        return token
+
+    async def issue(self, user_id: int) -> str:
+        """Emite o primeiro token de uma nova família (login)"""
+        self.database.ensure_schema()
+        now = time.time()
+        async with self.database.async_engine.begin() as connection:
+            await connection.execute(PRUNE_USER_STATEMENT, {"user_id": user_id, "now": now})
+            return await self._insert(connection, user_id, secrets.token_urlsafe(16), now)
+
+    async def rotate(self, token: str) -> Tuple[int, str]:
+        """
+        Consome o token e emite o próximo da família: (user_id, novo token).
+        Lança InvalidRefreshTokenError se o token for desconhecido, expirado ou
+        já usado; no último caso, revoga a família.
+        """
+        self.database.ensure_schema()
+        now = time.time()
+        token_hash = _token_hash(token)
+        async with self.database.async_engine.begin() as connection:
+            row = (await connection.execute(USE_STATEMENT, {"token_hash": token_hash, "now": now})).first()
+            if row is not None:
+                user_id, family = row
+                return user_id, await self._insert(connection, user_id, family, now)
+            previous = (await connection.execute(LOOKUP_STATEMENT, {"token_hash": token_hash})).first()
+            if previous is not None and previous.used_at is not None:
+                await connection.execute(REVOKE_FAMILY_STATEMENT, {"family": previous.family})
+                logger.warning("⚠️  Refresh token reutilizado: família de tokens revogada")
+        raise InvalidRefreshTokenError("Refresh token inválido, expirado ou já utilizado")
+
+    async def revoke_user(self, user_id: int) -> None:
+        """Revoga todos os refresh tokens do usuário (ex.: usuário removido)"""
+        self.database.ensure_schema()
+        async with self.database.async_engine.begin() as connection:
+            await connection.execute(REVOKE_USER_STATEMENT, {"user_id": user_id})
@@ -0,0 +1,326 @@
+"""
+Repositório particionado em vários arquivos SQLite (shards).
+
+O SQLite aceita um único escritor por arquivo; com N arquivos, escritas em
+shards diferentes não disputam o mesmo lock. Cada usuário é gravado no shard
+definido por um hash estável do email no momento da criação e nunca muda de
+shard, de modo que o id global permanece o mesmo:
+
+    id global = id local * N + índice do shard
+
+Buscas por id e por email consultam um único shard. Listagens consultam todos
+e intercalam os resultados já ordenados de cada shard (merge de k listas). A
+paginação por offset é convertida em cursor: os ids a pular são percorridos
+por keyset, sem carregar as linhas, e a página vem de get_all_after.
+
+add_many confirma um shard por vez. Se um COMMIT falhar, as linhas já
+confirmadas nos outros shards são removidas (compensação) antes de o erro
+chegar ao chamador; até lá, elas podem ser vistas por leituras concorrentes.
+
+Quando o email de um usuário muda para um endereço cujo hash aponta para outro
+shard, a linha continua onde está e uma rota (email -> shard) é registrada em
+email_routes no shard "de origem" do novo email (ver email_routes.py).
+
+O número de shards faz parte do esquema de ids: alterá-lo exige migrar os dados.
+"""
+import hashlib
+import heapq
+import logging
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.core.exceptions import UserAlreadyExistsError, UserVersionConflictError
+from src.core.models import User as UserDomain
+from src.core.ports.user_repository import UserRepository
+from src.infrastructure.database.email_routes import CLAIM_ROUTE, RELEASE_ROUTE, ROUTED_EMAILS, ROUTED_SHARD
+from src.infrastructure.database.models import User as UserModelDB, to_domain
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+
+logger = logging.getLogger(__name__)
+
+# Ids lidos por consulta, em cada shard, ao converter um offset em cursor
+OFFSET_SCAN_PAGE_SIZE = 1000
+
+
+class ShardRouter:
+    """Roteamento por hash do email e conversão entre ids globais e locais"""
+
+    def __init__(self, shard_count: int):
+        if shard_count <= 0:
+            raise ValueError("É necessário ao menos um shard")
+        self.shard_count = shard_count
+
+    def shard_for_email(self, email: str) -> int:
+        # blake2b é estável entre processos e versões (ao contrário de hash())
+        digest = hashlib.blake2b(email.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.shard_count
+
+    def to_global_id(self, shard: int, local_id: int) -> int:
+        return local_id * self.shard_count + shard
+
+    def from_global_id(self, global_id: int) -> Tuple[int, int]:
+        """Retorna (shard, id local)"""
+        return global_id % self.shard_count, global_id // self.shard_count
+
+    def local_after(self, shard: int, after_id: Optional[int]) -> Optional[int]:
+        """Maior id local do shard cujo id global não passa de after_id"""
+        if after_id is None:
+            return None
+        return (after_id - shard) // self.shard_count
+
+
+class ShardedUserRepository(UserRepository):
+    """
+    Implementação do UserRepository sobre N bancos SQLite, um SQLiteUserRepository
+    por shard. Recebe uma sessão por shard, na ordem dos shards.
+    """
+
+    def __init__(self, sessions: Sequence[Session]):
+        self.sessions = list(sessions)
+        self.router = ShardRouter(len(self.sessions))
+        self.shards = [SQLiteUserRepository(session) for session in self.sessions]
+
+    def _globalize(self, shard: int, user: Optional[UserDomain]) -> Optional[UserDomain]:
+        if user is None:
+            return None
+        return user.model_copy(update={"id": self.router.to_global_id(shard, user.id)})
+
+    def _locate(self, user_id: int) -> Optional[Tuple[int, int]]:
+        shard, local_id = self.router.from_global_id(user_id)
+        return (shard, local_id) if local_id > 0 else None
+
+    def _merge(self, per_shard: Iterable[Iterable], key) -> Iterator:
+        return heapq.merge(*per_shard, key=key)
+
+    # --- Rotas de email entre shards ---
+    def _claim_route(self, home: int, email: str, shard: int) -> None:
+        # Falha se o email já for de um usuário do shard de origem ou já estiver roteado
+        session = self.sessions[home]
+        try:
+            claimed = session.execute(CLAIM_ROUTE, {"email": email, "shard": shard}).rowcount
+        except IntegrityError as e:
+            session.rollback()
+            raise UserAlreadyExistsError(f"Usuário com email {email} já existe") from e
+        if not claimed:
+            session.rollback()
+            raise UserAlreadyExistsError(f"Usuário com email {email} já existe")
+        session.commit()
+
+    def _release_route(self, email: str) -> None:
+        session = self.sessions[self.router.shard_for_email(email)]
+        session.execute(RELEASE_ROUTE, {"email": email})
+        session.commit()
+
+    # --- Escritas ---
+    def add(self, user_data: dict) -> UserDomain:
+        shard = self.router.shard_for_email(user_data["email"])
+        return self._globalize(shard, self.shards[shard].add(user_data))
+
+    def add_many(self, users_data: List[dict]) -> List[UserDomain]:
+        if not users_data:
+            return []
+        indexes_by_shard: Dict[int, List[int]] = defaultdict(list)
+        for index, user_data in enumerate(users_data):
+            indexes_by_shard[self.router.shard_for_email(user_data["email"])].append(index)
+
+        # Insere em todos os shards e só então faz o COMMIT de cada um: um email
+        # duplicado em qualquer shard desfaz o lote inteiro, como no banco único
+        statement = insert(UserModelDB).returning(UserModelDB, sort_by_parameter_order=True)
+        users: List[Optional[UserDomain]] = [None] * len(users_data)
+        try:
+            for shard, indexes in indexes_by_shard.items():
+                rows = self.sessions[shard].scalars(statement, [users_data[i] for i in indexes]).all()
+                for index, row in zip(indexes, rows):
+                    users[index] = self._globalize(shard, to_domain(row))
+        except IntegrityError as e:
+            for shard in indexes_by_shard:
+                self.sessions[shard].rollback()
+            raise UserAlreadyExistsError("Um ou mais emails do lote já existem") from e
+        committed: List[int] = []
+        try:
+            for shard in indexes_by_shard:
+                self.sessions[shard].commit()
+                committed.append(shard)
+        except Exception:
+            for shard in indexes_by_shard:
+                if shard not in committed:
+                    self.sessions[shard].rollback()
+            for shard in committed:
+                self._discard(shard, [users[index].id for index in indexes_by_shard[shard]])
+            raise
+        return users
+
+    def _discard(self, shard: int, user_ids: List[int]) -> None:
+        """Compensação de add_many: remove as linhas já confirmadas em um shard"""
+        local_ids = [self.router.from_global_id(user_id)[1] for user_id in user_ids]
+        session = self.sessions[shard]
+        try:
+            session.execute(delete(UserModelDB).where(UserModelDB.id.in_(local_ids)))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"❌ Falha ao desfazer a inserção em lote no shard {shard} (ids {user_ids}): {e}")
+
+    def update(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[UserDomain]:
+        location = self._locate(user_id)
+        if location is None:
+            return None
+        shard, local_id = location
+        new_email = user_data.get("email")
+        previous = None
+        routed = False
+        if new_email is not None:
+            previous = self.shards[shard].get_by_id(local_id)
+            if previous is None:
+                return None
+            if previous.email == new_email:
+                previous = None
+            elif self.router.shard_for_email(new_email) != shard:
+                # O novo email pertence a outro shard: reserva-o lá antes de alterar a linha
+                self._claim_route(self.router.shard_for_email(new_email), new_email, shard)
+                routed = True
+        try:
+            user = self.shards[shard].update(local_id, user_data, expected_version)
+        except (UserAlreadyExistsError, UserVersionConflictError):
+            if routed:
+                self._release_route(new_email)
+            raise
+        if user is None:
+            if routed:
+                self._release_route(new_email)
+            return None
+        if previous is not None and self.router.shard_for_email(previous.email) != shard:
+            self._release_route(previous.email)
+        return self._globalize(shard, user)
+
+    def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[UserDomain]:
+        location = self._locate(user_id)
+        if location is None:
+            return None
+        shard, local_id = location
+        user = self.shards[shard].delete(local_id, expected_version)
+        if user is not None and self.router.shard_for_email(user.email) != shard:
+            self._release_route(user.email)
+        return self._globalize(shard, user)
+
+    # --- Leituras em um shard ---
+    def get_by_id(self, user_id: int) -> Optional[UserDomain]:
+        location = self._locate(user_id)
+        if location is None:
+            return None
+        shard, local_id = location
+        return self._globalize(shard, self.shards[shard].get_by_id(local_id))
+
+    def get_version(self, user_id: int) -> Optional[int]:
+        location = self._locate(user_id)
+        if location is None:
+            return None
+        shard, local_id = location
+        return self.shards[shard].get_version(local_id)
+
+    def get_by_email(self, email: str) -> Optional[UserDomain]:
+        home = self.router.shard_for_email(email)
+        user = self.shards[home].get_by_email(email)
+        if user is not None:
+            return self._globalize(home, user)
+        routed_shard = self.sessions[home].execute(ROUTED_SHARD, {"email": email}).scalar()
+        if routed_shard is None:
+            return None
+        return self._globalize(routed_shard, self.shards[routed_shard].get_by_email(email))
+
+    def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        emails_by_shard: Dict[int, List[str]] = defaultdict(list)
+        for email in emails:
+            emails_by_shard[self.router.shard_for_email(email)].append(email)
+        existing: Set[str] = set()
+        for shard, shard_emails in emails_by_shard.items():
+            existing |= self.shards[shard].get_existing_emails(shard_emails)
+            existing.update(self.sessions[shard].scalars(ROUTED_EMAILS, {"emails": shard_emails}))
+        return existing
+
+    # --- Leituras em todos os shards ---
+    def count(self) -> int:
+        return sum(shard.count() for shard in self.shards)
+
+    def _shard_ids(self, index: int, page_size: int) -> Iterator[int]:
+        """Ids globais do shard em ordem crescente, lidos por keyset em páginas de (id, versão)"""
+        after_id = None
+        while True:
+            pairs = self.shards[index].get_versions(limit=page_size, after_id=after_id)
+            for local_id, _ in pairs:
+                yield self.router.to_global_id(index, local_id)
+            if len(pairs) < page_size:
+                return
+            after_id = pairs[-1][0]
+
+    def _offset_cursor(self, skip: int) -> Optional[int]:
+        """
+        Id global da última linha pulada por um offset (skip > 0), ou None se
+        houver no máximo skip linhas. O merge é preguiçoso: cada shard lê apenas
+        os ids que chegam a ser percorridos, mais uma página.
+        """
+        page_size = min(skip, OFFSET_SCAN_PAGE_SIZE)
+        ids = heapq.merge(*(self._shard_ids(index, page_size) for index in range(len(self.shards))))
+        return next(islice(ids, skip - 1, None), None)
+
+    def get_all(self, skip: int = 0, limit: int = 100) -> List[UserDomain]:
+        if skip <= 0:
+            return self.get_all_after(limit=limit)
+        after_id = self._offset_cursor(skip)
+        return [] if after_id is None else self.get_all_after(after_id=after_id, limit=limit)
+
+    def get_all_after(self, after_id: Optional[int] = None, limit: int = 100) -> List[UserDomain]:
+        per_shard = [
+            [
+                self._globalize(index, user)
+                for user in shard.get_all_after(after_id=self.router.local_after(index, after_id), limit=limit)
+            ]
+            for index, shard in enumerate(self.shards)
+        ]
+        return list(islice(self._merge(per_shard, key=lambda user: user.id), limit))
+
+    def get_versions(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        # Mesmas páginas de get_all/get_all_after, apenas com (id global, versão)
+        if after_id is None and skip > 0:
+            after_id = self._offset_cursor(skip)
+            if after_id is None:
+                return []
+        per_shard = []
+        for index, shard in enumerate(self.shards):
+            pairs = shard.get_versions(limit=limit, after_id=self.router.local_after(index, after_id))
+            per_shard.append([(self.router.to_global_id(index, local_id), version) for local_id, version in pairs])
+        return list(islice(self._merge(per_shard, key=lambda pair: pair[0]), limit))
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[Tuple[int, str, str]]:
+        def globalized(index: int, rows: Iterator[Tuple[int, str, str]]):
+            for local_id, username, email in rows:
+                yield self.router.to_global_id(index, local_id), username, email
+
+        per_shard = [
+            globalized(index, shard.stream_all(batch_size=batch_size)) for index, shard in enumerate(self.shards)
+        ]
+        yield from self._merge(per_shard, key=lambda row: row[0])
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, UserDomain]]:
+        # (rank, id global) > (r, g) equivale, em cada shard, a (rank, id local) > (r, local_after(g))
+        per_shard = []
+        for index, shard in enumerate(self.shards):
+            shard_after = None if after is None else (after[0], self.router.local_after(index, after[1]))
+            hits = shard.search(query, limit=limit, after=shard_after, max_candidates=max_candidates)
+            per_shard.append([(rank, self._globalize(index, user)) for rank, user in hits])
+        return list(islice(self._merge(per_shard, key=lambda hit: (hit[0], hit[1].id)), limit))
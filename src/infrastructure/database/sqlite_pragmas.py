@@ -0,0 +1,111 @@
+"""
+Perfis de PRAGMAs do SQLite aplicados a cada conexão do pool.
+
+- durable: WAL + synchronous=FULL; leitores não bloqueiam durante commits
+  e nenhuma transação confirmada é perdida em queda de energia
+- throughput: WAL + synchronous=NORMAL, cache maior, mmap e temporários em
+  memória; uma queda de energia pode desfazer os últimos commits, mas o
+  banco nunca fica corrompido
+- default: mantém os padrões do SQLite (rollback journal)
+"""
+from typing import Dict, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+PragmaValue = Union[str, int]
+
+SQLITE_PRAGMA_PROFILES: Dict[str, Dict[str, PragmaValue]] = {
+    "default": {},
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,  # valores negativos são em KiB (~16 MiB)
+        "temp_store": "DEFAULT",
+        "mmap_size": 0,
+        "busy_timeout": 5000,
+    },
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,  # ~64 MiB
+        "temp_store": "MEMORY",
+        "mmap_size": 268435456,  # 256 MiB
+        "busy_timeout": 5000,
+    },
+}
+
+_ALLOWED_VALUES = {
+    "journal_mode": ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+    "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "temp_store": ("DEFAULT", "FILE", "MEMORY"),
+}
+_INTEGER_PRAGMAS = ("cache_size", "mmap_size", "busy_timeout")
+
+# Leitura dos valores numéricos retornados pelo SQLite
+_SYNCHRONOUS_NAMES = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+_TEMP_STORE_NAMES = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+REPORTED_PRAGMAS = ("journal_mode", "synchronous", "cache_size", "temp_store", "mmap_size", "busy_timeout")
+
+
+def resolve_sqlite_pragmas(
+    profile: str, overrides: Optional[Dict[str, Optional[str]]] = None
+) -> Dict[str, PragmaValue]:
+    """Combina o perfil escolhido com os valores sobrescritos, validando cada um"""
+    if profile not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(
+            f"Perfil SQLite desconhecido: '{profile}'. Use: {', '.join(SQLITE_PRAGMA_PROFILES)}"
+        )
+    pragmas: Dict[str, PragmaValue] = dict(SQLITE_PRAGMA_PROFILES[profile])
+    for name, value in (overrides or {}).items():
+        if value is None or value == "":
+            continue
+        if name in _ALLOWED_VALUES:
+            value = str(value).upper()
+            if value not in _ALLOWED_VALUES[name]:
+                raise ValueError(f"Valor inválido para PRAGMA {name}: '{value}'")
+        elif name in _INTEGER_PRAGMAS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"PRAGMA {name} deve ser inteiro, recebido '{value}'")
+        else:
+            raise ValueError(f"PRAGMA não suportado: '{name}'")
+        pragmas[name] = value
+    return pragmas
+
+
+def install_sqlite_pragmas(engine: Engine, pragmas: Dict[str, PragmaValue]) -> None:
+    """Registra um hook que aplica os PRAGMAs em cada nova conexão do engine"""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    # Os valores já foram validados por resolve_sqlite_pragmas
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def read_sqlite_pragmas(engine: Engine) -> Dict[str, PragmaValue]:
+    """Consulta os PRAGMAs efetivos em uma conexão do engine"""
+    if engine.dialect.name != "sqlite":
+        return {}
+    effective: Dict[str, PragmaValue] = {}
+    with engine.connect() as connection:
+        for name in REPORTED_PRAGMAS:
+            effective[name] = connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+    effective["journal_mode"] = str(effective["journal_mode"]).upper()
+    effective["synchronous"] = _SYNCHRONOUS_NAMES.get(effective["synchronous"], effective["synchronous"])
+    effective["temp_store"] = _TEMP_STORE_NAMES.get(effective["temp_store"], effective["temp_store"])
+    return effective
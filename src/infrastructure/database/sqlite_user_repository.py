@@ -1,56 +1,200 @@
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from src.core.ports.user_repository import UserRepository
 from src.core.models import User as UserDomain
-from src.infrastructure.database.models import User as UserModelDB
+from src.core.exceptions import UserAlreadyExistsError, UserVersionConflictError
+from src.infrastructure.database.models import User as UserModelDB, to_domain
+from src.infrastructure.database.user_count import COUNT_STATEMENT
+from src.infrastructure.database.user_search import SEARCH_STATEMENT, search_parameters
+from src.infrastructure.database.user_versions import VERSION_STATEMENT, page_versions_query, version_conflict
+
+# Colunas devolvidas por UPDATE/DELETE ... RETURNING
+_USER_COLUMNS = (
+    UserModelDB.id, UserModelDB.username, UserModelDB.email, UserModelDB.hashed_password, UserModelDB.version
+)
 
 
 class SQLiteUserRepository(UserRepository):
     """
     Implementação concreta (Adapter) do UserRepository para SQLite usando SQLAlchemy.
+
+    Consultas de leitura usam read_session (réplica/pool somente leitura) quando
+    informada; após a primeira escrita, passam a usar a sessão de escrita para
+    garantir read-your-writes dentro da mesma requisição.
     """
 
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, read_session: Optional[Session] = None):
         self.db = db_session
+        self.read_db = read_session
+        self._has_written = False
+
+    @property
+    def _reader(self) -> Session:
+        if self.read_db is None or self._has_written:
+            return self.db
+        return self.read_db
+
+    def _mark_written(self) -> None:
+        self._has_written = True
+
+    def _check_version(self, user_id: int, expected_version: int) -> None:
+        """
+        Chamado quando um UPDATE/DELETE condicional não afetou linhas: lança
+        UserVersionConflictError se o usuário existe (em outra versão)
+        """
+        current_version = self.db.execute(VERSION_STATEMENT, {"id": user_id}).scalar()
+        if current_version is not None:
+            raise version_conflict(expected_version, current_version)
 
     def add(self, user_data: dict) -> UserDomain:
-        db_user = UserModelDB(**user_data)
-        self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
-        return UserDomain.model_validate(db_user)
+        self._mark_written()
+        # INSERT ... RETURNING: a unicidade do email é garantida pela constraint,
+        # sem SELECT prévio nem refresh após o COMMIT
+        statement = insert(UserModelDB).returning(UserModelDB)
+        try:
+            user = to_domain(self.db.scalars(statement, [user_data]).one())
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            raise UserAlreadyExistsError(f"Usuário com email {user_data.get('email')} já existe") from e
+        return user
+
+    def add_many(self, users_data: List[dict]) -> List[UserDomain]:
+        if not users_data:
+            return []
+        self._mark_written()
+        # INSERT ... RETURNING em lote (executemany/insertmanyvalues) e um único COMMIT
+        statement = insert(UserModelDB).returning(UserModelDB, sort_by_parameter_order=True)
+        try:
+            db_users = self.db.scalars(statement, users_data).all()
+            users = [to_domain(user) for user in db_users]
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            raise UserAlreadyExistsError("Um ou mais emails do lote já existem") from e
+        return users
 
     def get_by_id(self, user_id: int) -> Optional[UserDomain]:
-        db_user = self.db.query(UserModelDB).filter(UserModelDB.id == user_id).first()
+        db_user = self._reader.query(UserModelDB).filter(UserModelDB.id == user_id).first()
         if db_user:
-            return UserDomain.model_validate(db_user)
+            return to_domain(db_user)
         return None
 
     def get_by_email(self, email: str) -> Optional[UserDomain]:
-        db_user = self.db.query(UserModelDB).filter(UserModelDB.email == email).first()
+        db_user = self._reader.query(UserModelDB).filter(UserModelDB.email == email).first()
         if db_user:
-            return UserDomain.model_validate(db_user)
+            return to_domain(db_user)
         return None
 
+    def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        emails = list(emails)
+        if not emails:
+            return set()
+        return set(
+            self._reader.scalars(select(UserModelDB.email).where(UserModelDB.email.in_(emails)))
+        )
+
     def get_all(self, skip: int = 0, limit: int = 10) -> List[UserDomain]:
-        users_db = self.db.query(UserModelDB).offset(skip).limit(limit).all()
-        return [UserDomain.model_validate(user) for user in users_db]
+        users_db = (
+            self._reader.query(UserModelDB)
+            .order_by(UserModelDB.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return [to_domain(user) for user in users_db]
 
-    def update(self, user_id: int, user_data: dict) -> Optional[UserDomain]:
-        db_user = self.db.query(UserModelDB).filter(UserModelDB.id == user_id).first()
-        if db_user:
-            for key, value in user_data.items():
-                setattr(db_user, key, value)
-            self.db.commit()
-            self.db.refresh(db_user)
-            return UserDomain.model_validate(db_user)
-        return None
+    def get_all_after(self, after_id: Optional[int] = None, limit: int = 10) -> List[UserDomain]:
+        # WHERE id > ? ORDER BY id LIMIT ? percorre o índice da chave primária:
+        # o custo de cada página independe da profundidade
+        query = self._reader.query(UserModelDB)
+        if after_id is not None:
+            query = query.filter(UserModelDB.id > after_id)
+        users_db = query.order_by(UserModelDB.id).limit(limit).all()
+        return [to_domain(user) for user in users_db]
 
-    def delete(self, user_id: int) -> bool:
-        db_user = self.db.query(UserModelDB).filter(UserModelDB.id == user_id).first()
-        if db_user:
-            self.db.delete(db_user)
+    def get_version(self, user_id: int) -> Optional[int]:
+        return self._reader.execute(VERSION_STATEMENT, {"id": user_id}).scalar()
+
+    def get_versions(
+        self, skip: int = 0, limit: int = 10, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        statement, parameters = page_versions_query(skip, limit, after_id)
+        return [tuple(row) for row in self._reader.execute(statement, parameters)]
+
+    def count(self) -> int:
+        # Linha de table_row_counts mantida pelos triggers de INSERT/DELETE
+        return self._reader.execute(COUNT_STATEMENT).scalar_one()
+
+    def stream_all(self, batch_size: int = 1000) -> Iterator[Tuple[int, str, str]]:
+        # Cursor no servidor com busca em lotes: tuplas direto do banco, sem objetos ORM
+        statement = (
+            select(UserModelDB.id, UserModelDB.username, UserModelDB.email)
+            .order_by(UserModelDB.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for row in self._reader.execute(statement):
+            yield tuple(row)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, UserDomain]]:
+        parameters = search_parameters(query, limit, after, max_candidates)
+        if parameters is None:
+            return []
+        rows = self._reader.execute(SEARCH_STATEMENT, parameters).all()
+        return [(row.rank, to_domain(row)) for row in rows]
+
+    def update(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[UserDomain]:
+        self._mark_written()
+        if not user_data:
+            db_user = self.db.get(UserModelDB, user_id)
+            if db_user is not None and expected_version is not None and db_user.version != expected_version:
+                raise version_conflict(expected_version, db_user.version)
+            return to_domain(db_user) if db_user else None
+        # UPDATE ... RETURNING: nenhuma linha devolvida significa usuário inexistente
+        # (ou, com expected_version, possivelmente em outra versão)
+        statement = (
+            update(UserModelDB)
+            .where(UserModelDB.id == user_id)
+            .values(**user_data, version=UserModelDB.version + 1)
+            .returning(*_USER_COLUMNS)
+        )
+        if expected_version is not None:
+            statement = statement.where(UserModelDB.version == expected_version)
+        try:
+            row = self.db.execute(statement).first()
+            if row is None and expected_version is not None:
+                self._check_version(user_id, expected_version)
             self.db.commit()
-            return True
-        return False
+        except IntegrityError as e:
+            self.db.rollback()
+            raise UserAlreadyExistsError(f"Usuário com email {user_data.get('email')} já existe") from e
+        except UserVersionConflictError:
+            self.db.rollback()
+            raise
+        return to_domain(row) if row else None
+
+    def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[UserDomain]:
+        self._mark_written()
+        statement = delete(UserModelDB).where(UserModelDB.id == user_id).returning(*_USER_COLUMNS)
+        if expected_version is not None:
+            statement = statement.where(UserModelDB.version == expected_version)
+        try:
+            row = self.db.execute(statement).first()
+            if row is None and expected_version is not None:
+                self._check_version(user_id, expected_version)
+        except UserVersionConflictError:
+            self.db.rollback()
+            raise
+        self.db.commit()
+        return to_domain(row) if row else None
@@ -0,0 +1,91 @@
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+
+from anyio import to_thread
+
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.core.ports.user_repository import UserRepository
+from src.core.models import User
+
+
+class ThreadPoolUserRepository(AsyncUserRepository):
+    """
+    Adapter que expõe um UserRepository síncrono através da porta assíncrona.
+    Cada chamada é executada no threadpool do anyio, reproduzindo o
+    comportamento das rotas síncronas para fins de comparação.
+    """
+
+    def __init__(self, repository: UserRepository):
+        self.repository = repository
+
+    def _mark_written(self) -> None:
+        """Repassa ao repositório síncrono as escritas feitas fora dele (ex.: group commit)"""
+        mark_written = getattr(self.repository, "_mark_written", None)
+        if mark_written is not None:
+            mark_written()
+
+    async def add(self, user_data: dict) -> User:
+        return await to_thread.run_sync(self.repository.add, user_data)
+
+    async def add_many(self, users_data: List[dict]) -> List[User]:
+        return await to_thread.run_sync(self.repository.add_many, users_data)
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        return await to_thread.run_sync(self.repository.get_by_id, user_id)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await to_thread.run_sync(self.repository.get_by_email, email)
+
+    async def get_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        return await to_thread.run_sync(self.repository.get_existing_emails, list(emails))
+
+    async def get_all(self, skip: int = 0, limit: int = 100) -> List[User]:
+        return await to_thread.run_sync(partial(self.repository.get_all, skip=skip, limit=limit))
+
+    async def get_all_after(self, after_id: Optional[int] = None, limit: int = 100) -> List[User]:
+        return await to_thread.run_sync(
+            partial(self.repository.get_all_after, after_id=after_id, limit=limit)
+        )
+
+    async def get_version(self, user_id: int) -> Optional[int]:
+        return await to_thread.run_sync(self.repository.get_version, user_id)
+
+    async def get_versions(
+        self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        return await to_thread.run_sync(
+            partial(self.repository.get_versions, skip=skip, limit=limit, after_id=after_id)
+        )
+
+    async def count(self) -> int:
+        return await to_thread.run_sync(self.repository.count)
+
+    async def stream_all(self, batch_size: int = 1000) -> AsyncIterator[Tuple[int, str, str]]:
+        # Busca um lote inteiro por ida ao threadpool, não uma linha por vez
+        rows = self.repository.stream_all(batch_size=batch_size)
+        while True:
+            batch = await to_thread.run_sync(lambda: list(islice(rows, batch_size)))
+            if not batch:
+                break
+            for row in batch:
+                yield row
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None,
+        max_candidates: int = 1000,
+    ) -> List[Tuple[int, User]]:
+        return await to_thread.run_sync(
+            partial(self.repository.search, query, limit=limit, after=after, max_candidates=max_candidates)
+        )
+
+    async def update(
+        self, user_id: int, user_data: dict, expected_version: Optional[int] = None
+    ) -> Optional[User]:
+        return await to_thread.run_sync(self.repository.update, user_id, user_data, expected_version)
+
+    async def delete(self, user_id: int, expected_version: Optional[int] = None) -> Optional[User]:
+        return await to_thread.run_sync(self.repository.delete, user_id, expected_version)
@@ -0,0 +1,73 @@
+"""
+Total de usuários mantido incrementalmente (contador em uma linha).
+
+table_row_counts guarda o número de linhas de users, atualizado por triggers
+em INSERT e DELETE na mesma transação da escrita: add, add_many, a importação
+em massa e qualquer outro caminho de escrita mantêm o contador sem que os
+repositórios precisem conhecê-lo. Ler o total custa uma busca pela chave
+primária, em vez de um COUNT(*) que percorre a tabela.
+
+reconcile_user_count recalcula o contador com COUNT(*) e corrige desvios
+(ex.: linhas alteradas com os triggers ausentes); é executado no startup e
+periodicamente pela aplicação.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+COUNTS_TABLE = "table_row_counts"
+
+_COUNTER_DDL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {COUNTS_TABLE} (
+        table_name VARCHAR PRIMARY KEY,
+        row_count INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_count_insert AFTER INSERT ON users BEGIN
+        UPDATE {COUNTS_TABLE} SET row_count = row_count + 1 WHERE table_name = 'users';
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_count_delete AFTER DELETE ON users BEGIN
+        UPDATE {COUNTS_TABLE} SET row_count = row_count - 1 WHERE table_name = 'users';
+    END
+    """,
+)
+
+COUNT_STATEMENT = text(f"SELECT row_count FROM {COUNTS_TABLE} WHERE table_name = 'users'")
+
+
+def create_user_counter(connection) -> None:
+    """Cria o contador e os triggers se ainda não existirem, iniciando-o com COUNT(*)"""
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in _COUNTER_DDL:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {COUNTS_TABLE} (table_name, row_count) "
+        "VALUES ('users', (SELECT count(*) FROM users))"
+    )
+
+
+def reconcile_user_count(connection) -> Optional[int]:
+    """
+    Corrige o contador se ele divergir de COUNT(*). A comparação e a correção
+    são uma única instrução, atômica em relação às escritas concorrentes.
+    Retorna o valor corrigido, ou None se o contador estava certo.
+    """
+    corrected = connection.exec_driver_sql(
+        f"""
+        WITH actual(row_count) AS MATERIALIZED (SELECT count(*) FROM users)
+        UPDATE {COUNTS_TABLE} SET row_count = (SELECT row_count FROM actual)
+        WHERE table_name = 'users' AND row_count != (SELECT row_count FROM actual)
+        RETURNING row_count
+        """
+    ).scalar()
+    if corrected is not None:
+        logger.warning(f"⚠️  Contador de usuários divergia da tabela e foi corrigido para {corrected}")
+    return corrected
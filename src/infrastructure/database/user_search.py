@@ -0,0 +1,131 @@
+"""
+Busca textual e por prefixo em username e email (SQLite FTS5).
+
+users_fts é um índice FTS5 de conteúdo externo sobre a tabela users, mantido
+por triggers em INSERT, UPDATE e DELETE: nenhuma escrita dos repositórios
+precisa conhecê-lo. Os termos são separados em letras/dígitos ("maria.silva@
+example.com" vira maria, silva, example, com), acentos são ignorados e o
+último termo da consulta é tratado como prefixo (busca enquanto se digita).
+
+Classificação (rank, menor é melhor):
+    0  username ou email iguais à consulta
+    1  username ou email começam com a consulta
+    2  demais usuários que contêm todos os termos
+
+Consultas muito amplas ("example") são limitadas às primeiras
+max_candidates ocorrências do índice, o que mantém o custo de cada página
+constante. bm25 não é usado: exige percorrer toda a lista de ocorrências de
+cada termo para calcular o IDF e, em campos curtos, quase sempre empata.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import text
+
+SEARCH_TABLE = "users_fts"
+
+# Índices de prefixo de 2 a 8 caracteres: prefixos longos e frequentes ("exampl")
+# não precisam mesclar as listas de todos os termos no momento da consulta
+_SEARCH_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        username, email, content='users', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, username, email)
+        VALUES ('delete', old.id, old.username, old.email);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username, email ON users BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, username, email)
+        VALUES ('delete', old.id, old.username, old.email);
+        INSERT INTO {SEARCH_TABLE}(rowid, username, email) VALUES (new.id, new.username, new.email);
+    END
+    """,
+)
+
+# Candidatas: as primeiras ocorrências no índice mais as igualdades exatas
+# (pelos índices de email e username), classificadas e paginadas por (rank, id)
+SEARCH_STATEMENT = text(
+    f"""
+    WITH candidates(id) AS (
+        SELECT * FROM (
+            SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match LIMIT :max_candidates
+        )
+        UNION
+        SELECT id FROM users WHERE email = :query OR username = :query
+    ),
+    ranked AS (
+        SELECT users.id, users.username, users.email, users.hashed_password, users.version,
+               CASE
+                   WHEN lower(users.email) = lower(:query) OR lower(users.username) = lower(:query) THEN 0
+                   WHEN users.email LIKE :prefix ESCAPE '\\' OR users.username LIKE :prefix ESCAPE '\\' THEN 1
+                   ELSE 2
+               END AS rank
+        FROM users JOIN candidates ON users.id = candidates.id
+    )
+    SELECT id, username, email, hashed_password, version, rank FROM ranked
+    WHERE (rank, id) > (:after_rank, :after_id)
+    ORDER BY rank, id
+    LIMIT :limit
+    """
+)
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Converte o texto digitado em uma expressão MATCH do FTS5: todos os termos
+    são obrigatórios e o último é um prefixo. Retorna None se não houver termos.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_parameters(query: str, limit: int, after: Optional[tuple], max_candidates: int) -> Optional[dict]:
+    """Parâmetros de SEARCH_STATEMENT, ou None se a consulta não tiver termos"""
+    match = build_match_query(query)
+    if match is None:
+        return None
+    query = query.strip()
+    after_rank, after_id = after if after is not None else (-1, 0)
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return {
+        "match": match,
+        "query": query,
+        "prefix": f"{escaped}%",
+        "max_candidates": max_candidates,
+        "after_rank": after_rank,
+        "after_id": after_id,
+        "limit": limit,
+    }
+
+
+def create_search_index(connection) -> None:
+    """
+    Cria o índice e os triggers se ainda não existirem. Em um banco que já tem
+    usuários, o índice recém-criado é preenchido a partir da tabela users.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+    ).first()
+    for statement in _SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
@@ -0,0 +1,53 @@
+"""
+Versão de cada usuário (coluna users.version).
+
+A versão começa em 1 e é incrementada pelo próprio UPDATE de cada
+atualização (version = version + 1, na mesma instrução). As rotas derivam
+dela o ETag do usuário e das páginas da listagem: para responder a um
+If-None-Match basta ler (id, version), sem carregar nem serializar as linhas.
+Com If-Match, UPDATE/DELETE incluem "AND version = ?" na cláusula WHERE
+(controle de concorrência otimista).
+
+add_version_column acrescenta a coluna em bancos criados antes dela; as
+linhas existentes ficam na versão 1.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+
+from src.core.exceptions import UserVersionConflictError
+
+logger = logging.getLogger(__name__)
+
+VERSION_STATEMENT = text("SELECT version FROM users WHERE id = :id")
+
+# Mesmas páginas de get_all (OFFSET) e get_all_after (keyset), apenas com (id, version)
+PAGE_VERSIONS_STATEMENT = text("SELECT id, version FROM users ORDER BY id LIMIT :limit OFFSET :skip")
+PAGE_VERSIONS_AFTER_STATEMENT = text(
+    "SELECT id, version FROM users WHERE id > :after_id ORDER BY id LIMIT :limit"
+)
+
+
+def page_versions_query(skip: int, limit: int, after_id: Optional[int]):
+    """Instrução e parâmetros da página de versões (keyset quando after_id é informado)"""
+    if after_id is None:
+        return PAGE_VERSIONS_STATEMENT, {"skip": skip, "limit": limit}
+    return PAGE_VERSIONS_AFTER_STATEMENT, {"after_id": after_id, "limit": limit}
+
+
+def version_conflict(expected_version: int, current_version: int) -> UserVersionConflictError:
+    return UserVersionConflictError(
+        f"Usuário alterado por outra requisição: versão atual {current_version}, esperada {expected_version}"
+    )
+
+
+def add_version_column(connection) -> None:
+    """Acrescenta users.version em bancos que ainda não a têm"""
+    if connection.dialect.name != "sqlite":
+        return
+    columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(users)")}
+    if "version" in columns:
+        return
+    connection.exec_driver_sql("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    logger.info("🗄️  Coluna users.version adicionada (usuários existentes na versão 1)")
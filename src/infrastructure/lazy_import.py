@@ -0,0 +1,30 @@
+"""
+Importação adiada de módulos pesados.
+
+LazyModule se comporta como o módulo importado, mas só o importa no primeiro
+acesso a um atributo. Assim o custo de bibliotecas usadas apenas em algumas
+rotas (jose, passlib) sai da partida do processo e vai para o primeiro uso.
+"""
+import importlib
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule:
+    """Proxy de um módulo importado no primeiro acesso a um atributo"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "carregado" if self._module is not None else "não carregado"
+        return f"<LazyModule {self._name} ({state})>"
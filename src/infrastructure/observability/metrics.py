@@ -0,0 +1,535 @@
+"""
+Métricas da aplicação no formato texto do Prometheus (GET /metrics).
+
+Registro próprio e sem dependências: contadores, gauges e histogramas com
+rótulos. Cada série tem a sua trava, segurada só pelo incremento, e nenhuma
+trava global é tomada no caminho das requisições. Valores que já existem em
+outros objetos (tamanho do pool, estatísticas dos caches) são lidos por
+coletores apenas no momento da coleta.
+
+Com vários workers do uvicorn, cada processo expõe as próprias métricas. Se
+METRICS_MULTIPROC_DIR estiver configurado, cada processo grava periodicamente
+um instantâneo em JSON nesse diretório e /metrics soma os arquivos de todos
+os processos. Contadores e histogramas de processos encerrados continuam
+somados; gauges consideram apenas processos vivos.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Intervalos (segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Consultas ao SQLite são em geral bem mais rápidas que uma requisição
+QUERY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5, 1.0)
+
+# Uma amostra: (nome, rótulos, valor)
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+
+class _Series:
+    """Valor de uma combinação de rótulos de um contador ou gauge"""
+
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramSeries:
+    """Contagens por intervalo, soma e total de uma combinação de rótulos"""
+
+    __slots__ = ("_lock", "_upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Sequence[float]):
+        self._lock = threading.Lock()
+        self._upper_bounds = upper_bounds
+        # Última posição: observações acima do maior limite (+Inf)
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._create_lock = threading.Lock()
+
+    @abstractmethod
+    def _new_series(self):
+        """Cria o acumulador de uma nova combinação de rótulos"""
+
+    def labels(self, *values) -> object:
+        """Retorna a série dos rótulos informados, criando-a no primeiro uso"""
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera os rótulos {self.labelnames}")
+            with self._create_lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _label_pairs(self, key: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, key))
+
+    def samples(self) -> List[Sample]:
+        return [
+            (self.name, self._label_pairs(key), series.value)
+            for key, series in list(self._series.items())
+        ]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_series(self):
+        return _Series()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_series(self):
+        return _Series()
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        for key, series in list(self._series.items()):
+            labels = self._label_pairs(key)
+            with series._lock:
+                counts, total = list(series.counts), series.sum
+            cumulative = 0
+            for upper, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labels + (("le", _format_value(upper)),), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+# Coletor: função chamada na coleta que retorna [(nome, tipo, ajuda, amostras)]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+class MetricsRegistry:
+    """Conjunto das métricas e coletores de um processo"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: Dict[object, Collector] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector, key: Optional[str] = None) -> None:
+        """Registra um coletor; um novo coletor com a mesma key substitui o anterior"""
+        self._collectors[key if key is not None else collector] = collector
+
+    def collect(self) -> List[Tuple[str, str, str, List[Sample]]]:
+        """Retorna as famílias (nome, tipo, ajuda, amostras) do processo"""
+        families = [
+            (metric.name, metric.type_name, metric.documentation, metric.samples())
+            for metric in self._metrics
+        ]
+        # Coletores diferentes podem contribuir para a mesma família (ex.: um por engine)
+        collected: Dict[str, Tuple[str, str, List[Sample]]] = {}
+        for collector in list(self._collectors.values()):
+            try:
+                for name, type_name, documentation, samples in collector():
+                    collected.setdefault(name, (type_name, documentation, []))[2].extend(samples)
+            except Exception as e:
+                logger.warning(f"Coletor de métricas falhou: {e}")
+        families.extend(
+            (name, type_name, documentation, samples)
+            for name, (type_name, documentation, samples) in collected.items()
+        )
+        return families
+
+
+# --- Agregação entre processos (METRICS_MULTIPROC_DIR) ---
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_snapshot(registry: MetricsRegistry, directory: str) -> None:
+    """Grava o instantâneo do processo de forma atômica (arquivo temporário + rename)"""
+    families = [
+        {"name": name, "type": type_name, "help": documentation,
+         "samples": [[sample, [list(pair) for pair in labels], value] for sample, labels, value in samples]}
+        for name, type_name, documentation, samples in registry.collect()
+    ]
+    path = _snapshot_path(directory, os.getpid())
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "written_at": time.time(), "families": families}, f)
+    os.replace(temporary, path)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def aggregate_snapshots(directory: str) -> List[Tuple[str, str, str, List[Sample]]]:
+    """Soma os instantâneos de todos os processos gravados no diretório"""
+    families: Dict[str, Tuple[str, str, Dict[Tuple[str, tuple], float]]] = {}
+    for path in sorted(glob.glob(os.path.join(directory, "metrics-*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Instantâneo de métricas ignorado ({path}): {e}")
+            continue
+        alive = _process_alive(snapshot["pid"])
+        for family in snapshot["families"]:
+            if family["type"] == "gauge" and not alive:
+                continue
+            _, _, values = families.setdefault(family["name"], (family["type"], family["help"], {}))
+            for sample, labels, value in family["samples"]:
+                key = (sample, tuple(tuple(pair) for pair in labels))
+                values[key] = values.get(key, 0.0) + value
+    return [
+        (name, type_name, documentation, [(sample, labels, value) for (sample, labels), value in values.items()])
+        for name, (type_name, documentation, values) in families.items()
+    ]
+
+
+# --- Formato texto ---
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _with_hit_ratios(families):
+    """Acrescenta cache_hit_ratio calculado a partir dos acertos e falhas já somados"""
+    totals: Dict[tuple, List[float]] = {}
+    for name, _, _, samples in families:
+        if name in ("cache_hits_total", "cache_misses_total"):
+            position = 0 if name == "cache_hits_total" else 1
+            for _, labels, value in samples:
+                totals.setdefault(labels, [0.0, 0.0])[position] += value
+    if not totals:
+        return families
+    ratios = [
+        ("cache_hit_ratio", labels, hits / (hits + misses) if hits + misses else 0.0)
+        for labels, (hits, misses) in totals.items()
+    ]
+    return families + [("cache_hit_ratio", "gauge", "Fração de consultas atendidas pelo cache", ratios)]
+
+
+def render(families) -> str:
+    """Formata as famílias no formato de exposição texto do Prometheus"""
+    lines = []
+    for name, type_name, documentation, samples in _with_hit_ratios(families):
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {type_name}")
+        for sample, labels, value in samples:
+            if labels:
+                rendered = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                lines.append(f"{sample}{{{rendered}}} {_format_value(value)}")
+            else:
+                lines.append(f"{sample} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Produz o corpo de /metrics: do próprio processo ou, com multiproc_dir,
+    a soma dos instantâneos de todos os workers (atualizados a cada flush_interval).
+    """
+
+    def __init__(self, registry: MetricsRegistry, multiproc_dir: Optional[str] = None,
+                 flush_interval: float = 5.0):
+        self.registry = registry
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Inicia a gravação periódica do instantâneo (somente no modo multiprocesso)"""
+        if not self.multiproc_dir or self._thread is not None:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._thread.start()
+        logger.info(f"📈 Métricas agregadas em {self.multiproc_dir} (a cada {self.flush_interval}s)")
+
+    def _flush_loop(self) -> None:
+        while True:
+            self.flush()
+            if self._stop.wait(self.flush_interval):
+                return
+
+    def flush(self) -> None:
+        if not self.multiproc_dir:
+            return
+        try:
+            write_snapshot(self.registry, self.multiproc_dir)
+        except OSError as e:
+            logger.warning(f"Falha ao gravar instantâneo de métricas: {e}")
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def render(self) -> str:
+        if not self.multiproc_dir:
+            return render(self.registry.collect())
+        self.flush()
+        return render(aggregate_snapshots(self.multiproc_dir))
+
+
+# --- Métricas da aplicação ---
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por rota (template) e status",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requisições HTTP em andamento", ("method",)
+)
+http_requests_shed = registry.counter(
+    "http_requests_shed_total",
+    "Requisições recusadas com 503 pelo limite de concorrência (fila cheia ou espera esgotada)",
+    ("route_class", "reason"),
+)
+http_concurrency_limit = registry.gauge(
+    "http_concurrency_limit", "Limite adaptativo de concorrência por classe de rotas", ("route_class",)
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Duração das instruções SQL por tipo (SELECT, INSERT, ...)",
+    ("engine", "statement"),
+    buckets=QUERY_BUCKETS,
+)
+db_query_errors = registry.counter(
+    "db_query_errors_total", "Instruções SQL que falharam", ("engine", "statement")
+)
+db_pool_checkout_duration = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Espera para obter uma conexão do pool (inclui abrir conexões novas)",
+    ("engine",),
+    buckets=QUERY_BUCKETS,
+)
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds", "Tempo de CPU do bcrypt por operação", ("operation",)
+)
+password_hash_queue_wait = registry.histogram(
+    "password_hash_queue_wait_seconds", "Espera na fila do pool de hashing", ("operation",)
+)
+password_hash_rejected = registry.counter(
+    "password_hash_rejected_total", "Operações recusadas com a fila de hashing cheia"
+)
+db_write_batch_size = registry.histogram(
+    "db_write_batch_size",
+    "Escritas confirmadas por COMMIT na fila de escrita (group commit)",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+db_write_queue_wait = registry.histogram(
+    "db_write_queue_wait_seconds", "Espera das escritas na fila até o início do lote", buckets=QUERY_BUCKETS
+)
+
+
+def statement_type(statement: str) -> str:
+    """Primeira palavra-chave da instrução (SELECT, INSERT, UPDATE, DELETE, ...)"""
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "BEGIN",
+                                  "COMMIT", "ROLLBACK", "WITH", "CREATE") else "OTHER"
+
+
+def install_engine_metrics(engine: "Engine", name: str) -> None:
+    """Registra eventos de SQL e a medição de checkout do pool de um engine síncrono"""
+    from sqlalchemy import event
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("metrics_started")
+        if started:
+            db_query_duration.labels(name, statement_type(statement)).observe(time.perf_counter() - started.pop())
+
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        started = connection.info.get("metrics_started") if connection is not None else None
+        if started:
+            started.pop()
+        db_query_errors.labels(name, statement_type(exception_context.statement or "")).inc()
+
+    def instrument_pool(target_engine) -> None:
+        # Pool não tem evento anterior ao checkout: mede a chamada connect() da instância
+        pool = target_engine.pool
+        connect = pool.connect
+        checkout = db_pool_checkout_duration.labels(name)
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                checkout.observe(time.perf_counter() - started)
+
+        pool.connect = timed_connect
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+    # dispose() recria o pool; a medição é reinstalada no novo
+    event.listen(engine, "engine_disposed", instrument_pool)
+    instrument_pool(engine)
+
+    def collect_pool():
+        pool = engine.pool
+        samples = []
+        for state in ("size", "checkedout", "overflow", "checkedin"):
+            reader = getattr(pool, state, None)
+            if callable(reader):
+                # overflow() é negativo enquanto o pool não atingiu pool_size
+                value = max(0, reader()) if state == "overflow" else reader()
+                samples.append(("db_pool_connections", (("engine", name), ("state", state)), float(value)))
+        # NullPool/StaticPool (ex.: aiosqlite) não têm contagem de conexões
+        if not samples:
+            return
+        yield ("db_pool_connections", "gauge",
+               "Conexões do pool por estado (size, checkedout, overflow, checkedin)", samples)
+
+    # Um engine recriado com o mesmo nome (nova aplicação) substitui o coletor anterior
+    registry.add_collector(collect_pool, key=f"db_pool:{name}")
+
+
+def cache_collector(caches: Callable[[], Dict[str, Optional[dict]]]) -> Collector:
+    """Coletor de acertos, falhas e tamanho a partir do stats() de cada cache"""
+
+    def collect():
+        hits, misses, sizes = [], [], []
+        for cache_name, stats in caches().items():
+            if not stats:
+                continue
+            labels = (("cache", cache_name),)
+            hits.append(("cache_hits_total", labels, float(stats.get("hits") or 0)))
+            misses.append(("cache_misses_total", labels, float(stats.get("misses") or 0)))
+            if stats.get("size") is not None:
+                sizes.append(("cache_entries", labels, float(stats["size"])))
+        return [
+            ("cache_hits_total", "counter", "Consultas atendidas pelo cache", hits),
+            ("cache_misses_total", "counter", "Consultas não atendidas pelo cache", misses),
+            ("cache_entries", "gauge", "Entradas em cache no processo", sizes),
+        ]
+
+    return collect
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a latência por rota (template do FastAPI, não o
+    caminho concreto, para limitar a cardinalidade) e as requisições em andamento.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = http_requests_in_flight.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            http_request_duration.labels(method, template, status).observe(time.perf_counter() - started)
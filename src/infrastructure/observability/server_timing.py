@@ -0,0 +1,145 @@
+"""
+Medição por fase de cada requisição HTTP, exposta no cabeçalho Server-Timing.
+
+Um ContextVar guarda, por requisição, o tempo acumulado e o número de
+chamadas de cada fase (db, hash, jwt, validate). Os pontos instrumentados
+apenas somam perf_counter() quando há uma requisição ativa, o que mantém o
+custo baixo o bastante para ficar ligado em produção. O middleware ASGI
+escreve o cabeçalho e uma linha de log estruturada (chave=valor) por requisição.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+import logging
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_HEADER = b"server-timing"
+
+# Ordem em que as fases aparecem no cabeçalho e no log
+PHASE_DESCRIPTIONS = {
+    "db": "SQL",
+    "hash": "bcrypt",
+    "jwt": "JWT",
+    "validate": "pydantic",
+}
+
+# {fase: [segundos acumulados, chamadas]} da requisição corrente (None fora de requisições)
+_current_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "server_timings", default=None
+)
+
+
+def record(phase: str, seconds: float) -> None:
+    """Soma a duração de uma chamada à fase na requisição corrente"""
+    timings = _current_timings.get()
+    if timings is None:
+        return
+    entry = timings.get(phase)
+    if entry is None:
+        timings[phase] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Mede o bloco e o atribui à fase (sem custo fora de uma requisição medida)"""
+    if _current_timings.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_timings.get() is not None:
+        conn.info.setdefault("server_timing_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("server_timing_started")
+    if started:
+        record("db", time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    # Instruções que falham não disparam after_cursor_execute
+    connection = exception_context.connection
+    started = connection.info.get("server_timing_started") if connection is not None else None
+    if started:
+        record("db", time.perf_counter() - started.pop())
+
+
+def install_sql_timing(engine: "Engine") -> None:
+    """Registra os eventos de cursor que medem o tempo das instruções SQL"""
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def format_server_timing(timings: Dict[str, List[float]], total: float) -> str:
+    """Formata as fases no padrão do cabeçalho Server-Timing (durações em ms)"""
+    metrics = []
+    for phase, description in PHASE_DESCRIPTIONS.items():
+        if phase in timings:
+            seconds, calls = timings[phase]
+            metrics.append(f'{phase};dur={seconds * 1000:.2f};desc="{description} x{calls}"')
+    metrics.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(metrics)
+
+
+def format_log_line(method: str, path: str, status: int, timings: Dict[str, List[float]], total: float) -> str:
+    fields = [f"method={method}", f"path={path}", f"status={status}", f"total_ms={total * 1000:.2f}"]
+    for phase in PHASE_DESCRIPTIONS:
+        if phase in timings:
+            seconds, calls = timings[phase]
+            fields.append(f"{phase}_ms={seconds * 1000:.2f} {phase}_calls={calls}")
+    return "server_timing " + " ".join(fields)
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que abre o contexto de medição da requisição.
+    O cabeçalho reflete o trabalho feito até o início da resposta; em respostas
+    em streaming, o que acontece depois entra apenas na linha de log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, List[float]] = {}
+        token = _current_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = format_server_timing(timings, time.perf_counter() - started)
+                message["headers"] = [*message.get("headers", []), (SERVER_TIMING_HEADER, header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            logger.info(format_log_line(
+                scope["method"], scope["path"], status, timings, time.perf_counter() - started
+            ))
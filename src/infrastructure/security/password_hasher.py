@@ -0,0 +1,372 @@
+"""
+Executor dedicado para hashing e verificação de senhas.
+
+O bcrypt consome ~200-300 ms de CPU por operação segurando o GIL; executá-lo
+nas threads das requisições faz um pico de logins degradar todas as rotas do
+worker. Aqui as operações rodam em um pool de processos (uma CPU por
+processo), com fila limitada e métricas de espera e de tempo de hash.
+
+O esquema (bcrypt ou argon2) e o custo dos novos hashes vêm da
+PasswordHashPolicy (PASSWORD_HASH_* nas configurações). Hashes de outro
+esquema ou custo continuam válidos e são atualizados no próximo login
+(verify_and_update), o que aplica uma mudança de custo sem exigir a troca
+de senhas. O custo adequado ao hardware é medido por
+python -m benchmarks.password_hash.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+from anyio import to_thread
+
+from src.config import Settings, get_settings
+from src.infrastructure.observability.metrics import (
+    password_hash_duration,
+    password_hash_queue_wait,
+    password_hash_rejected,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de espera das operações em lote quando a fila está cheia
+BATCH_BUSY_RETRY_SECONDS = 0.05
+
+PASSWORD_HASH_SCHEMES = ("bcrypt", "argon2")
+
+
+@dataclass(frozen=True)
+class PasswordHashPolicy:
+    """Esquema e custo dos novos hashes (enviada junto com cada operação aos processos do pool)"""
+
+    scheme: str = "bcrypt"
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 2
+    argon2_memory_kib: int = 19456
+    argon2_parallelism: int = 1
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "PasswordHashPolicy":
+        return cls(
+            scheme=settings.password_hash_scheme,
+            bcrypt_rounds=settings.password_hash_bcrypt_rounds,
+            argon2_time_cost=settings.password_hash_argon2_time_cost,
+            argon2_memory_kib=settings.password_hash_argon2_memory_kib,
+            argon2_parallelism=settings.password_hash_argon2_parallelism,
+        )
+
+    def context_options(self) -> dict:
+        """
+        Opções do CryptContext: os dois esquemas verificam, apenas o da política
+        gera hashes. min_rounds = max_rounds marca para atualização hashes com
+        custo diferente do atual (maior ou menor); no argon2, memory_cost também.
+        """
+        return {
+            "schemes": [self.scheme] + [scheme for scheme in PASSWORD_HASH_SCHEMES if scheme != self.scheme],
+            "default": self.scheme,
+            "deprecated": "auto",
+            "bcrypt__rounds": self.bcrypt_rounds,
+            "bcrypt__min_rounds": self.bcrypt_rounds,
+            "bcrypt__max_rounds": self.bcrypt_rounds,
+            "argon2__rounds": self.argon2_time_cost,
+            "argon2__min_rounds": self.argon2_time_cost,
+            "argon2__max_rounds": self.argon2_time_cost,
+            "argon2__memory_cost": self.argon2_memory_kib,
+            "argon2__parallelism": self.argon2_parallelism,
+        }
+
+    def check_backend(self) -> None:
+        """Falha já na configuração se o esquema escolhido não tiver implementação instalada"""
+        if self.scheme == "argon2":
+            try:
+                import argon2  # noqa: F401
+            except ImportError as e:
+                raise RuntimeError(
+                    "PASSWORD_HASH_SCHEME=argon2 requer o pacote 'argon2-cffi' (pip install argon2-cffi)"
+                ) from e
+
+
+DEFAULT_POLICY = PasswordHashPolicy()
+
+
+# --- Contexto para Hashing de Senhas (carregado também nos processos do pool) ---
+@lru_cache(maxsize=None)
+def get_pwd_context(policy: PasswordHashPolicy = DEFAULT_POLICY):
+    """CryptContext do passlib para a política, importado e criado no primeiro hash/verificação"""
+    from passlib.context import CryptContext
+
+    return CryptContext(**policy.context_options())
+
+
+class PasswordHasherBusyError(Exception):
+    """Exceção lançada quando a fila de hashing atingiu o limite configurado."""
+    pass
+
+
+# --- Funções executadas nos processos do pool (precisam ser picklable) ---
+def _timed_hash(password: str, policy: PasswordHashPolicy) -> Tuple[str, float]:
+    started = time.perf_counter()
+    hashed = get_pwd_context(policy).hash(password)
+    return hashed, time.perf_counter() - started
+
+
+def _timed_verify(plain_password: str, hashed_password: str, policy: PasswordHashPolicy) -> Tuple[bool, float]:
+    started = time.perf_counter()
+    result = get_pwd_context(policy).verify(plain_password, hashed_password)
+    return result, time.perf_counter() - started
+
+
+def _timed_verify_and_update(
+    plain_password: str, hashed_password: str, policy: PasswordHashPolicy
+) -> Tuple[Tuple[bool, Optional[str]], float]:
+    started = time.perf_counter()
+    result = get_pwd_context(policy).verify_and_update(plain_password, hashed_password)
+    return result, time.perf_counter() - started
+
+
+# Rótulo "operation" das métricas de cada função executada no pool
+_OPERATION_NAMES = {_timed_hash: "hash", _timed_verify: "verify", _timed_verify_and_update: "verify_and_update"}
+
+
+class PasswordHashMetrics:
+    """Métricas acumuladas de espera na fila e de tempo de hash."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+
+    def record(self, queue_wait: float, hash_time: float, operation: str = "hash") -> None:
+        password_hash_queue_wait.labels(operation).observe(queue_wait)
+        password_hash_duration.labels(operation).observe(hash_time)
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_seconds_total += queue_wait
+            self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+            self.hash_seconds_total += hash_time
+            self.hash_seconds_max = max(self.hash_seconds_max, hash_time)
+
+    def record_rejection(self) -> None:
+        password_hash_rejected.inc()
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_seconds_avg": self.queue_wait_seconds_total / completed,
+                "queue_wait_seconds_max": self.queue_wait_seconds_max,
+                "hash_seconds_avg": self.hash_seconds_total / completed,
+                "hash_seconds_max": self.hash_seconds_max,
+            }
+
+
+class PasswordHasher:
+    """
+    Executa hash/verificação de senhas em um pool de processos com fila limitada.
+
+    - workers > 0: ProcessPoolExecutor com esse número de processos (criado sob demanda)
+    - workers == 0: execução na própria thread chamadora (API async usa o threadpool)
+
+    Quando há max_pending operações em andamento, novas chamadas falham
+    imediatamente com PasswordHasherBusyError em vez de acumular trabalho.
+    """
+
+    def __init__(self, workers: int, max_pending: int, policy: PasswordHashPolicy = DEFAULT_POLICY):
+        self._validate(workers, max_pending)
+        policy.check_backend()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.policy = policy
+        self.metrics = PasswordHashMetrics()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @staticmethod
+    def _validate(workers: int, max_pending: int) -> None:
+        if workers < 0:
+            raise ValueError("workers não pode ser negativo")
+        if max_pending <= 0:
+            raise ValueError("max_pending deve ser positivo")
+
+    def configure(self, workers: int, max_pending: int, policy: Optional[PasswordHashPolicy] = None) -> None:
+        """
+        Redefine o número de processos, o limite da fila e (se informada) a
+        política de hashing; um pool já iniciado é encerrado
+        """
+        self._validate(workers, max_pending)
+        if policy is not None:
+            policy.check_backend()
+        self.shutdown()
+        self.workers = workers
+        self.max_pending = max_pending
+        if policy is not None:
+            self.policy = policy
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _acquire_slot(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.metrics.record_rejection()
+                logger.warning(f"Fila de hashing cheia ({self.max_pending} operações pendentes)")
+                raise PasswordHasherBusyError("Fila de hashing de senhas cheia")
+            self._pending += 1
+
+    def _release_slot(self, *_args) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn evita herdar locks de threads do processo pai via fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"🔐 Pool de hashing iniciado com {self.workers} processos")
+            return self._executor
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        self._acquire_slot()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release_slot()
+            raise
+        future.add_done_callback(self._release_slot)
+        return future
+
+    def _run_inline(self, fn: Callable, *args):
+        self._acquire_slot()
+        started = time.perf_counter()
+        try:
+            result, hash_time = fn(*args)
+        finally:
+            self._release_slot()
+        self.metrics.record(time.perf_counter() - started - hash_time, hash_time, _OPERATION_NAMES[fn])
+        return result
+
+    def _run(self, fn: Callable, *args):
+        if self.workers == 0:
+            return self._run_inline(fn, *args)
+        started = time.perf_counter()
+        result, hash_time = self._submit(fn, *args).result()
+        self.metrics.record(time.perf_counter() - started - hash_time, hash_time, _OPERATION_NAMES[fn])
+        return result
+
+    async def _run_async(self, fn: Callable, *args):
+        if self.workers == 0:
+            return await to_thread.run_sync(self._run_inline, fn, *args)
+        started = time.perf_counter()
+        result, hash_time = await asyncio.wrap_future(self._submit(fn, *args))
+        self.metrics.record(time.perf_counter() - started - hash_time, hash_time, _OPERATION_NAMES[fn])
+        return result
+
+    def hash(self, password: str) -> str:
+        """Gera o hash da senha (bloqueia a thread chamadora)"""
+        return self._run(_timed_hash, password, self.policy)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifica a senha contra o hash (bloqueia a thread chamadora)"""
+        return self._run(_timed_verify, plain_password, hashed_password, self.policy)
+
+    def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verifica a senha e, se o hash estiver desatualizado em relação à
+        política, retorna também o novo hash: (válida, novo hash ou None)
+        """
+        return self._run(_timed_verify_and_update, plain_password, hashed_password, self.policy)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """Indica se o hash usa outro esquema ou custo (sem calcular hashes)"""
+        return get_pwd_context(self.policy).needs_update(hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        """Gera o hash da senha sem bloquear o event loop"""
+        return await self._run_async(_timed_hash, password, self.policy)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifica a senha contra o hash sem bloquear o event loop"""
+        return await self._run_async(_timed_verify, plain_password, hashed_password, self.policy)
+
+    async def verify_and_update_async(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """verify_and_update sem bloquear o event loop (verificação e novo hash na mesma operação do pool)"""
+        return await self._run_async(_timed_verify_and_update, plain_password, hashed_password, self.policy)
+
+    async def hash_many_async(self, passwords: List[str]) -> List[str]:
+        """
+        Gera os hashes de um lote em paralelo, preservando a ordem.
+        A concorrência é limitada pelo número de processos e, com a fila
+        cheia, o lote aguarda em vez de falhar, cedendo lugar às requisições
+        interativas.
+        """
+        semaphore = asyncio.Semaphore(max(1, min(self.workers * 2, self.max_pending // 2)))
+
+        async def hash_one(password: str) -> str:
+            async with semaphore:
+                while True:
+                    try:
+                        return await self.hash_async(password)
+                    except PasswordHasherBusyError:
+                        await asyncio.sleep(BATCH_BUSY_RETRY_SECONDS)
+
+        return list(await asyncio.gather(*(hash_one(password) for password in passwords)))
+
+    def snapshot(self) -> dict:
+        """Retorna o estado atual do executor e suas métricas"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "scheme": self.policy.scheme,
+            "pending": self._pending,
+            **self.metrics.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        """Encerra o pool de processos, se tiver sido iniciado"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+            logger.info("🔐 Pool de hashing encerrado")
+
+
+# Instância compartilhada pelo processo (None até o primeiro uso ou create_app)
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def configure_password_hasher(settings: Settings) -> PasswordHasher:
+    """Aplica PASSWORD_HASH_* ao PasswordHasher do processo; um pool já iniciado é encerrado"""
+    global _password_hasher
+    policy = PasswordHashPolicy.from_settings(settings)
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending, policy)
+    else:
+        _password_hasher.configure(settings.password_hash_workers, settings.password_hash_max_pending, policy)
+    return _password_hasher
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Retorna o PasswordHasher configurado por create_app (ou pelas configurações ativas)"""
+    if _password_hasher is None:
+        configure_password_hasher(get_settings())
+    return _password_hasher
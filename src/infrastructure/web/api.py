@@ -1,18 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Form, Header, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from src.core.services.user_service import UserService
-from src.core.exceptions import UserAlreadyExistsError, UserNotFoundError
-from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+from src.config import Settings, get_settings
+from src.core.services.async_user_service import AsyncUserService
+from src.core.exceptions import (
+    InvalidRefreshTokenError,
+    UserAlreadyExistsError,
+    UserNotFoundError,
+    UserVersionConflictError,
+)
+from src.infrastructure.database.refresh_tokens import RefreshTokenStore
 from src.infrastructure.web import schemas
-from src.infrastructure.web.dependencies import get_db
+from src.infrastructure.web.dependencies import (
+    get_refresh_token_store,
+    get_uncached_user_service,
+    get_user_service,
+)
+from src.infrastructure.web.bulk_import import (
+    BulkImportFormatError,
+    BulkImportResponse,
+    detect_format,
+    iter_csv_rows,
+    iter_ndjson_rows,
+    peek_rows,
+    stream_import,
+)
+from src.infrastructure.web.export import EXPORT_MEDIA_TYPES, stream_users_export
+from src.infrastructure.web.serialization import encode_user, encode_users, json_response
+from src.infrastructure.web.conditional import (
+    ETAG_HEADER,
+    is_not_modified,
+    not_modified_response,
+    page_etag,
+    parse_if_match,
+    user_etag,
+)
+from src.infrastructure.web.pagination import (
+    NEXT_CURSOR_HEADER,
+    TOTAL_COUNT_HEADER,
+    decode_cursor,
+    decode_search_cursor,
+    encode_cursor,
+    encode_search_cursor,
+)
 from src.infrastructure.web.auth import (
+    ACCESS_TOKEN_HEADER,
+    access_token_claims,
     create_access_token,
+    current_token_claims,
     get_current_active_user,
-    verify_password,
-    get_password_hash,
+    get_current_verified_user,
+    verify_and_update_password_async,
+    get_password_hash_async,
 )
 import logging
 
@@ -22,26 +63,56 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-# --- Helper para instanciar o serviço com suas dependências ---
-def get_user_service(db: Session = Depends(get_db)) -> UserService:
-    repository = SQLiteUserRepository(db)
-    return UserService(repository)
+# --- Rotas de Autenticação ---
+async def _store_rehashed_password(service: AsyncUserService, user, new_hash: str):
+    """
+    Grava o hash refeito com a política atual e retorna o usuário atualizado.
+    Só substitui a versão lida no login (uma troca de senha concorrente
+    prevalece) e não impede o login se falhar: o hash será refeito em um
+    próximo login.
+    """
+    try:
+        updated_user = await service.update_user(
+            user.id, {"hashed_password": new_hash}, expected_version=user.version
+        )
+        logger.info(f"🔐 Hash de senha atualizado para a política atual: usuário {user.id}")
+        return updated_user
+    except (UserNotFoundError, UserVersionConflictError):
+        logger.info(f"Hash de senha não atualizado: usuário {user.id} alterado durante o login")
+    except Exception as e:
+        logger.error(f"❌ Erro ao atualizar o hash de senha do usuário {user.id}: {e}")
+    return user
+
+
+def _token_response(user, refresh_token: Optional[str]) -> dict:
+    return {
+        "access_token": create_access_token(data=access_token_claims(user)),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
 
 
-# --- Rotas de Autenticação ---
-@router.post("/token", response_model=schemas.Token, tags=["Authentication"])
-def login_for_access_token(
+@router.post("/token", response_model=schemas.Token, response_model_exclude_none=True, tags=["Authentication"])
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    service: UserService = Depends(get_user_service),
+    token_service: AsyncUserService = Depends(get_uncached_user_service),
+    refresh_tokens: RefreshTokenStore = Depends(get_refresh_token_store),
+    settings: Settings = Depends(get_settings),
 ):
     """
-    Autentica o usuário e retorna um token de acesso.
+    Autentica o usuário e retorna um token de acesso e um refresh token.
 
     Use o seu **e-mail** no campo 'username' e sua **senha** para obter o token JWT.
     """
-    # O campo do formulário é 'username', mas sabemos que ele contém o e-mail
-    user = service.get_user_by_email(form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # O campo do formulário é 'username', mas sabemos que ele contém o e-mail.
+    # A leitura ignora o cache read-through: o hash e a versão do token vêm do banco
+    user = await token_service.get_user_by_email(form_data.username)
+    # O hashing é CPU-bound: executa no pool de hashing para não bloquear outras rotas
+    verified, new_hash = (
+        await verify_and_update_password_async(form_data.password, user.hashed_password)
+        if user else (False, None)
+    )
+    if not verified:
         logger.warning(f"Tentativa de login falhou para: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -49,9 +120,44 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    if new_hash is not None:
+        # Mesma sessão da leitura; a escrita invalida as entradas do usuário no cache
+        user = await _store_rehashed_password(token_service, user, new_hash)
     logger.info(f"Login bem-sucedido para: {form_data.username}")
-    access_token = create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await refresh_tokens.issue(user.id) if settings.refresh_token_expire_days > 0 else None
+    return _token_response(user, refresh_token)
+
+
+@router.post(
+    "/token/refresh", response_model=schemas.Token, response_model_exclude_none=True, tags=["Authentication"]
+)
+async def refresh_access_token(
+    refresh_token: str = Form(...),
+    token_service: AsyncUserService = Depends(get_uncached_user_service),
+    refresh_tokens: RefreshTokenStore = Depends(get_refresh_token_store),
+):
+    """
+    Troca um refresh token por um novo token de acesso (com os dados atuais do
+    usuário, lidos do banco sem o cache read-through) e um novo refresh token.
+    O refresh token usado deixa de valer; reutilizá-lo revoga todos os tokens
+    emitidos a partir do mesmo login.
+    """
+    unauthorized = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        user_id, new_refresh_token = await refresh_tokens.rotate(refresh_token)
+    except InvalidRefreshTokenError as e:
+        logger.warning(f"Renovação de token recusada: {e}")
+        raise unauthorized
+
+    user = await token_service.get_user_by_id(user_id)
+    if user is None:
+        await refresh_tokens.revoke_user(user_id)
+        raise unauthorized
+    return _token_response(user, new_refresh_token)
 
 
 # --- Rotas de Usuários (CRUD) ---
@@ -61,37 +167,153 @@ def login_for_access_token(
     status_code=status.HTTP_201_CREATED,
     tags=["Users"],
 )
-def create_user(
-    user: schemas.UserCreate, service: UserService = Depends(get_user_service)
+async def create_user(
+    user: schemas.UserCreate, service: AsyncUserService = Depends(get_user_service)
 ):
     try:
         user_data = user.model_dump()
-        user_data["hashed_password"] = get_password_hash(user_data.pop("password"))
+        user_data["hashed_password"] = await get_password_hash_async(
+            user_data.pop("password")
+        )
         
-        return service.create_user(user_data)
+        return await service.create_user(user_data)
     except UserAlreadyExistsError as e:
         logger.warning(f"Tentativa de criar usuário duplicado: {user.email}")
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post(
+    "/users/bulk",
+    response_class=StreamingResponse,
+    tags=["Users"],
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def bulk_create_users(
+    request: Request,
+    current_user: schemas.UserResponse = Depends(get_current_verified_user),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Importa usuários em massa a partir de um corpo NDJSON (`application/x-ndjson`)
+    ou CSV (`text/csv`, com cabeçalho `username,email,password`).
+
+    Retorna, em streaming, um relatório NDJSON com uma linha por registro, na
+    ordem de entrada (`created` com o id ou `error` com o motivo); as linhas de
+    cada lote são enviadas assim que ele é gravado. A última linha traz os
+    totais: `{"status": "summary", "created": ..., "failed": ...}`.
+    """
+    try:
+        body_format = detect_format(request.headers.get("content-type"))
+    except BulkImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+
+    parse_rows = iter_csv_rows if body_format == "csv" else iter_ndjson_rows
+    try:
+        rows = await peek_rows(parse_rows(request.stream()))
+    except BulkImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(f"Usuário {current_user.id} iniciou importação em massa ({body_format})")
+    return BulkImportResponse(
+        stream_import(rows, settings.bulk_import_batch_size), media_type="application/x-ndjson"
+    )
+
+
 @router.get("/users/", response_model=List[schemas.UserResponse], tags=["Users"])
-def read_users(
+async def read_users(
+    response: Response,
     skip: int = Query(0, ge=0, description="Número de registros a pular"),
     limit: int = Query(
         10, ge=1, le=100, description="Número máximo de registros a retornar"
     ),
-    service: UserService = Depends(get_user_service),
+    after: Optional[str] = Query(
+        None,
+        description="Cursor opaco retornado em X-Next-Cursor; quando informado, 'skip' é ignorado",
+    ),
+    include_total: bool = Query(False, description="Retorna o total de usuários no cabeçalho X-Total-Count"),
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncUserService = Depends(get_user_service),
 ):
     """
-    Recupera uma lista paginada de usuários.
+    Recupera uma lista paginada de usuários, ordenada por id.
+
+    A paginação por cursor (`after`) tem custo constante por página. O modo
+    `skip`/`limit` é mantido por compatibilidade. Quando houver próxima página,
+    o cursor é retornado no cabeçalho `X-Next-Cursor`. Com `include_total=true`,
+    o total de usuários vem em `X-Total-Count` (contador mantido a cada escrita,
+    sem `COUNT(*)`).
+
+    O cabeçalho `ETag` identifica o conteúdo da página. Com `If-None-Match`
+    igual a ele, a resposta é 304, calculada a partir apenas dos ids e das
+    versões da página.
+
+    Os usuários vêm do banco já validados e são codificados diretamente em
+    JSON, sem passar novamente pela validação do `response_model`.
     """
-    users = service.get_all_users(skip=skip, limit=limit)
+    after_id = None
+    if after is not None:
+        try:
+            after_id = decode_cursor(after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    total = await service.count_users() if include_total else None
+
+    if if_none_match is not None:
+        etag = page_etag(await service.get_user_versions(skip=skip, limit=limit, after_id=after_id), total)
+        if is_not_modified(if_none_match, etag):
+            return not_modified_response(etag)
+
+    if after_id is not None:
+        users = await service.get_users_after(after_id=after_id, limit=limit)
+    else:
+        users = await service.get_all_users(skip=skip, limit=limit)
+
+    if len(users) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(users[-1].id)
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    response.headers[ETAG_HEADER] = page_etag(((user.id, user.version) for user in users), total)
     logger.debug(f"Listando usuários: {len(users)} encontrados")
-    return users
+    return json_response(encode_users(users), response)
+
+
+@router.get("/users/search", response_model=List[schemas.UserResponse], tags=["Users"])
+async def search_users(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Termos ou prefixo de username/email"),
+    limit: int = Query(20, ge=1, le=100, description="Número máximo de resultados"),
+    after: Optional[str] = Query(None, description="Cursor opaco retornado em X-Next-Cursor"),
+    service: AsyncUserService = Depends(get_user_service),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Busca usuários por username e email (índice FTS5).
+
+    Todos os termos devem aparecer e o último é tratado como prefixo
+    (`mar sil` encontra `maria.silva@...`). Os resultados vêm ordenados pela
+    relevância: igualdade exata, depois início do username/email, depois os
+    demais. Quando houver próxima página, o cursor é retornado no cabeçalho
+    `X-Next-Cursor`.
+    """
+    after_position = None
+    if after is not None:
+        try:
+            after_position = decode_search_cursor(after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    hits = await service.search_users(
+        q, limit=limit, after=after_position, max_candidates=settings.search_max_candidates
+    )
+
+    if len(hits) == limit:
+        rank, last_user = hits[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_search_cursor(rank, last_user.id)
+    logger.debug(f"Busca por {q!r}: {len(hits)} resultados")
+    return json_response(encode_users(user for _, user in hits), response)
 
 
 @router.get("/users/me", response_model=schemas.UserResponse, tags=["Users"])
-def read_users_me(
+async def read_users_me(
     current_user: schemas.UserResponse = Depends(get_current_active_user),
 ):
     """
@@ -100,25 +322,77 @@ def read_users_me(
     return current_user
 
 
+@router.get(
+    "/users/export",
+    response_class=StreamingResponse,
+    tags=["Users"],
+    responses={200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}},
+)
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato: ndjson ou csv"),
+    current_user: schemas.UserResponse = Depends(get_current_verified_user),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Exporta todos os usuários (id, username, email) em NDJSON ou CSV, em streaming.
+    """
+    logger.info(f"Usuário {current_user.id} iniciou exportação em {format}")
+    return StreamingResponse(
+        stream_users_export(format, settings.export_batch_size),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+
 @router.get("/users/{user_id}", response_model=schemas.UserResponse, tags=["Users"])
-def read_user(user_id: int, service: UserService = Depends(get_user_service)):
+async def read_user(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+    service: AsyncUserService = Depends(get_user_service),
+):
+    """
+    Retorna o usuário com o cabeçalho `ETag`. Com `If-None-Match` igual ao
+    ETag atual, a resposta é 304, calculada a partir apenas da versão do
+    usuário.
+    """
     try:
-        db_user = service.get_user_by_id(user_id)
+        if if_none_match is not None:
+            version = await service.get_user_version(user_id)
+            if version is None:
+                raise UserNotFoundError(f"Usuário com ID {user_id} não encontrado")
+            etag = user_etag(user_id, version)
+            if is_not_modified(if_none_match, etag):
+                return not_modified_response(etag)
+
+        db_user = await service.get_user_by_id(user_id)
         if db_user is None:
             raise UserNotFoundError(f"Usuário com ID {user_id} não encontrado")
-        return db_user
+        response = json_response(encode_user(db_user))
+        response.headers[ETAG_HEADER] = user_etag(db_user.id, db_user.version)
+        return response
     except UserNotFoundError as e:
         logger.warning(f"Tentativa de acessar usuário inexistente: {user_id}")
         raise HTTPException(status_code=404, detail=str(e))
 
 
 @router.put("/users/{user_id}", response_model=schemas.UserResponse, tags=["Users"])
-def update_user(
+async def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
-    service: UserService = Depends(get_user_service),
-    current_user: schemas.UserResponse = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    service: AsyncUserService = Depends(get_user_service),
+    current_user: schemas.UserResponse = Depends(get_current_verified_user),
 ):
+    """
+    Atualiza o usuário e retorna o novo `ETag`. Com `If-Match`, a atualização
+    só ocorre se o usuário ainda estiver na versão informada (412 caso contrário).
+
+    Se a requisição usou um token autocontido (com a versão do usuário), o
+    token renovado, com os novos dados e a nova versão, vem no cabeçalho
+    `X-Access-Token`: o token anterior deixa de valer para operações sensíveis.
+    """
     if current_user.id != user_id:
         logger.warning(f"Usuário {current_user.id} tentou atualizar usuário {user_id}")
         raise HTTPException(
@@ -131,21 +405,41 @@ def update_user(
         raise HTTPException(status_code=400, detail="No data to update")
 
     try:
-        updated_user = service.update_user(user_id, user_data)
+        expected_version = parse_if_match(if_match, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
+
+    try:
+        updated_user = await service.update_user(user_id, user_data, expected_version=expected_version)
+        response.headers[ETAG_HEADER] = user_etag(updated_user.id, updated_user.version)
+        if "ver" in current_token_claims(request):
+            response.headers[ACCESS_TOKEN_HEADER] = create_access_token(data=access_token_claims(updated_user))
         return updated_user
     except UserNotFoundError as e:
         logger.warning(f"Tentativa de atualizar usuário inexistente: {user_id}")
         raise HTTPException(status_code=404, detail=str(e))
+    except UserAlreadyExistsError as e:
+        logger.warning(f"Tentativa de atualizar usuário {user_id} para email já existente")
+        raise HTTPException(status_code=400, detail=str(e))
+    except UserVersionConflictError as e:
+        logger.warning(f"Atualização do usuário {user_id} recusada por If-Match: {e}")
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
 
 
 @router.delete(
     "/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Users"]
 )
-def delete_user(
+async def delete_user(
     user_id: int,
-    service: UserService = Depends(get_user_service),
-    current_user: schemas.UserResponse = Depends(get_current_active_user),
+    if_match: Optional[str] = Header(None),
+    service: AsyncUserService = Depends(get_user_service),
+    refresh_tokens: RefreshTokenStore = Depends(get_refresh_token_store),
+    current_user: schemas.UserResponse = Depends(get_current_verified_user),
 ):
+    """
+    Remove o usuário. Com `If-Match`, a remoção só ocorre se o usuário ainda
+    estiver na versão informada (412 caso contrário).
+    """
     if current_user.id != user_id:
         logger.warning(f"Usuário {current_user.id} tentou deletar usuário {user_id}")
         raise HTTPException(
@@ -154,10 +448,19 @@ def delete_user(
         )
 
     try:
-        if not service.delete_user(user_id):
+        expected_version = parse_if_match(if_match, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
+
+    try:
+        if not await service.delete_user(user_id, expected_version=expected_version):
             raise UserNotFoundError(f"Usuário com ID {user_id} não encontrado")
+        await refresh_tokens.revoke_user(user_id)
         logger.info(f"Usuário {user_id} deletado com sucesso")
         return None
     except UserNotFoundError as e:
         logger.warning(f"Tentativa de deletar usuário inexistente: {user_id}")
-        raise HTTPException(status_code=404, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=404, detail=str(e))
+    except UserVersionConflictError as e:
+        logger.warning(f"Remoção do usuário {user_id} recusada por If-Match: {e}")
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
\ No newline at end of file
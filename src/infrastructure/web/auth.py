@@ -1,58 +1,178 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
 
 from src.infrastructure.web import schemas
-from src.infrastructure.web.dependencies import get_db
-from src.core.services.user_service import UserService
+from src.infrastructure.web.dependencies import get_user_service
+from src.infrastructure.web.user_cache import get_auth_user_cache
+from src.core.services.async_user_service import AsyncUserService
 from src.core.exceptions import InvalidCredentialsError
-from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
-from src.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from src.infrastructure.security.password_hasher import (
+    PasswordHasherBusyError,
+    get_password_hasher,
+)
+from src.infrastructure.cache.ttl_cache import TTLCache
+from src.infrastructure.lazy_import import LazyModule
+from src.infrastructure.observability.server_timing import timed
+from src.config import Settings, get_settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# --- Contexto para Hashing de Senhas ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# python-jose é importado no primeiro token emitido ou validado
+jwt = LazyModule("jose.jwt")
+
+# --- Cache de claims de tokens já verificados ---
+# Chave: SHA-256 do token completo (incluindo a assinatura); cada entrada vive
+# no máximo até o 'exp' do próprio token. None até o primeiro uso ou create_app
+_token_claims_cache: Optional[TTLCache] = None
+
+
+def configure_token_claims_cache(settings: Settings) -> TTLCache:
+    """Aplica TOKEN_CLAIMS_CACHE_MAX_SIZE e a validade dos tokens ao cache do processo"""
+    global _token_claims_cache
+    maxsize, ttl = settings.token_claims_cache_max_size, settings.access_token_expire_minutes * 60
+    if _token_claims_cache is None:
+        _token_claims_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+    else:
+        _token_claims_cache.configure(maxsize=maxsize, ttl=ttl)
+    return _token_claims_cache
+
+
+def get_token_claims_cache() -> TTLCache:
+    """Retorna o cache configurado por create_app (ou pelas configurações ativas)"""
+    if _token_claims_cache is None:
+        configure_token_claims_cache(get_settings())
+    return _token_claims_cache
+
 
 # --- Esquema de Autenticação ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
+# Token de acesso renovado, devolvido quando o usuário altera a si mesmo com um token autocontido
+ACCESS_TOKEN_HEADER = "X-Access-Token"
+
 
 # --- Funções Auxiliares de Autenticação ---
 def verify_password(plain_password, hashed_password):
     """Verifica se a senha em texto plano corresponde ao hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    with timed("hash"):
+        return get_password_hasher().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
     """Gera hash da senha usando bcrypt"""
-    return pwd_context.hash(password)
+    with timed("hash"):
+        return get_password_hasher().hash(password)
+
+
+def _hashing_unavailable_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Password hashing is overloaded, try again later",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verifica a senha no pool de hashing sem bloquear o event loop"""
+    try:
+        with timed("hash"):
+            return await get_password_hasher().verify_async(plain_password, hashed_password)
+    except PasswordHasherBusyError:
+        raise _hashing_unavailable_exception()
+
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """
+    Verifica a senha no pool de hashing e retorna (válida, novo hash ou None);
+    o novo hash vem quando o atual usa outro esquema ou custo da política
+    """
+    try:
+        with timed("hash"):
+            return await get_password_hasher().verify_and_update_async(plain_password, hashed_password)
+    except PasswordHasherBusyError:
+        raise _hashing_unavailable_exception()
+
+
+async def get_password_hash_async(password):
+    """Gera o hash da senha no pool de hashing sem bloquear o event loop"""
+    try:
+        with timed("hash"):
+            return await get_password_hasher().hash_async(password)
+    except PasswordHasherBusyError:
+        raise _hashing_unavailable_exception()
+
+
+def access_token_claims(user) -> dict:
+    """
+    Claims de identidade do token de acesso: 'sub' (email) e, com
+    ACCESS_TOKEN_SELF_CONTAINED, também 'uid', 'username' e 'ver' (versão do usuário)
+    """
+    claims = {"sub": user.email}
+    if get_settings().access_token_self_contained:
+        claims.update({"uid": user.id, "username": user.username, "ver": user.version})
+    return claims
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Cria um token JWT de acesso"""
+    """
+    Cria um token JWT de acesso. Tokens autocontidos (com 'ver') expiram em
+    SELF_CONTAINED_TOKEN_EXPIRE_MINUTES, limitado por ACCESS_TOKEN_EXPIRE_MINUTES
+    """
+    settings = get_settings()
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(
-            minutes=ACCESS_TOKEN_EXPIRE_MINUTES
-        )
+        minutes = settings.access_token_expire_minutes
+        if "ver" in data:
+            minutes = min(minutes, settings.self_contained_token_expire_minutes)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=minutes)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with timed("jwt"):
+        encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     logger.debug(f"Token JWT criado para usuário: {data.get('sub')}")
     return encoded_jwt
 
 
-def get_current_active_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+def decode_access_token(token: str) -> dict:
+    """
+    Decodifica e valida o token JWT, reaproveitando claims já verificadas.
+    Tokens repetidos dispensam a verificação HMAC e o parsing base64/JSON.
+    """
+    cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+    token_claims_cache = get_token_claims_cache()
+    payload = token_claims_cache.get(cache_key)
+    if payload is not None:
+        return payload
+
+    settings = get_settings()
+    with timed("jwt"):
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_claims_cache.set(cache_key, payload, ttl=exp - time.time())
+    return payload
+
+
+def current_token_claims(request: Request) -> dict:
+    """Claims do token já validado por get_current_active_user nesta requisição"""
+    return getattr(request.state, "token_claims", {})
+
+
+async def get_current_active_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    service: AsyncUserService = Depends(get_user_service),
 ) -> schemas.UserResponse:
-    """Valida o token JWT e retorna o usuário ativo"""
+    """
+    Valida o token JWT e retorna o usuário ativo. As claims decodificadas
+    ficam em request.state.token_claims para as demais dependências da rota.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -60,7 +180,7 @@ def get_current_active_user(
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             logger.warning("Token JWT inválido: sub claim ausente")
@@ -68,22 +188,67 @@ def get_current_active_user(
         
         # Verificar se o token expirou
         exp = payload.get("exp")
-        if exp and datetime.fromtimestamp(exp, tz=timezone.utc) < datetime.now(timezone.utc):
+        if exp and exp < time.time():
             logger.warning(f"Token JWT expirado para usuário: {email}")
             raise credentials_exception
             
         token_data = schemas.TokenData(email=email)
-    except JWTError as e:
+    except jwt.JWTError as e:
         logger.warning(f"Erro ao decodificar token JWT: {e}")
         raise credentials_exception
+    request.state.token_claims = payload
+
+    # Token autocontido: a identidade vem das claims, sem cache nem banco. Troca
+    # aceita: até o 'exp' (curto), username/email podem estar desatualizados e um
+    # usuário removido continua autenticado nas rotas que não usam
+    # get_current_verified_user
+    if "uid" in payload and get_settings().access_token_self_contained:
+        try:
+            with timed("validate"):
+                return schemas.UserResponse(id=payload["uid"], username=payload["username"], email=email)
+        except (KeyError, ValueError):
+            logger.warning(f"Token JWT com claims de usuário inválidas: {email}")
+            raise credentials_exception
+
+    auth_user_cache = get_auth_user_cache()
+    cached_user = auth_user_cache.get(token_data.email)
+    if cached_user is not None:
+        logger.debug(f"Usuário autenticado (cache): {email}")
+        return cached_user
 
-    repository = SQLiteUserRepository(db)
-    service = UserService(repository)
-    user = service.get_user_by_email(email=token_data.email)
+    user = await service.get_user_by_email(email=token_data.email)
 
     if user is None:
         logger.warning(f"Usuário não encontrado para token válido: {email}")
         raise credentials_exception
     
     logger.debug(f"Usuário autenticado: {email}")
-    return schemas.UserResponse.model_validate(user)
+    with timed("validate"):
+        current_user = schemas.UserResponse.model_validate(user)
+    auth_user_cache.set(current_user)
+    return current_user
+
+
+async def get_current_verified_user(
+    request: Request,
+    current_user: schemas.UserResponse = Depends(get_current_active_user),
+    service: AsyncUserService = Depends(get_user_service),
+) -> schemas.UserResponse:
+    """
+    Usuário autenticado para operações sensíveis. Se o token traz a versão do
+    usuário ('ver'), confere que ele não foi alterado nem removido desde a
+    emissão (consulta apenas a versão); caso contrário, responde 401 e o
+    cliente deve obter um novo token em /token/refresh. Depois de alterar o
+    próprio usuário, o cliente recebe o token renovado em X-Access-Token.
+    """
+    token_version = current_token_claims(request).get("ver")
+    if token_version is None:
+        return current_user
+    if await service.get_user_version(current_user.id) != token_version:
+        logger.warning(f"Token desatualizado para o usuário {current_user.id}: versão {token_version}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token is outdated, refresh it",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return current_user
@@ -0,0 +1,280 @@
+"""
+Importação em massa de usuários a partir de um corpo NDJSON ou CSV em streaming.
+
+O corpo é lido e validado incrementalmente em lotes de tamanho fixo. Em cada
+lote, uma única consulta descarta os emails já cadastrados (ou repetidos no
+lote) antes do hashing; as senhas restantes são processadas em paralelo
+pelo pool de hashing e inseridas com um INSERT em lote, em sua própria
+transação. O relatório NDJSON de cada lote, na ordem de entrada, é enviado
+assim que o lote é confirmado, enquanto o restante do corpo ainda é lido; a
+última linha traz os totais. Linhas acima de MAX_LINE_CHARS são descartadas
+sem serem acumuladas, mantendo o uso de memória limitado a um lote.
+"""
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from src.core.services.async_user_service import AsyncUserService
+from src.infrastructure.security.password_hasher import get_password_hasher
+from src.infrastructure.web import schemas
+from src.infrastructure.web.dependencies import user_service_scope
+import logging
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+CSV_COLUMNS = ("username", "email", "password")
+
+# Tamanho máximo de uma linha (ou registro CSV) em caracteres; acima dele o registro é rejeitado
+MAX_LINE_CHARS = 64 * 1024
+LINE_TOO_LONG_ERROR = f"Registro excede o limite de {MAX_LINE_CHARS} caracteres"
+
+ParsedRow = Tuple[int, Union[dict, str]]
+
+
+class BulkImportFormatError(Exception):
+    """Exceção lançada quando o formato do corpo não é suportado ou é inválido."""
+    pass
+
+
+def detect_format(content_type: Optional[str]) -> str:
+    """Retorna 'ndjson' ou 'csv' a partir do Content-Type da requisição"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_MEDIA_TYPES:
+        return "csv"
+    if media_type in NDJSON_MEDIA_TYPES:
+        return "ndjson"
+    raise BulkImportFormatError(
+        f"Content-Type não suportado: '{media_type}'. Use NDJSON ou text/csv"
+    )
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: int = MAX_LINE_CHARS) -> AsyncIterator[Optional[str]]:
+    """
+    Divide o corpo em linhas decodificando UTF-8 incrementalmente. Uma linha
+    maior que max_length é descartada enquanto chega, sem ser acumulada, e
+    produzida como None.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    oversized = False
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield None if oversized or len(line) > max_length else line
+            oversized = False
+        if len(pending) > max_length:
+            oversized, pending = True, ""
+    pending += decoder.decode(b"", final=True)
+    if oversized or len(pending) > max_length:
+        yield None
+    elif pending:
+        yield pending
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """Produz (número da linha, objeto ou mensagem de erro) para cada linha NDJSON"""
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if line is None:
+            yield line_number, LINE_TOO_LONG_ERROR
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"JSON inválido: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "Cada linha deve ser um objeto JSON"
+            continue
+        yield line_number, row
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """
+    Produz (número do registro, objeto ou mensagem de erro) para cada registro CSV.
+    A primeira linha deve ser o cabeçalho com as colunas username,email,password.
+    Campos entre aspas podem conter quebras de linha (RFC 4180).
+    """
+    header: Optional[List[str]] = None
+    record_number = 0
+    buffered = ""
+    async for line in iter_lines(chunks):
+        if line is not None:
+            buffered = f"{buffered}\n{line}" if buffered else line
+        if line is None or len(buffered) > MAX_LINE_CHARS:
+            # Registro longo demais (inclusive um campo entre aspas com várias linhas)
+            if header is None:
+                raise BulkImportFormatError(f"Cabeçalho CSV excede o limite de {MAX_LINE_CHARS} caracteres")
+            record_number += 1
+            buffered = ""
+            yield record_number, LINE_TOO_LONG_ERROR
+            continue
+        # Com aspas balanceadas o registro está completo (aspas escapadas são duplicadas)
+        if buffered.count('"') % 2:
+            continue
+        record, buffered = buffered.rstrip("\r"), ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [column.strip().lower() for column in values]
+            missing = [column for column in CSV_COLUMNS if column not in header]
+            if missing:
+                raise BulkImportFormatError(f"Cabeçalho CSV sem as colunas: {', '.join(missing)}")
+            continue
+        record_number += 1
+        if len(values) != len(header):
+            yield record_number, f"Esperadas {len(header)} colunas, recebidas {len(values)}"
+            continue
+        yield record_number, dict(zip(header, values))
+    if buffered:
+        record_number += 1
+        yield record_number, "Registro CSV com aspas não fechadas"
+
+
+async def peek_rows(rows: AsyncIterator[ParsedRow]) -> AsyncIterator[ParsedRow]:
+    """
+    Lê o primeiro registro antes de a resposta começar, para que um corpo com
+    formato inválido (ex.: cabeçalho CSV sem as colunas) ainda resulte em 400;
+    retorna um iterador equivalente ao original
+    """
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def chained() -> AsyncIterator[ParsedRow]:
+        if first is not None:
+            yield first
+            async for row in rows:
+                yield row
+
+    return chained()
+
+
+class BulkImportReport:
+    """Totais da importação e codificação das linhas do relatório NDJSON"""
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+
+    @staticmethod
+    def _encode(entry: dict) -> bytes:
+        return json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    def created_line(self, row: int, user_id: int) -> bytes:
+        self.created += 1
+        return self._encode({"row": row, "status": "created", "id": user_id})
+
+    def error_line(self, row: int, error: str) -> bytes:
+        self.failed += 1
+        return self._encode({"row": row, "status": "error", "error": error})
+
+    def summary_line(self) -> bytes:
+        return self._encode({"status": "summary", "created": self.created, "failed": self.failed})
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+BatchEntry = Tuple[int, Union[schemas.UserCreate, str]]
+
+
+async def _import_batch(batch: List[BatchEntry], service: AsyncUserService, report: BulkImportReport) -> bytes:
+    """Importa um lote e retorna as linhas do relatório na ordem de entrada"""
+    outcomes: Dict[int, Union[int, str]] = {
+        index: entry for index, (_, entry) in enumerate(batch) if isinstance(entry, str)
+    }
+    candidates = [(index, entry) for index, (_, entry) in enumerate(batch) if index not in outcomes]
+
+    # Duplicados são descartados antes do hashing, que domina o custo do lote
+    existing_emails = await service.get_existing_emails(user.email for _, user in candidates)
+    seen_emails = set(existing_emails)
+    to_create = []
+    for index, user in candidates:
+        if user.email in seen_emails:
+            outcomes[index] = f"Usuário com email {user.email} já existe"
+        else:
+            seen_emails.add(user.email)
+            to_create.append((index, user))
+
+    if to_create:
+        hashed_passwords = await get_password_hasher().hash_many_async([user.password for _, user in to_create])
+        results = await service.create_users([
+            {"username": user.username, "email": user.email, "hashed_password": hashed}
+            for (_, user), hashed in zip(to_create, hashed_passwords)
+        ], known_existing=existing_emails)
+        for (index, _), result in zip(to_create, results):
+            outcomes[index] = str(result) if isinstance(result, Exception) else result.id
+
+    return b"".join(
+        report.error_line(row, outcomes[index]) if isinstance(outcomes[index], str)
+        else report.created_line(row, outcomes[index])
+        for index, (row, _) in enumerate(batch)
+    )
+
+
+async def import_users(
+    rows: AsyncIterator[ParsedRow],
+    service: AsyncUserService,
+    batch_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    Valida e importa as linhas em lotes, produzindo o relatório de cada lote
+    depois do seu commit e, por fim, a linha com os totais
+    """
+    report = BulkImportReport()
+    batch: List[BatchEntry] = []
+    async for row, data in rows:
+        if isinstance(data, str):
+            batch.append((row, data))
+        else:
+            try:
+                batch.append((row, schemas.UserCreate.model_validate(data)))
+            except ValidationError as e:
+                batch.append((row, _format_validation_error(e)))
+        if len(batch) >= batch_size:
+            yield await _import_batch(batch, service, report)
+            batch = []
+    if batch:
+        yield await _import_batch(batch, service, report)
+    logger.info(f"Importação em massa concluída: {report.created} criados, {report.failed} com erro")
+    yield report.summary_line()
+
+
+async def stream_import(rows: AsyncIterator[ParsedRow], batch_size: int) -> AsyncIterator[bytes]:
+    """Corpo da resposta de POST /users/bulk"""
+    # O serviço pertence ao gerador: a dependência por requisição é encerrada
+    # antes de a StreamingResponse começar a enviar o corpo
+    async with user_service_scope() as service:
+        async for chunk in import_users(rows, service, batch_size):
+            yield chunk
+
+
+class BulkImportResponse(StreamingResponse):
+    """
+    StreamingResponse que envia o relatório enquanto o corpo da requisição
+    ainda é lido. Não escuta http.disconnect em paralelo, como a classe base:
+    essa escuta consumiria as mensagens com o corpo. Uma desconexão interrompe
+    a leitura do corpo (ClientDisconnect) e, com ela, a importação.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
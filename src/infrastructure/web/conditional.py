@@ -0,0 +1,73 @@
+"""
+ETags e requisições condicionais das rotas de usuários.
+
+O ETag de um usuário é formado pelo id e pela versão (users.version), que é
+incrementada a cada atualização. Um If-None-Match é respondido com 304 a
+partir de uma consulta que lê apenas a versão, sem carregar nem serializar a
+linha. O ETag de uma página da listagem é um hash dos pares (id, versão) da
+página (e do total, quando X-Total-Count é pedido). Ele muda quando um
+usuário da página é alterado ou removido, ou quando outro passa a fazer parte
+dela.
+
+If-Match em PUT/DELETE informa a versão que o cliente leu. A escrita só
+ocorre se ela ainda for a atual; caso contrário, a resposta é 412.
+"""
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import Response, status
+
+ETAG_HEADER = "ETag"
+
+
+def user_etag(user_id: int, version: int) -> str:
+    """ETag forte de um usuário: muda a cada atualização"""
+    return f'"{user_id}-{version}"'
+
+
+def page_etag(versions: Iterable[Tuple[int, int]], total: Optional[int] = None) -> str:
+    """ETag forte de uma página da listagem, a partir dos pares (id, versão) e do total"""
+    digest = hashlib.blake2b(digest_size=16)
+    for user_id, version in versions:
+        digest.update(f"{user_id}:{version};".encode("ascii"))
+    if total is not None:
+        digest.update(f"total:{total}".encode("ascii"))
+    return f'"p-{digest.hexdigest()}"'
+
+
+def _entity_tags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def is_not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """Indica se If-None-Match contém o ETag atual ou '*' (comparação fraca, como no RFC 9110)"""
+    if not if_none_match:
+        return False
+    tags = _entity_tags(if_none_match)
+    if "*" in tags:
+        return True
+    return etag in {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={ETAG_HEADER: etag})
+
+
+def parse_if_match(if_match: Optional[str], user_id: int) -> Optional[int]:
+    """
+    Versão exigida por If-Match, ou None se não houver condição (cabeçalho
+    ausente ou '*'). Lança ValueError se nenhuma tag for um ETag deste usuário
+    (comparação forte: tags W/ não valem). Com várias tags do usuário, vale a
+    primeira.
+    """
+    if if_match is None:
+        return None
+    tags = _entity_tags(if_match)
+    if "*" in tags:
+        return None
+    prefix = f'"{user_id}-'
+    for tag in tags:
+        version = tag[len(prefix):-1]
+        if tag.startswith(prefix) and tag.endswith('"') and version.isascii() and version.isdigit():
+            return int(version)
+    raise ValueError("If-Match não corresponde a nenhuma versão deste usuário")
@@ -1,13 +1,146 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 from sqlalchemy.orm import Session
-from src.infrastructure.database.database import SessionLocal
+from src.config import Settings, get_settings
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.core.services.async_user_service import AsyncUserService
+from src.infrastructure.cache.backends import CacheBackend, create_cache_backend
+from src.infrastructure.cache.caching_user_repository import AsyncCachingUserRepository
+from src.infrastructure.database.async_sqlite_user_repository import AsyncSQLiteUserRepository
+from src.infrastructure.database.database import get_database
+from src.infrastructure.database.group_commit import GroupCommitUserRepository
+from src.infrastructure.database.refresh_tokens import RefreshTokenStore
+from src.infrastructure.database.sharded_user_repository import ShardedUserRepository
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+from src.infrastructure.database.threadpool_user_repository import ThreadPoolUserRepository
+from src.infrastructure.web.user_cache import get_auth_user_cache
+
+# Backend do cache read-through do repositório (None quando desabilitado)
+_user_repository_cache: Optional[CacheBackend] = None
+_user_repository_cache_configured = False
+
+
+def configure_user_repository_cache(settings: Settings) -> Optional[CacheBackend]:
+    """Cria o backend do cache read-through conforme USER_REPOSITORY_CACHE"""
+    global _user_repository_cache, _user_repository_cache_configured
+    _user_repository_cache = create_cache_backend(
+        settings.user_repository_cache,
+        maxsize=settings.user_repository_cache_max_size,
+        ttl=settings.user_repository_cache_ttl_seconds,
+        redis_url=settings.user_repository_cache_redis_url,
+    )
+    _user_repository_cache_configured = True
+    return _user_repository_cache
+
+
+def get_user_repository_cache() -> Optional[CacheBackend]:
+    """Retorna o backend configurado por create_app (ou pelas configurações ativas)"""
+    if not _user_repository_cache_configured:
+        configure_user_repository_cache(get_settings())
+    return _user_repository_cache
 
 
 def get_db():
     """
     Dependência do FastAPI para fornecer uma sessão de banco de dados por requisição.
     """
-    db = SessionLocal()
+    db = get_database().session()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependência do FastAPI para fornecer uma sessão assíncrona por requisição.
+    """
+    async with get_database().async_session() as db:
+        yield db
+
+
+@asynccontextmanager
+async def user_repository_scope() -> AsyncIterator[AsyncUserRepository]:
+    """
+    Abre o repositório configurado em REPOSITORY_BACKEND com uma sessão própria.
+    O backend "sync" executa o SQLiteUserRepository no threadpool,
+    permitindo comparar os dois adapters sob a mesma carga.
+    Se houver réplicas em DATABASE_READ_URLS, uma sessão de leitura é aberta
+    junto com a de escrita e o repositório decide qual usar por operação.
+    Com DATABASE_SHARD_URLS, o ShardedUserRepository (síncrono) é executado no
+    threadpool com uma sessão por shard, qualquer que seja o backend.
+    Com WRITE_QUEUE_ENABLED, as escritas vão para a fila de group commit e as
+    leituras continuam no repositório do backend.
+    """
+    database = get_database()
+    write_queue = database.write_queue
+    if database.sharded:
+        sessions = database.shard_sessions()
+        try:
+            yield ThreadPoolUserRepository(ShardedUserRepository(sessions))
+        finally:
+            for session in sessions:
+                session.close()
+    elif database.settings.repository_backend == "sync":
+        db: Session = database.session()
+        read_db = database.read_session()
+        try:
+            repository = ThreadPoolUserRepository(SQLiteUserRepository(db, read_session=read_db))
+            yield repository if write_queue is None else GroupCommitUserRepository(repository, write_queue)
+        finally:
+            if read_db is not None:
+                read_db.close()
+            db.close()
+    else:
+        async with database.async_session() as db:
+            read_db = database.async_read_session()
+            try:
+                repository = AsyncSQLiteUserRepository(db, read_session=read_db)
+                yield repository if write_queue is None else GroupCommitUserRepository(repository, write_queue)
+            finally:
+                if read_db is not None:
+                    await read_db.close()
+
+
+@asynccontextmanager
+async def user_service_scope(cached: bool = True) -> AsyncIterator[AsyncUserService]:
+    """
+    Abre o serviço sobre o repositório de user_repository_scope. O cache de
+    usuários autenticados é invalidado pelo serviço em update/delete. Com
+    USER_REPOSITORY_CACHE habilitado, o repositório é envolvido pelo cache
+    read-through; com cached=False, as leituras vão direto ao banco e as
+    escritas continuam invalidando o cache.
+    """
+    repository_cache = get_user_repository_cache()
+    async with user_repository_scope() as repository:
+        if repository_cache is not None:
+            repository = AsyncCachingUserRepository(
+                repository,
+                repository_cache,
+                negative_ttl=get_settings().user_repository_cache_negative_ttl_seconds,
+                read_through=cached,
+            )
+        yield AsyncUserService(repository, user_cache=get_auth_user_cache())
+
+
+async def get_user_service() -> AsyncIterator[AsyncUserService]:
+    """Dependência do FastAPI que instancia o serviço com o repositório configurado"""
+    async with user_service_scope() as service:
+        yield service
+
+
+async def get_uncached_user_service() -> AsyncIterator[AsyncUserService]:
+    """
+    Serviço que lê os usuários direto do banco, sem o cache read-through.
+    Usado ao emitir tokens: a versão gravada na claim 'ver' precisa ser a atual,
+    e não a de uma entrada em cache ainda não invalidada (ex.: em outro worker).
+    As escritas (ex.: hash refeito no login) invalidam o cache normalmente.
+    """
+    async with user_service_scope(cached=False) as service:
+        yield service
+
+
+def get_refresh_token_store() -> RefreshTokenStore:
+    """Dependência do FastAPI com o armazenamento de refresh tokens do banco principal"""
+    return RefreshTokenStore(get_database(), ttl_seconds=get_settings().refresh_token_expire_days * 86400)
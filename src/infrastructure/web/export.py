@@ -0,0 +1,51 @@
+"""
+Exportação de todos os usuários em NDJSON ou CSV via StreamingResponse.
+
+As linhas vêm do repositório como tuplas (id, username, email) lidas por um
+cursor em lotes e são serializadas diretamente, sem criar modelos Pydantic
+por linha. A resposta começa a ser enviada antes do fim da consulta e o uso
+de memória fica limitado a um lote.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator, Iterable, Tuple
+
+from src.infrastructure.web.dependencies import user_repository_scope
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+Row = Tuple[int, str, str]
+
+
+def encode_ndjson(rows: Iterable[Row]) -> bytes:
+    dumps = json.dumps
+    return "".join(
+        f'{{"id":{user_id},"username":{dumps(username, ensure_ascii=False)},"email":{dumps(email, ensure_ascii=False)}}}\n'
+        for user_id, username, email in rows
+    ).encode("utf-8")
+
+
+def encode_csv(rows: Iterable[Row]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_users_export(body_format: str, batch_size: int) -> AsyncIterator[bytes]:
+    """Gera o conteúdo da exportação em blocos de até batch_size usuários"""
+    encode = encode_csv if body_format == "csv" else encode_ndjson
+    if body_format == "csv":
+        yield encode_csv([("id", "username", "email")])
+
+    # A sessão pertence ao gerador: a dependência por requisição é encerrada
+    # antes de a StreamingResponse começar a enviar o corpo
+    async with user_repository_scope() as repository:
+        batch = []
+        async for row in repository.stream_all(batch_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield encode(batch)
+                batch = []
+        if batch:
+            yield encode(batch)
@@ -0,0 +1,202 @@
+"""
+Limites adaptativos de concorrência e descarte de carga por classe de rotas.
+
+Um pico de POST /token ocupa a CPU com bcrypt e, sem limites, todas as rotas
+do worker ficam lentas juntas, inclusive leituras baratas e /health. Aqui
+cada requisição é classificada (auth, write, read, health) e precisa de uma
+vaga no limitador da sua classe antes de chegar à aplicação:
+
+- abaixo do limite, segue direto;
+- acima dele, espera em uma fila limitada por no máximo queue_timeout_ms;
+- com a fila cheia ou a espera esgotada, recebe 503 com Retry-After, sem
+  consumir CPU da aplicação.
+
+O limite de cada classe é ajustado por AIMD a partir da latência observada
+(tempo até o início da resposta, sem a espera na fila): cresce uma vaga por
+resposta abaixo de target_ms enquanto o limite está em uso, e é multiplicado
+por BACKOFF_RATIO quando uma resposta passa do alvo. Assim, quando o bcrypt
+satura a CPU, o limite de auth encolhe e o excesso é recusado cedo, enquanto
+read e health mantêm os seus orçamentos.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Mapping, Optional
+
+from src.config import ConcurrencyLimit
+from src.infrastructure.observability.metrics import http_concurrency_limit, http_requests_shed
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fator aplicado ao limite quando uma resposta passa da latência alvo
+BACKOFF_RATIO = 0.9
+RETRY_AFTER_SECONDS = "1"
+
+HEALTH_PATHS = frozenset({"/", "/health", "/metrics"})
+# Rotas que calculam hashes bcrypt (login, cadastro e importação em massa)
+AUTH_ROUTES = frozenset({("POST", "/token"), ("POST", "/users/"), ("POST", "/users/bulk")})
+
+
+def classify_request(method: str, path: str) -> str:
+    """Classe de rotas de uma requisição: auth, write, read ou health"""
+    if path in HEALTH_PATHS:
+        return "health"
+    if (method, path) in AUTH_ROUTES:
+        return "auth"
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return "read"
+    return "write"
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Requisição recusada: fila da classe cheia ou espera por uma vaga esgotada"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limite de requisições simultâneas de uma classe, ajustado por AIMD.
+    Usado apenas a partir do event loop (sem locks).
+    """
+
+    def __init__(self, name: str, config: ConcurrencyLimit):
+        self.name = name
+        self.config = config
+        self.limit = float(config.initial)
+        self.in_flight = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._queue_timeout = config.queue_timeout_ms / 1000
+        self._target = config.target_ms / 1000
+        http_concurrency_limit.labels(name).set(int(self.limit))
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> None:
+        """Obtém uma vaga, aguardando na fila se preciso; lança ConcurrencyLimitExceeded"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.config.queue or self._queue_timeout == 0:
+            self._reject("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A vaga é contada em in_flight por _wake_waiters antes de resolver o Future
+            await asyncio.wait_for(waiter, self._queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self._reject("timeout")
+        except BaseException:
+            # Cancelada (cliente desconectou) depois de receber a vaga: devolve-a
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            else:
+                self._discard(waiter)
+            raise
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """Devolve a vaga e ajusta o limite pela latência da resposta (None não ajusta)"""
+        saturated = self.in_flight * 2 >= self.limit
+        self.in_flight -= 1
+        if latency is not None:
+            previous = int(self.limit)
+            if latency > self._target:
+                self.limit = max(self.config.min, self.limit * BACKOFF_RATIO)
+            elif saturated:
+                self.limit = min(self.config.max, self.limit + 1)
+            if int(self.limit) != previous:
+                http_concurrency_limit.labels(self.name).set(int(self.limit))
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _reject(self, reason: str) -> None:
+        self.rejected[reason] += 1
+        http_requests_shed.labels(self.name, reason).inc()
+        raise ConcurrencyLimitExceeded(reason)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "rejected": dict(self.rejected),
+        }
+
+
+def build_limiters(limits: Mapping[str, ConcurrencyLimit]) -> Dict[str, AdaptiveConcurrencyLimiter]:
+    return {name: AdaptiveConcurrencyLimiter(name, config) for name, config in limits.items()}
+
+
+_OVERLOADED_BODY = json.dumps({"detail": "Server is overloaded, try again later"}).encode()
+
+
+async def _send_overloaded(send) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(_OVERLOADED_BODY)).encode()),
+            (b"retry-after", RETRY_AFTER_SECONDS.encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": _OVERLOADED_BODY})
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Middleware ASGI que aplica o limitador da classe de cada requisição.
+    Deve ser o mais externo, para que as recusas não passem pelos demais.
+    """
+
+    def __init__(self, app, limiters: Mapping[str, AdaptiveConcurrencyLimiter],
+                 classify: Callable[[str, str], str] = classify_request):
+        self.app = app
+        self.limiters = limiters
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[self.classify(scope["method"], scope["path"])]
+        try:
+            await limiter.acquire()
+        except ConcurrencyLimitExceeded:
+            await _send_overloaded(send)
+            return
+
+        started = time.perf_counter()
+        latency = None
+
+        async def send_with_latency(message):
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_latency)
+        finally:
+            # A vaga fica ocupada até o fim do corpo (respostas em streaming incluídas)
+            limiter.release(latency if latency is not None else time.perf_counter() - started)
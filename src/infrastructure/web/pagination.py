@@ -0,0 +1,50 @@
+"""
+Cursores opacos para a paginação por keyset das listagens.
+O cliente apenas repassa o valor recebido em X-Next-Cursor; o formato
+interno (base64 de um JSON) pode mudar sem quebrar a API.
+"""
+import base64
+import binascii
+import json
+from typing import Tuple
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str, *keys: str) -> Tuple[int, ...]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = tuple(payload[key] for key in keys)
+    except (binascii.Error, ValueError, UnicodeError, KeyError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+    if any(not isinstance(value, int) or isinstance(value, bool) for value in values):
+        raise ValueError("Cursor inválido")
+    return values
+
+
+def encode_cursor(last_id: int) -> str:
+    """Codifica o último id visto em um cursor opaco e seguro para URLs"""
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decodifica um cursor gerado por encode_cursor, retornando o último id visto"""
+    (last_id,) = _decode(cursor, "id")
+    return last_id
+
+
+def encode_search_cursor(rank: int, last_id: int) -> str:
+    """Cursor da busca: posição (rank, id) do último resultado visto"""
+    return _encode({"rank": rank, "id": last_id})
+
+
+def decode_search_cursor(cursor: str) -> Tuple[int, int]:
+    """Decodifica um cursor gerado por encode_search_cursor"""
+    return _decode(cursor, "rank", "id")
@@ -28,6 +28,8 @@ class UserResponse(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    # Ausente com REFRESH_TOKEN_EXPIRE_DAYS=0
+    refresh_token: Optional[str] = None
 
 
 class TokenData(BaseModel):
@@ -0,0 +1,47 @@
+"""
+Serialização direta de usuários do banco para JSON.
+
+Os dados vindos do repositório já foram validados na escrita; revalidá-los no
+response_model do FastAPI (EmailStr incluído) custa CPU em toda leitura. As
+rotas de leitura montam UserResponse sem validação (model_construct) e
+codificam com TypeAdapters pré-compilados, devolvendo os bytes prontos. A
+saída é idêntica byte a byte à do caminho padrão (response_model + JSONResponse).
+"""
+from typing import Iterable, List, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from src.core.models import User as UserDomain
+from src.infrastructure.web import schemas
+
+_user_adapter = TypeAdapter(schemas.UserResponse)
+_user_list_adapter = TypeAdapter(List[schemas.UserResponse])
+# Cabeçalhos que descrevem o corpo: valem os da resposta codificada
+_BODY_HEADERS = (b"content-length", b"content-type")
+
+
+def to_response(user: UserDomain) -> schemas.UserResponse:
+    """Monta o schema de saída a partir do domínio, sem revalidar os campos"""
+    return schemas.UserResponse.model_construct(id=user.id, username=user.username, email=user.email)
+
+
+def encode_user(user: UserDomain) -> bytes:
+    return _user_adapter.dump_json(to_response(user))
+
+
+def encode_users(users: Iterable[UserDomain]) -> bytes:
+    return _user_list_adapter.dump_json([to_response(user) for user in users])
+
+
+def json_response(content: bytes, response: Optional[Response] = None) -> Response:
+    """
+    Resposta com o JSON já codificado. Cabeçalhos definidos no parâmetro
+    Response da rota (ex.: X-Next-Cursor) são copiados, como o FastAPI faz.
+    """
+    encoded = Response(content=content, media_type="application/json")
+    if response is not None:
+        encoded.raw_headers.extend(
+            (name, value) for name, value in response.raw_headers if name not in _BODY_HEADERS
+        )
+    return encoded
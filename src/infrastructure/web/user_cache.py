@@ -0,0 +1,77 @@
+"""
+Cache dos usuários autenticados resolvidos por get_current_active_user.
+
+Evita uma consulta ao banco por requisição protegida apenas para confirmar
+que o usuário do token ainda existe. O AsyncUserService invalida as entradas em
+update/delete; entre workers diferentes a defasagem é limitada pelo TTL.
+"""
+from typing import Optional
+
+from src.config import Settings, get_settings
+from src.core.models import User
+from src.core.ports.user_cache import UserCache
+from src.infrastructure.cache.ttl_cache import TTLCache
+from src.infrastructure.web import schemas
+
+
+class AuthenticatedUserCache(UserCache):
+    """Cache de UserResponse indexado pelo email (claim 'sub' do token)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._users = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Índice id -> email: permite invalidar o email antigo de um usuário renomeado
+        self._email_by_id = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def configure(self, maxsize: int, ttl: float) -> None:
+        """Redefine tamanho e TTL (aplicado por create_app), descartando as entradas"""
+        self._users.configure(maxsize=maxsize, ttl=ttl)
+        self._email_by_id.configure(maxsize=maxsize, ttl=ttl)
+
+    def get(self, email: str) -> Optional[schemas.UserResponse]:
+        user = self._users.get(email)
+        if user is not None:
+            # Mantém o índice id -> email na mesma ordem LRU das entradas: o
+            # serviço invalida apenas pelo usuário atualizado e o email antigo
+            # é encontrado por aqui
+            self._email_by_id.get(user.id)
+        return user
+
+    def set(self, user: schemas.UserResponse) -> None:
+        self._users.set(user.email, user)
+        self._email_by_id.set(user.id, user.email)
+
+    def invalidate_user(self, user: User) -> None:
+        self._users.delete(user.email)
+        previous_email = self._email_by_id.get(user.id)
+        if previous_email is not None:
+            self._users.delete(previous_email)
+        self._email_by_id.delete(user.id)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._email_by_id.clear()
+
+    def stats(self) -> dict:
+        return self._users.stats()
+
+
+# Instância compartilhada pelo processo (None até o primeiro uso ou create_app)
+_auth_user_cache: Optional[AuthenticatedUserCache] = None
+
+
+def configure_auth_user_cache(settings: Settings) -> AuthenticatedUserCache:
+    """Aplica AUTH_USER_CACHE_* ao cache do processo, descartando as entradas"""
+    global _auth_user_cache
+    maxsize, ttl = settings.auth_user_cache_max_size, settings.auth_user_cache_ttl_seconds
+    if _auth_user_cache is None:
+        _auth_user_cache = AuthenticatedUserCache(maxsize=maxsize, ttl=ttl)
+    else:
+        _auth_user_cache.configure(maxsize=maxsize, ttl=ttl)
+    return _auth_user_cache
+
+
+def get_auth_user_cache() -> AuthenticatedUserCache:
+    """Retorna o cache configurado por create_app (ou pelas configurações ativas)"""
+    if _auth_user_cache is None:
+        configure_auth_user_cache(get_settings())
+    return _auth_user_cache
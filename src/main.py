@@ -1,42 +1,181 @@
+"""
+Ponto de entrada da aplicação.
+
+create_app(settings) monta a aplicação sem efeitos colaterais pesados: os
+engines são criados no primeiro uso, o esquema é criado no startup (lifespan)
+e bibliotecas como passlib e jose são importadas na primeira rota que as usa.
+
+    uvicorn src.main:app                       # configurações do ambiente/.env
+    uvicorn --factory src.main:create_app      # idem, chamando a fábrica
+"""
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime
+from typing import Optional
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from src.config import Settings, configure_logging, configure_settings, load_settings
 from src.infrastructure.web.api import router as api_router
-from src.infrastructure.database.database import create_db_and_tables
+from src.infrastructure.database.database import Database, configure_database
+from src.infrastructure.security.password_hasher import configure_password_hasher
+from src.infrastructure.web.user_cache import configure_auth_user_cache
+from src.infrastructure.web.auth import configure_token_claims_cache
+from src.infrastructure.web.dependencies import configure_user_repository_cache
+from src.infrastructure.web.load_shedding import ConcurrencyLimitMiddleware, build_limiters
+from src.infrastructure.observability.server_timing import ServerTimingMiddleware
+from src.infrastructure.observability.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MetricsExporter,
+    MetricsMiddleware,
+    cache_collector,
+    registry as metrics_registry,
+)
 import logging
-from datetime import datetime
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
-# Cria as tabelas no banco de dados na inicialização
-try:
-    create_db_and_tables()
-    logger.info("🚀 Aplicação inicializada com sucesso")
-except Exception as e:
-    logger.error(f"❌ Erro na inicialização: {e}")
-    raise
-
-# Instancia a aplicação FastAPI
-app = FastAPI(
-    title="API de Gerenciamento de Usuários",
-    description="Uma API REST para gerenciar usuários seguindo a Arquitetura Hexagonal.",
-    version="1.0.0",
-)
 
-# Inclui o roteador da API
-app.include_router(api_router)
+async def _reconcile_user_count_periodically(database: Database, interval: float) -> None:
+    """Confere o contador de usuários com COUNT(*) a cada intervalo, fora do event loop"""
+    from anyio import to_thread
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await to_thread.run_sync(database.reconcile_user_count)
+        except Exception as e:
+            logger.error(f"❌ Erro ao conferir o contador de usuários: {e}")
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Cria a aplicação com as configurações informadas (padrão: ambiente e .env).
+    As configurações passam a ser as ativas do processo e são aplicadas ao
+    banco, ao pool de hashing e aos caches compartilhados.
+    """
+    settings = settings or load_settings()
+    configure_settings(settings)
+    configure_logging()
+
+    database = configure_database(settings)
+    password_hasher = configure_password_hasher(settings)
+    auth_user_cache = configure_auth_user_cache(settings)
+    token_claims_cache = configure_token_claims_cache(settings)
+    user_repository_cache = configure_user_repository_cache(settings)
+    concurrency_limiters = (
+        build_limiters(settings.concurrency_limits) if settings.concurrency_limit_enabled else None
+    )
+
+    # Métricas do processo; com METRICS_MULTIPROC_DIR, somadas entre os workers
+    metrics_exporter = MetricsExporter(
+        metrics_registry,
+        multiproc_dir=settings.metrics_multiproc_dir or None,
+        flush_interval=settings.metrics_flush_interval_seconds,
+    )
+    metrics_registry.add_collector(cache_collector(lambda: {
+        "auth_user": auth_user_cache.stats(),
+        "token_claims": token_claims_cache.stats(),
+        "user_repository": user_repository_cache.stats() if user_repository_cache else None,
+    }), key="caches")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Cria as tabelas no banco de dados na inicialização
+        try:
+            database.create_tables()
+            logger.info("🚀 Aplicação inicializada com sucesso")
+        except Exception as e:
+            logger.error(f"❌ Erro na inicialização: {e}")
+            raise
+        if settings.metrics_enabled:
+            metrics_exporter.start()
+        reconcile_task = None
+        if settings.user_count_reconcile_interval_seconds > 0:
+            reconcile_task = asyncio.create_task(_reconcile_user_count_periodically(
+                database, settings.user_count_reconcile_interval_seconds
+            ))
+        yield
+        if reconcile_task is not None:
+            reconcile_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await reconcile_task
+        metrics_exporter.stop()
+        # Encerra os processos do pool de hashing junto com a aplicação
+        password_hasher.shutdown()
+        await database.dispose()
+
+    # Instancia a aplicação FastAPI
+    app = FastAPI(
+        title="API de Gerenciamento de Usuários",
+        description="Uma API REST para gerenciar usuários seguindo a Arquitetura Hexagonal.",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    app.state.settings = settings
+
+    # Inclui o roteador da API
+    app.include_router(api_router)
+
+    # Tempo por fase (SQL, bcrypt, JWT, pydantic) no cabeçalho Server-Timing
+    if settings.server_timing_enabled:
+        app.add_middleware(ServerTimingMiddleware)
+    # Latência por rota e requisições em andamento em /metrics
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+    # Limites de concorrência por classe de rotas; o último adicionado é o mais externo
+    if concurrency_limiters:
+        app.add_middleware(ConcurrencyLimitMiddleware, limiters=concurrency_limiters)
+
+    @app.get("/", tags=["Root"])
+    def read_root():
+        return {"message": "Bem-vindo à API de Gerenciamento de Usuários!"}
+
+    @app.get("/health", tags=["Health"])
+    def health_check():
+        """Endpoint de verificação de saúde da aplicação"""
+        try:
+            # Uma consulta por verificação; os PRAGMAs foram lidos no startup
+            database.ping()
+            sqlite_pragmas = database.effective_sqlite_pragmas()
+            database_status = "connected"
+        except Exception as e:
+            logger.error(f"❌ Banco de dados indisponível: {e}")
+            sqlite_pragmas, database_status = {}, "unavailable"
+        return {
+            "status": "healthy" if database_status == "connected" else "degraded",
+            "timestamp": datetime.now().isoformat(),
+            "version": "1.0.0",
+            "database": database_status,
+            "sqlite_pragmas": sqlite_pragmas,
+            "password_hashing": password_hasher.snapshot(),
+            "auth_user_cache": auth_user_cache.stats(),
+            "token_claims_cache": token_claims_cache.stats(),
+            "user_repository_cache": user_repository_cache.stats() if user_repository_cache else None,
+            "write_queue": database.write_queue.stats() if database.write_queue else None,
+            "concurrency_limits": {
+                name: limiter.snapshot() for name, limiter in concurrency_limiters.items()
+            } if concurrency_limiters else None,
+        }
+
+    if settings.metrics_enabled:
+        @app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+        def metrics():
+            """Métricas no formato texto do Prometheus"""
+            return PlainTextResponse(metrics_exporter.render(), media_type=METRICS_CONTENT_TYPE)
+
+    return app
 
 
-@app.get("/", tags=["Root"])
-def read_root():
-    return {"message": "Bem-vindo à API de Gerenciamento de Usuários!"}
+_app: Optional[FastAPI] = None
 
 
-@app.get("/health", tags=["Health"])
-def health_check():
-    """Endpoint de verificação de saúde da aplicação"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0",
-        "database": "connected"
-    }
+def __getattr__(name: str):
+    # "src.main:app" é criado no primeiro acesso: importar o módulo não monta a aplicação
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
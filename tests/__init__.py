@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+
+def user_data(index: int, **overrides) -> dict:
+    """Dados de criação de um usuário de teste, com username e email derivados do índice"""
+    data = {"username": f"user{index}", "email": f"user{index}@example.com", "hashed_password": "h"}
+    data.update(overrides)
+    return data
+
+
+def create_memory_engine():
+    """Engine de um banco SQLite em memória, compartilhado entre as conexões, com o esquema criado"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    from src.infrastructure.database.database import Base
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine
+
+
+class SQLiteRepositoryTestMixin:
+    """
+    Para testes do SQLiteUserRepository: um banco em memória novo por teste,
+    em self.engine, com a sessão em self.session e o repositório em self.repository.
+    """
+
+    def setUp(self):
+        from sqlalchemy.orm import sessionmaker
+
+        from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+
+        super().setUp()
+        self.engine = create_memory_engine()
+        self.session = sessionmaker(bind=self.engine)()
+        self.repository = SQLiteUserRepository(self.session)
+        self.addCleanup(self.engine.dispose)
+        self.addCleanup(self.session.close)
+
+
+class AppStateTestMixin:
+    """
+    Para testes que criam a aplicação: create_app substitui as configurações e
+    o Database do processo, restaurados ao fim de cada teste. Oferece um
+    diretório temporário para os bancos SQLite.
+    """
+
+    def setUp(self):
+        import src.config
+        import src.infrastructure.database.database as database_module
+
+        super().setUp()
+        self.previous = (src.config._active_settings, database_module._database)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        # Executado depois do tearDown da subclasse (ex.: fechar o TestClient)
+        self.addCleanup(self._restore_app_state)
+
+    def _restore_app_state(self):
+        import src.config
+        import src.infrastructure.database.database as database_module
+
+        src.config.configure_settings(self.previous[0])
+        database_module._database = self.previous[1]
+        self.tmpdir.cleanup()
+
+    def database_url(self, name: str = "users.db") -> str:
+        """URL de um banco SQLite no diretório temporário do teste"""
+        return f"sqlite:///{os.path.join(self.tmpdir.name, name)}"
@@ -69,6 +69,11 @@ class TestAPIEndpoints:
         # Pode retornar 200 (usuários) ou 500 (erro de banco), mas não 422
         assert response.status_code in [200, 500]
 
+    def test_users_endpoint_invalid_cursor(self):
+        """Testa que um cursor malformado é rejeitado com 400"""
+        response = client.get("/users/?after=not-a-cursor")
+        assert response.status_code == 400
+
     def test_user_by_id_invalid_id(self):
         """Testa busca de usuário com ID inválido"""
         response = client.get("/users/abc")  # ID não numérico
@@ -0,0 +1,191 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect
+
+import src.config
+import src.infrastructure.database.database as database_module
+from src.config import Settings, get_settings
+from src.infrastructure.database.database import Database
+from src.infrastructure.lazy_import import LazyModule
+from src.infrastructure.security.password_hasher import get_password_hasher
+from src.main import create_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestSettings(unittest.TestCase):
+
+    def test_from_env_parses_values(self):
+        """Testa a leitura das configurações de um mapeamento de variáveis"""
+        settings = Settings.from_env({
+            "SECRET_KEY": "s3cr3t",
+            "ACCESS_TOKEN_EXPIRE_MINUTES": "15",
+            "DATABASE_READ_URLS": "sqlite:///a.db, sqlite:///b.db",
+            "METRICS_ENABLED": "false",
+            "REPOSITORY_BACKEND": "SYNC",
+        })
+        self.assertEqual(settings.secret_key, "s3cr3t")
+        self.assertEqual(settings.access_token_expire_minutes, 15)
+        self.assertEqual(settings.database_read_urls, ("sqlite:///a.db", "sqlite:///b.db"))
+        self.assertFalse(settings.metrics_enabled)
+        self.assertEqual(settings.repository_backend, "sync")
+
+    def test_from_env_uses_defaults(self):
+        """Testa que variáveis ausentes usam os padrões de Settings"""
+        settings = Settings.from_env({})
+        self.assertEqual(settings.algorithm, "HS256")
+        self.assertEqual(settings.repository_backend, "async")
+        self.assertIn("user_manager.db", settings.database_url)
+
+    def test_invalid_values_raise(self):
+        """Testa a validação das configurações"""
+        with self.assertRaises(ValueError):
+            Settings(repository_backend="threads")
+        with self.assertRaises(ValueError):
+            Settings.from_env({"EXPORT_BATCH_SIZE": "0"})
+
+
+class TestLazyDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.settings = Settings(
+            database_url=f"sqlite:///{os.path.join(self.tmpdir.name, 'lazy.db')}",
+            metrics_enabled=False,
+            server_timing_enabled=False,
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_engine_created_on_first_use(self):
+        """Testa que o Database não cria engines nem o arquivo do banco até o primeiro uso"""
+        database = Database(self.settings)
+        self.assertIsNone(database._engine)
+        self.assertIsNone(database._async_engine)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "lazy.db")))
+
+        session = database.session()
+        session.close()
+        self.assertIsNotNone(database._engine)
+        self.assertIsNone(database._async_engine)
+        self.assertIn("users", inspect(database.engine).get_table_names())
+        database.engine.dispose()
+
+    def test_no_read_replicas(self):
+        """Testa que sem réplicas configuradas não há sessão de leitura"""
+        database = Database(self.settings)
+        self.assertIsNone(database.read_session())
+        self.assertEqual(database.read_engines, [])
+
+    def test_module_engine_is_deprecated(self):
+        """Testa que engine/SessionLocal do módulo avisam e apontam para get_database()"""
+        previous = database_module._database
+        database_module._database = Database(self.settings)
+        try:
+            with self.assertWarns(DeprecationWarning):
+                engine = database_module.engine
+            self.assertIs(engine, database_module.get_database().engine)
+            engine.dispose()
+            with self.assertRaises(AttributeError):
+                database_module.async_engine
+        finally:
+            database_module._database = previous
+
+
+class TestCreateApp(unittest.TestCase):
+
+    def setUp(self):
+        self.previous_settings = src.config._active_settings
+        self.previous_database = database_module._database
+        self.previous_hasher = (get_password_hasher().workers, get_password_hasher().max_pending)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.settings = Settings(
+            database_url=f"sqlite:///{os.path.join(self.tmpdir.name, 'app.db')}",
+            password_hash_workers=0,
+            metrics_enabled=False,
+            server_timing_enabled=False,
+        )
+
+    def tearDown(self):
+        src.config.configure_settings(self.previous_settings)
+        database_module._database = self.previous_database
+        get_password_hasher().configure(*self.previous_hasher)
+        self.tmpdir.cleanup()
+
+    def test_injected_settings_are_used(self):
+        """Testa que create_app aplica as configurações recebidas ao processo"""
+        app = create_app(self.settings)
+        self.assertIs(app.state.settings, self.settings)
+        self.assertIs(get_settings(), self.settings)
+        self.assertEqual(get_password_hasher().workers, 0)
+
+        with TestClient(app) as client:
+            health = client.get("/health")
+            self.assertEqual(health.status_code, 200)
+            self.assertEqual(health.json()["database"], "connected")
+            # METRICS_ENABLED=false não registra a rota
+            self.assertEqual(client.get("/metrics").status_code, 404)
+            self.assertNotIn("server-timing", health.headers)
+            self.assertEqual(health.json()["sqlite_pragmas"]["journal_mode"], "WAL")
+
+            # Os PRAGMAs efetivos vêm do startup: cada verificação faz uma única consulta
+            statements = []
+            engine = database_module.get_database().engine
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(engine, "before_cursor_execute", listener)
+            try:
+                client.get("/health")
+            finally:
+                event.remove(engine, "before_cursor_execute", listener)
+            self.assertEqual(statements, ["SELECT 1"])
+
+            created = client.post(
+                "/users/", json={"username": "fabrica", "email": "fabrica@example.com", "password": "pw"}
+            )
+            self.assertEqual(created.status_code, 201)
+
+    def test_create_app_does_not_open_database(self):
+        """Testa que o engine só é criado no startup da aplicação"""
+        create_app(self.settings)
+        self.assertIsNone(database_module.get_database()._engine)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "app.db")))
+
+
+class TestImportSideEffects(unittest.TestCase):
+
+    def test_import_main_is_side_effect_free(self):
+        """Testa que importar src.main não monta a aplicação, não lê configurações nem importa passlib/jose"""
+        code = (
+            "import src.config as config; created = []; post_init = config.Settings.__post_init__; "
+            "config.Settings.__post_init__ = lambda self: (created.append(self), post_init(self))[1]; "
+            "import sys, src.main, src.infrastructure.database.database as db; "
+            "print(db._database is None, 'passlib' in sys.modules, 'jose' in sys.modules, "
+            "'_app' in vars(src.main) and src.main._app is not None, len(created))"
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = subprocess.run(
+                [sys.executable, "-c", code], cwd=tmpdir, capture_output=True, text=True, check=True,
+                env={**os.environ, "PYTHONPATH": ROOT, "DATABASE_URL": f"sqlite:///{tmpdir}/side.db"},
+            ).stdout
+            self.assertFalse(os.path.exists(os.path.join(tmpdir, "side.db")))
+        self.assertEqual(output.split(), ["True", "False", "False", "False", "0"])
+
+
+class TestLazyModule(unittest.TestCase):
+
+    def test_imports_on_first_attribute_access(self):
+        """Testa que o módulo é importado apenas no primeiro acesso"""
+        module = LazyModule("json")
+        self.assertIsNone(module._module)
+        self.assertEqual(module.dumps([1]), "[1]")
+        self.assertIsNotNone(module._module)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.infrastructure.database.async_sqlite_user_repository import AsyncSQLiteUserRepository
+from src.infrastructure.database.database import Base, get_async_database_url
+from src.core.models import User as UserDomain
+from src.core.exceptions import UserAlreadyExistsError
+
+
+class TestAsyncSQLiteUserRepository(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        # Banco em memória compartilhado entre as conexões do engine
+        self.engine = create_async_engine(
+            "sqlite+aiosqlite:///:memory:", poolclass=StaticPool
+        )
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.repository = AsyncSQLiteUserRepository(self.session)
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def _add_user(self, index: int) -> UserDomain:
+        return await self.repository.add({
+            "username": f"user{index}",
+            "email": f"user{index}@example.com",
+            "hashed_password": "hashed_password",
+        })
+
+    async def test_add_and_get_by_id(self):
+        """Testa adição e busca por ID"""
+        created = await self._add_user(1)
+
+        self.assertIsInstance(created, UserDomain)
+        self.assertIsNotNone(created.id)
+        found = await self.repository.get_by_id(created.id)
+        self.assertEqual(found, created)
+
+    async def test_get_by_email(self):
+        """Testa busca por email - encontrado e não encontrado"""
+        created = await self._add_user(1)
+
+        self.assertEqual(await self.repository.get_by_email("user1@example.com"), created)
+        self.assertIsNone(await self.repository.get_by_email("missing@example.com"))
+
+    async def test_add_many_and_get_existing_emails(self):
+        """Testa inserção em lote preservando a ordem e a consulta de emails existentes"""
+        created = await self.repository.add_many([
+            {"username": f"bulk{index}", "email": f"bulk{index}@example.com", "hashed_password": "h"}
+            for index in range(3)
+        ])
+
+        self.assertEqual([user.username for user in created], ["bulk0", "bulk1", "bulk2"])
+        self.assertEqual(len({user.id for user in created}), 3)
+        existing = await self.repository.get_existing_emails(
+            ["bulk1@example.com", "missing@example.com"]
+        )
+        self.assertEqual(existing, {"bulk1@example.com"})
+
+    async def test_add_many_duplicate_email(self):
+        """Testa que um email duplicado desfaz o lote inteiro"""
+        await self._add_user(1)
+
+        with self.assertRaises(UserAlreadyExistsError):
+            await self.repository.add_many([
+                {"username": "new", "email": "new@example.com", "hashed_password": "h"},
+                {"username": "dup", "email": "user1@example.com", "hashed_password": "h"},
+            ])
+        self.assertIsNone(await self.repository.get_by_email("new@example.com"))
+
+    async def test_get_all_with_pagination(self):
+        """Testa listagem com skip e limit"""
+        for index in range(5):
+            await self._add_user(index)
+
+        users = await self.repository.get_all(skip=1, limit=2)
+
+        self.assertEqual([user.username for user in users], ["user1", "user2"])
+
+    async def test_get_all_after_keyset(self):
+        """Testa paginação por keyset a partir do último id visto"""
+        created = [await self._add_user(index) for index in range(5)]
+
+        first_page = await self.repository.get_all_after(limit=2)
+        next_page = await self.repository.get_all_after(after_id=first_page[-1].id, limit=2)
+
+        self.assertEqual(first_page, created[:2])
+        self.assertEqual(next_page, created[2:4])
+
+    async def test_stream_all(self):
+        """Testa leitura em streaming de tuplas ordenadas por id"""
+        for index in range(3):
+            await self._add_user(index)
+
+        rows = [row async for row in self.repository.stream_all(batch_size=2)]
+
+        self.assertEqual([row[1:] for row in rows], [
+            ("user0", "user0@example.com"),
+            ("user1", "user1@example.com"),
+            ("user2", "user2@example.com"),
+        ])
+
+    async def test_update(self):
+        """Testa atualização de usuário existente e inexistente"""
+        created = await self._add_user(1)
+
+        updated = await self.repository.update(created.id, {"username": "renamed"})
+
+        self.assertEqual(updated.username, "renamed")
+        self.assertIsNone(await self.repository.update(999, {"username": "x"}))
+
+    async def test_delete(self):
+        """Testa deleção de usuário existente e inexistente"""
+        created = await self._add_user(1)
+
+        self.assertEqual(await self.repository.delete(created.id), created)
+        self.assertIsNone(await self.repository.get_by_id(created.id))
+        self.assertIsNone(await self.repository.delete(created.id))
+
+    async def test_add_duplicate_email(self):
+        """Testa que a constraint única do INSERT vira UserAlreadyExistsError"""
+        await self._add_user(1)
+
+        with self.assertRaises(UserAlreadyExistsError):
+            await self._add_user(1)
+        # A sessão continua utilizável após o rollback
+        self.assertEqual(len(await self.repository.get_all()), 1)
+
+    async def test_update_to_existing_email(self):
+        """Testa que trocar para um email em uso vira UserAlreadyExistsError"""
+        await self._add_user(1)
+        second = await self._add_user(2)
+
+        with self.assertRaises(UserAlreadyExistsError):
+            await self.repository.update(second.id, {"email": "user1@example.com"})
+        self.assertEqual((await self.repository.get_by_id(second.id)).email, "user2@example.com")
+
+    def test_get_async_database_url(self):
+        """Testa conversão da URL síncrona para o driver aiosqlite"""
+        self.assertEqual(
+            get_async_database_url("sqlite:///./user_manager.db"),
+            "sqlite+aiosqlite:///./user_manager.db",
+        )
+        self.assertEqual(
+            get_async_database_url("postgresql+asyncpg://u:p@host/db"),
+            "postgresql+asyncpg://u:p@host/db",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.core.models import User
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.core.services.async_user_service import AsyncUserService
+from src.core.exceptions import UserAlreadyExistsError, UserNotFoundError
+
+
+class TestAsyncUserService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.mock_repo = MagicMock(spec=AsyncUserRepository)
+        for method in ("add", "get_by_id", "get_by_email", "get_all", "update", "delete"):
+            setattr(self.mock_repo, method, AsyncMock())
+        self.user_service = AsyncUserService(self.mock_repo)
+        self.user = User(
+            id=1, username="testuser", email="test@example.com", hashed_password="hashed"
+        )
+
+    async def test_create_user(self):
+        """Testa criação de usuário com um único INSERT (sem SELECT prévio)"""
+        self.mock_repo.add.return_value = self.user
+        user_data = {"username": "testuser", "email": "test@example.com", "hashed_password": "hashed"}
+
+        created = await self.user_service.create_user(user_data)
+
+        self.mock_repo.get_by_email.assert_not_awaited()
+        self.mock_repo.add.assert_awaited_once_with(user_data)
+        self.assertEqual(created, self.user)
+
+    async def test_create_user_duplicate_email(self):
+        """Testa rejeição de email duplicado detectado pela constraint"""
+        self.mock_repo.add.side_effect = UserAlreadyExistsError("constraint")
+
+        with self.assertRaises(UserAlreadyExistsError) as context:
+            await self.user_service.create_user({"email": "test@example.com"})
+        self.assertIn("já existe", str(context.exception))
+
+    async def test_get_all_users_normalizes_pagination(self):
+        """Testa normalização dos parâmetros de paginação"""
+        self.mock_repo.get_all.return_value = []
+
+        await self.user_service.get_all_users(skip=-5, limit=500)
+
+        self.mock_repo.get_all.assert_awaited_once_with(skip=0, limit=10)
+
+    async def test_update_user_not_found(self):
+        """Testa atualização de usuário inexistente"""
+        self.mock_repo.update.return_value = None
+
+        with self.assertRaises(UserNotFoundError):
+            await self.user_service.update_user(99, {"username": "x"})
+        self.mock_repo.get_by_id.assert_not_awaited()
+
+    async def test_delete_user(self):
+        """Testa deleção de usuário existente"""
+        self.mock_repo.delete.return_value = self.user
+
+        self.assertTrue(await self.user_service.delete_user(1))
+        self.mock_repo.delete.assert_awaited_once_with(1, expected_version=None)
+        self.mock_repo.get_by_id.assert_not_awaited()
+
+    async def test_delete_user_not_found(self):
+        """Testa deleção de usuário inexistente"""
+        self.mock_repo.delete.return_value = None
+
+        with self.assertRaises(UserNotFoundError):
+            await self.user_service.delete_user(99)
+
+
+if __name__ == "__main__":
+    unittest.main()
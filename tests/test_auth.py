@@ -1,5 +1,6 @@
+import asyncio
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException
 
@@ -7,14 +8,23 @@ from src.infrastructure.web.auth import (
     verify_password,
     get_password_hash,
     create_access_token,
-    get_current_active_user
+    decode_access_token,
+    get_current_active_user,
+    get_token_claims_cache,
 )
 from src.infrastructure.web import schemas
+from src.infrastructure.web.user_cache import AuthenticatedUserCache, get_auth_user_cache
 from src.core.models import User as UserDomain
+from jose.jwt import decode as jwt_decode
 
 
 class TestAuth(unittest.TestCase):
 
+    def setUp(self):
+        # Os caches de usuários autenticados e de claims são globais ao processo
+        get_auth_user_cache().clear()
+        get_token_claims_cache().clear()
+
     def test_verify_password_correct(self):
         """Testa verificação de senha correta"""
         password = "testpassword"
@@ -62,9 +72,7 @@ class TestAuth(unittest.TestCase):
         self.assertTrue(len(token) > 0)
 
     @patch('src.infrastructure.web.auth.jwt.decode')
-    @patch('src.infrastructure.web.auth.SQLiteUserRepository')
-    @patch('src.infrastructure.web.auth.UserService')
-    def test_get_current_active_user_valid_token(self, mock_user_service, mock_repo, mock_jwt_decode):
+    def test_get_current_active_user_valid_token(self, mock_jwt_decode):
         """Testa obtenção de usuário ativo com token válido"""
         # Mock do token JWT
         mock_jwt_decode.return_value = {
@@ -80,35 +88,93 @@ class TestAuth(unittest.TestCase):
             hashed_password="hashed_password"
         )
         
-        # Mock do serviço
-        mock_service_instance = MagicMock()
-        mock_service_instance.get_user_by_email.return_value = mock_user
-        mock_user_service.return_value = mock_service_instance
-        
-        # Mock da sessão
-        mock_session = MagicMock()
+        # Mock do serviço assíncrono
+        mock_service = MagicMock()
+        mock_service.get_user_by_email = AsyncMock(return_value=mock_user)
         
         # Mock do token
         mock_token = "valid_token"
         
         # Mock do oauth2_scheme
         with patch('src.infrastructure.web.auth.oauth2_scheme', return_value=mock_token):
-            result = get_current_active_user(mock_token, mock_session)
+            result = asyncio.run(get_current_active_user(MagicMock(), mock_token, mock_service))
         
         self.assertIsInstance(result, schemas.UserResponse)
         self.assertEqual(result.email, "test@example.com")
 
+    @patch('src.infrastructure.web.auth.jwt.decode')
+    def test_get_current_active_user_uses_cache(self, mock_jwt_decode):
+        """Testa que a segunda resolução do mesmo usuário não consulta o serviço"""
+        mock_jwt_decode.return_value = {
+            "sub": "test@example.com",
+            "exp": datetime.now(timezone.utc).timestamp() + 3600
+        }
+        mock_service = MagicMock()
+        mock_service.get_user_by_email = AsyncMock(return_value=UserDomain(
+            id=1, username="testuser", email="test@example.com", hashed_password="hashed"
+        ))
+
+        first = asyncio.run(get_current_active_user(MagicMock(), "token", mock_service))
+        second = asyncio.run(get_current_active_user(MagicMock(), "token", mock_service))
+
+        self.assertEqual(first, second)
+        mock_service.get_user_by_email.assert_awaited_once()
+
+    def test_decode_access_token_caches_verified_claims(self):
+        """Testa que o mesmo token é verificado apenas uma vez"""
+        token = create_access_token({"sub": "test@example.com"})
+
+        with patch('src.infrastructure.web.auth.jwt.decode', wraps=jwt_decode) as mock_decode:
+            first = decode_access_token(token)
+            second = decode_access_token(token)
+
+        self.assertEqual(first["sub"], "test@example.com")
+        self.assertEqual(first, second)
+        mock_decode.assert_called_once()
+
+    def test_decode_access_token_does_not_cache_invalid_tokens(self):
+        """Testa que tokens com assinatura inválida não entram no cache"""
+        from jose import JWTError
+        token = create_access_token({"sub": "test@example.com"})[:-2] + "xx"
+
+        for _ in range(2):
+            with self.assertRaises(JWTError):
+                decode_access_token(token)
+        self.assertEqual(len(get_token_claims_cache()), 0)
+
+    def test_authenticated_user_cache_invalidation(self):
+        """Testa invalidação pelo email atual e pelo email antigo (renomeado)"""
+        cache = AuthenticatedUserCache(maxsize=10, ttl=60)
+        cache.set(schemas.UserResponse(id=1, username="u", email="old@example.com"))
+
+        renamed = UserDomain(id=1, username="u", email="new@example.com", hashed_password="h")
+        cache.invalidate_user(renamed)
+
+        self.assertIsNone(cache.get("old@example.com"))
+
+    def test_authenticated_user_cache_index_follows_lru(self):
+        """Testa que o índice id -> email acompanha a ordem LRU das entradas lidas"""
+        cache = AuthenticatedUserCache(maxsize=2, ttl=60)
+        cache.set(schemas.UserResponse(id=1, username="a", email="a@example.com"))
+        cache.set(schemas.UserResponse(id=2, username="b", email="b@example.com"))
+        cache.get("a@example.com")
+        cache.set(schemas.UserResponse(id=3, username="c", email="c@example.com"))
+
+        cache.invalidate_user(UserDomain(id=1, username="a", email="new@example.com", hashed_password="h"))
+
+        self.assertIsNone(cache.get("a@example.com"))
+
     @patch('src.infrastructure.web.auth.jwt.decode')
     def test_get_current_active_user_invalid_token_no_sub(self, mock_jwt_decode):
         """Testa token inválido sem sub claim"""
         mock_jwt_decode.return_value = {"exp": datetime.now(timezone.utc).timestamp() + 3600}
         
-        mock_session = MagicMock()
+        mock_service = MagicMock()
         mock_token = "invalid_token"
         
         with patch('src.infrastructure.web.auth.oauth2_scheme', return_value=mock_token):
             with self.assertRaises(HTTPException) as context:
-                get_current_active_user(mock_token, mock_session)
+                asyncio.run(get_current_active_user(MagicMock(), mock_token, mock_service))
             
             self.assertEqual(context.exception.status_code, 401)
 
@@ -120,19 +186,17 @@ class TestAuth(unittest.TestCase):
             "exp": datetime.now(timezone.utc).timestamp() - 3600  # Token expirado
         }
         
-        mock_session = MagicMock()
+        mock_service = MagicMock()
         mock_token = "expired_token"
         
         with patch('src.infrastructure.web.auth.oauth2_scheme', return_value=mock_token):
             with self.assertRaises(HTTPException) as context:
-                get_current_active_user(mock_token, mock_session)
+                asyncio.run(get_current_active_user(MagicMock(), mock_token, mock_service))
             
             self.assertEqual(context.exception.status_code, 401)
 
     @patch('src.infrastructure.web.auth.jwt.decode')
-    @patch('src.infrastructure.web.auth.SQLiteUserRepository')
-    @patch('src.infrastructure.web.auth.UserService')
-    def test_get_current_active_user_user_not_found(self, mock_user_service, mock_repo, mock_jwt_decode):
+    def test_get_current_active_user_user_not_found(self, mock_jwt_decode):
         """Testa usuário não encontrado para token válido"""
         # Mock do token JWT válido
         mock_jwt_decode.return_value = {
@@ -141,16 +205,14 @@ class TestAuth(unittest.TestCase):
         }
         
         # Mock do serviço retornando None
-        mock_service_instance = MagicMock()
-        mock_service_instance.get_user_by_email.return_value = None
-        mock_user_service.return_value = mock_service_instance
+        mock_service = MagicMock()
+        mock_service.get_user_by_email = AsyncMock(return_value=None)
         
-        mock_session = MagicMock()
         mock_token = "valid_token"
         
         with patch('src.infrastructure.web.auth.oauth2_scheme', return_value=mock_token):
             with self.assertRaises(HTTPException) as context:
-                get_current_active_user(mock_token, mock_session)
+                asyncio.run(get_current_active_user(MagicMock(), mock_token, mock_service))
             
             self.assertEqual(context.exception.status_code, 401)
 
@@ -160,12 +222,12 @@ class TestAuth(unittest.TestCase):
         from jose import JWTError
         mock_jwt_decode.side_effect = JWTError("JWT decode error")
         
-        mock_session = MagicMock()
+        mock_service = MagicMock()
         mock_token = "invalid_token"
         
         with patch('src.infrastructure.web.auth.oauth2_scheme', return_value=mock_token):
             with self.assertRaises(HTTPException) as context:
-                get_current_active_user(mock_token, mock_session)
+                asyncio.run(get_current_active_user(MagicMock(), mock_token, mock_service))
             
             self.assertEqual(context.exception.status_code, 401)
 
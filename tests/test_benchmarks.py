@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from benchmarks.dataset import generate_users, seed_database
+from benchmarks.suite import compare, summarize
+
+
+class TestDatasetGenerator(unittest.TestCase):
+
+    def test_generator_is_deterministic(self):
+        """Testa que a mesma seed produz os mesmos usuários"""
+        first = list(generate_users(50, seed=7))
+        second = list(generate_users(50, seed=7))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, list(generate_users(50, seed=8)))
+
+    def test_generated_emails_are_unique(self):
+        """Testa a unicidade dos emails exigida pela constraint da tabela"""
+        emails = [user["email"] for user in generate_users(5000, seed=1)]
+
+        self.assertEqual(len(emails), len(set(emails)))
+
+    def test_seed_database(self):
+        """Testa a criação do banco semeado com ids sequenciais"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "seed.db")
+            seed_database(path, 25, seed=3)
+            engine = create_engine(f"sqlite:///{path}")
+            with engine.connect() as conn:
+                count, max_id = conn.execute(text("SELECT COUNT(*), MAX(id) FROM users")).one()
+                email = conn.execute(text("SELECT email FROM users WHERE id = 1")).scalar()
+            engine.dispose()
+
+        self.assertEqual((count, max_id), (25, 25))
+        self.assertEqual(email, next(generate_users(1, seed=3))["email"])
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_summarize(self):
+        """Testa as estatísticas por operação em microssegundos"""
+        stats = summarize([1000, 2000, 3000, 4000])
+
+        self.assertEqual(stats["iterations"], 4)
+        self.assertEqual(stats["median_us"], 2.5)
+        self.assertEqual(stats["min_us"], 1.0)
+        self.assertEqual(stats["p95_us"], 4.0)
+        self.assertAlmostEqual(stats["ops_per_second"], 400000)
+
+    def test_compare_flags_regressions(self):
+        """Testa a classificação de cada caso em relação à baseline"""
+        baseline = {"results": {
+            "a": {"median_us": 100.0}, "b": {"median_us": 100.0},
+            "c": {"median_us": 100.0}, "gone": {"median_us": 1.0},
+        }}
+        current = {"results": {
+            "a": {"median_us": 125.0}, "b": {"median_us": 105.0},
+            "c": {"median_us": 50.0}, "new": {"median_us": 1.0},
+        }}
+
+        rows = {row["case"]: row["status"] for row in compare(baseline, current, threshold=0.2)}
+
+        self.assertEqual(rows, {
+            "a": "regression", "b": "ok", "c": "improvement", "gone": "missing", "new": "new",
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from src.config import Settings
+from src.core.exceptions import UserAlreadyExistsError
+from src.core.models import User
+from src.core.services.async_user_service import AsyncUserService
+from src.infrastructure.web.bulk_import import (
+    LINE_TOO_LONG_ERROR,
+    MAX_LINE_CHARS,
+    BulkImportFormatError,
+    detect_format,
+    import_users,
+    iter_csv_rows,
+    iter_lines,
+    iter_ndjson_rows,
+)
+from tests import AppStateTestMixin
+
+
+async def as_chunks(data: bytes, size: int = 7):
+    """Simula o corpo da requisição chegando em pedaços pequenos"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+class TestBulkImport(unittest.IsolatedAsyncioTestCase):
+
+    def test_detect_format(self):
+        """Testa detecção do formato pelo Content-Type"""
+        self.assertEqual(detect_format("text/csv; charset=utf-8"), "csv")
+        self.assertEqual(detect_format("application/x-ndjson"), "ndjson")
+        with self.assertRaises(BulkImportFormatError):
+            detect_format("application/xml")
+
+    async def test_iter_ndjson_rows(self):
+        """Testa parsing incremental de NDJSON com linhas inválidas"""
+        body = '{"username": "ã", "email": "a@example.com"}\n\nnot json\n[1]\n'.encode("utf-8")
+
+        rows = await collect(iter_ndjson_rows(as_chunks(body)))
+
+        self.assertEqual(rows[0], (1, {"username": "ã", "email": "a@example.com"}))
+        self.assertEqual(rows[1][0], 3)
+        self.assertIn("JSON inválido", rows[1][1])
+        self.assertEqual(rows[2], (4, "Cada linha deve ser um objeto JSON"))
+
+    async def test_iter_csv_rows_with_quoted_newline(self):
+        """Testa parsing de CSV com campo entre aspas contendo quebra de linha"""
+        body = b'username,email,password\r\nu1,u1@example.com,"a\nb"\r\nu2,u2@example.com\r\n'
+
+        rows = await collect(iter_csv_rows(as_chunks(body)))
+
+        self.assertEqual(rows[0], (1, {"username": "u1", "email": "u1@example.com", "password": "a\nb"}))
+        self.assertEqual(rows[1], (2, "Esperadas 3 colunas, recebidas 2"))
+
+    async def test_iter_csv_rows_requires_header(self):
+        """Testa rejeição de CSV sem as colunas obrigatórias"""
+        with self.assertRaises(BulkImportFormatError):
+            await collect(iter_csv_rows(as_chunks(b"name,mail\nx,y\n")))
+
+    async def test_iter_lines_caps_line_length(self):
+        """Testa que linhas longas demais são descartadas sem interromper as seguintes"""
+        body = b'{"a": 1}\n' + b"x" * 50 + b'\n{"b": 2}\n' + b"y" * 30
+
+        lines = await collect(iter_lines(as_chunks(body), max_length=20))
+
+        self.assertEqual(lines, ['{"a": 1}', None, '{"b": 2}', None])
+
+    async def test_iter_ndjson_rows_reports_long_lines(self):
+        body = b"x" * (MAX_LINE_CHARS + 1) + b'\n{"username": "u"}\n'
+
+        rows = await collect(iter_ndjson_rows(as_chunks(body, size=4096)))
+
+        self.assertEqual(rows, [(1, LINE_TOO_LONG_ERROR), (2, {"username": "u"})])
+
+    @patch("src.infrastructure.web.bulk_import.get_password_hasher")
+    async def test_import_users_in_batches(self, mock_get_hasher):
+        """Testa validação, lotes, relatório na ordem de entrada e totais"""
+        mock_hasher = mock_get_hasher.return_value
+        mock_hasher.hash_many_async = AsyncMock(side_effect=lambda passwords: [f"h:{p}" for p in passwords])
+        service = MagicMock()
+        service.get_existing_emails = AsyncMock(side_effect=lambda emails: set())
+        service.create_users = AsyncMock(side_effect=[
+            [User(id=1, username="u1", email="u1@example.com", hashed_password="h:p"),
+             UserAlreadyExistsError("Usuário com email u2@example.com já existe")],
+            [User(id=2, username="u3", email="u3@example.com", hashed_password="h:p")],
+        ])
+        lines = [
+            {"username": "u1", "email": "u1@example.com", "password": "p"},
+            {"username": "bad", "email": "invalid", "password": "p"},
+            {"username": "u2", "email": "u2@example.com", "password": "p"},
+            {"username": "u3", "email": "u3@example.com", "password": "p"},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines).encode("utf-8")
+
+        chunks = await collect(import_users(iter_ndjson_rows(as_chunks(body)), service, batch_size=3))
+        entries = [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+        # Um bloco por lote e o bloco final com os totais
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(service.create_users.await_count, 2)
+        first_batch = service.create_users.await_args_list[0].args[0]
+        self.assertEqual(first_batch[0], {"username": "u1", "email": "u1@example.com", "hashed_password": "h:p"})
+        self.assertEqual([entry.get("row") for entry in entries], [1, 2, 3, 4, None])
+        self.assertEqual(entries[0], {"row": 1, "status": "created", "id": 1})
+        self.assertIn("email", entries[1]["error"])
+        self.assertEqual(entries[2]["status"], "error")
+        self.assertEqual(entries[3], {"row": 4, "status": "created", "id": 2})
+        self.assertEqual(entries[4], {"status": "summary", "created": 2, "failed": 2})
+
+    @patch("src.infrastructure.web.bulk_import.get_password_hasher")
+    async def test_duplicates_are_rejected_before_hashing(self, mock_get_hasher):
+        """Testa que emails já cadastrados ou repetidos no lote não têm a senha processada"""
+        mock_hasher = mock_get_hasher.return_value
+        mock_hasher.hash_many_async = AsyncMock(side_effect=lambda passwords: [f"h:{p}" for p in passwords])
+        service = MagicMock()
+        service.get_existing_emails = AsyncMock(return_value={"old@example.com"})
+        service.create_users = AsyncMock(return_value=[
+            User(id=7, username="n", email="new@example.com", hashed_password="h:p2"),
+        ])
+        lines = [
+            {"username": "o", "email": "old@example.com", "password": "p1"},
+            {"username": "n", "email": "new@example.com", "password": "p2"},
+            {"username": "d", "email": "new@example.com", "password": "p3"},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines).encode("utf-8")
+
+        chunks = await collect(import_users(iter_ndjson_rows(as_chunks(body)), service, batch_size=10))
+        entries = [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+        mock_hasher.hash_many_async.assert_awaited_once_with(["p2"])
+        self.assertEqual([entry["status"] for entry in entries[:3]], ["error", "created", "error"])
+
+    @patch("src.infrastructure.web.bulk_import.get_password_hasher")
+    async def test_one_duplicate_query_per_batch(self, mock_get_hasher):
+        """Testa que cada lote consulta os emails existentes uma única vez"""
+        mock_get_hasher.return_value.hash_many_async = AsyncMock(
+            side_effect=lambda passwords: [f"h:{p}" for p in passwords]
+        )
+        repository = MagicMock()
+        repository.get_existing_emails = AsyncMock(return_value={"u0@example.com"})
+        repository.add_many = AsyncMock(side_effect=lambda users_data: [
+            User(id=index, hashed_password=user_data["hashed_password"],
+                 username=user_data["username"], email=user_data["email"])
+            for index, user_data in enumerate(users_data, start=1)
+        ])
+        lines = [
+            {"username": f"u{index}", "email": f"u{index}@example.com", "password": "p"}
+            for index in range(4)
+        ]
+        body = "\n".join(json.dumps(line) for line in lines).encode("utf-8")
+
+        chunks = await collect(
+            import_users(iter_ndjson_rows(as_chunks(body)), AsyncUserService(repository), batch_size=2)
+        )
+        entries = [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+        self.assertEqual(repository.get_existing_emails.await_count, 2)
+        self.assertEqual(repository.add_many.await_count, 2)
+        self.assertEqual([entry["status"] for entry in entries[:4]], ["error", "created", "created", "created"])
+
+
+class TestBulkImportEndpoint(AppStateTestMixin, unittest.TestCase):
+
+    def test_streams_report_in_input_order(self):
+        """Testa a rota completa: 400 para formato inválido e relatório em streaming com os totais"""
+        from src.main import create_app
+
+        settings = Settings(
+            database_url=self.database_url("users.db"),
+            password_hash_workers=0,
+            password_hash_bcrypt_rounds=4,
+            metrics_enabled=False,
+            bulk_import_batch_size=2,
+        )
+        with TestClient(create_app(settings)) as client:
+            client.post("/users/", json={"username": "ana", "email": "ana@example.com", "password": "pw"})
+            token = client.post("/token", data={"username": "ana@example.com", "password": "pw"}).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}", "Content-Type": "text/csv"}
+
+            invalid = client.post("/users/bulk", content=b"name,mail\nx,y\n", headers=headers)
+            self.assertEqual(invalid.status_code, 400)
+
+            body = (
+                "username,email,password\n"
+                "u1,u1@example.com,p\n"
+                "dup,ana@example.com,p\n"
+                "u2,u2@example.com,p\n"
+            ).encode("utf-8")
+            response = client.post("/users/bulk", content=body, headers=headers)
+        entries = [json.loads(line) for line in response.text.splitlines()]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry.get("status") for entry in entries], ["created", "error", "created", "summary"])
+        self.assertEqual(entries[-1], {"status": "summary", "created": 2, "failed": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.core.models import User
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.core.ports.user_repository import UserRepository
+from src.infrastructure.cache.backends import (
+    InMemoryCacheBackend,
+    SharedCacheBackend,
+    create_cache_backend,
+)
+from src.infrastructure.cache.caching_user_repository import (
+    AsyncCachingUserRepository,
+    CachingUserRepository,
+)
+
+
+class FakeRedis:
+    """Dublê local de um cliente redis-py (get/set/delete/info)"""
+
+    def __init__(self):
+        self.data = {}
+        self.expirations = {}
+
+    def get(self, key):
+        value = self.data.get(key)
+        return value.encode("utf-8") if value is not None else None
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expirations[key] = ex
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def info(self, section):
+        return {"evicted_keys": 3, "expired_keys": 7}
+
+
+def make_user(user_id=1, email="u@example.com", username="u"):
+    return User(id=user_id, username=username, email=email, hashed_password="h")
+
+
+class TestCachingUserRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.inner = MagicMock(spec=UserRepository)
+        self.backend = InMemoryCacheBackend(maxsize=100, ttl=60)
+        self.repository = CachingUserRepository(self.inner, self.backend, negative_ttl=5)
+
+    def test_get_by_id_read_through(self):
+        """Testa que a segunda consulta é servida do cache"""
+        user = make_user()
+        self.inner.get_by_id.return_value = user
+
+        self.assertEqual(self.repository.get_by_id(1), user)
+        self.assertEqual(self.repository.get_by_id(1), user)
+
+        self.inner.get_by_id.assert_called_once_with(1)
+        self.assertEqual(self.repository.stats()["hits"], 1)
+
+    def test_lookup_by_id_also_fills_email(self):
+        """Testa que um usuário carregado por id atende a busca por email"""
+        self.inner.get_by_id.return_value = make_user()
+
+        self.repository.get_by_id(1)
+
+        self.assertEqual(self.repository.get_by_email("u@example.com"), make_user())
+        self.inner.get_by_email.assert_not_called()
+
+    def test_negative_lookup_cached(self):
+        """Testa o cache de consultas sem resultado"""
+        self.inner.get_by_email.return_value = None
+
+        self.assertIsNone(self.repository.get_by_email("x@example.com"))
+        self.assertIsNone(self.repository.get_by_email("x@example.com"))
+
+        self.inner.get_by_email.assert_called_once_with("x@example.com")
+
+    def test_negative_cache_disabled(self):
+        """Testa que negative_ttl=0 não guarda consultas sem resultado"""
+        repository = CachingUserRepository(self.inner, self.backend, negative_ttl=0)
+        self.inner.get_by_id.return_value = None
+
+        repository.get_by_id(9)
+        repository.get_by_id(9)
+
+        self.assertEqual(self.inner.get_by_id.call_count, 2)
+
+    def test_add_invalidates_negative_entry(self):
+        """Testa que a criação remove o 'não encontrado' do email"""
+        self.inner.get_by_email.side_effect = [None, make_user()]
+        self.repository.get_by_email("u@example.com")
+        self.inner.add.return_value = make_user()
+
+        self.repository.add({"username": "u", "email": "u@example.com", "hashed_password": "h"})
+
+        self.assertEqual(self.repository.get_by_email("u@example.com"), make_user())
+        self.assertEqual(self.inner.get_by_email.call_count, 2)
+
+    def test_update_email_invalidates_old_email(self):
+        """Testa que a troca de email invalida o email antigo, o novo e o id"""
+        old = make_user()
+        new = make_user(email="new@example.com")
+        self.inner.get_by_id.return_value = old
+        self.repository.get_by_id(1)
+        self.inner.update.return_value = new
+        self.inner.get_by_email.return_value = None
+
+        self.repository.update(1, {"email": "new@example.com"})
+
+        self.assertIsNone(self.repository.get_by_email("u@example.com"))
+        self.inner.get_by_email.assert_called_once_with("u@example.com")
+        self.inner.get_by_id.return_value = new
+        self.assertEqual(self.repository.get_by_id(1), new)
+
+    def test_delete_invalidates_entries(self):
+        """Testa a invalidação pelo usuário devolvido pela deleção"""
+        self.inner.get_by_email.return_value = make_user()
+        self.repository.get_by_email("u@example.com")
+        self.inner.delete.return_value = make_user()
+
+        self.assertEqual(self.repository.delete(1), make_user())
+        self.inner.get_by_email.return_value = None
+
+        self.assertIsNone(self.repository.get_by_email("u@example.com"))
+        self.assertEqual(self.inner.get_by_email.call_count, 2)
+        self.inner.get_by_id.assert_not_called()
+
+    def test_listings_bypass_cache(self):
+        """Testa que listagens são delegadas sem cache"""
+        self.inner.get_all.return_value = []
+
+        self.repository.get_all(skip=0, limit=10)
+        self.repository.get_all(skip=0, limit=10)
+
+        self.assertEqual(self.inner.get_all.call_count, 2)
+
+    def test_versions_bypass_cache(self):
+        """Testa que a versão vem sempre do repositório, mesmo com o usuário em cache"""
+        self.inner.get_by_id.return_value = make_user()
+        self.inner.get_version.return_value = 2
+        self.inner.get_versions.return_value = [(1, 2)]
+        self.repository.get_by_id(1)
+
+        self.assertEqual(self.repository.get_version(1), 2)
+        self.assertEqual(self.repository.get_versions(limit=1), [(1, 2)])
+
+        self.inner.get_version.assert_called_once_with(1)
+        self.inner.get_versions.assert_called_once_with(skip=0, limit=1, after_id=None)
+
+
+class TestSharedCacheBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeRedis()
+        self.backend = SharedCacheBackend(self.client, ttl=60, prefix="test:")
+        self.inner = MagicMock(spec=UserRepository)
+        self.repository = CachingUserRepository(self.inner, self.backend, negative_ttl=5)
+
+    def test_shared_between_repositories(self):
+        """Testa que outra instância (outro worker) enxerga as entradas gravadas"""
+        self.inner.get_by_id.return_value = make_user()
+        self.repository.get_by_id(1)
+
+        other = CachingUserRepository(MagicMock(spec=UserRepository), SharedCacheBackend(self.client, ttl=60, prefix="test:"))
+
+        self.assertEqual(other.get_by_id(1), make_user())
+        self.assertIn("test:email:u@example.com", self.client.data)
+
+    def test_negative_ttl_and_rounding(self):
+        """Testa TTL em segundos inteiros e o TTL menor das entradas negativas"""
+        self.inner.get_by_id.return_value = None
+        self.repository.get_by_id(5)
+
+        self.assertEqual(self.client.expirations["test:id:5"], 5)
+        self.backend.set("tiny", "x", ttl=0.5)
+        self.assertNotIn("test:tiny", self.client.data)
+
+    def test_stats_include_server_evictions(self):
+        """Testa contadores locais e descartes informados pelo servidor"""
+        self.backend.get("missing")
+
+        stats = self.backend.stats()
+
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["evictions"], 3)
+        self.assertEqual(stats["expirations"], 7)
+
+
+class TestAsyncCachingUserRepository(unittest.IsolatedAsyncioTestCase):
+
+    async def test_read_through_and_invalidation(self):
+        """Testa o decorator assíncrono com o backend compartilhado (threadpool)"""
+        inner = AsyncMock(spec=AsyncUserRepository)
+        inner.get_by_email.return_value = make_user()
+        inner.delete.return_value = make_user()
+        repository = AsyncCachingUserRepository(inner, SharedCacheBackend(FakeRedis(), ttl=60))
+
+        self.assertEqual(await repository.get_by_email("u@example.com"), make_user())
+        self.assertEqual(await repository.get_by_id(1), make_user())
+        inner.get_by_id.assert_not_called()
+
+        await repository.delete(1)
+        inner.get_by_email.return_value = None
+        self.assertIsNone(await repository.get_by_email("u@example.com"))
+        self.assertEqual(inner.get_by_email.call_count, 2)
+
+    async def test_version_bypasses_cache(self):
+        inner = AsyncMock(spec=AsyncUserRepository)
+        inner.get_by_id.return_value = make_user()
+        inner.get_version.return_value = 3
+        repository = AsyncCachingUserRepository(inner, InMemoryCacheBackend(maxsize=10, ttl=60))
+        await repository.get_by_id(1)
+
+        self.assertEqual(await repository.get_version(1), 3)
+        inner.get_version.assert_awaited_once_with(1)
+
+    async def test_without_read_through_writes_still_invalidate(self):
+        """Testa que read_through=False lê do repositório e ainda invalida o cache nas escritas"""
+        inner = AsyncMock(spec=AsyncUserRepository)
+        inner.get_by_email.return_value = make_user()
+        backend = InMemoryCacheBackend(maxsize=10, ttl=60)
+        cached = AsyncCachingUserRepository(inner, backend)
+        uncached = AsyncCachingUserRepository(inner, backend, read_through=False)
+        await cached.get_by_email("u@example.com")
+
+        inner.get_by_email.return_value = make_user(username="novo")
+        self.assertEqual((await uncached.get_by_email("u@example.com")).username, "novo")
+        self.assertEqual(inner.get_by_email.await_count, 2)
+
+        inner.update.return_value = make_user(username="novo")
+        await uncached.update(1, {"username": "novo"})
+        self.assertEqual((await cached.get_by_email("u@example.com")).username, "novo")
+        self.assertEqual(inner.get_by_email.await_count, 3)
+
+
+class TestCreateCacheBackend(unittest.TestCase):
+
+    def test_kinds(self):
+        """Testa a criação do backend a partir da configuração"""
+        self.assertIsNone(create_cache_backend("none", maxsize=10, ttl=60))
+        self.assertIsInstance(create_cache_backend("memory", maxsize=10, ttl=60), InMemoryCacheBackend)
+        with self.assertRaises(ValueError):
+            create_cache_backend("memcached", maxsize=10, ttl=60)
+
+
+if __name__ == "__main__":
+    unittest.main()
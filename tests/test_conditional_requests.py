@@ -0,0 +1,264 @@
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.exceptions import UserVersionConflictError
+from src.infrastructure.database.async_sqlite_user_repository import AsyncSQLiteUserRepository
+from src.infrastructure.database.database import Base
+from src.infrastructure.database.email_routes import create_shard_schema
+from src.infrastructure.database.sharded_user_repository import ShardedUserRepository
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+from src.infrastructure.database.user_versions import add_version_column
+from src.infrastructure.web.conditional import is_not_modified, page_etag, parse_if_match, user_etag
+from tests import AppStateTestMixin, SQLiteRepositoryTestMixin, create_memory_engine, user_data
+
+
+class TestUserVersions(SQLiteRepositoryTestMixin, unittest.TestCase):
+
+    def test_version_is_bumped_on_update(self):
+        """Testa a versão inicial, o incremento a cada UPDATE e a leitura sem carregar a linha"""
+        user = self.repository.add(user_data(1))
+        self.assertEqual(user.version, 1)
+        self.assertEqual(self.repository.update(user.id, {"username": "a"}).version, 2)
+        self.assertEqual(self.repository.update(user.id, {"username": "b"}).version, 3)
+        self.assertEqual(self.repository.update(user.id, {}).version, 3)
+        self.assertEqual(self.repository.get_version(user.id), 3)
+        self.assertEqual(self.repository.get_by_id(user.id).version, 3)
+        self.assertIsNone(self.repository.get_version(999))
+
+    def test_page_versions_match_listing(self):
+        """Testa que get_versions devolve a mesma página de get_all/get_all_after"""
+        users = self.repository.add_many([user_data(i) for i in range(6)])
+        self.repository.update(users[2].id, {"username": "x"})
+        self.assertEqual(
+            self.repository.get_versions(skip=1, limit=3),
+            [(user.id, user.version) for user in self.repository.get_all(skip=1, limit=3)],
+        )
+        self.assertEqual(
+            self.repository.get_versions(limit=5, after_id=users[3].id),
+            [(user.id, user.version) for user in self.repository.get_all_after(users[3].id, limit=5)],
+        )
+
+    def test_conditional_update_and_delete(self):
+        """Testa UPDATE/DELETE com expected_version: conflito não altera a linha"""
+        user = self.repository.add(user_data(1))
+        with self.assertRaises(UserVersionConflictError):
+            self.repository.update(user.id, {"username": "stale"}, expected_version=2)
+        with self.assertRaises(UserVersionConflictError):
+            self.repository.update(user.id, {}, expected_version=2)
+        with self.assertRaises(UserVersionConflictError):
+            self.repository.delete(user.id, expected_version=2)
+        self.assertEqual(self.repository.get_by_id(user.id).username, "user1")
+
+        self.assertIsNone(self.repository.update(999, {"username": "x"}, expected_version=1))
+        self.assertIsNone(self.repository.delete(999, expected_version=1))
+        updated = self.repository.update(user.id, {"username": "fresh"}, expected_version=1)
+        self.assertEqual((updated.username, updated.version), ("fresh", 2))
+        self.assertEqual(self.repository.delete(user.id, expected_version=2).id, user.id)
+        self.assertIsNone(self.repository.get_version(user.id))
+
+    def test_version_column_added_to_existing_table(self):
+        """Testa a migração de um banco criado antes da coluna de versão"""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, email VARCHAR, hashed_password VARCHAR)"
+            )
+            connection.exec_driver_sql("INSERT INTO users (username, email) VALUES ('a', 'a@example.com')")
+            add_version_column(connection)
+            add_version_column(connection)  # idempotente
+        repository = SQLiteUserRepository(sessionmaker(bind=engine)())
+        self.assertEqual(repository.get_versions(), [(1, 1)])
+        self.assertEqual(repository.update(1, {"username": "b"}).version, 2)
+        engine.dispose()
+
+
+class TestAsyncUserVersions(unittest.IsolatedAsyncioTestCase):
+
+    async def test_conditional_update(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session = async_sessionmaker(engine, expire_on_commit=False)()
+        repository = AsyncSQLiteUserRepository(session)
+        user = await repository.add(user_data(1))
+
+        self.assertEqual((await repository.update(user.id, {"username": "a"}, expected_version=1)).version, 2)
+        with self.assertRaises(UserVersionConflictError):
+            await repository.update(user.id, {"username": "b"}, expected_version=1)
+        with self.assertRaises(UserVersionConflictError):
+            await repository.delete(user.id, expected_version=1)
+        self.assertEqual(await repository.get_version(user.id), 2)
+        self.assertEqual(await repository.get_versions(limit=5), [(user.id, 2)])
+        await session.close()
+        await engine.dispose()
+
+
+class TestShardedUserVersions(unittest.TestCase):
+
+    def test_versions_use_global_ids(self):
+        """Testa get_version/get_versions e a atualização condicional com ids globais"""
+        engines, sessions = [], []
+        for _ in range(3):
+            engine = create_memory_engine()
+            with engine.begin() as connection:
+                create_shard_schema(connection)
+            engines.append(engine)
+            sessions.append(sessionmaker(bind=engine)())
+        repository = ShardedUserRepository(sessions)
+        repository.add_many([user_data(i) for i in range(9)])
+        users = repository.get_all(limit=9)
+        repository.update(users[4].id, {"username": "x"}, expected_version=1)
+        with self.assertRaises(UserVersionConflictError):
+            repository.delete(users[4].id, expected_version=1)
+
+        self.assertEqual(repository.get_version(users[4].id), 2)
+        self.assertEqual(
+            repository.get_versions(skip=2, limit=4),
+            [(user.id, user.version) for user in repository.get_all(skip=2, limit=4)],
+        )
+        self.assertEqual(
+            repository.get_versions(limit=3, after_id=users[3].id),
+            [(user.id, user.version) for user in repository.get_all_after(users[3].id, limit=3)],
+        )
+        for session, engine in zip(sessions, engines):
+            session.close()
+            engine.dispose()
+
+
+class TestConditionalHelpers(unittest.TestCase):
+
+    def test_if_none_match(self):
+        etag = user_etag(7, 3)
+        self.assertTrue(is_not_modified(etag, etag))
+        self.assertTrue(is_not_modified(f'"outro", W/{etag}', etag))
+        self.assertTrue(is_not_modified("*", etag))
+        self.assertFalse(is_not_modified(user_etag(7, 2), etag))
+        self.assertFalse(is_not_modified(None, etag))
+
+    def test_if_match(self):
+        self.assertIsNone(parse_if_match(None, 7))
+        self.assertIsNone(parse_if_match("*", 7))
+        self.assertEqual(parse_if_match(user_etag(7, 3), 7), 3)
+        self.assertEqual(parse_if_match(f'{user_etag(8, 1)}, {user_etag(7, 4)}', 7), 4)
+        for header in (user_etag(8, 3), f"W/{user_etag(7, 3)}", '"7-x"', '"7-"'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_if_match(header, 7)
+
+    def test_page_etag(self):
+        """Testa que o ETag da página muda com versões, membros e total"""
+        base = page_etag([(1, 1), (2, 1)])
+        self.assertEqual(base, page_etag(iter([(1, 1), (2, 1)])))
+        self.assertNotEqual(base, page_etag([(1, 1), (2, 2)]))
+        self.assertNotEqual(base, page_etag([(1, 1), (3, 1)]))
+        self.assertNotEqual(base, page_etag([(1, 1), (2, 1)], total=2))
+
+
+class TestConditionalRoutes(AppStateTestMixin, unittest.TestCase):
+
+    def _client(self, backend: str) -> TestClient:
+        from src.config import Settings
+        from src.main import create_app
+
+        settings = Settings(
+            database_url=self.database_url(f"{backend}.db"),
+            password_hash_workers=0,
+            metrics_enabled=False,
+            repository_backend=backend,
+        )
+        return TestClient(create_app(settings))
+
+    def _login(self, client: TestClient, email: str) -> dict:
+        token = client.post("/token", data={"username": email, "password": "pw"})
+        return {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+    def test_user_etag_and_preconditions(self):
+        """Testa ETag, 304 com If-None-Match e 412 com If-Match desatualizado nos dois backends"""
+        for backend in ("async", "sync"):
+            with self.subTest(backend=backend), self._client(backend) as client:
+                user_id = client.post(
+                    "/users/", json={"username": "ana", "email": "ana@example.com", "password": "pw"}
+                ).json()["id"]
+                headers = self._login(client, "ana@example.com")
+
+                response = client.get(f"/users/{user_id}")
+                etag = response.headers["ETag"]
+                self.assertEqual(etag, user_etag(user_id, 1))
+                not_modified = client.get(f"/users/{user_id}", headers={"If-None-Match": etag})
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified.content, b"")
+                self.assertEqual(not_modified.headers["ETag"], etag)
+                self.assertEqual(client.get("/users/999", headers={"If-None-Match": etag}).status_code, 404)
+
+                updated = client.put(
+                    f"/users/{user_id}", json={"username": "ana2"}, headers={**headers, "If-Match": etag}
+                )
+                self.assertEqual(updated.status_code, 200)
+                new_etag = updated.headers["ETag"]
+                self.assertNotEqual(new_etag, etag)
+                self.assertEqual(client.get(f"/users/{user_id}", headers={"If-None-Match": etag}).status_code, 200)
+
+                stale = client.put(
+                    f"/users/{user_id}", json={"username": "ana3"}, headers={**headers, "If-Match": etag}
+                )
+                self.assertEqual(stale.status_code, 412)
+                self.assertEqual(
+                    client.put(
+                        f"/users/{user_id}", json={"username": "ana3"}, headers={**headers, "If-Match": '"x"'}
+                    ).status_code,
+                    412,
+                )
+                self.assertEqual(
+                    client.delete(f"/users/{user_id}", headers={**headers, "If-Match": etag}).status_code, 412
+                )
+                self.assertEqual(client.get(f"/users/{user_id}").json()["username"], "ana2")
+                self.assertEqual(
+                    client.delete(f"/users/{user_id}", headers={**headers, "If-Match": new_etag}).status_code, 204
+                )
+
+    def test_listing_etag(self):
+        """Testa o ETag das páginas da listagem e o 304 calculado só com as versões"""
+        with self._client("async") as client:
+            for i in range(3):
+                client.post("/users/", json={"username": f"u{i}", "email": f"u{i}@example.com", "password": "pw"})
+
+            first = client.get("/users/", params={"limit": 2})
+            etag = first.headers["ETag"]
+            cursor = first.headers["X-Next-Cursor"]
+            self.assertEqual(
+                client.get("/users/", params={"limit": 2}, headers={"If-None-Match": etag}).status_code, 304
+            )
+            second = client.get("/users/", params={"after": cursor, "limit": 2})
+            self.assertEqual(
+                client.get(
+                    "/users/", params={"after": cursor, "limit": 2}, headers={"If-None-Match": second.headers["ETag"]}
+                ).status_code,
+                304,
+            )
+
+            # O total faz parte do ETag quando pedido: um novo usuário fora da página também o muda
+            with_total = client.get("/users/", params={"limit": 2, "include_total": "true"})
+            self.assertNotEqual(with_total.headers["ETag"], etag)
+            client.post("/users/", json={"username": "u3", "email": "u3@example.com", "password": "pw"})
+            self.assertEqual(
+                client.get(
+                    "/users/", params={"limit": 2, "include_total": "true"},
+                    headers={"If-None-Match": with_total.headers["ETag"]},
+                ).status_code,
+                200,
+            )
+
+            headers = self._login(client, "u1@example.com")
+            user_id = first.json()[1]["id"]
+            client.put(f"/users/{user_id}", json={"username": "novo"}, headers=headers)
+            changed = client.get("/users/", params={"limit": 2}, headers={"If-None-Match": etag})
+            self.assertEqual(changed.status_code, 200)
+            self.assertEqual(changed.json()[1]["username"], "novo")
+
+
+if __name__ == "__main__":
+    unittest.main()
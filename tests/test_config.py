@@ -58,6 +58,16 @@ class TestConfig(unittest.TestCase):
         
         self.assertEqual(src.config.ALGORITHM, 'HS512')
 
+    def test_uppercase_names_are_deprecated(self):
+        """As constantes em maiúsculas avisam que estão obsoletas e seguem get_settings()"""
+        import src.config
+
+        with self.assertWarns(DeprecationWarning):
+            secret_key = src.config.SECRET_KEY
+        self.assertEqual(secret_key, src.config.get_settings().secret_key)
+        with self.assertRaises(AttributeError):
+            src.config.SQLITE_PROFILE
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,65 @@
+import json
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+from src.infrastructure.web.export import encode_csv, encode_ndjson, stream_users_export
+
+
+def fake_repository_scope(rows):
+    """Substitui o repositório configurado por um que produz as linhas informadas"""
+    repository = MagicMock()
+
+    async def stream_all(batch_size=1000):
+        for row in rows:
+            yield row
+
+    repository.stream_all = stream_all
+
+    @asynccontextmanager
+    async def scope():
+        yield repository
+
+    return scope
+
+
+class TestExport(unittest.IsolatedAsyncioTestCase):
+
+    def test_encode_ndjson(self):
+        """Testa serialização direta das tuplas em NDJSON com escape"""
+        encoded = encode_ndjson([(1, 'jo"ão', "j@example.com")])
+
+        self.assertEqual(json.loads(encoded), {"id": 1, "username": 'jo"ão', "email": "j@example.com"})
+        self.assertTrue(encoded.endswith(b"\n"))
+
+    def test_encode_csv(self):
+        """Testa serialização CSV com campos que exigem aspas"""
+        self.assertEqual(encode_csv([(1, "a,b", "a@example.com")]), b'1,"a,b",a@example.com\n')
+
+    async def test_stream_in_batches(self):
+        """Testa que a exportação é enviada em blocos de até batch_size linhas"""
+        rows = [(index, f"user{index}", f"user{index}@example.com") for index in range(5)]
+
+        with patch(
+            "src.infrastructure.web.export.user_repository_scope",
+            fake_repository_scope(rows),
+        ):
+            chunks = [chunk async for chunk in stream_users_export("ndjson", batch_size=2)]
+
+        self.assertEqual(len(chunks), 3)
+        lines = b"".join(chunks).splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [0, 1, 2, 3, 4])
+
+    async def test_stream_csv_has_header(self):
+        """Testa que o CSV começa pelo cabeçalho"""
+        with patch(
+            "src.infrastructure.web.export.user_repository_scope",
+            fake_repository_scope([(1, "u", "u@example.com")]),
+        ):
+            body = b"".join([chunk async for chunk in stream_users_export("csv", batch_size=10)])
+
+        self.assertEqual(body, b"id,username,email\n1,u,u@example.com\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
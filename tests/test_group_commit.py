@@ -0,0 +1,251 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+
+from src.core.exceptions import UserAlreadyExistsError
+from src.infrastructure.database.database import Base
+from src.infrastructure.database.group_commit import (
+    GroupCommitUserRepository,
+    GroupCommitWriter,
+    enable_savepoints,
+)
+from tests import AppStateTestMixin, user_data
+
+
+class GroupCommitTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.tmpdir.name, 'users.db')}"
+        setup = create_engine(self.url)
+        Base.metadata.create_all(setup)
+        setup.dispose()
+        self.engine = create_engine(self.url, connect_args={"check_same_thread": False, "timeout": 0.1})
+        enable_savepoints(self.engine)
+        self.commits = 0
+        event.listen(self.engine, "commit", self._count_commit)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _count_commit(self, connection):
+        self.commits += 1
+
+    def _writer(self, **kwargs) -> GroupCommitWriter:
+        writer = GroupCommitWriter(self.engine, **kwargs)
+        self.addCleanup(writer.close)
+        return writer
+
+    def _usernames(self):
+        engine = create_engine(self.url)
+        with engine.connect() as connection:
+            names = [row[0] for row in connection.exec_driver_sql("SELECT username FROM users ORDER BY id")]
+        engine.dispose()
+        return names
+
+
+class TestGroupCommitWriter(GroupCommitTestCase):
+
+    def test_batch_with_one_commit_and_individual_results(self):
+        """Testa que operações do mesmo lote têm um único COMMIT e resultados individuais"""
+        writer = self._writer(max_delay=0.2)
+        futures = [writer.add(user_data(i)) for i in range(5)]
+        futures.append(writer.add(user_data(1, username="duplicado")))
+        users = [future.result(timeout=5) for future in futures[:5]]
+
+        self.assertEqual([user.username for user in users], [f"user{i}" for i in range(5)])
+        with self.assertRaises(UserAlreadyExistsError):
+            futures[5].result(timeout=5)
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(writer.stats()["operations"], 6)
+        self.assertEqual(self._usernames(), [f"user{i}" for i in range(5)])
+
+    def test_results_are_visible_to_other_connections(self):
+        """Testa que o Future só é resolvido depois do COMMIT"""
+        writer = self._writer()
+        writer.add(user_data(1)).result(timeout=5)
+        self.assertEqual(self._usernames(), ["user1"])
+
+    def test_update_and_delete(self):
+        writer = self._writer()
+        user = writer.add(user_data(1)).result(timeout=5)
+        writer.add(user_data(2)).result(timeout=5)
+
+        self.assertEqual(writer.update(user.id, {"username": "novo"}).result(timeout=5).username, "novo")
+        self.assertEqual(writer.update(user.id, {}).result(timeout=5).username, "novo")
+        self.assertIsNone(writer.update(999, {"username": "x"}).result(timeout=5))
+        with self.assertRaises(UserAlreadyExistsError):
+            writer.update(user.id, {"email": "user2@example.com"}).result(timeout=5)
+
+        self.assertEqual(writer.delete(user.id).result(timeout=5).id, user.id)
+        self.assertIsNone(writer.delete(user.id).result(timeout=5))
+        self.assertEqual(self._usernames(), ["user2"])
+
+    def test_conditional_update_and_delete(self):
+        """Testa expected_version: o conflito chega ao chamador e não altera a linha"""
+        from src.core.exceptions import UserVersionConflictError
+
+        writer = self._writer()
+        user = writer.add(user_data(1)).result(timeout=5)
+        self.assertEqual(writer.update(user.id, {"username": "novo"}, 1).result(timeout=5).version, 2)
+        with self.assertRaises(UserVersionConflictError):
+            writer.update(user.id, {"username": "velho"}, 1).result(timeout=5)
+        with self.assertRaises(UserVersionConflictError):
+            writer.delete(user.id, 1).result(timeout=5)
+        self.assertIsNone(writer.update(999, {"username": "x"}, 1).result(timeout=5))
+        self.assertEqual(self._usernames(), ["novo"])
+        self.assertEqual(writer.delete(user.id, 2).result(timeout=5).id, user.id)
+
+    def test_failed_add_many_is_rolled_back_alone(self):
+        """Testa que um add_many com duplicado desfaz apenas o próprio lote"""
+        writer = self._writer(max_delay=0.2)
+        writer.add(user_data(0)).result(timeout=5)
+        failed = writer.add_many([user_data(1), user_data(2), user_data(0)])
+        succeeded = writer.add(user_data(3))
+        with self.assertRaises(UserAlreadyExistsError):
+            failed.result(timeout=5)
+        self.assertEqual(succeeded.result(timeout=5).username, "user3")
+        self.assertEqual(self._usernames(), ["user0", "user3"])
+
+    def test_transaction_failure_is_reported_to_every_caller(self):
+        """Testa que uma falha ao obter o lock de escrita chega a todas as operações do lote"""
+        writer = self._writer(max_delay=0.2)
+        blocker = create_engine(self.url, connect_args={"isolation_level": None})
+        with blocker.connect() as connection:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            futures = [writer.add(user_data(i)) for i in range(3)]
+            for future in futures:
+                with self.assertRaises(OperationalError):
+                    future.result(timeout=5)
+            connection.exec_driver_sql("ROLLBACK")
+        blocker.dispose()
+        # A thread continua processando depois da falha
+        self.assertEqual(writer.add(user_data(9)).result(timeout=5).username, "user9")
+
+    def test_close_drains_queue_and_restarts_on_demand(self):
+        writer = self._writer(max_batch=2)
+        futures = [writer.add(user_data(i)) for i in range(5)]
+        writer.close()
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(writer.add(user_data(5)).result(timeout=5).username, "user5")
+
+    def test_cancelled_operation_is_skipped(self):
+        """Testa que uma operação cancelada antes de o lote começar não é executada"""
+        writer = self._writer(max_delay=0.3)
+        kept = writer.add(user_data(1))
+        cancelled = writer.add(user_data(2))
+        self.assertTrue(cancelled.cancel())
+
+        self.assertEqual(kept.result(timeout=5).username, "user1")
+        self.assertEqual(self._usernames(), ["user1"])
+        self.assertEqual(writer.stats()["operations"], 1)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            GroupCommitWriter(self.engine, max_batch=0)
+        with self.assertRaises(ValueError):
+            GroupCommitWriter(self.engine, max_delay=-1)
+
+
+class TestGroupCommitUserRepository(GroupCommitTestCase):
+
+    def test_concurrent_writes_share_commits(self):
+        """Testa escritas concorrentes pela porta assíncrona e leituras no repositório envolvido"""
+        from unittest.mock import AsyncMock, MagicMock
+
+        writer = self._writer(max_delay=0.05)
+        inner = AsyncMock()
+        inner._mark_written = MagicMock()
+        inner.get_by_id.return_value = None
+        repository = GroupCommitUserRepository(inner, writer)
+
+        async def scenario():
+            users = await asyncio.gather(*(repository.add(user_data(i)) for i in range(20)))
+            self.assertIsNone(await repository.get_by_id(users[0].id))
+            self.assertEqual(await repository.add_many([]), [])
+            return users
+
+        users = asyncio.run(scenario())
+        self.assertEqual(sorted(user.username for user in users), sorted(f"user{i}" for i in range(20)))
+        self.assertLess(self.commits, 20)
+        inner.get_by_id.assert_awaited_once_with(users[0].id)
+        inner.add.assert_not_called()
+        self.assertEqual(inner._mark_written.call_count, 20)
+
+    def test_writes_move_reads_to_primary(self):
+        """Testa read-your-writes com réplicas: após uma escrita na fila, as leituras vão ao primário"""
+        from unittest.mock import MagicMock
+
+        from src.infrastructure.database.async_sqlite_user_repository import AsyncSQLiteUserRepository
+        from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+        from src.infrastructure.database.threadpool_user_repository import ThreadPoolUserRepository
+
+        writer = self._writer()
+        async_inner = AsyncSQLiteUserRepository(MagicMock(), read_session=MagicMock())
+        sync_inner = SQLiteUserRepository(MagicMock(), read_session=MagicMock())
+
+        async def scenario():
+            await GroupCommitUserRepository(async_inner, writer).add(user_data(1))
+            await GroupCommitUserRepository(ThreadPoolUserRepository(sync_inner), writer).add(user_data(2))
+
+        asyncio.run(scenario())
+        self.assertIs(async_inner._reader, async_inner.db)
+        self.assertIs(sync_inner._reader, sync_inner.db)
+
+
+class TestWriteQueueApp(AppStateTestMixin, unittest.TestCase):
+
+    def test_settings(self):
+        from src.config import Settings
+
+        settings = Settings.from_env({"WRITE_QUEUE_ENABLED": "true", "WRITE_QUEUE_MAX_BATCH": "8"})
+        self.assertTrue(settings.write_queue_enabled)
+        self.assertEqual(settings.write_queue_max_batch, 8)
+        with self.assertRaises(ValueError):
+            Settings(write_queue_max_batch=0)
+        with self.assertRaises(ValueError):
+            Settings(write_queue_max_delay_ms=-1)
+        with self.assertRaises(ValueError):
+            Settings(write_queue_enabled=True, database_shard_urls=("sqlite:///a.db",))
+
+    def test_routes_use_write_queue(self):
+        """Testa create/update/delete pelas rotas com WRITE_QUEUE_ENABLED nos dois backends"""
+        from src.config import Settings
+        from src.main import create_app
+
+        for backend in ("async", "sync"):
+            with self.subTest(backend=backend):
+                settings = Settings(
+                    database_url=self.database_url(f"{backend}.db"),
+                    password_hash_workers=0,
+                    metrics_enabled=False,
+                    write_queue_enabled=True,
+                    repository_backend=backend,
+                )
+                with TestClient(create_app(settings)) as client:
+                    payload = {"username": "ana", "email": "ana@example.com", "password": "pw"}
+                    created = client.post("/users/", json=payload)
+                    self.assertEqual(created.status_code, 201)
+                    self.assertEqual(client.post("/users/", json=payload).status_code, 400)
+
+                    token = client.post("/token", data={"username": "ana@example.com", "password": "pw"})
+                    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+                    user_id = created.json()["id"]
+                    updated = client.put(f"/users/{user_id}", json={"username": "ana2"}, headers=headers)
+                    self.assertEqual(updated.json()["username"], "ana2")
+                    self.assertEqual(client.get(f"/users/{user_id}").json()["username"], "ana2")
+                    self.assertEqual(client.delete(f"/users/{user_id}", headers=headers).status_code, 204)
+                    self.assertEqual(client.get(f"/users/{user_id}").status_code, 404)
+
+                    stats = client.get("/health").json()["write_queue"]
+                    self.assertEqual(stats["operations"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
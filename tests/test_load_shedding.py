@@ -0,0 +1,215 @@
+import asyncio
+import unittest
+
+import httpx
+from fastapi.testclient import TestClient
+
+from src.config import ConcurrencyLimit, Settings
+from src.infrastructure.web.load_shedding import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitExceeded,
+    ConcurrencyLimitMiddleware,
+    build_limiters,
+    classify_request,
+)
+from tests import AppStateTestMixin
+
+
+def _limit(**overrides) -> ConcurrencyLimit:
+    values = dict(initial=2, min=1, max=4, queue=1, queue_timeout_ms=1000, target_ms=100)
+    values.update(overrides)
+    return ConcurrencyLimit(**values)
+
+
+class TestClassifyRequest(unittest.TestCase):
+
+    def test_route_classes(self):
+        self.assertEqual(classify_request("POST", "/token"), "auth")
+        self.assertEqual(classify_request("POST", "/users/"), "auth")
+        self.assertEqual(classify_request("POST", "/users/bulk"), "auth")
+        self.assertEqual(classify_request("GET", "/users/"), "read")
+        self.assertEqual(classify_request("GET", "/users/export"), "read")
+        self.assertEqual(classify_request("PUT", "/users/1"), "write")
+        self.assertEqual(classify_request("DELETE", "/users/1"), "write")
+        self.assertEqual(classify_request("GET", "/health"), "health")
+        self.assertEqual(classify_request("GET", "/metrics"), "health")
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+
+    def test_queue_and_rejections(self):
+        """Testa vagas até o limite, espera na fila e recusa com a fila cheia"""
+        limiter = AdaptiveConcurrencyLimiter("test", _limit())
+
+        async def scenario():
+            await limiter.acquire()
+            await limiter.acquire()
+            queued = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            self.assertEqual(limiter.snapshot()["queued"], 1)
+            with self.assertRaises(ConcurrencyLimitExceeded) as raised:
+                await limiter.acquire()
+            self.assertEqual(raised.exception.reason, "queue_full")
+
+            limiter.release(None)
+            await asyncio.wait_for(queued, 1)
+            self.assertEqual(limiter.in_flight, 2)
+
+        asyncio.run(scenario())
+        self.assertEqual(limiter.snapshot()["rejected"], {"queue_full": 1, "timeout": 0})
+
+    def test_queue_timeout(self):
+        limiter = AdaptiveConcurrencyLimiter("test", _limit(initial=1, queue_timeout_ms=10))
+
+        async def scenario():
+            await limiter.acquire()
+            with self.assertRaises(ConcurrencyLimitExceeded) as raised:
+                await limiter.acquire()
+            self.assertEqual(raised.exception.reason, "timeout")
+            limiter.release(None)
+            # A espera expirada não fica na fila nem ocupa vaga
+            self.assertEqual(limiter.snapshot()["queued"], 0)
+            self.assertEqual(limiter.in_flight, 0)
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_leaves_queue(self):
+        limiter = AdaptiveConcurrencyLimiter("test", _limit(initial=1))
+
+        async def scenario():
+            await limiter.acquire()
+            queued = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            queued.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await queued
+            limiter.release(None)
+            self.assertEqual((limiter.in_flight, limiter.snapshot()["queued"]), (0, 0))
+
+        asyncio.run(scenario())
+
+    def test_aimd_adjusts_limit_within_bounds(self):
+        """Testa o aumento aditivo com o limite em uso e a redução multiplicativa acima do alvo"""
+        limiter = AdaptiveConcurrencyLimiter("test", _limit())
+
+        async def scenario():
+            for _ in range(5):
+                await limiter.acquire()
+                await limiter.acquire()
+                limiter.release(0.01)
+                limiter.release(0.01)
+            self.assertEqual(limiter.snapshot()["limit"], 4)
+
+            for _ in range(20):
+                await limiter.acquire()
+                limiter.release(0.5)
+            self.assertEqual(limiter.snapshot()["limit"], 1)
+
+            # Com o limite ocioso (uma requisição por vez, limite 4), respostas rápidas não o aumentam
+            limiter.limit = 4.0
+            await limiter.acquire()
+            limiter.release(0.01)
+            await limiter.acquire()
+            limiter.release(0.01)
+            self.assertEqual(limiter.limit, 4.0)
+
+        asyncio.run(scenario())
+
+
+class TestConcurrencyLimitMiddleware(unittest.TestCase):
+
+    def test_rejects_over_budget_without_affecting_other_classes(self):
+        """Testa 503 com Retry-After na classe saturada enquanto as demais continuam atendidas"""
+        release = asyncio.Event()
+        started = []
+
+        async def app(scope, receive, send):
+            if scope["path"] == "/token":
+                started.append(scope["path"])
+                await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        limits = {
+            "auth": _limit(initial=1, max=1, queue=1),
+            "write": _limit(),
+            "read": _limit(),
+            "health": _limit(),
+        }
+        limiters = build_limiters(limits)
+        middleware = ConcurrencyLimitMiddleware(app, limiters=limiters)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=middleware)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = asyncio.ensure_future(client.post("/token"))
+                queued = asyncio.ensure_future(client.post("/token"))
+                while not started or limiters["auth"].snapshot()["queued"] == 0:
+                    await asyncio.sleep(0.001)
+
+                rejected = await client.post("/token")
+                self.assertEqual(rejected.status_code, 503)
+                self.assertEqual(rejected.headers["Retry-After"], "1")
+                self.assertEqual(rejected.json()["detail"], "Server is overloaded, try again later")
+                self.assertEqual((await client.get("/users/1")).status_code, 200)
+                self.assertEqual((await client.get("/health")).status_code, 200)
+
+                release.set()
+                self.assertEqual((await first).status_code, 200)
+                self.assertEqual((await queued).status_code, 200)
+
+        asyncio.run(scenario())
+        self.assertEqual(limiters["auth"].snapshot()["rejected"]["queue_full"], 1)
+        self.assertEqual(limiters["auth"].in_flight, 0)
+        self.assertEqual(limiters["read"].snapshot()["rejected"], {"queue_full": 0, "timeout": 0})
+
+
+class TestLoadSheddingSettings(unittest.TestCase):
+
+    def test_from_env_overrides(self):
+        settings = Settings.from_env({"CONCURRENCY_LIMIT_AUTH": "initial=2, max=8,queue_timeout_ms=250"})
+        auth = settings.concurrency_limits["auth"]
+        self.assertEqual((auth.initial, auth.max, auth.queue_timeout_ms), (2, 8, 250.0))
+        self.assertEqual(auth.queue, Settings().concurrency_limits["auth"].queue)
+        self.assertFalse(Settings.from_env({"CONCURRENCY_LIMIT_ENABLED": "false"}).concurrency_limit_enabled)
+
+    def test_invalid_limits(self):
+        with self.assertRaises(ValueError):
+            Settings.from_env({"CONCURRENCY_LIMIT_READ": "min=10,initial=5"})
+        with self.assertRaises(ValueError):
+            Settings.from_env({"CONCURRENCY_LIMIT_READ": "limit=10"})
+        with self.assertRaises(ValueError):
+            _limit(target_ms=0)
+        with self.assertRaises(ValueError):
+            Settings(concurrency_limits={"read": _limit()})
+
+
+class TestLoadSheddingApp(AppStateTestMixin, unittest.TestCase):
+
+    def _settings(self, **overrides) -> Settings:
+        return Settings(
+            database_url=self.database_url("users.db"),
+            password_hash_workers=0,
+            metrics_enabled=False,
+            **overrides,
+        )
+
+    def test_health_reports_limits(self):
+        from src.main import create_app
+
+        with TestClient(create_app(self._settings())) as client:
+            self.assertEqual(client.get("/users/").status_code, 200)
+            limits = client.get("/health").json()["concurrency_limits"]
+        self.assertEqual(set(limits), {"auth", "write", "read", "health"})
+        self.assertEqual(limits["read"]["in_flight"], 0)
+        self.assertEqual(limits["health"]["in_flight"], 1)
+
+    def test_disabled(self):
+        from src.main import create_app
+
+        with TestClient(create_app(self._settings(concurrency_limit_enabled=False))) as client:
+            self.assertIsNone(client.get("/health").json()["concurrency_limits"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from benchmarks.loadtest import HISTOGRAM_BUCKETS_MS, OPERATIONS, WORKLOADS, Recorder, histogram, percentile, summarize
+
+
+class TestLoadTestReport(unittest.TestCase):
+
+    def test_percentile(self):
+        """Testa os percentis sobre latências ordenadas"""
+        ordered = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(percentile(ordered, 0.50), 51.0)
+        self.assertEqual(percentile(ordered, 0.99), 100.0)
+        self.assertEqual(percentile([], 0.95), 0.0)
+
+    def test_histogram_buckets(self):
+        """Testa a distribuição das latências nos intervalos do histograma"""
+        buckets = dict(histogram([0.5, 1.0, 1.5, 7000.0]))
+
+        self.assertEqual(len(buckets), len(HISTOGRAM_BUCKETS_MS))
+        self.assertEqual(buckets["<= 1 ms"], 2)
+        self.assertEqual(buckets["<= 2 ms"], 1)
+        self.assertEqual(buckets["> 5000 ms"], 1)
+
+    def test_summarize_counts_errors(self):
+        """Testa req/s e taxa de erros por rota e no total"""
+        recorder = Recorder()
+        recorder.record("GET /users/me", 2.0, 200)
+        recorder.record("GET /users/me", 4.0, 401)
+        recorder.record("POST /token", 300.0, None)
+        recorder.record("POST /token", 250.0, 200)
+
+        report = summarize(recorder, elapsed=2.0)
+
+        self.assertEqual(report["total"]["requests"], 4)
+        self.assertEqual(report["total"]["requests_per_second"], 2.0)
+        self.assertEqual(report["total"]["error_rate"], 0.5)
+        self.assertEqual(report["routes"]["POST /token"]["status_codes"], {"exception": 1, "200": 1})
+        self.assertEqual(report["routes"]["GET /users/me"]["max_ms"], 4.0)
+
+    def test_workloads_use_known_operations(self):
+        """Testa que toda carga referencia operações existentes com pesos positivos"""
+        for name, weights in WORKLOADS.items():
+            with self.subTest(workload=name):
+                self.assertTrue(set(weights) <= set(OPERATIONS))
+                self.assertTrue(all(weight > 0 for weight in weights.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
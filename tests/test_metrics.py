@@ -0,0 +1,165 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.infrastructure.observability import metrics
+from src.infrastructure.observability.metrics import (
+    MetricsMiddleware,
+    MetricsRegistry,
+    aggregate_snapshots,
+    cache_collector,
+    install_engine_metrics,
+    render,
+    statement_type,
+    write_snapshot,
+)
+
+
+def _samples(text_body: str) -> dict:
+    lines = [line for line in text_body.splitlines() if line and not line.startswith("#")]
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in lines}
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_counter_and_gauge(self):
+        """Testa contadores e gauges com rótulos no formato texto"""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requisições", ("route",))
+        in_flight = registry.gauge("in_flight", "Em andamento")
+        requests.labels('/a"b').inc()
+        requests.labels('/a"b').inc(2)
+        in_flight.labels().inc()
+        in_flight.labels().dec()
+
+        body = render(registry.collect())
+
+        self.assertIn("# TYPE requests_total counter", body)
+        self.assertEqual(_samples(body)['requests_total{route="/a\\"b"}'], 3)
+        self.assertEqual(_samples(body)["in_flight"], 0)
+
+    def test_histogram_is_cumulative(self):
+        """Testa os intervalos cumulativos, a soma e o total de um histograma"""
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "Latência", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.labels().observe(value)
+
+        samples = _samples(render(registry.collect()))
+
+        self.assertEqual(samples['latency_seconds_bucket{le="0.1"}'], 2)
+        self.assertEqual(samples['latency_seconds_bucket{le="1"}'], 3)
+        self.assertEqual(samples['latency_seconds_bucket{le="+Inf"}'], 4)
+        self.assertEqual(samples["latency_seconds_count"], 4)
+        self.assertAlmostEqual(samples["latency_seconds_sum"], 3.65)
+
+    def test_wrong_label_count(self):
+        """Testa a recusa de rótulos incompatíveis com a métrica"""
+        registry = MetricsRegistry()
+        with self.assertRaises(ValueError):
+            registry.counter("c_total", "c", ("a", "b")).labels("x")
+
+    def test_metric_requires_new_series(self):
+        """Testa que uma métrica sem _new_series falha já ao ser criada"""
+        class Incomplete(metrics._Metric):
+            type_name = "gauge"
+
+        with self.assertRaises(TypeError):
+            Incomplete("incomplete", "Sem _new_series")
+
+    def test_cache_hit_ratio(self):
+        """Testa acertos, falhas e a razão de acerto derivada dos stats() dos caches"""
+        registry = MetricsRegistry()
+        registry.add_collector(cache_collector(lambda: {
+            "auth_user": {"hits": 3, "misses": 1, "size": 2},
+            "disabled": None,
+        }))
+
+        samples = _samples(render(registry.collect()))
+
+        self.assertEqual(samples['cache_hits_total{cache="auth_user"}'], 3)
+        self.assertEqual(samples['cache_hit_ratio{cache="auth_user"}'], 0.75)
+        self.assertNotIn('cache_hits_total{cache="disabled"}', samples)
+
+    def test_statement_type(self):
+        """Testa a classificação das instruções SQL"""
+        self.assertEqual(statement_type("  select 1"), "SELECT")
+        self.assertEqual(statement_type("INSERT INTO users"), "INSERT")
+        self.assertEqual(statement_type("VACUUM"), "OTHER")
+        self.assertEqual(statement_type(""), "OTHER")
+
+
+class TestMultiprocessAggregation(unittest.TestCase):
+
+    def test_snapshots_are_summed(self):
+        """Testa a soma entre processos e o descarte de gauges de processos encerrados"""
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requisições").inc(5)
+        registry.gauge("in_flight", "Em andamento").labels().inc(2)
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write_snapshot(registry, tmpdir)
+            with open(os.path.join(tmpdir, f"metrics-{finished.pid}.json"), "w") as f:
+                json.dump({"pid": finished.pid, "written_at": 0, "families": [
+                    {"name": "requests_total", "type": "counter", "help": "Requisições",
+                     "samples": [["requests_total", [], 7]]},
+                    {"name": "in_flight", "type": "gauge", "help": "Em andamento",
+                     "samples": [["in_flight", [], 9]]},
+                ]}, f)
+            samples = _samples(render(aggregate_snapshots(tmpdir)))
+
+        self.assertEqual(samples["requests_total"], 12)
+        self.assertEqual(samples["in_flight"], 2)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_middleware_uses_route_template(self):
+        """Testa a latência rotulada pelo template da rota e pelo status"""
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        def read_item(item_id: int):
+            return {"id": item_id}
+
+        client = TestClient(app)
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/missing")
+
+        series = metrics.http_request_duration._series
+        self.assertEqual(sum(series[("GET", "/items/{item_id}", "200")].counts), 2)
+        self.assertIn(("GET", "<unmatched>", "404"), series)
+        self.assertNotIn(("GET", "/items/1", "200"), series)
+
+    def test_engine_metrics(self):
+        """Testa contagem de SQL por tipo, erros e checkout do pool de um engine"""
+        engine = create_engine("sqlite://")
+        install_engine_metrics(engine, "test_engine")
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with self.assertRaises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        engine.dispose()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 2"))
+
+        selects = metrics.db_query_duration._series[("test_engine", "SELECT")]
+        self.assertEqual(sum(selects.counts), 2)
+        self.assertEqual(metrics.db_query_errors._series[("test_engine", "SELECT")].value, 1)
+        self.assertEqual(sum(metrics.db_pool_checkout_duration._series[("test_engine",)].counts), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from src.infrastructure.web.pagination import decode_cursor, encode_cursor
+
+
+class TestPagination(unittest.TestCase):
+
+    def test_cursor_roundtrip(self):
+        """Testa que o cursor codificado retorna o mesmo id"""
+        for last_id in (1, 42, 10**12):
+            self.assertEqual(decode_cursor(encode_cursor(last_id)), last_id)
+
+    def test_cursor_is_url_safe(self):
+        """Testa que o cursor não contém caracteres que exijam escape em URLs"""
+        cursor = encode_cursor(123456789)
+        self.assertNotIn("=", cursor)
+        self.assertNotIn("+", cursor)
+        self.assertNotIn("/", cursor)
+
+    def test_decode_invalid_cursor(self):
+        """Testa que cursores malformados geram ValueError"""
+        for cursor in ("not-a-cursor", "", encode_cursor(1)[:-2] + "!!"):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_decode_cursor_with_non_integer_id(self):
+        """Testa que um id não inteiro é rejeitado"""
+        import base64
+        cursor = base64.urlsafe_b64encode(b'{"id":"1"}').decode().rstrip("=")
+        with self.assertRaises(ValueError):
+            decode_cursor(cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from src.config import Settings
+from src.infrastructure.security.password_hasher import (
+    PasswordHashPolicy,
+    PasswordHasher,
+    PasswordHasherBusyError,
+    get_password_hasher,
+)
+from tests import AppStateTestMixin
+
+
+class TestPasswordHasher(unittest.TestCase):
+
+    def setUp(self):
+        # Execução na própria thread: mantém os testes rápidos e determinísticos
+        self.hasher = PasswordHasher(workers=0, max_pending=4)
+
+    def test_hash_and_verify_inline(self):
+        """Testa hash e verificação sem pool de processos"""
+        hashed = self.hasher.hash("secret")
+
+        self.assertNotEqual(hashed, "secret")
+        self.assertTrue(self.hasher.verify("secret", hashed))
+        self.assertFalse(self.hasher.verify("wrong", hashed))
+
+    def test_async_api(self):
+        """Testa a API assíncrona no modo sem pool"""
+        async def scenario():
+            hashed = await self.hasher.hash_async("secret")
+            return await self.hasher.verify_async("secret", hashed)
+
+        self.assertTrue(asyncio.run(scenario()))
+
+    def test_metrics_are_recorded(self):
+        """Testa que tempos de hash e contadores são registrados"""
+        self.hasher.hash("secret")
+
+        snapshot = self.hasher.snapshot()
+        self.assertEqual(snapshot["completed"], 1)
+        self.assertEqual(snapshot["pending"], 0)
+        self.assertGreater(snapshot["hash_seconds_max"], 0)
+        self.assertGreaterEqual(snapshot["queue_wait_seconds_avg"], 0)
+
+    def test_rejects_when_queue_is_full(self):
+        """Testa que a fila limitada rejeita novas operações"""
+        hasher = PasswordHasher(workers=0, max_pending=1)
+        hasher._acquire_slot()  # simula uma operação em andamento
+
+        with self.assertRaises(PasswordHasherBusyError):
+            hasher.hash("secret")
+        self.assertEqual(hasher.snapshot()["rejected"], 1)
+
+    def test_process_pool(self):
+        """Testa hash e verificação executados no pool de processos"""
+        hasher = PasswordHasher(workers=1, max_pending=4)
+        try:
+            hashed = hasher.hash("secret")
+
+            self.assertTrue(hasher.verify("secret", hashed))
+            self.assertTrue(asyncio.run(hasher.verify_async("secret", hashed)))
+            self.assertEqual(hasher.snapshot()["completed"], 3)
+            self.assertEqual(hasher.pending, 0)
+        finally:
+            hasher.shutdown()
+
+    def test_invalid_configuration(self):
+        """Testa validação dos parâmetros do executor"""
+        with self.assertRaises(ValueError):
+            PasswordHasher(workers=-1, max_pending=1)
+        with self.assertRaises(ValueError):
+            PasswordHasher(workers=1, max_pending=0)
+
+
+class TestPasswordHashPolicy(unittest.TestCase):
+
+    def test_cost_change_is_detected_and_rehashed(self):
+        """Testa que hashes com outro custo (maior ou menor) são refeitos por verify_and_update"""
+        old = PasswordHasher(workers=0, max_pending=4, policy=PasswordHashPolicy(bcrypt_rounds=4))
+        new = PasswordHasher(workers=0, max_pending=4, policy=PasswordHashPolicy(bcrypt_rounds=5))
+        hashed = old.hash("secret")
+
+        self.assertFalse(old.needs_update(hashed))
+        self.assertTrue(new.needs_update(hashed))
+        verified, new_hash = new.verify_and_update("secret", hashed)
+        self.assertTrue(verified)
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+        self.assertTrue(old.needs_update(new_hash))
+        self.assertEqual(new.verify_and_update("wrong", hashed), (False, None))
+        self.assertEqual(asyncio.run(new.verify_and_update_async("secret", new_hash)), (True, None))
+
+    def test_settings(self):
+        settings = Settings.from_env({"PASSWORD_HASH_SCHEME": "Argon2", "PASSWORD_HASH_ARGON2_TIME_COST": "3"})
+        policy = PasswordHashPolicy.from_settings(settings)
+        self.assertEqual((policy.scheme, policy.argon2_time_cost, policy.bcrypt_rounds), ("argon2", 3, 12))
+        with self.assertRaises(ValueError):
+            Settings(password_hash_scheme="md5")
+        with self.assertRaises(ValueError):
+            Settings(password_hash_bcrypt_rounds=3)
+        with self.assertRaises(ValueError):
+            Settings(password_hash_argon2_memory_kib=8, password_hash_argon2_parallelism=2)
+
+    def test_argon2_requires_backend(self):
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            with self.assertRaises(RuntimeError):
+                PasswordHasher(workers=0, max_pending=4, policy=PasswordHashPolicy(scheme="argon2"))
+            return
+        hasher = PasswordHasher(workers=0, max_pending=4, policy=PasswordHashPolicy(
+            scheme="argon2", argon2_time_cost=1, argon2_memory_kib=1024
+        ))
+        bcrypt_hash = PasswordHasher(workers=0, max_pending=4, policy=PasswordHashPolicy(bcrypt_rounds=4)).hash("s")
+        verified, new_hash = hasher.verify_and_update("s", bcrypt_hash)
+        self.assertTrue(verified)
+        self.assertTrue(new_hash.startswith("$argon2"))
+
+
+class TestRehashOnLogin(AppStateTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.previous_policy = get_password_hasher().policy
+        self.path = os.path.join(self.tmpdir.name, "users.db")
+
+    def tearDown(self):
+        password_hasher = get_password_hasher()
+        password_hasher.configure(password_hasher.workers, password_hasher.max_pending, self.previous_policy)
+
+    def _client(self, rounds: int, user_repository_cache: str = "none") -> TestClient:
+        from src.main import create_app
+
+        return TestClient(create_app(Settings(
+            database_url=f"sqlite:///{self.path}",
+            password_hash_workers=0,
+            password_hash_bcrypt_rounds=rounds,
+            user_repository_cache=user_repository_cache,
+            metrics_enabled=False,
+        )))
+
+    def _stored_hash(self) -> str:
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute("SELECT hashed_password FROM users").fetchone()[0]
+
+    def test_login_rehashes_outdated_password(self):
+        """Testa que o login grava o hash com o novo custo e continua aceitando a senha"""
+        credentials = {"username": "ana@example.com", "password": "pw"}
+        with self._client(rounds=4) as client:
+            payload = {"username": "ana", "email": "ana@example.com", "password": "pw"}
+            self.assertEqual(client.post("/users/", json=payload).status_code, 201)
+        self.assertTrue(self._stored_hash().startswith("$2b$04$"))
+
+        with self._client(rounds=5) as client:
+            self.assertEqual(client.post("/token", data=credentials).status_code, 200)
+            self.assertTrue(self._stored_hash().startswith("$2b$05$"))
+            self.assertEqual(client.post("/token", data=credentials).status_code, 200)
+            self.assertEqual(client.post("/token", data={**credentials, "password": "x"}).status_code, 401)
+            # Apenas o primeiro login regrava o hash (uma nova versão do usuário)
+            self.assertEqual(client.get("/users/1").headers["ETag"], '"1-2"')
+
+    def test_login_uses_one_repository_scope(self):
+        """Testa que o login lê e regrava o hash com uma única sessão, invalidando o cache"""
+        import src.infrastructure.web.dependencies as dependencies
+
+        credentials = {"username": "ana@example.com", "password": "pw"}
+        with self._client(rounds=4) as client:
+            payload = {"username": "ana", "email": "ana@example.com", "password": "pw"}
+            self.assertEqual(client.post("/users/", json=payload).status_code, 201)
+
+        scopes = []
+        original_scope = dependencies.user_repository_scope
+
+        def counting_scope():
+            scopes.append(1)
+            return original_scope()
+
+        with self._client(rounds=5, user_repository_cache="memory") as client:
+            # Usuário no cache read-through com a versão anterior ao novo hash
+            self.assertEqual(client.get("/users/1").headers["ETag"], '"1-1"')
+            with patch.object(dependencies, "user_repository_scope", counting_scope):
+                self.assertEqual(client.post("/token", data=credentials).status_code, 200)
+            self.assertEqual(len(scopes), 1)
+            self.assertTrue(self._stored_hash().startswith("$2b$05$"))
+            self.assertEqual(client.get("/users/1").headers["ETag"], '"1-2"')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.infrastructure.database.async_sqlite_user_repository import AsyncSQLiteUserRepository
+from src.infrastructure.database.database import Base, get_read_only_sqlite_url
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+
+
+class TestReadOnlySQLiteUrl(unittest.TestCase):
+
+    def test_file_url_becomes_read_only(self):
+        """Testa a conversão de arquivos SQLite para mode=ro"""
+        self.assertEqual(
+            get_read_only_sqlite_url("sqlite:///./user_manager.db"),
+            "sqlite:///file:./user_manager.db?mode=ro&uri=true",
+        )
+        self.assertEqual(
+            get_read_only_sqlite_url("sqlite+aiosqlite:///./user_manager.db"),
+            "sqlite+aiosqlite:///file:./user_manager.db?mode=ro&uri=true",
+        )
+
+    def test_other_urls_unchanged(self):
+        """Testa que memória, URIs já explícitas e outros bancos não são alterados"""
+        for url in (
+            "sqlite:///:memory:",
+            "sqlite:///file:replica.db?mode=ro&uri=true",
+            "postgresql://user:pw@replica/db",
+        ):
+            self.assertEqual(get_read_only_sqlite_url(url), url)
+
+
+class TestSyncReadRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, "users.db")
+        self.write_engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(self.write_engine)
+        self.read_engine = create_engine(get_read_only_sqlite_url(f"sqlite:///{path}"))
+        self.db = sessionmaker(bind=self.write_engine)()
+        self.read_db = sessionmaker(bind=self.read_engine)()
+        self.repository = SQLiteUserRepository(self.db, read_session=self.read_db)
+
+    def tearDown(self):
+        self.read_db.close()
+        self.db.close()
+        self.read_engine.dispose()
+        self.write_engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_read_only_engine_rejects_writes(self):
+        """Testa que o engine de leitura abre o arquivo em modo somente leitura"""
+        with self.assertRaises(OperationalError):
+            with self.read_engine.begin() as conn:
+                conn.execute(text("DELETE FROM users"))
+
+    def test_reads_use_read_session_until_first_write(self):
+        """Testa o roteamento de leituras e a consistência read-your-writes"""
+        self.assertIs(self.repository._reader, self.read_db)
+
+        created = self.repository.add({
+            "username": "u", "email": "u@example.com", "hashed_password": "h"
+        })
+
+        self.assertIs(self.repository._reader, self.db)
+        self.assertEqual(self.repository.get_by_email("u@example.com"), created)
+
+    def test_replica_serves_committed_rows(self):
+        """Testa que a sessão de leitura enxerga dados confirmados pelo escritor"""
+        writer = SQLiteUserRepository(self.db)
+        created = writer.add({"username": "u", "email": "u@example.com", "hashed_password": "h"})
+
+        self.assertEqual(self.repository.get_by_id(created.id), created)
+        self.assertIs(self.repository._reader, self.read_db)
+
+
+class TestAsyncReadRouting(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        # Dois bancos em memória distintos tornam visível qual sessão atendeu a leitura
+        self.write_engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+        self.read_engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+        for engine in (self.write_engine, self.read_engine):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        self.db = async_sessionmaker(self.write_engine, expire_on_commit=False)()
+        self.read_db = async_sessionmaker(self.read_engine, expire_on_commit=False)()
+        await AsyncSQLiteUserRepository(self.read_db).add(
+            {"username": "replica", "email": "replica@example.com", "hashed_password": "h"}
+        )
+        self.repository = AsyncSQLiteUserRepository(self.db, read_session=self.read_db)
+
+    async def asyncTearDown(self):
+        await self.read_db.close()
+        await self.db.close()
+        await self.read_engine.dispose()
+        await self.write_engine.dispose()
+
+    async def test_reads_go_to_replica(self):
+        """Testa que leituras sem escrita prévia usam a sessão de leitura"""
+        self.assertIsNotNone(await self.repository.get_by_email("replica@example.com"))
+        self.assertEqual(len(await self.repository.get_all()), 1)
+
+    async def test_read_your_writes_after_add(self):
+        """Testa que, após uma escrita, as leituras passam para o escritor"""
+        created = await self.repository.add(
+            {"username": "u", "email": "u@example.com", "hashed_password": "h"}
+        )
+
+        self.assertEqual(await self.repository.get_by_id(created.id), created)
+        self.assertIsNone(await self.repository.get_by_email("replica@example.com"))
+
+    async def test_update_uses_write_session(self):
+        """Testa que update consulta o escritor, não a réplica"""
+        self.assertIsNone(await self.repository.update(1, {"username": "x"}))
+        self.assertFalse(await self.repository.delete(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from src.core.models import User as UserDomain
+from src.infrastructure.database.models import User as UserModelDB, to_domain
+from src.infrastructure.web.serialization import encode_user, encode_users, json_response
+
+from benchmarks.serialization import standard_path
+from fastapi import Response
+
+
+def _row(user_id: int, username: str, email: str = None) -> UserModelDB:
+    return UserModelDB(
+        id=user_id, username=username, email=email or f"user{user_id}@example.com", hashed_password="hash", version=1
+    )
+
+
+class TestToDomain(unittest.TestCase):
+
+    def test_builds_domain_without_validation(self):
+        """Testa a conversão de linhas do banco para o domínio"""
+        user = to_domain(_row(7, "maria"))
+        self.assertIsInstance(user, UserDomain)
+        self.assertEqual(
+            user.model_dump(),
+            {"id": 7, "username": "maria", "email": "user7@example.com", "hashed_password": "hash", "version": 1},
+        )
+
+    def test_matches_model_validate(self):
+        """Testa que o resultado é igual ao de model_validate para dados válidos"""
+        row = _row(1, "joão")
+        self.assertEqual(to_domain(row), UserDomain.model_validate(row))
+
+
+class TestEncoding(unittest.TestCase):
+    # Nomes com aspas, barras, caracteres de controle, acentos, emoji e separadores Unicode
+    USERNAMES = [
+        "simples",
+        'aspas "duplas" e \\ barra',
+        "controle\n\t\r\x00\x1f\x7f",
+        "acentuação çãõ ÆØ 日本語",
+        "emoji 🚀👩‍💻",
+        "separadores   ",
+        "",
+    ]
+
+    def _rows(self):
+        return [_row(index + 1, username) for index, username in enumerate(self.USERNAMES)]
+
+    def test_single_user_bytes_identical(self):
+        """Testa que GET /users/{id} produz os mesmos bytes do response_model"""
+        for row in self._rows():
+            with self.subTest(username=row.username):
+                self.assertEqual(encode_user(to_domain(row)), asyncio.run(standard_path([row], single=True)))
+
+    def test_user_list_bytes_identical(self):
+        """Testa que GET /users/ produz os mesmos bytes do response_model"""
+        rows = self._rows()
+        self.assertEqual(
+            encode_users([to_domain(row) for row in rows]), asyncio.run(standard_path(rows, single=False))
+        )
+
+    def test_empty_list(self):
+        self.assertEqual(encode_users([]), b"[]")
+
+    def test_password_hash_not_exposed(self):
+        """Testa que hashed_password não aparece na saída"""
+        self.assertNotIn(b"hashed_password", encode_user(to_domain(_row(1, "a"))))
+
+    def test_json_response_copies_headers(self):
+        """Testa que cabeçalhos definidos na Response da rota são mantidos"""
+        sub_response = Response()
+        sub_response.headers["X-Next-Cursor"] = "abc"
+        response = json_response(b"[]", sub_response)
+        self.assertEqual(response.body, b"[]")
+        self.assertEqual(response.headers["x-next-cursor"], "abc")
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(response.headers["content-length"], "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
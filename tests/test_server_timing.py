@@ -0,0 +1,94 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.infrastructure.observability import server_timing
+from src.infrastructure.observability.server_timing import (
+    ServerTimingMiddleware,
+    format_server_timing,
+    install_sql_timing,
+    record,
+    timed,
+)
+
+
+def _create_app(engine):
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/work")
+    def work():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        with timed("jwt"):
+            pass
+        return {"ok": True}
+
+    @app.get("/broken")
+    def broken():
+        with engine.connect() as conn:
+            try:
+                conn.execute(text("SELECT * FROM missing_table"))
+            except OperationalError:
+                pass
+        return {"ok": False}
+
+    return app
+
+
+class TestServerTiming(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        install_sql_timing(self.engine)
+        self.client = TestClient(_create_app(self.engine))
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_no_cost_outside_requests(self):
+        """Testa que medições fora de uma requisição são ignoradas"""
+        record("db", 1.0)
+        with timed("hash"):
+            pass
+
+        self.assertIsNone(server_timing._current_timings.get())
+
+    def test_format_header(self):
+        """Testa o formato das fases no cabeçalho (ms, com o número de chamadas)"""
+        header = format_server_timing({"jwt": [0.0005, 1], "db": [0.0125, 3]}, total=0.02)
+
+        self.assertEqual(header, 'db;dur=12.50;desc="SQL x3", jwt;dur=0.50;desc="JWT x1", total;dur=20.00')
+
+    def test_response_header(self):
+        """Testa as fases db, jwt e total no cabeçalho Server-Timing da resposta"""
+        response = self.client.get("/work")
+
+        header = response.headers["server-timing"]
+        self.assertIn('desc="SQL x2"', header)
+        self.assertIn('jwt;dur=', header)
+        self.assertIn("total;dur=", header)
+
+    def test_failed_statement_is_timed(self):
+        """Testa que instruções com erro também são medidas"""
+        response = self.client.get("/broken")
+
+        self.assertIn('desc="SQL x1"', response.headers["server-timing"])
+
+    def test_log_line(self):
+        """Testa a linha de log estruturada por requisição"""
+        with self.assertLogs(server_timing.logger, level="INFO") as logs:
+            self.client.get("/work")
+
+        self.assertEqual(len(logs.records), 1)
+        line = logs.records[0].getMessage()
+        self.assertTrue(line.startswith("server_timing method=GET path=/work status=200"))
+        self.assertIn("db_calls=2", line)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,277 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.core.exceptions import UserAlreadyExistsError
+from src.infrastructure.database.email_routes import create_shard_schema
+from src.infrastructure.database.sharded_user_repository import ShardedUserRepository, ShardRouter
+from tests import AppStateTestMixin, create_memory_engine, user_data
+
+SHARDS = 4
+
+
+def _email_for_shard(router: ShardRouter, shard: int, prefix: str = "moved") -> str:
+    """Primeiro email gerado a partir de prefix cujo hash aponta para o shard"""
+    index = 0
+    while router.shard_for_email(f"{prefix}{index}@example.com") != shard:
+        index += 1
+    return f"{prefix}{index}@example.com"
+
+
+class TestShardRouter(unittest.TestCase):
+
+    def test_global_id_roundtrip(self):
+        """Testa a conversão entre id global e (shard, id local)"""
+        router = ShardRouter(SHARDS)
+        for shard in range(SHARDS):
+            for local_id in (1, 2, 99):
+                self.assertEqual(router.from_global_id(router.to_global_id(shard, local_id)), (shard, local_id))
+
+    def test_routing_is_stable_and_spread(self):
+        """Testa que o shard depende só do email e que os emails se distribuem"""
+        router = ShardRouter(SHARDS)
+        shards = [router.shard_for_email(f"user{i}@example.com") for i in range(400)]
+        self.assertEqual(shards, [ShardRouter(SHARDS).shard_for_email(f"user{i}@example.com") for i in range(400)])
+        self.assertEqual(set(shards), set(range(SHARDS)))
+        self.assertTrue(all(60 < shards.count(shard) < 140 for shard in range(SHARDS)))
+
+    def test_local_after(self):
+        """Testa que local_after seleciona exatamente os ids globais maiores que o cursor"""
+        router = ShardRouter(SHARDS)
+        for after_id in range(0, 20):
+            for shard in range(SHARDS):
+                local_after = router.local_after(shard, after_id)
+                self.assertGreater(router.to_global_id(shard, local_after + 1), after_id)
+                self.assertLessEqual(router.to_global_id(shard, local_after), after_id)
+
+    def test_invalid_shard_count(self):
+        with self.assertRaises(ValueError):
+            ShardRouter(0)
+
+
+class TestShardedUserRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.engines, self.sessions = [], []
+        for _ in range(SHARDS):
+            engine = create_memory_engine()
+            with engine.begin() as connection:
+                create_shard_schema(connection)
+            self.engines.append(engine)
+            self.sessions.append(sessionmaker(bind=engine)())
+        self.repository = ShardedUserRepository(self.sessions)
+        self.router = self.repository.router
+
+    def tearDown(self):
+        for session in self.sessions:
+            session.close()
+        for engine in self.engines:
+            engine.dispose()
+
+    def _rows_per_shard(self):
+        rows = []
+        for engine in self.engines:
+            with engine.connect() as connection:
+                rows.append(connection.exec_driver_sql("SELECT count(*) FROM users").scalar())
+        return rows
+
+    def test_add_routes_by_email(self):
+        """Testa que cada usuário é gravado no shard do hash do email e achado por id e email"""
+        users = [self.repository.add(user_data(i)) for i in range(20)]
+        self.assertEqual(sum(self._rows_per_shard()), 20)
+        for user in users:
+            shard, _ = self.router.from_global_id(user.id)
+            self.assertEqual(shard, self.router.shard_for_email(user.email))
+            self.assertEqual(self.repository.get_by_id(user.id), user)
+            self.assertEqual(self.repository.get_by_email(user.email), user)
+        self.assertEqual(len({user.id for user in users}), 20)
+        self.assertIsNone(self.repository.get_by_id(0))
+        self.assertIsNone(self.repository.get_by_id(users[-1].id + SHARDS * 100))
+        self.assertIsNone(self.repository.get_by_email("ninguem@example.com"))
+
+    def test_duplicate_email(self):
+        self.repository.add(user_data(1))
+        with self.assertRaises(UserAlreadyExistsError):
+            self.repository.add(user_data(1, username="outro"))
+
+    def test_add_many_is_atomic_across_shards(self):
+        """Testa que um email duplicado em um shard desfaz o lote em todos"""
+        self.repository.add(user_data(0))
+        with self.assertRaises(UserAlreadyExistsError):
+            self.repository.add_many([user_data(i) for i in range(1, 12)] + [user_data(0)])
+        self.assertEqual(self.repository.count(), 1)
+
+        users = self.repository.add_many([user_data(i) for i in range(1, 12)])
+        self.assertEqual([user.username for user in users], [f"user{i}" for i in range(1, 12)])
+        self.assertEqual(self.repository.count(), 12)
+
+    def test_add_many_compensates_failed_commit(self):
+        """Testa que, se o COMMIT de um shard falha, as linhas já confirmadas nos outros são removidas"""
+        batch = [user_data(i) for i in range(12)]
+        last_shard = list(dict.fromkeys(self.router.shard_for_email(data["email"]) for data in batch))[-1]
+        failure = OperationalError("COMMIT", {}, Exception("disk I/O error"))
+
+        with patch.object(self.sessions[last_shard], "commit", side_effect=failure):
+            with self.assertRaises(OperationalError):
+                self.repository.add_many(batch)
+
+        self.assertEqual(self._rows_per_shard(), [0] * SHARDS)
+        self.assertEqual(self.repository.count(), 0)
+        self.assertEqual(len(self.repository.add_many(batch)), 12)
+
+    def test_offset_pages_use_keyset(self):
+        """Testa que get_all/get_versions com skip pulam ids por keyset, sem carregar linhas de cada shard"""
+        users = self.repository.add_many([user_data(i) for i in range(30)])
+        expected = sorted(user.id for user in users)
+        versions = {user.id: user.version for user in users}
+
+        with patch("src.infrastructure.database.sharded_user_repository.OFFSET_SCAN_PAGE_SIZE", 3):
+            for shard in self.repository.shards:
+                shard.get_all = None  # o caminho por offset não pode ser usado
+            for skip in (1, 5, 13, 29, 30, 45):
+                with self.subTest(skip=skip):
+                    page = self.repository.get_all(skip=skip, limit=7)
+                    self.assertEqual([user.id for user in page], expected[skip:skip + 7])
+                    self.assertEqual(
+                        self.repository.get_versions(skip=skip, limit=7),
+                        [(user_id, versions[user_id]) for user_id in expected[skip:skip + 7]],
+                    )
+
+    def test_listings_merge_shards_in_id_order(self):
+        """Testa get_all, get_all_after e stream_all ordenados pelo id global"""
+        users = self.repository.add_many([user_data(i) for i in range(30)])
+        expected = sorted(user.id for user in users)
+
+        self.assertEqual([user.id for user in self.repository.get_all(skip=0, limit=100)], expected)
+        self.assertEqual([user.id for user in self.repository.get_all(skip=5, limit=7)], expected[5:12])
+
+        pages, after = [], None
+        while True:
+            page = self.repository.get_all_after(after_id=after, limit=4)
+            pages.extend(user.id for user in page)
+            if len(page) < 4:
+                break
+            after = page[-1].id
+        self.assertEqual(pages, expected)
+
+        self.assertEqual([row[0] for row in self.repository.stream_all(batch_size=3)], expected)
+
+    def test_search_merges_by_rank_and_id(self):
+        """Testa a busca distribuída com paginação por (rank, id)"""
+        for i, name in enumerate(("maria", "mariana", "maria_silva", "ana_maria", "pedro", "marina")):
+            self.repository.add(user_data(i, username=name))
+        hits = self.repository.search("maria", limit=10)
+        self.assertEqual([user.username for _, user in hits][0], "maria")
+        self.assertEqual(hits, sorted(hits, key=lambda hit: (hit[0], hit[1].id)))
+        self.assertEqual(len(hits), 4)
+
+        rank, user = hits[1]
+        self.assertEqual(self.repository.search("maria", limit=10, after=(rank, user.id)), hits[2:])
+
+    def test_email_change_to_another_shard(self):
+        """Testa que o usuário fica no seu shard e o novo email é roteado e único"""
+        user = self.repository.add(user_data(1))
+        shard, _ = self.router.from_global_id(user.id)
+        new_email = _email_for_shard(self.router, (shard + 1) % SHARDS)
+
+        updated = self.repository.update(user.id, {"email": new_email})
+        self.assertEqual(updated.id, user.id)
+        self.assertEqual(self.repository.get_by_email(new_email), updated)
+        self.assertIsNone(self.repository.get_by_email(user.email))
+        self.assertEqual(self.repository.get_existing_emails([new_email, user.email]), {new_email})
+
+        # O email roteado não pode ser cadastrado no seu shard de origem
+        with self.assertRaises(UserAlreadyExistsError):
+            self.repository.add(user_data(2, email=new_email))
+        with self.assertRaises(UserAlreadyExistsError):
+            self.repository.add_many([user_data(3), user_data(2, email=new_email)])
+
+        # Mudar de novo libera a rota anterior
+        newer_email = _email_for_shard(self.router, (shard + 2) % SHARDS, prefix="again")
+        self.repository.update(user.id, {"email": newer_email})
+        self.assertIsNone(self.repository.get_by_email(new_email))
+        self.assertEqual(self.repository.add(user_data(2, email=new_email)).email, new_email)
+
+        # Excluir o usuário libera a rota
+        self.repository.delete(user.id)
+        self.assertIsNone(self.repository.get_by_email(newer_email))
+        self.assertEqual(self.repository.add(user_data(4, email=newer_email)).email, newer_email)
+        self.assertEqual(self.repository.count(), 2)
+
+    def test_email_change_to_existing_email(self):
+        """Testa que trocar para um email já cadastrado em outro shard falha sem deixar rota"""
+        first = self.repository.add(user_data(1))
+        shard, _ = self.router.from_global_id(first.id)
+        other_email = _email_for_shard(self.router, (shard + 1) % SHARDS, prefix="other")
+        self.repository.add(user_data(2, email=other_email))
+
+        with self.assertRaises(UserAlreadyExistsError):
+            self.repository.update(first.id, {"email": other_email})
+        self.assertEqual(self.repository.get_by_id(first.id).email, first.email)
+        self.assertEqual(self.repository.get_by_email(other_email).username, "user2")
+
+    def test_update_in_same_shard_and_missing_user(self):
+        user = self.repository.add(user_data(1))
+        self.assertEqual(self.repository.update(user.id, {"username": "novo"}).username, "novo")
+        self.assertIsNone(self.repository.update(user.id + SHARDS * 10, {"email": "x@example.com"}))
+        self.assertIsNone(self.repository.delete(user.id + SHARDS * 10))
+
+
+class TestShardedApp(AppStateTestMixin, unittest.TestCase):
+
+    def test_settings(self):
+        from src.config import Settings
+
+        settings = Settings.from_env({"DATABASE_SHARD_URLS": "sqlite:///a.db, sqlite:///b.db"})
+        self.assertEqual(settings.database_shard_urls, ("sqlite:///a.db", "sqlite:///b.db"))
+        with self.assertRaises(ValueError):
+            Settings.from_env({"DATABASE_SHARD_URLS": "sqlite:///a.db", "DATABASE_READ_URLS": "sqlite:///a.db"})
+        with self.assertRaises(ValueError):
+            Settings(database_shard_urls=("sqlite:///a.db", "sqlite:///a.db"))
+
+    def test_routes_use_shards(self):
+        """Testa as rotas com DATABASE_SHARD_URLS: usuários distribuídos entre os arquivos"""
+        from src.config import Settings
+        from src.infrastructure.database.database import get_database
+        from src.main import create_app
+
+        settings = Settings(
+            database_url=self.database_url("main.db"),
+            database_shard_urls=tuple(
+                self.database_url(f"shard{i}.db") for i in range(3)
+            ),
+            password_hash_workers=0,
+            metrics_enabled=False,
+        )
+        with TestClient(create_app(settings)) as client:
+            ids = []
+            for i in range(12):
+                response = client.post(
+                    "/users/", json={"username": f"u{i}", "email": f"u{i}@example.com", "password": "pw"}
+                )
+                self.assertEqual(response.status_code, 201)
+                ids.append(response.json()["id"])
+            self.assertEqual(
+                client.post("/users/", json={"username": "x", "email": "u0@example.com", "password": "pw"}).status_code,
+                400,
+            )
+
+            response = client.get("/users/", params={"limit": 100, "include_total": "true"})
+            self.assertEqual([user["id"] for user in response.json()], sorted(ids))
+            self.assertEqual(response.headers["X-Total-Count"], "12")
+            self.assertEqual(client.get(f"/users/{ids[3]}").json()["username"], "u3")
+
+            rows = []
+            for engine in get_database().shard_engines:
+                with engine.connect() as connection:
+                    rows.append(connection.exec_driver_sql("SELECT count(*) FROM users").scalar())
+            self.assertEqual(sum(rows), 12)
+            self.assertTrue(all(count > 0 for count in rows))
+            self.assertIsNone(get_database().reconcile_user_count())
+
+
+if __name__ == "__main__":
+    unittest.main()
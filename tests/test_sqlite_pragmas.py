@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+
+from src.infrastructure.database.sqlite_pragmas import (
+    SQLITE_PRAGMA_PROFILES,
+    install_sqlite_pragmas,
+    read_sqlite_pragmas,
+    resolve_sqlite_pragmas,
+)
+
+
+class TestSQLitePragmas(unittest.TestCase):
+
+    def test_resolve_profile(self):
+        """Testa que o perfil é retornado sem sobrescritas"""
+        self.assertEqual(
+            resolve_sqlite_pragmas("throughput"), SQLITE_PRAGMA_PROFILES["throughput"]
+        )
+        self.assertEqual(resolve_sqlite_pragmas("default"), {})
+
+    def test_resolve_overrides(self):
+        """Testa sobrescritas normalizadas e valores vazios ignorados"""
+        pragmas = resolve_sqlite_pragmas(
+            "durable", {"synchronous": "normal", "cache_size": "-2000", "mmap_size": None}
+        )
+
+        self.assertEqual(pragmas["synchronous"], "NORMAL")
+        self.assertEqual(pragmas["cache_size"], -2000)
+        self.assertEqual(pragmas["mmap_size"], SQLITE_PRAGMA_PROFILES["durable"]["mmap_size"])
+
+    def test_resolve_rejects_invalid_values(self):
+        """Testa validação de perfil, valores e nomes de PRAGMA"""
+        with self.assertRaises(ValueError):
+            resolve_sqlite_pragmas("fast")
+        with self.assertRaises(ValueError):
+            resolve_sqlite_pragmas("durable", {"journal_mode": "WAL; DROP TABLE users"})
+        with self.assertRaises(ValueError):
+            resolve_sqlite_pragmas("durable", {"busy_timeout": "soon"})
+        with self.assertRaises(ValueError):
+            resolve_sqlite_pragmas("durable", {"foreign_keys": "ON"})
+
+    def test_pragmas_applied_to_each_connection(self):
+        """Testa que o hook aplica os PRAGMAs e que a leitura reporta os efetivos"""
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{os.path.join(directory, 'test.db')}")
+            install_sqlite_pragmas(engine, resolve_sqlite_pragmas("throughput"))
+            try:
+                effective = read_sqlite_pragmas(engine)
+            finally:
+                engine.dispose()
+
+        self.assertEqual(effective["journal_mode"], "WAL")
+        self.assertEqual(effective["synchronous"], "NORMAL")
+        self.assertEqual(effective["temp_store"], "MEMORY")
+        self.assertEqual(effective["cache_size"], -64000)
+        self.assertEqual(effective["busy_timeout"], 5000)
+
+
+if __name__ == "__main__":
+    unittest.main()
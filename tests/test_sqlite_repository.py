@@ -1,10 +1,12 @@
 import unittest
 from unittest.mock import MagicMock, patch
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
 from src.infrastructure.database.models import User as UserModel
 from src.core.models import User as UserDomain
+from src.core.exceptions import UserAlreadyExistsError
 
 
 class TestSQLiteUserRepository(unittest.TestCase):
@@ -15,49 +17,38 @@ class TestSQLiteUserRepository(unittest.TestCase):
         self.repository = SQLiteUserRepository(self.mock_session)
 
     def test_add_user(self):
-        """Testa adição de usuário"""
+        """Testa adição de usuário com INSERT ... RETURNING e um único COMMIT"""
         user_data = {
             "username": "testuser",
             "email": "test@example.com",
             "hashed_password": "hashed_password"
         }
         
-        # Mock do usuário criado
-        mock_user = UserModel(
-            id=1,
-            username=user_data["username"],
-            email=user_data["email"],
-            hashed_password=user_data["hashed_password"]
-        )
-        
-        # Configurar o mock para retornar o usuário
-        self.mock_session.add.return_value = None
-        self.mock_session.commit.return_value = None
-        self.mock_session.refresh.return_value = None
-        
-        # Mock do query para retornar o usuário após refresh
-        mock_query = MagicMock()
-        mock_query.first.return_value = mock_user
-        self.mock_session.query.return_value = mock_query
-        
-        # Mock do refresh para definir o ID
-        def mock_refresh(user):
-            user.id = 1
-        
-        self.mock_session.refresh.side_effect = mock_refresh
+        # Mock da linha devolvida pelo RETURNING
+        mock_user = UserModel(id=1, **user_data)
+        self.mock_session.scalars.return_value.one.return_value = mock_user
 
         result = self.repository.add(user_data)
 
-        # Verificar se os métodos foram chamados
-        self.mock_session.add.assert_called_once()
+        self.mock_session.scalars.assert_called_once()
         self.mock_session.commit.assert_called_once()
-        self.mock_session.refresh.assert_called_once()
+        self.mock_session.refresh.assert_not_called()
         
         # Verificar se o resultado é do tipo correto
         self.assertIsInstance(result, UserDomain)
-        self.assertEqual(result.username, user_data["username"])
+        self.assertEqual(result.id, 1)
         self.assertEqual(result.email, user_data["email"])
 
+    def test_add_user_duplicate_email(self):
+        """Testa que a violação da constraint única vira UserAlreadyExistsError"""
+        self.mock_session.scalars.side_effect = IntegrityError("INSERT", {}, Exception("UNIQUE"))
+
+        with self.assertRaises(UserAlreadyExistsError):
+            self.repository.add({"username": "u", "email": "dup@example.com", "hashed_password": "h"})
+
+        self.mock_session.rollback.assert_called_once()
+        self.mock_session.commit.assert_not_called()
+
     def test_get_by_id_found(self):
         """Testa busca de usuário por ID - encontrado"""
         user_id = 1
@@ -141,6 +132,7 @@ class TestSQLiteUserRepository(unittest.TestCase):
         
         # Mock do query
         mock_query = MagicMock()
+        mock_query.order_by.return_value = mock_query
         mock_query.offset.return_value = mock_query
         mock_query.limit.return_value = mock_query
         mock_query.all.return_value = mock_users
@@ -153,92 +145,90 @@ class TestSQLiteUserRepository(unittest.TestCase):
         self.assertIsInstance(result[0], UserDomain)
         self.assertIsInstance(result[1], UserDomain)
 
+    def test_get_all_after(self):
+        """Testa paginação por keyset (WHERE id > ? ORDER BY id LIMIT ?)"""
+        mock_users = [
+            UserModel(id=11, username="user11", email="user11@example.com", hashed_password="pw"),
+        ]
+
+        mock_query = MagicMock()
+        mock_query.filter.return_value = mock_query
+        mock_query.order_by.return_value = mock_query
+        mock_query.limit.return_value = mock_query
+        mock_query.all.return_value = mock_users
+        self.mock_session.query.return_value = mock_query
+
+        result = self.repository.get_all_after(after_id=10, limit=5)
+
+        mock_query.filter.assert_called_once()
+        mock_query.limit.assert_called_once_with(5)
+        mock_query.offset.assert_not_called()
+        self.assertEqual([user.id for user in result], [11])
+
     def test_update_user_found(self):
-        """Testa atualização de usuário - encontrado"""
+        """Testa atualização de usuário - encontrado (UPDATE ... RETURNING)"""
         user_id = 1
         user_data = {"username": "updated_user"}
         
-        mock_user = UserModel(
+        # Mock da linha devolvida pelo RETURNING
+        self.mock_session.execute.return_value.first.return_value = UserModel(
             id=user_id,
-            username="old_user",
+            username="updated_user",
             email="test@example.com",
             hashed_password="hashed_password"
         )
-        
-        # Mock do query
-        mock_query = MagicMock()
-        mock_query.filter.return_value = mock_query
-        mock_query.first.return_value = mock_user
-        self.mock_session.query.return_value = mock_query
-        
-        # Mock do commit
-        self.mock_session.commit.return_value = None
 
         result = self.repository.update(user_id, user_data)
 
-        self.mock_session.query.assert_called_once_with(UserModel)
+        self.mock_session.execute.assert_called_once()
+        self.mock_session.query.assert_not_called()
         self.mock_session.commit.assert_called_once()
         self.assertIsInstance(result, UserDomain)
         self.assertEqual(result.username, "updated_user")
 
     def test_update_user_not_found(self):
-        """Testa atualização de usuário - não encontrado"""
-        user_id = 99
-        user_data = {"username": "updated_user"}
-        
-        # Mock do query retornando None
-        mock_query = MagicMock()
-        mock_query.filter.return_value = mock_query
-        mock_query.first.return_value = None
-        self.mock_session.query.return_value = mock_query
+        """Testa atualização de usuário - não encontrado (nenhuma linha devolvida)"""
+        self.mock_session.execute.return_value.first.return_value = None
 
-        result = self.repository.update(user_id, user_data)
+        result = self.repository.update(99, {"username": "updated_user"})
 
-        self.mock_session.query.assert_called_once_with(UserModel)
+        self.mock_session.execute.assert_called_once()
         self.assertIsNone(result)
 
+    def test_update_user_duplicate_email(self):
+        """Testa que trocar para um email existente vira UserAlreadyExistsError"""
+        self.mock_session.execute.side_effect = IntegrityError("UPDATE", {}, Exception("UNIQUE"))
+
+        with self.assertRaises(UserAlreadyExistsError):
+            self.repository.update(1, {"email": "dup@example.com"})
+
+        self.mock_session.rollback.assert_called_once()
+
     def test_delete_user_found(self):
-        """Testa deleção de usuário - encontrado"""
+        """Testa deleção de usuário - encontrado (DELETE ... RETURNING)"""
         user_id = 1
-        mock_user = UserModel(
+        self.mock_session.execute.return_value.first.return_value = UserModel(
             id=user_id,
             username="testuser",
             email="test@example.com",
             hashed_password="hashed_password"
         )
-        
-        # Mock do query
-        mock_query = MagicMock()
-        mock_query.filter.return_value = mock_query
-        mock_query.first.return_value = mock_user
-        self.mock_session.query.return_value = mock_query
-        
-        # Mock do delete e commit
-        self.mock_session.delete.return_value = None
-        self.mock_session.commit.return_value = None
 
         result = self.repository.delete(user_id)
 
-        self.mock_session.query.assert_called_once_with(UserModel)
-        self.mock_session.delete.assert_called_once_with(mock_user)
+        self.mock_session.execute.assert_called_once()
+        self.mock_session.query.assert_not_called()
         self.mock_session.commit.assert_called_once()
-        self.assertTrue(result)
+        self.assertEqual(result.email, "test@example.com")
 
     def test_delete_user_not_found(self):
         """Testa deleção de usuário - não encontrado"""
-        user_id = 99
-        
-        # Mock do query retornando None
-        mock_query = MagicMock()
-        mock_query.filter.return_value = mock_query
-        mock_query.first.return_value = None
-        self.mock_session.query.return_value = mock_query
+        self.mock_session.execute.return_value.first.return_value = None
 
-        result = self.repository.delete(user_id)
+        result = self.repository.delete(99)
 
-        self.mock_session.query.assert_called_once_with(UserModel)
-        self.mock_session.delete.assert_not_called()
-        self.assertFalse(result)
+        self.mock_session.execute.assert_called_once()
+        self.assertIsNone(result)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import time
+import unittest
+
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from src.config import Settings
+from src.core.exceptions import InvalidRefreshTokenError
+from src.infrastructure.database.database import Database
+from src.infrastructure.database.refresh_tokens import RefreshTokenStore
+from tests import AppStateTestMixin
+
+
+class TokenTestCase(AppStateTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        from src.infrastructure.web.auth import get_token_claims_cache
+        from src.infrastructure.web.user_cache import get_auth_user_cache
+
+        super().setUp()
+        get_auth_user_cache().clear()
+        get_token_claims_cache().clear()
+
+    def _settings(self, **overrides) -> Settings:
+        return Settings(
+            database_url=self.database_url(),
+            password_hash_workers=0,
+            password_hash_bcrypt_rounds=4,
+            metrics_enabled=False,
+            **overrides,
+        )
+
+    def _client(self, **overrides) -> TestClient:
+        from src.main import create_app
+
+        return TestClient(create_app(self._settings(**overrides)))
+
+    @staticmethod
+    def _login(client: TestClient) -> dict:
+        payload = {"username": "ana", "email": "ana@example.com", "password": "pw"}
+        client.post("/users/", json=payload)
+        response = client.post("/token", data={"username": "ana@example.com", "password": "pw"})
+        return response.json()
+
+    @staticmethod
+    def _auth(tokens: dict) -> dict:
+        return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+class TestSelfContainedTokens(TokenTestCase):
+
+    def test_claims_and_me_without_database(self):
+        """Testa as claims de identidade e /users/me sem nenhuma consulta SQL"""
+        with self._client(access_token_self_contained=True) as client:
+            tokens = self._login(client)
+            claims = jwt.get_unverified_claims(tokens["access_token"])
+            self.assertEqual(
+                (claims["sub"], claims["uid"], claims["username"], claims["ver"]), ("ana@example.com", 1, "ana", 1)
+            )
+
+            # Validade própria, mais curta, para tokens autocontidos
+            self.assertLessEqual(claims["exp"] - time.time(), 5 * 60)
+
+            me = client.get("/users/me", headers=self._auth(tokens))
+            self.assertEqual(me.json(), {"id": 1, "username": "ana", "email": "ana@example.com"})
+            self.assertNotIn("db;", me.headers["Server-Timing"])
+
+    def test_version_check_on_sensitive_operations(self):
+        """Testa que um token emitido antes de alterar o usuário precisa ser renovado para PUT/DELETE"""
+        with self._client(access_token_self_contained=True) as client:
+            tokens = self._login(client)
+            updated = client.put("/users/1", json={"username": "ana2"}, headers=self._auth(tokens))
+            self.assertEqual(updated.status_code, 200)
+
+            outdated = client.delete("/users/1", headers=self._auth(tokens))
+            self.assertEqual(outdated.status_code, 401)
+            self.assertEqual(outdated.json()["detail"], "Token is outdated, refresh it")
+
+            refreshed = client.post("/token/refresh", data={"refresh_token": tokens["refresh_token"]}).json()
+            self.assertEqual(jwt.get_unverified_claims(refreshed["access_token"])["username"], "ana2")
+            self.assertEqual(client.delete("/users/1", headers=self._auth(refreshed)).status_code, 204)
+            # A remoção revoga os refresh tokens do usuário
+            again = client.post("/token/refresh", data={"refresh_token": refreshed["refresh_token"]})
+            self.assertEqual(again.status_code, 401)
+
+    def test_update_returns_refreshed_token(self):
+        """Testa que o PUT do próprio usuário devolve um token com a nova versão em X-Access-Token"""
+        with self._client(access_token_self_contained=True) as client:
+            tokens = self._login(client)
+            updated = client.put("/users/1", json={"username": "ana2"}, headers=self._auth(tokens))
+            refreshed = {"access_token": updated.headers["X-Access-Token"]}
+            claims = jwt.get_unverified_claims(refreshed["access_token"])
+            self.assertEqual((claims["username"], claims["ver"]), ("ana2", 2))
+
+            again = client.put("/users/1", json={"username": "ana3"}, headers=self._auth(refreshed))
+            self.assertEqual(again.status_code, 200)
+            self.assertEqual(jwt.get_unverified_claims(again.headers["X-Access-Token"])["ver"], 3)
+
+    def test_default_tokens_keep_database_lookup(self):
+        with self._client(refresh_token_expire_days=0) as client:
+            tokens = self._login(client)
+            self.assertNotIn("refresh_token", tokens)
+            self.assertNotIn("uid", jwt.get_unverified_claims(tokens["access_token"]))
+            self.assertEqual(client.get("/users/me", headers=self._auth(tokens)).json()["username"], "ana")
+            updated = client.put("/users/1", json={"username": "ana2"}, headers=self._auth(tokens))
+            self.assertNotIn("X-Access-Token", updated.headers)
+
+
+class TestRefreshTokenRotation(TokenTestCase):
+
+    def test_rotation_and_reuse_detection(self):
+        """Testa que cada refresh token vale uma vez e que o reuso revoga a família"""
+        with self._client() as client:
+            tokens = self._login(client)
+            first = client.post("/token/refresh", data={"refresh_token": tokens["refresh_token"]})
+            self.assertEqual(first.status_code, 200)
+            rotated = first.json()
+            self.assertNotEqual(rotated["refresh_token"], tokens["refresh_token"])
+            self.assertEqual(client.get("/users/me", headers=self._auth(rotated)).status_code, 200)
+
+            reused = client.post("/token/refresh", data={"refresh_token": tokens["refresh_token"]})
+            self.assertEqual(reused.status_code, 401)
+            revoked = client.post("/token/refresh", data={"refresh_token": rotated["refresh_token"]})
+            self.assertEqual(revoked.status_code, 401)
+            self.assertEqual(client.post("/token/refresh", data={"refresh_token": "x"}).status_code, 401)
+
+    def test_refresh_bypasses_repository_cache(self):
+        """Testa que a versão do token renovado vem do banco, e não de uma entrada antiga do cache"""
+        import sqlite3
+
+        with self._client(access_token_self_contained=True, user_repository_cache="memory") as client:
+            tokens = self._login(client)
+            self.assertEqual(client.get("/users/1").status_code, 200)  # usuário no cache read-through
+            # Alteração feita por outro worker: o cache deste processo não é invalidado
+            with sqlite3.connect(os.path.join(self.tmpdir.name, "users.db")) as connection:
+                connection.execute("UPDATE users SET username = 'ana2', version = version + 1 WHERE id = 1")
+
+            refreshed = client.post("/token/refresh", data={"refresh_token": tokens["refresh_token"]}).json()
+            claims = jwt.get_unverified_claims(refreshed["access_token"])
+            self.assertEqual((claims["username"], claims["ver"]), ("ana2", 2))
+
+    def test_expired_token(self):
+        database = Database(self._settings())
+        store = RefreshTokenStore(database, ttl_seconds=0)
+
+        async def scenario():
+            try:
+                token = await store.issue(1)
+                with self.assertRaises(InvalidRefreshTokenError):
+                    await store.rotate(token)
+            finally:
+                await database.dispose()
+
+        asyncio.run(scenario())
+
+    def test_settings(self):
+        settings = Settings.from_env({"ACCESS_TOKEN_SELF_CONTAINED": "true", "REFRESH_TOKEN_EXPIRE_DAYS": "1.5"})
+        self.assertTrue(settings.access_token_self_contained)
+        self.assertEqual(settings.refresh_token_expire_days, 1.5)
+        with self.assertRaises(ValueError):
+            Settings(refresh_token_expire_days=-1)
+        self.assertEqual(
+            Settings.from_env({"SELF_CONTAINED_TOKEN_EXPIRE_MINUTES": "2"}).self_contained_token_expire_minutes, 2
+        )
+        with self.assertRaises(ValueError):
+            Settings(self_contained_token_expire_minutes=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
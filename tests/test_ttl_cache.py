@@ -0,0 +1,83 @@
+import unittest
+
+from src.infrastructure.cache.ttl_cache import TTLCache
+
+
+class FakeTimer:
+    """Relógio controlado manualmente para testar expiração"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.cache = TTLCache(maxsize=2, ttl=10, timer=self.timer)
+
+    def test_get_and_set(self):
+        """Testa acerto e falha com contadores"""
+        self.cache.set("a", 1)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_entries_expire(self):
+        """Testa expiração pelo TTL padrão e pelo TTL da entrada"""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2, ttl=1)
+
+        self.timer.now = 5
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+
+        self.timer.now = 10
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["expirations"], 2)
+
+    def test_entry_ttl_is_capped_by_default_ttl(self):
+        """Testa que o TTL da entrada não ultrapassa o TTL padrão"""
+        self.cache.set("a", 1, ttl=100)
+
+        self.timer.now = 11
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_lru_eviction(self):
+        """Testa descarte da entrada menos recentemente usada"""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_delete_and_clear(self):
+        """Testa remoção explícita de entradas"""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+
+        self.assertTrue(self.cache.delete("a"))
+        self.assertFalse(self.cache.delete("a"))
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_disabled_cache(self):
+        """Testa que TTL zero desabilita o cache"""
+        cache = TTLCache(maxsize=10, ttl=0)
+        cache.set("a", 1)
+
+        self.assertFalse(cache.enabled)
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
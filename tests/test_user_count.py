@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.infrastructure.database.async_sqlite_user_repository import AsyncSQLiteUserRepository
+from src.infrastructure.database.database import Base
+from src.infrastructure.database.user_count import create_user_counter, reconcile_user_count
+from tests import AppStateTestMixin, SQLiteRepositoryTestMixin, user_data
+
+
+class TestUserCounter(SQLiteRepositoryTestMixin, unittest.TestCase):
+
+    def test_counter_follows_writes(self):
+        """Testa o contador em add, add_many, update e delete"""
+        self.assertEqual(self.repository.count(), 0)
+        first = self.repository.add(user_data(1))
+        self.repository.add_many([user_data(i) for i in range(2, 6)])
+        self.assertEqual(self.repository.count(), 5)
+
+        self.repository.update(first.id, {"username": "renamed"})
+        self.assertEqual(self.repository.count(), 5)
+
+        self.repository.delete(first.id)
+        self.repository.delete(9999)
+        self.assertEqual(self.repository.count(), 4)
+
+    def test_failed_insert_does_not_change_counter(self):
+        """Testa que o rollback de um email duplicado desfaz o incremento"""
+        from src.core.exceptions import UserAlreadyExistsError
+
+        self.repository.add(user_data(1))
+        with self.assertRaises(UserAlreadyExistsError):
+            self.repository.add_many([user_data(2), user_data(1)])
+        self.assertEqual(self.repository.count(), 1)
+
+    def test_reconcile_fixes_drift(self):
+        """Testa a correção do contador a partir de COUNT(*)"""
+        self.repository.add_many([user_data(i) for i in range(3)])
+        with self.engine.begin() as connection:
+            self.assertIsNone(reconcile_user_count(connection))
+            connection.exec_driver_sql("UPDATE table_row_counts SET row_count = 42")
+            with self.assertLogs("src.infrastructure.database.user_count", level="WARNING"):
+                self.assertEqual(reconcile_user_count(connection), 3)
+        self.assertEqual(self.repository.count(), 3)
+
+    def test_counter_created_on_existing_table(self):
+        """Testa que o contador de um banco antigo começa com o total da tabela"""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, email VARCHAR, hashed_password VARCHAR)"
+            )
+            connection.exec_driver_sql("INSERT INTO users (username) VALUES ('a'), ('b')")
+            create_user_counter(connection)
+            create_user_counter(connection)  # idempotente
+            connection.exec_driver_sql("INSERT INTO users (username) VALUES ('c')")
+            count = connection.exec_driver_sql("SELECT row_count FROM table_row_counts").scalar()
+        self.assertEqual(count, 3)
+        engine.dispose()
+
+
+class TestAsyncUserCounter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_count(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session = async_sessionmaker(engine, expire_on_commit=False)()
+        repository = AsyncSQLiteUserRepository(session)
+        await repository.add_many([user_data(i) for i in range(3)])
+        self.assertEqual(await repository.count(), 3)
+        await session.close()
+        await engine.dispose()
+
+
+class TestTotalCountHeader(AppStateTestMixin, unittest.TestCase):
+
+    def _app(self, **overrides):
+        from src.config import Settings
+        from src.main import create_app
+
+        settings = Settings(
+            database_url=self.database_url("count.db"),
+            password_hash_workers=0,
+            metrics_enabled=False,
+            **overrides,
+        )
+        return create_app(settings)
+
+    def test_include_total(self):
+        """Testa X-Total-Count apenas quando include_total=true"""
+        with TestClient(self._app()) as client:
+            for i in range(3):
+                client.post("/users/", json={"username": f"u{i}", "email": f"u{i}@example.com", "password": "pw"})
+            response = client.get("/users/", params={"limit": 2, "include_total": "true"})
+            self.assertEqual(response.headers["X-Total-Count"], "3")
+            self.assertIn("X-Next-Cursor", response.headers)
+            self.assertNotIn("X-Total-Count", client.get("/users/").headers)
+
+    def test_periodic_reconciliation(self):
+        """Testa que a conferência periódica corrige o contador"""
+        from src.infrastructure.database.database import get_database
+
+        with TestClient(self._app(user_count_reconcile_interval_seconds=0.05)) as client:
+            with get_database().engine.begin() as connection:
+                connection.exec_driver_sql("UPDATE table_row_counts SET row_count = 7")
+            client.portal.call(asyncio.sleep, 0.3)
+            response = client.get("/users/", params={"include_total": "true"})
+            self.assertEqual(response.headers["X-Total-Count"], "0")
+
+
+if __name__ == "__main__":
+    unittest.main()
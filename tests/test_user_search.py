@@ -0,0 +1,202 @@
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.infrastructure.database.async_sqlite_user_repository import AsyncSQLiteUserRepository
+from src.infrastructure.database.database import Base
+from src.infrastructure.database.sqlite_user_repository import SQLiteUserRepository
+from src.infrastructure.database.user_search import build_match_query, create_search_index
+from src.infrastructure.database.user_versions import add_version_column
+from src.infrastructure.web.pagination import decode_search_cursor, encode_search_cursor
+from tests import AppStateTestMixin, SQLiteRepositoryTestMixin
+
+USERS = (
+    ("maria", "maria@example.com"),
+    ("maria_silva", "maria.silva@example.com"),
+    ("joão_souza", "joao.souza@example.org"),
+    ("ana_maria", "ana.maria@example.net"),
+    ("mariana", "mariana@example.com"),
+    ("pedro", "pedro.mariano@example.com"),
+)
+
+
+class TestMatchQuery(unittest.TestCase):
+
+    def test_terms_are_quoted_and_last_is_prefix(self):
+        """Testa a conversão do texto em expressão MATCH"""
+        self.assertEqual(build_match_query("maria sil"), '"maria" "sil"*')
+        self.assertEqual(build_match_query("maria.silva@ex"), '"maria" "silva" "ex"*')
+
+    def test_operators_are_not_interpreted(self):
+        """Testa que aspas e operadores do FTS5 digitados são tratados como texto"""
+        self.assertEqual(build_match_query('NEAR("a" OR b*)'), '"NEAR" "a" "OR" "b"*')
+
+    def test_query_without_terms(self):
+        self.assertIsNone(build_match_query(" @.- "))
+
+
+class TestSearchCursor(unittest.TestCase):
+
+    def test_roundtrip(self):
+        self.assertEqual(decode_search_cursor(encode_search_cursor(1, 42)), (1, 42))
+
+    def test_invalid_cursor(self):
+        from src.infrastructure.web.pagination import encode_cursor
+        for cursor in ("invalido", encode_cursor(5)):
+            with self.assertRaises(ValueError):
+                decode_search_cursor(cursor)
+
+
+class TestSQLiteUserSearch(SQLiteRepositoryTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            self.repository.add({"username": username, "email": email, "hashed_password": "h"})
+            for username, email in USERS
+        ]
+
+    def _usernames(self, hits):
+        return [user.username for _, user in hits]
+
+    def test_ranking(self):
+        """Testa a ordem: igualdade exata, depois prefixo, depois os demais termos"""
+        hits = self.repository.search("maria")
+        self.assertEqual(
+            [(rank, user.username) for rank, user in hits],
+            [(0, "maria"), (1, "maria_silva"), (1, "mariana"), (2, "ana_maria"), (2, "pedro")],
+        )
+
+    def test_all_terms_required_and_accents_ignored(self):
+        """Testa que todos os termos devem aparecer e que acentos são ignorados"""
+        self.assertEqual(self._usernames(self.repository.search("maria sil")), ["maria_silva"])
+        self.assertEqual(self._usernames(self.repository.search("joao")), ["joão_souza"])
+        self.assertEqual(self._usernames(self.repository.search("example.org")), ["joão_souza"])
+
+    def test_keyset_pagination(self):
+        """Testa que as páginas seguem a ordem (rank, id) sem repetições"""
+        expected = self._usernames(self.repository.search("mari", limit=10))
+        pages, after = [], None
+        while True:
+            hits = self.repository.search("mari", limit=2, after=after)
+            pages.extend(self._usernames(hits))
+            if len(hits) < 2:
+                break
+            rank, user = hits[-1]
+            after = (rank, user.id)
+        self.assertEqual(pages, expected)
+
+    def test_max_candidates(self):
+        """Testa o limite de ocorrências consideradas por consulta"""
+        self.assertEqual(len(self.repository.search("example", max_candidates=3)), 3)
+
+    def test_index_follows_updates_and_deletes(self):
+        """Testa que os triggers mantêm o índice em update e delete"""
+        pedro = self.users[-1]
+        self.repository.update(pedro.id, {"email": "pedro@example.com"})
+        self.assertNotIn("pedro", self._usernames(self.repository.search("mariano")))
+        self.assertEqual(self._usernames(self.repository.search("pedro")), ["pedro"])
+
+        self.repository.delete(pedro.id)
+        self.assertEqual(self.repository.search("pedro"), [])
+
+    def test_query_without_terms_returns_empty(self):
+        self.assertEqual(self.repository.search("@@"), [])
+
+
+class TestSearchIndexOnExistingDatabase(unittest.TestCase):
+
+    def test_index_is_built_from_existing_rows(self):
+        """Testa que um banco criado antes do índice é indexado por create_search_index"""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, email VARCHAR UNIQUE, "
+                "hashed_password VARCHAR)"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO users (username, email, hashed_password) VALUES ('legado', 'legado@example.com', 'h')"
+            )
+            add_version_column(connection)  # migração aplicada por _create_schema antes do índice
+            create_search_index(connection)
+            create_search_index(connection)  # idempotente
+        repository = SQLiteUserRepository(sessionmaker(bind=engine)())
+        self.assertEqual([user.username for _, user in repository.search("legado")], ["legado"])
+        with engine.connect() as connection:
+            count = connection.execute(text("SELECT count(*) FROM users_fts WHERE users_fts MATCH 'legado'")).scalar()
+        self.assertEqual(count, 1)
+        engine.dispose()
+
+
+class TestAsyncSQLiteUserSearch(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.repository = AsyncSQLiteUserRepository(self.session)
+        for username, email in USERS:
+            await self.repository.add({"username": username, "email": email, "hashed_password": "h"})
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def test_search(self):
+        hits = await self.repository.search("maria", limit=2)
+        self.assertEqual([(rank, user.username) for rank, user in hits], [(0, "maria"), (1, "maria_silva")])
+        hits = await self.repository.search("maria", limit=10, after=(1, hits[-1][1].id))
+        self.assertEqual([user.username for _, user in hits], ["mariana", "ana_maria", "pedro"])
+
+
+class TestSearchEndpoint(AppStateTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        import src.infrastructure.database.database as database_module
+        from src.config import Settings
+        from src.main import create_app
+
+        super().setUp()
+        settings = Settings(
+            database_url=self.database_url("search.db"),
+            password_hash_workers=0,
+            metrics_enabled=False,
+        )
+        self.client = TestClient(create_app(settings))
+        self.client.__enter__()
+        database = database_module.get_database()
+        with database.engine.begin() as connection:
+            for username, email in USERS:
+                connection.execute(
+                    text("INSERT INTO users (username, email, hashed_password) VALUES (:u, :e, 'h')"),
+                    {"u": username, "e": email},
+                )
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+
+    def test_search_with_cursor(self):
+        """Testa a busca paginada pelo cabeçalho X-Next-Cursor"""
+        response = self.client.get("/users/search", params={"q": "maria", "limit": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([u["username"] for u in response.json()], ["maria", "maria_silva", "mariana"])
+        self.assertNotIn("hashed_password", response.json()[0])
+
+        cursor = response.headers["X-Next-Cursor"]
+        response = self.client.get("/users/search", params={"q": "maria", "limit": 3, "after": cursor})
+        self.assertEqual([u["username"] for u in response.json()], ["ana_maria", "pedro"])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get("/users/search").status_code, 422)
+        self.assertEqual(self.client.get("/users/search", params={"q": ""}).status_code, 422)
+        self.assertEqual(self.client.get("/users/search", params={"q": "a", "after": "x"}).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
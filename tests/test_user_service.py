@@ -1,19 +1,21 @@
+import asyncio
 import unittest
 from unittest.mock import MagicMock
 
 from src.core.models import User
-from src.core.ports.user_repository import UserRepository
-from src.core.services.user_service import UserService
-from src.core.exceptions import UserNotFoundError
+from src.core.ports.async_user_repository import AsyncUserRepository
+from src.core.ports.user_cache import UserCache
+from src.core.services.async_user_service import AsyncUserService
+from src.core.exceptions import UserAlreadyExistsError, UserNotFoundError
 
 
 class TestUserService(unittest.TestCase):
 
     def setUp(self):
-        # Cria um mock (dublê) do repositório
-        self.mock_repo = MagicMock(spec=UserRepository)
+        # Cria um mock (dublê) do repositório; os métodos da porta viram AsyncMock
+        self.mock_repo = MagicMock(spec=AsyncUserRepository)
         # Instancia o serviço com o repositório mockado
-        self.user_service = UserService(self.mock_repo)
+        self.user_service = AsyncUserService(self.mock_repo)
 
     def test_create_user(self):
         user_data = {
@@ -23,16 +25,14 @@ class TestUserService(unittest.TestCase):
         }
         expected_user = User(id=1, **user_data)
 
-        # Configura o mock para retornar None quando verificar se usuário existe
-        self.mock_repo.get_by_email.return_value = None
         # Configura o mock para retornar o usuário esperado quando 'add' for chamado
         self.mock_repo.add.return_value = expected_user
 
         # Chama o método do serviço
-        created_user = self.user_service.create_user(user_data)
+        created_user = asyncio.run(self.user_service.create_user(user_data))
 
-        # Verifica se o método 'get_by_email' foi chamado para verificar duplicação
-        self.mock_repo.get_by_email.assert_called_once_with("test@example.com")
+        # A duplicidade é verificada pela constraint do INSERT, sem SELECT prévio
+        self.mock_repo.get_by_email.assert_not_called()
         # Verifica se o método 'add' do repositório foi chamado com os dados corretos
         self.mock_repo.add.assert_called_once_with(user_data)
         # Verifica se o usuário retornado é o esperado
@@ -46,17 +46,55 @@ class TestUserService(unittest.TestCase):
             "hashed_password": "hashed_password",
         }
         
-        # Configura o mock para retornar um usuário existente
-        existing_user = User(id=1, **user_data)
-        self.mock_repo.get_by_email.return_value = existing_user
+        # Configura o mock para sinalizar a violação da constraint única
+        self.mock_repo.add.side_effect = UserAlreadyExistsError("UNIQUE constraint failed")
 
         # Verifica se a exceção é lançada
-        with self.assertRaises(Exception) as context:
-            self.user_service.create_user(user_data)
+        with self.assertRaises(UserAlreadyExistsError) as context:
+            asyncio.run(self.user_service.create_user(user_data))
         
-        # Verifica se a exceção é do tipo correto
+        # Verifica a mensagem de negócio
         self.assertIn("já existe", str(context.exception))
 
+    def test_create_users_batch(self):
+        """Testa criação em lote com duplicados no banco e dentro do lote"""
+        users_data = [
+            {"username": "a", "email": "a@example.com", "hashed_password": "h"},
+            {"username": "b", "email": "b@example.com", "hashed_password": "h"},
+            {"username": "a2", "email": "a@example.com", "hashed_password": "h"},
+            {"username": "c", "email": "c@example.com", "hashed_password": "h"},
+        ]
+        created_a = User(id=10, **users_data[0])
+        created_c = User(id=11, **users_data[3])
+        self.mock_repo.get_existing_emails.return_value = {"b@example.com"}
+        self.mock_repo.add_many.return_value = [created_a, created_c]
+
+        results = asyncio.run(self.user_service.create_users(users_data))
+
+        self.mock_repo.add_many.assert_called_once_with([users_data[0], users_data[3]])
+        self.assertEqual(results[0], created_a)
+        self.assertIsInstance(results[1], UserAlreadyExistsError)
+        self.assertIsInstance(results[2], UserAlreadyExistsError)
+        self.assertEqual(results[3], created_c)
+
+    def test_create_users_retries_per_row_after_concurrent_insert(self):
+        """Testa que um conflito no INSERT em lote refaz o lote item a item"""
+        users_data = [
+            {"username": "a", "email": "a@example.com", "hashed_password": "h"},
+            {"username": "b", "email": "b@example.com", "hashed_password": "h"},
+        ]
+        created_b = User(id=2, username="b", email="b@example.com", hashed_password="h")
+        self.mock_repo.get_existing_emails.return_value = set()
+        self.mock_repo.add_many.side_effect = UserAlreadyExistsError("conflito")
+        self.mock_repo.add.side_effect = [UserAlreadyExistsError("conflito"), created_b]
+
+        results = asyncio.run(self.user_service.create_users(users_data))
+
+        self.assertIsInstance(results[0], UserAlreadyExistsError)
+        self.assertEqual(results[1], created_b)
+        self.assertEqual(self.mock_repo.add_many.call_count, 1)
+        self.assertEqual(self.mock_repo.add.call_count, 2)
+
     def test_get_user_by_id(self):
         user_id = 1
         expected_user = User(
@@ -68,7 +106,7 @@ class TestUserService(unittest.TestCase):
 
         self.mock_repo.get_by_id.return_value = expected_user
 
-        user = self.user_service.get_user_by_id(user_id)
+        user = asyncio.run(self.user_service.get_user_by_id(user_id))
 
         self.mock_repo.get_by_id.assert_called_once_with(user_id)
         self.assertEqual(user, expected_user)
@@ -77,7 +115,7 @@ class TestUserService(unittest.TestCase):
         user_id = 99
         self.mock_repo.get_by_id.return_value = None
 
-        user = self.user_service.get_user_by_id(user_id)
+        user = asyncio.run(self.user_service.get_user_by_id(user_id))
 
         self.mock_repo.get_by_id.assert_called_once_with(user_id)
         self.assertIsNone(user)
@@ -93,7 +131,7 @@ class TestUserService(unittest.TestCase):
 
         self.mock_repo.get_by_email.return_value = expected_user
 
-        user = self.user_service.get_user_by_email(email)
+        user = asyncio.run(self.user_service.get_user_by_email(email))
 
         self.mock_repo.get_by_email.assert_called_once_with(email)
         self.assertEqual(user, expected_user)
@@ -102,7 +140,7 @@ class TestUserService(unittest.TestCase):
         email = "nonexistent@example.com"
         self.mock_repo.get_by_email.return_value = None
 
-        user = self.user_service.get_user_by_email(email)
+        user = asyncio.run(self.user_service.get_user_by_email(email))
 
         self.mock_repo.get_by_email.assert_called_once_with(email)
         self.assertIsNone(user)
@@ -118,7 +156,7 @@ class TestUserService(unittest.TestCase):
         ]
         self.mock_repo.get_all.return_value = expected_users
 
-        users = self.user_service.get_all_users(skip=0, limit=10)
+        users = asyncio.run(self.user_service.get_all_users(skip=0, limit=10))
 
         self.mock_repo.get_all.assert_called_once_with(skip=0, limit=10)
         self.assertEqual(users, expected_users)
@@ -128,7 +166,7 @@ class TestUserService(unittest.TestCase):
         expected_users = []
         self.mock_repo.get_all.return_value = expected_users
 
-        users = self.user_service.get_all_users(skip=-5, limit=10)
+        users = asyncio.run(self.user_service.get_all_users(skip=-5, limit=10))
 
         # Verifica se skip foi corrigido para 0
         self.mock_repo.get_all.assert_called_once_with(skip=0, limit=10)
@@ -140,13 +178,22 @@ class TestUserService(unittest.TestCase):
         self.mock_repo.get_all.return_value = expected_users
 
         # Testa limit muito baixo
-        users = self.user_service.get_all_users(skip=0, limit=0)
+        users = asyncio.run(self.user_service.get_all_users(skip=0, limit=0))
         self.mock_repo.get_all.assert_called_with(skip=0, limit=10)
 
         # Testa limit muito alto
-        users = self.user_service.get_all_users(skip=0, limit=200)
+        users = asyncio.run(self.user_service.get_all_users(skip=0, limit=200))
         self.mock_repo.get_all.assert_called_with(skip=0, limit=10)
 
+    def test_get_users_after(self):
+        """Testa a paginação por cursor delegada ao repositório"""
+        self.mock_repo.get_all_after.return_value = []
+
+        asyncio.run(self.user_service.get_users_after(after_id=42, limit=500))
+
+        # limit fora do intervalo é normalizado como na paginação por offset
+        self.mock_repo.get_all_after.assert_called_once_with(after_id=42, limit=10)
+
     def test_update_user(self):
         user_id = 1
         user_data = {"username": "updated_user"}
@@ -157,66 +204,85 @@ class TestUserService(unittest.TestCase):
             hashed_password="fake",
         )
 
-        # Mock para verificar se usuário existe
-        existing_user = User(
-            id=user_id,
-            username="old_user",
-            email="test@example.com",
-            hashed_password="fake",
-        )
-        self.mock_repo.get_by_id.return_value = existing_user
         self.mock_repo.update.return_value = expected_user
 
-        user = self.user_service.update_user(user_id, user_data)
+        user = asyncio.run(self.user_service.update_user(user_id, user_data))
 
-        self.mock_repo.get_by_id.assert_called_once_with(user_id)
-        self.mock_repo.update.assert_called_once_with(user_id, user_data)
+        # UPDATE ... RETURNING: nenhum SELECT prévio
+        self.mock_repo.get_by_id.assert_not_called()
+        self.mock_repo.update.assert_called_once_with(user_id, user_data, expected_version=None)
         self.assertEqual(user, expected_user)
 
+    def test_update_user_invalidates_cache(self):
+        """Testa que a atualização invalida o usuário atualizado no cache"""
+        mock_cache = MagicMock(spec=UserCache)
+        service = AsyncUserService(self.mock_repo, user_cache=mock_cache)
+        updated_user = User(id=1, username="u", email="new@example.com", hashed_password="h")
+        self.mock_repo.update.return_value = updated_user
+
+        asyncio.run(service.update_user(1, {"email": "new@example.com"}))
+
+        mock_cache.invalidate_user.assert_called_once_with(updated_user)
+
+    def test_delete_user_invalidates_cache(self):
+        """Testa que a deleção invalida o usuário removido no cache"""
+        mock_cache = MagicMock(spec=UserCache)
+        service = AsyncUserService(self.mock_repo, user_cache=mock_cache)
+        deleted_user = User(id=1, username="u", email="u@example.com", hashed_password="h")
+        self.mock_repo.delete.return_value = deleted_user
+
+        asyncio.run(service.delete_user(1))
+
+        mock_cache.invalidate_user.assert_called_once_with(deleted_user)
+
     def test_update_user_not_found(self):
         """Testa se o serviço rejeita atualização de usuário inexistente"""
         user_id = 99
         user_data = {"username": "updated_user"}
 
-        self.mock_repo.get_by_id.return_value = None
+        self.mock_repo.update.return_value = None
 
         with self.assertRaises(UserNotFoundError) as context:
-            self.user_service.update_user(user_id, user_data)
+            asyncio.run(self.user_service.update_user(user_id, user_data))
 
         self.assertIn("não encontrado", str(context.exception))
-        self.mock_repo.get_by_id.assert_called_once_with(user_id)
-        self.mock_repo.update.assert_not_called()
+        self.mock_repo.update.assert_called_once_with(user_id, user_data, expected_version=None)
+
+    def test_update_user_duplicate_email(self):
+        """Testa que trocar para um email existente propaga UserAlreadyExistsError"""
+        self.mock_repo.update.side_effect = UserAlreadyExistsError("já existe")
+
+        with self.assertRaises(UserAlreadyExistsError):
+            asyncio.run(self.user_service.update_user(1, {"email": "dup@example.com"}))
 
     def test_delete_user(self):
         user_id = 1
-        existing_user = User(
+        deleted_user = User(
             id=user_id,
             username="testuser",
             email="test@example.com",
             hashed_password="fake",
         )
 
-        self.mock_repo.get_by_id.return_value = existing_user
-        self.mock_repo.delete.return_value = True
+        self.mock_repo.delete.return_value = deleted_user
 
-        result = self.user_service.delete_user(user_id)
+        result = asyncio.run(self.user_service.delete_user(user_id))
 
-        self.mock_repo.get_by_id.assert_called_once_with(user_id)
-        self.mock_repo.delete.assert_called_once_with(user_id)
+        self.mock_repo.get_by_id.assert_not_called()
+        self.mock_repo.delete.assert_called_once_with(user_id, expected_version=None)
         self.assertTrue(result)
 
     def test_delete_user_not_found(self):
         """Testa se o serviço rejeita deleção de usuário inexistente"""
         user_id = 99
 
-        self.mock_repo.get_by_id.return_value = None
+        self.mock_repo.delete.return_value = None
 
         with self.assertRaises(UserNotFoundError) as context:
-            self.user_service.delete_user(user_id)
+            asyncio.run(self.user_service.delete_user(user_id))
 
         self.assertIn("não encontrado", str(context.exception))
-        self.mock_repo.get_by_id.assert_called_once_with(user_id)
-        self.mock_repo.delete.assert_not_called()
+        self.mock_repo.delete.assert_called_once_with(user_id, expected_version=None)
 
 
 if __name__ == "__main__":